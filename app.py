@@ -1,26 +1,48 @@
 import os
 import time
+import threading
 import re
 import io
+import itertools
 import zipfile
+import tarfile
 import streamlit as st
-from typing import List, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import IO, List, Optional, Dict, Any, Callable, Iterable, Iterator, Tuple, Union
 from pathlib import Path
 from pydantic import BaseModel, Field
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.callbacks import UsageMetadataCallbackHandler
 from pyvis.network import Network
 import json
 import streamlit.components.v1 as components
 from dotenv import load_dotenv
 from src.parsers.markdown_parser import MarkdownMultiDocumentParser
+from src.parsers.pdf_pages import PdfDocumentText, build_pdf_document_text, iter_pdf_pages, page_for_sentence
+from src.parsers.archive_loader import archive_kind, iter_archive_files
+from src.parsers.document_loader import ParsedFile, default_parse_workers, extract_text, parse_directory, parse_files
+from src.parsers.html_content import default_html_mode, extract_html_text
+from src.parsers.office_xml import iter_docx_paragraphs, iter_odt_paragraphs
+from src.extraction.alias_index import AliasIndex, load_alias_index
+from src.extraction.alias_matching import AliasMatchReport
+from src.extraction.entity_resolution import ALIAS_RELATION, DISTINCT_RELATION, EntityResolver
+from src.extraction.cache import ExtractionCache, create_extraction_cache, make_cache_key
+from src.parsers.sentence_chunker import SENTENCE_ID_LINE_REGEX, TextChunk, chunk_sentences, chunk_text, estimate_tokens, split_sentences
+from src.parsers.sentence_segmenter import SentenceIndex, annotate_sentences
+from src.extraction.llm_scheduler import LLMScheduler, RetryPolicy
+from src.extraction.jsonl_stream import JSONObjectStreamParser, is_fact, message_chunk_text
+from src.extraction.relset_pruning import RelSetPruner, load_gazetteer, restrict_rel_set
+from src.extraction.cascade import DEFAULT_MIN_MEAN_CONFIDENCE, ModelCascade
+from src.extraction.incremental import DEFAULT_MAX_CHANGED_RATIO, DEFAULT_REEXTRACTION_WINDOW, DocumentSnapshot, DocumentSnapshotStore, diff_sentences, hash_sentence, hash_sentences, reextraction_windows, remap_retained_evidence
+from src.extraction.near_duplicates import DEFAULT_SIMILARITY_THRESHOLD, NearDuplicateDetector, duplicate_evidence, map_duplicate_sentences
+from src.extraction.folder_manifest import FolderChanges, FolderManifest
+from src.extraction.run_manifest import STATUS_DONE, STATUS_DUPLICATE, STATUS_ERROR, STATUS_SKIPPED, RunManifest, list_runs
+from src.extraction.llm_backend import LLM_BACKENDS, RecordingChatModel, RecordingStore, ReplayChatModel
+from src.extraction.metrics import CallMetrics, RunMetrics
+from src.extraction.document_packing import PACKED_DOC_ID, pack_documents, render_packed_documents, resolve_packed_doc_id
 
 # Import parsers for different file types
-from PyPDF2 import PdfReader
-import docx
-from odf.opendocument import load as load_odt
-from odf import text as odf_text, teletype as odf_teletype
-from bs4 import BeautifulSoup
 from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound
 from neo4j import GraphDatabase
 
@@ -38,6 +60,42 @@ NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 
 SUPPORTED_FILE_EXTENSIONS = {".txt", ".pdf", ".docx", ".md", ".html", ".htm", ".odt"}
+# Markdown corpora are streamed line by line from the file instead of being read whole by the parse workers
+MARKDOWN_EXTENSIONS = {".md"}
+
+# Number of documents sent to the LLM at the same time; the run is I/O bound on Gemini latency.
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("KGRAPH_MAX_CONCURRENCY", "4"))
+
+# Worker processes for parsing the files of an input directory
+DEFAULT_PARSE_WORKERS = default_parse_workers()
+DEFAULT_HTML_MODE = default_html_mode()
+HTML_MODE_OPTIONS = {"正文（去除导航、页脚、广告等模板内容）": "main", "整页文本": "full"}
+
+# Persistent extraction cache location (disk and SQLite backends)
+EXTRACTION_CACHE_DIR = Path(os.getenv("KGRAPH_CACHE_DIR", ".kgraph_cache"))
+# Run manifests for checkpointed, resumable batch runs
+RUNS_DIR = EXTRACTION_CACHE_DIR / "runs"
+ALIAS_INDEX_DIR = EXTRACTION_CACHE_DIR / "alias_index"
+
+# Documents estimated above this many tokens are split into overlapping sentence windows
+DEFAULT_CHUNK_TOKEN_BUDGET = int(os.getenv("KGRAPH_CHUNK_TOKENS", "3000"))
+DEFAULT_CHUNK_OVERLAP_SENTENCES = 1
+
+# Short documents can be packed into one request up to this many estimated tokens (0 disables packing)
+DEFAULT_PACK_TOKEN_BUDGET = int(os.getenv("KGRAPH_PACK_TOKENS", "0"))
+
+# Client-side rate limits for the Gemini API key (0 means unlimited)
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv("KGRAPH_RPM", "0"))
+DEFAULT_TOKENS_PER_MINUTE = int(os.getenv("KGRAPH_TPM", "0"))
+DEFAULT_MAX_RETRIES = int(os.getenv("KGRAPH_MAX_RETRIES", "5"))
+
+# LLM backend: "live" calls Gemini, "record" also saves every response, "replay" serves saved responses offline
+LLM_BACKEND = os.getenv("KGRAPH_LLM_BACKEND", "live")
+LLM_RECORDINGS_DIR = Path(os.getenv("KGRAPH_LLM_RECORDINGS_DIR", str(EXTRACTION_CACHE_DIR / "llm_recordings")))
+# Simulated per-call latency (seconds, ± jitter) and failure probability of the replay backend
+REPLAY_LATENCY_SECONDS = float(os.getenv("KGRAPH_REPLAY_LATENCY", "0"))
+REPLAY_LATENCY_JITTER = float(os.getenv("KGRAPH_REPLAY_JITTER", "0"))
+REPLAY_FAILURE_RATE = float(os.getenv("KGRAPH_REPLAY_FAILURE_RATE", "0"))
 
 # Load REL_SET configurations
 REL_SETS = {}
@@ -142,85 +200,150 @@ def sanitize_relationship_type(rel_type: Optional[str]) -> str:
     return cleaned.upper() if cleaned else "RELATIONSHIP"
 
 
-def process_markdown_content(markdown_content: str, fallback_doc_id: str, fallback_source: str) -> List[Dict[str, Any]]:
+def process_markdown_content(markdown_file: IO, fallback_doc_id: str, fallback_source: str, fallback_date: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    逐行读取 Markdown 文件（二进制或文本流），不先把整个文件解码为一个字符串：
+    含 /corpus/ 分段的多文档语料交给 MarkdownMultiDocumentParser.parse_iter 流式拆分，普通 Markdown 作为一篇文档。
+    """
     documents = []
-    if "/corpus/" in markdown_content:
-        parser = MarkdownMultiDocumentParser()
-        parsed_docs = parser.parse(markdown_content)
-        if parsed_docs:
-            documents.extend(parsed_docs)
-        else:
-            st.warning(f"未能在 {fallback_source} 中找到任何可解析的多文档内容。")
-    else:
-        cleaned_text = re.sub(r'[\*\#\`\>]', '', markdown_content)
-        documents.append({
-            "doc_id": fallback_doc_id,
-            "source": fallback_source,
-            "date": time.strftime("%Y-%m-%d"),
-            "text_with_sentence_ids": cleaned_text
-        })
+    lines = (line.decode("utf-8") if isinstance(line, bytes) else line for line in markdown_file)
+    preamble = []
+    for line in lines:
+        if "/corpus/" in line:
+            # Lines before the first block are outside any document, the parser would skip them anyway
+            parser = MarkdownMultiDocumentParser()
+            documents.extend(parser.parse_iter(itertools.chain([line], lines)))
+            if not documents:
+                st.warning(f"未能在 {fallback_source} 中找到任何可解析的多文档内容。")
+            if parser.errors:
+                st.warning(f"{fallback_source} 中有 {len(parser.errors)} 个文档块格式不正确，已跳过：\n" + "\n".join(
+                    f"- 第 {error.line_number} 行{f'（{error.doc_id}）' if error.doc_id else ''}: {error.reason}" for error in parser.errors
+                ))
+            return documents
+        preamble.append(line)
+
+    cleaned_text = re.sub(r'[\*\#\`\>]', '', "".join(preamble))
+    documents.append({
+        "doc_id": fallback_doc_id,
+        "source": fallback_source,
+        "date": fallback_date,
+        "text_with_sentence_ids": cleaned_text
+    })
     return documents
 
 
+def ensure_sentence_ids(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """未带 S 编号的文档（纯文本、PDF/DOCX/HTML、字幕、粘贴文本）先按中英文句界切分并标注 S1…Sn。"""
+    text = doc.get("text_with_sentence_ids") or ""
+    if not text.strip() or any(SENTENCE_ID_LINE_REGEX.match(line) for line in text.splitlines()):
+        return doc
+    return {**doc, "text_with_sentence_ids": annotate_sentences(text).text}
+
+
+def build_sentence_indexes(documents: List[Dict[str, Any]]) -> Dict[str, Tuple[str, SentenceIndex]]:
+    return {
+        doc["doc_id"]: (doc["text_with_sentence_ids"], SentenceIndex.from_annotated_text(doc["text_with_sentence_ids"]))
+        for doc in documents if doc.get("text_with_sentence_ids")
+    }
+
+
+def resolve_evidence_sentences(evidence: Optional[List[Dict[str, Any]]], sentence_indexes: Dict[str, Tuple[str, SentenceIndex]]) -> List[str]:
+    """把证据中的 (文档, 句号) 解析为原句文本，找不到的句号会标注出来。"""
+    resolved = []
+    for item in evidence or []:
+        doc_id = item.get("doc")
+        text, index = sentence_indexes.get(doc_id, ("", SentenceIndex()))
+        for sentence_id in item.get("sents") or []:
+            sentence = index.sentence_text(text, sentence_id) if isinstance(sentence_id, int) else None
+            resolved.append(f"[{doc_id} S{sentence_id}] {sentence if sentence is not None else '（未找到该句）'}")
+    return resolved
+
+
 def get_text_from_path(file_path: Path) -> str:
-    file_extension = file_path.suffix.lower()
     try:
-        if file_extension == ".pdf":
-            text = ""
-            with file_path.open("rb") as f:
-                reader = PdfReader(f)
-                for page in reader.pages:
-                    text += page.extract_text() or ""
-            return text
-        elif file_extension == ".docx":
-            with file_path.open("rb") as f:
-                doc = docx.Document(f)
-            text = "\n".join(para.text for para in doc.paragraphs)
-            return text
-        elif file_extension == ".odt":
-            doc = load_odt(str(file_path))
-            all_paras = doc.getElementsByType(odf_text.P)
-            text = "\n".join(odf_teletype.extractText(para) for para in all_paras)
-            return text
-        elif file_extension in [".html", ".htm"]:
-            with file_path.open("r", encoding="utf-8") as f:
-                return BeautifulSoup(f.read(), "html.parser").get_text()
-        elif file_extension == ".txt":
-            return file_path.read_text(encoding="utf-8")
-        else:
-            st.warning(f"目录中文件 {file_path.name} 的格式暂不支持。")
-            return ""
+        return extract_text(file_path)
     except Exception as e:
         st.error(f"读取文件 {file_path} 时发生错误: {e}")
         return ""
 
 
-def load_documents_from_directory(directory_path: Path) -> List[Dict[str, Any]]:
+def document_date(modified_at: Optional[float]) -> Optional[str]:
+    """
+    未注明日期的文件以其修改日期作为文档日期，取不到时留空（提示词中为“未知”）。
+    不使用运行当天的日期：日期会写入系统提示词和缓存键，同一文件隔天重跑时应命中缓存。
+    """
+    return time.strftime("%Y-%m-%d", time.localtime(modified_at)) if modified_at is not None else None
+
+
+def documents_from_parsed_file(parsed_file: ParsedFile) -> List[Dict[str, Any]]:
+    """把解析后的文件转换为待抽取文档：多文档 Markdown 拆分为多篇，其它文件以相对路径作为文档 ID。"""
+    date = document_date(parsed_file.modified_at)
+    if parsed_file.path.suffix.lower() == ".md":
+        if not parsed_file.deferred:
+            # Archive members are already decoded in memory
+            return process_markdown_content(io.StringIO(parsed_file.text), parsed_file.relative_name, parsed_file.relative_name, date)
+        try:
+            with parsed_file.path.open("rb") as markdown_file:
+                return process_markdown_content(markdown_file, parsed_file.relative_name, parsed_file.relative_name, date)
+        except (OSError, UnicodeDecodeError) as e:
+            st.error(f"读取文件 {parsed_file.path} 时发生错误: {e}")
+            return []
+    document = {
+        "doc_id": parsed_file.relative_name,
+        "source": parsed_file.relative_name,
+        "date": date,
+        "text_with_sentence_ids": parsed_file.text
+    }
+    if parsed_file.page_starts:
+        document["page_starts"] = parsed_file.page_starts
+    return [document]
+
+
+def load_documents_from_directory(directory_path: Path, max_workers: Optional[int] = None, html_mode: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    按路径排序并行解析目录下所有支持的文件（多进程，进程数默认取 KGRAPH_PARSE_WORKERS 或 CPU 核数），
+    文档顺序与并行度无关；解析失败的文件不会中断导入，而是在全部解析完成后统一报告。
+    html_mode 为 "main" 时网页只保留正文，"full" 时保留整页文本（默认取 KGRAPH_HTML_MODE）。
+    """
     documents = []
     if not directory_path.exists() or not directory_path.is_dir():
         st.error(f"目录 {directory_path} 不存在或不是有效目录。")
         return documents
 
-    matched_files = sorted([p for p in directory_path.rglob("*") if p.suffix.lower() in SUPPORTED_FILE_EXTENSIONS and p.is_file()])
+    parse_result = parse_directory(directory_path, max_workers=max_workers, extensions=SUPPORTED_FILE_EXTENSIONS, html_mode=html_mode, deferred_extensions=MARKDOWN_EXTENSIONS)
 
-    if not matched_files:
+    if not parse_result.files:
         st.warning(f"目录 {directory_path} 中未找到支持的文件类型: {', '.join(sorted(SUPPORTED_FILE_EXTENSIONS))}")
         return documents
 
-    for file_path in matched_files:
-        extension = file_path.suffix.lower()
-        relative_name = str(file_path.relative_to(directory_path))
-        if extension == ".md":
-            markdown_content = file_path.read_text(encoding="utf-8")
-            documents.extend(process_markdown_content(markdown_content, relative_name, relative_name))
-        else:
-            text = get_text_from_path(file_path)
-            documents.append({
-                "doc_id": relative_name,
-                "source": relative_name,
-                "date": time.strftime("%Y-%m-%d"),
-                "text_with_sentence_ids": text
-            })
+    for parsed_file in parse_result.files:
+        if parsed_file.error is None:
+            documents.extend(documents_from_parsed_file(parsed_file))
+
+    failures = parse_result.failures
+    if failures:
+        st.error(f"目录 {directory_path} 中有 {len(failures)} 个文件解析失败，已跳过：\n" + "\n".join(f"- {failure.relative_name}: {failure.error}" for failure in failures))
+    return documents
+
+
+def load_documents_from_archive(archive_source, archive_name: str, html_mode: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    逐个成员流式读取 .zip / .tar(.gz) 压缩包（本地路径或上传文件），不解压到磁盘；
+    每个成员按扩展名交给对应解析器，文档 ID 为成员在压缩包内的相对路径，解析失败的成员在最后统一报告。
+    """
+    documents, failures = [], []
+    try:
+        for parsed_file in iter_archive_files(archive_source, archive_name, extensions=SUPPORTED_FILE_EXTENSIONS, html_mode=html_mode):
+            if parsed_file.error is not None:
+                failures.append(parsed_file)
+            else:
+                documents.extend(documents_from_parsed_file(parsed_file))
+    except (zipfile.BadZipFile, tarfile.TarError, OSError) as e:
+        st.error(f"读取压缩包 {archive_name} 时发生错误: {e}")
+    if not documents and not failures:
+        st.warning(f"压缩包 {archive_name} 中未找到支持的文件类型: {', '.join(sorted(SUPPORTED_FILE_EXTENSIONS))}")
+    if failures:
+        st.error(f"压缩包 {archive_name} 中有 {len(failures)} 个文件解析失败，已跳过：\n" + "\n".join(f"- {failure.relative_name}: {failure.error}" for failure in failures))
     return documents
 
 # --- DATABASE LOGIC ---
@@ -287,7 +410,20 @@ class Neo4jDatabase:
 # --- MODEL INITIALIZATION ---
 
 def get_llm(model_name: str):
-    return ChatGoogleGenerativeAI(model=model_name, temperature=0, google_api_key=GOOGLE_API_KEY)
+    if LLM_BACKEND not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend {LLM_BACKEND!r}, expected one of {LLM_BACKENDS}")
+    if LLM_BACKEND == "replay":
+        return ReplayChatModel(
+            RecordingStore(LLM_RECORDINGS_DIR),
+            model_name,
+            latency_seconds=REPLAY_LATENCY_SECONDS,
+            latency_jitter=REPLAY_LATENCY_JITTER,
+            failure_rate=REPLAY_FAILURE_RATE,
+        )
+    llm = ChatGoogleGenerativeAI(model=model_name, temperature=0, google_api_key=GOOGLE_API_KEY)
+    if LLM_BACKEND == "record":
+        return RecordingChatModel(llm, RecordingStore(LLM_RECORDINGS_DIR), model_name)
+    return llm
 
 # --- CORE LOGIC ---
 
@@ -323,28 +459,26 @@ def get_text_from_youtube(url: str) -> str:
         st.error(f"获取YouTube字幕时发生错误: {e}")
         return ""
 
-def get_text_from_file(uploaded_file) -> str:
+def get_pdf_document_text(pdf_source) -> PdfDocumentText:
+    """逐页读取 PDF，返回带 S 编号的文本（句子不跨页）以及每页首句的编号，用于在证据中标注页码。"""
+    try:
+        return build_pdf_document_text(iter_pdf_pages(pdf_source))
+    except Exception as e:
+        st.error(f"解析 PDF 时发生错误: {e}")
+        return PdfDocumentText()
+
+
+def get_text_from_file(uploaded_file, html_mode: Optional[str] = None) -> str:
     try:
         file_extension = os.path.splitext(uploaded_file.name)[1].lower()
-        text = ""
         if file_extension == ".pdf":
-            reader = PdfReader(uploaded_file)
-            for page in reader.pages:
-                text += page.extract_text() or ""
-            return text
+            return build_pdf_document_text(iter_pdf_pages(uploaded_file)).text
         elif file_extension == ".docx":
-            doc = docx.Document(uploaded_file)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-            return text
+            return "\n".join(iter_docx_paragraphs(uploaded_file))
         elif file_extension == ".odt":
-            doc = load_odt(uploaded_file)
-            all_paras = doc.getElementsByType(odf_text.P)
-            for para in all_paras:
-                text += odf_teletype.extractText(para) + "\n"
-            return text
+            return "\n".join(iter_odt_paragraphs(uploaded_file))
         elif file_extension in [".html", ".htm"]:
-            return BeautifulSoup(uploaded_file.read(), "html.parser").get_text()
+            return extract_html_text(uploaded_file.read().decode("utf-8", errors="replace"), html_mode)
         elif file_extension == ".md":
             md_text = uploaded_file.read().decode("utf-8")
             text = re.sub(r'[\*\#\`\>]', '', md_text)
@@ -358,52 +492,241 @@ def get_text_from_file(uploaded_file) -> str:
         st.error(f"解析文件时发生错误: {e}")
         return ""
 
-def generate_graph(text: str, source: str, model_name: str, node_color: str, edge_color: str, rel_set_name: str, doc_id: Optional[str] = None, doc_date: Optional[str] = None) -> KnowledgeGraph:
-    llm = get_llm(model_name)
-    structured_llm = llm.with_structured_output(KnowledgeGraph)
+HUMAN_PROMPT_TEMPLATE = "请从以下文本中提取知识图谱：\n\n{text}"
 
-    selected_rel_set = REL_SETS.get(rel_set_name)
-    if not selected_rel_set:
-        raise ValueError(f"REL_SET '{rel_set_name}' not found.")
+# Document-specific placeholders of GraphRAG_prompt.md, filled in per call
+DOCUMENT_PROMPT_FIELDS = {"{{doc_id}}": "doc_id", "{{doc_date}}": "doc_date", "{{source_name}}": "source_name"}
 
+
+def build_system_prompt_template(rel_set: Dict[str, Any], prompt_template: str) -> str:
+    """
+    将 REL_SET 的关系、限定词、策略和权威来源排序渲染进提示词模板。
+    返回的模板只保留文档级占位符（doc_id、doc_date、source_name），每个 REL_SET 只需构建一次。
+    """
     # Format relations for the prompt
-    relations_list = [json.dumps(rel["name"]) for rel in selected_rel_set["relations"]]
+    relations_list = [json.dumps(rel["name"]) for rel in rel_set["relations"]]
     formatted_relations = ",\n  ".join(relations_list)
     
     # Format qualifiers for the prompt
-    formatted_qualifiers = json.dumps(selected_rel_set["qualifiers"], indent=2, ensure_ascii=False)
+    formatted_qualifiers = json.dumps(rel_set["qualifiers"], indent=2, ensure_ascii=False)
 
     # Format policies for the prompt
-    formatted_policies = json.dumps(selected_rel_set["policies"], indent=2, ensure_ascii=False)
+    formatted_policies = json.dumps(rel_set["policies"], indent=2, ensure_ascii=False)
     formatted_policies = formatted_policies.replace("{", "{{").replace("}", "}}")
 
     # Format authority order for the prompt
-    formatted_authority_order = json.dumps(selected_rel_set["authority_order_for_disputes"], indent=2, ensure_ascii=False)
+    formatted_authority_order = json.dumps(rel_set["authority_order_for_disputes"], indent=2, ensure_ascii=False)
     formatted_authority_order = formatted_authority_order.replace("{", "{{").replace("}", "}}")
 
     # Construct the system prompt using the template and REL_SET data
-    system_prompt_content = PROMPT_TEMPLATE.replace("{REL_SET}", formatted_relations).replace("{QUALIFIERS}", formatted_qualifiers)
+    system_prompt_content = prompt_template.replace("{REL_SET}", formatted_relations).replace("{QUALIFIERS}", formatted_qualifiers)
     system_prompt_content = system_prompt_content.replace("{{POLICIES}}", formatted_policies).replace("{{AUTHORITY_ORDER}}", formatted_authority_order)
-    
-    # Populate document-specific metadata in the prompt
-    system_prompt_content = system_prompt_content.replace("{{doc_id}}", doc_id if doc_id else "未知")
-    system_prompt_content = system_prompt_content.replace("{{doc_date}}", doc_date if doc_date else "未知")
-    system_prompt_content = system_prompt_content.replace("{{source_name}}", source)
-    
-    system_prompt = """从文本中提取知识图谱。请识别出所有的实体作为节点，以及它们之间的关系。
-    确保节点具有唯一的ID（通常是实体的名称）和类型（例如：人、地点、组织、概念）。
-    如果实体或关系有额外的属性（例如日期、数量、职位、事件描述等），请将它们提取到'properties'字段中。
-    特别地，如果关系是双向的（例如‘合作’、‘同事’、‘配偶’），请为每个方向都生成一条关系边（例如 A-合作->B 和 B-合作->A）。
-    你必须严格按照KnowledgeGraph的格式返回结果。
+    return system_prompt_content
+
+
+class CompiledExtractionChain:
+    """
+    针对 (模型, REL_SET) 预编译的抽取链：静态系统提示词只渲染一次，
+    LLM 客户端与结构化输出链在首次实际调用时创建并复用，每次调用只替换文档元数据。
     """
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt_content),
-        ("human", "请从以下文本中提取知识图谱：\n\n{text}")
-    ])
-    
-    chain = prompt | structured_llm
-    graph = chain.invoke({"text": text})
+    def __init__(self, model_name: str, rel_set_name: str, rel_set: Dict[str, Any], prompt_template: str, relation_names: Optional[Tuple[str, ...]] = None):
+        self.model_name = model_name
+        self.rel_set_name = rel_set_name
+        self.rel_set = rel_set
+        self.prompt_template = prompt_template
+        # A pruned variant only lists the given relations; everything else in the REL_SET is rendered unchanged
+        self.relation_names = relation_names
+        prompt_rel_set = restrict_rel_set(rel_set, relation_names) if relation_names is not None else rel_set
+        self.system_prompt_template = build_system_prompt_template(prompt_rel_set, prompt_template)
+        # Turn the document placeholders into ChatPromptTemplate variables so that
+        # per-call values are substituted as data and never parsed as template syntax
+        system_prompt_with_variables = self.system_prompt_template
+        for placeholder, variable in DOCUMENT_PROMPT_FIELDS.items():
+            system_prompt_with_variables = system_prompt_with_variables.replace(placeholder, "{" + variable + "}")
+        self.system_prompt_with_variables = system_prompt_with_variables
+        self.system_prompt_tokens = estimate_tokens(self.system_prompt_template)
+        self._chain = None
+        self._stream_chain = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build_document_fields(doc_id: Optional[str], doc_date: Optional[str], source: str) -> Dict[str, str]:
+        return {"doc_id": doc_id if doc_id else "未知", "doc_date": doc_date if doc_date else "未知", "source_name": source}
+
+    def render_system_prompt(self, doc_id: Optional[str], doc_date: Optional[str], source: str) -> str:
+        fields = self.build_document_fields(doc_id, doc_date, source)
+        system_prompt_content = self.system_prompt_template
+        for placeholder, variable in DOCUMENT_PROMPT_FIELDS.items():
+            system_prompt_content = system_prompt_content.replace(placeholder, fields[variable])
+        return system_prompt_content
+
+    def build_input(self, text: str, doc_id: Optional[str], doc_date: Optional[str], source: str) -> Dict[str, str]:
+        return {"text": text, **self.build_document_fields(doc_id, doc_date, source)}
+
+    def build_prompt(self) -> ChatPromptTemplate:
+        return ChatPromptTemplate.from_messages([
+            ("system", self.system_prompt_with_variables),
+            ("human", HUMAN_PROMPT_TEMPLATE)
+        ])
+
+    @property
+    def chain(self):
+        if self._chain is None:
+            with self._lock:
+                if self._chain is None:
+                    llm = get_llm(self.model_name)
+                    structured_llm = llm.with_structured_output(KnowledgeGraph)
+                    self._chain = self.build_prompt() | structured_llm
+        return self._chain
+
+    @property
+    def stream_chain(self):
+        # Raw text chain for streaming: the model's JSONL output is parsed incrementally instead of as one structured object
+        if self._stream_chain is None:
+            with self._lock:
+                if self._stream_chain is None:
+                    self._stream_chain = self.build_prompt() | get_llm(self.model_name)
+        return self._stream_chain
+
+    def is_stale(self, rel_set: Optional[Dict[str, Any]], prompt_template: str) -> bool:
+        return rel_set is not self.rel_set or prompt_template is not self.prompt_template
+
+    def invoke(self, text: str, doc_id: Optional[str], doc_date: Optional[str], source: str, callbacks: Optional[list] = None) -> KnowledgeGraph:
+        chain_input = self.build_input(text, doc_id, doc_date, source)
+        if callbacks:
+            return self.chain.invoke(chain_input, config={"callbacks": callbacks})
+        return self.chain.invoke(chain_input)
+
+    def stream(self, text: str, doc_id: Optional[str], doc_date: Optional[str], source: str, callbacks: Optional[list] = None) -> Iterator[str]:
+        config = {"callbacks": callbacks} if callbacks else None
+        for message_chunk in self.stream_chain.stream(self.build_input(text, doc_id, doc_date, source), config=config):
+            yield message_chunk_text(message_chunk)
+
+
+_COMPILED_CHAINS: Dict[Tuple[str, str, Optional[Tuple[str, ...]]], CompiledExtractionChain] = {}
+_COMPILED_CHAINS_LOCK = threading.Lock()
+
+
+def get_compiled_chain(model_name: str, rel_set_name: str, relation_names: Optional[Tuple[str, ...]] = None) -> CompiledExtractionChain:
+    selected_rel_set = REL_SETS.get(rel_set_name)
+    if not selected_rel_set:
+        raise ValueError(f"REL_SET '{rel_set_name}' not found.")
+
+    relation_names = tuple(relation_names) if relation_names is not None else None
+    registry_key = (model_name, rel_set_name, relation_names)
+    with _COMPILED_CHAINS_LOCK:
+        compiled_chain = _COMPILED_CHAINS.get(registry_key)
+        # Recompile when the REL_SET or prompt template object was swapped out (e.g. reloaded)
+        if compiled_chain is None or compiled_chain.is_stale(selected_rel_set, PROMPT_TEMPLATE):
+            compiled_chain = CompiledExtractionChain(model_name, rel_set_name, selected_rel_set, PROMPT_TEMPLATE, relation_names)
+            _COMPILED_CHAINS[registry_key] = compiled_chain
+        return compiled_chain
+
+
+def clear_compiled_chains():
+    with _COMPILED_CHAINS_LOCK:
+        _COMPILED_CHAINS.clear()
+
+
+def generate_graph(text: str, source: str, model_name: str, node_color: str, edge_color: str, rel_set_name: str, doc_id: Optional[str] = None, doc_date: Optional[str] = None, cache: Optional[ExtractionCache] = None, scheduler: Optional[LLMScheduler] = None, relation_names: Optional[Tuple[str, ...]] = None, cascade: Optional[ModelCascade] = None, metrics: Optional[RunMetrics] = None) -> KnowledgeGraph:
+    if cascade is not None:
+        # The cascade picks the model: cheaper tiers first, escalating results that fail the quality checks
+        return cascade.run(
+            lambda tier_model_name: generate_graph(text, source, tier_model_name, node_color, edge_color, rel_set_name, doc_id=doc_id, doc_date=doc_date, cache=cache, scheduler=scheduler, relation_names=relation_names, metrics=metrics),
+            text=text,
+            rel_set=REL_SETS[rel_set_name],
+        )
+
+    compiled_chain = get_compiled_chain(model_name, rel_set_name, relation_names)
+
+    # A cache hit skips the LLM client entirely
+    cache_key = None
+    graph = None
+    if cache is not None:
+        cache_key = build_extraction_cache_key(compiled_chain, text, doc_id, doc_date, source)
+        cached_payload = cache.get(cache_key)
+        if cached_payload is not None:
+            graph = KnowledgeGraph.model_validate(cached_payload)
+            if metrics is not None:
+                metrics.record(CallMetrics(doc_id=doc_id, model=model_name, nodes=len(graph.nodes), edges=len(graph.relationships), cache_hit=True))
+
+    if graph is None:
+        graph = run_instrumented_call(
+            compiled_chain, text, doc_id,
+            lambda callbacks: compiled_chain.invoke(text, doc_id, doc_date, source, callbacks=callbacks),
+            summarize=lambda result: (len(result.nodes), len(result.relationships), result.model_dump_json(exclude={"metadata"})),
+            scheduler=scheduler,
+            metrics=metrics,
+        )
+        if cache is not None:
+            cache.set(cache_key, graph.model_dump(exclude={"metadata"}))
+
+    return finalize_graph(graph, source, doc_id, doc_date, node_color, edge_color)
+
+
+def run_instrumented_call(
+    compiled_chain: CompiledExtractionChain,
+    text: str,
+    doc_id: Optional[str],
+    call_chain: Callable[[Optional[list]], Any],
+    summarize: Callable[[Any], Tuple[int, int, str]],
+    scheduler: Optional[LLMScheduler] = None,
+    metrics: Optional[RunMetrics] = None,
+) -> Any:
+    """
+    执行一次模型调用：预算用尽时不再发起调用；有调度器时在限流与重试之下调用；
+    有 metrics 时记录耗时、token 用量（模型未返回用量时按本地估算）、重试次数与节点/边数量。
+    summarize(result) 返回 (节点数, 边数, 用于估算输出 token 的文本)。
+    """
+    if metrics is not None:
+        metrics.check_budget()
+    estimated_prompt_tokens = compiled_chain.system_prompt_tokens + estimate_tokens(text)
+    usage_handler = UsageMetadataCallbackHandler() if metrics is not None else None
+    callbacks = [usage_handler] if usage_handler is not None else None
+    retries = 0
+
+    def count_retry(attempt: int, error: BaseException, delay: float):
+        nonlocal retries
+        retries = attempt
+
+    started_at = time.perf_counter()
+    try:
+        if scheduler is not None:
+            # Rate limits, adaptive concurrency and retries are applied around the actual LLM call only
+            result = scheduler.call(lambda: call_chain(callbacks), estimated_tokens=estimated_prompt_tokens, on_retry=count_retry)
+        else:
+            result = call_chain(callbacks)
+    except Exception as e:
+        if metrics is not None:
+            metrics.record(CallMetrics(doc_id=doc_id, model=compiled_chain.model_name, latency_seconds=time.perf_counter() - started_at, retries=retries, error=str(e), **usage_token_counts(usage_handler)))
+        raise
+
+    if metrics is not None:
+        latency = time.perf_counter() - started_at
+        nodes, edges, output_text = summarize(result)
+        token_counts = usage_token_counts(usage_handler)
+        tokens_estimated = not usage_handler.usage_metadata
+        if tokens_estimated:
+            token_counts = {"prompt_tokens": estimated_prompt_tokens * (retries + 1), "completion_tokens": estimate_tokens(output_text)}
+        metrics.record(CallMetrics(doc_id=doc_id, model=compiled_chain.model_name, latency_seconds=latency, tokens_estimated=tokens_estimated, retries=retries, nodes=nodes, edges=edges, **token_counts))
+    return result
+
+
+def usage_token_counts(usage_handler: Optional[UsageMetadataCallbackHandler]) -> Dict[str, int]:
+    usages = list(usage_handler.usage_metadata.values()) if usage_handler is not None else []
+    return {
+        "prompt_tokens": sum(usage.get("input_tokens", 0) for usage in usages),
+        "completion_tokens": sum(usage.get("output_tokens", 0) for usage in usages),
+    }
+
+
+def build_extraction_cache_key(compiled_chain: CompiledExtractionChain, text: str, doc_id: Optional[str], doc_date: Optional[str], source: str) -> str:
+    system_prompt_content = compiled_chain.render_system_prompt(doc_id, doc_date, source)
+    return make_cache_key(text, system_prompt_content, compiled_chain.rel_set_name, compiled_chain.rel_set.get("version"), compiled_chain.model_name)
+
+
+def finalize_graph(graph: KnowledgeGraph, source: str, doc_id: Optional[str], doc_date: Optional[str], node_color: str, edge_color: str) -> KnowledgeGraph:
     graph.metadata = Metadata(source=source, timestamp=time.strftime("%Y-%m-%d %H:%M:%S"), doc_id=doc_id, doc_date=doc_date)
     
     for node in graph.nodes:
@@ -414,6 +737,814 @@ def generate_graph(text: str, source: str, model_name: str, node_color: str, edg
     return graph
 
 
+def remap_chunk_evidence(graph: KnowledgeGraph, chunk: TextChunk, doc_id: Optional[str]) -> KnowledgeGraph:
+    """
+    将分块内的局部句子编号 (S1..Sk) 映射回文档级句子编号，并统一证据中的文档 ID。
+    不再引用任何句子的证据项被丢弃，证据因此全部丢失的关系也一并丢弃。
+    """
+    kept_relationships = []
+    for relationship in graph.relationships:
+        if not relationship.evidence:
+            kept_relationships.append(relationship)
+            continue
+        remapped_evidence = []
+        for evidence in relationship.evidence or []:
+            sentence_ids = []
+            for local_sentence_id in evidence.get("sents") or []:
+                try:
+                    sentence_ids.append(chunk.to_document_sentence_id(int(local_sentence_id)))
+                except (IndexError, TypeError, ValueError):
+                    # Evidence pointing outside the chunk cannot be verified, drop that sentence
+                    continue
+            if sentence_ids:
+                remapped_evidence.append({**evidence, "doc": doc_id or evidence.get("doc"), "sents": sentence_ids})
+        if remapped_evidence:
+            relationship.evidence = remapped_evidence
+            kept_relationships.append(relationship)
+    graph.relationships = kept_relationships
+    return graph
+
+
+def assign_evidence_doc(relationships: Iterable[Relationship], doc_id: Optional[str]) -> None:
+    """单篇文档抽取时模型只看到这一篇，证据中的 doc（常为 "d1" 之类的简称）一律改写为该文档的完整 ID。"""
+    if not doc_id:
+        return
+    for relationship in relationships:
+        if relationship.evidence:
+            relationship.evidence = [{**evidence, "doc": doc_id} for evidence in relationship.evidence]
+
+
+def relationship_merge_key(relationship: Relationship) -> Tuple[str, str, str, str]:
+    qualifiers = json.dumps(relationship.qualifiers or {}, ensure_ascii=False, sort_keys=True)
+    return (relationship.source.id, relationship.type, relationship.target.id, qualifiers)
+
+
+def merge_evidence(*evidence_lists: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    merged: Dict[Any, Dict[str, Any]] = {}
+    for evidence_list in evidence_lists:
+        for evidence in evidence_list or []:
+            doc = evidence.get("doc")
+            if doc not in merged:
+                merged[doc] = {**evidence, "sents": []}
+            for sentence_id in evidence.get("sents") or []:
+                if sentence_id not in merged[doc]["sents"]:
+                    merged[doc]["sents"].append(sentence_id)
+    for evidence in merged.values():
+        evidence["sents"] = sorted(evidence["sents"], key=lambda sentence_id: (str(type(sentence_id)), sentence_id))
+    return list(merged.values())
+
+
+def merge_graphs(graphs: List[KnowledgeGraph], metadata: Optional[Metadata] = None) -> KnowledgeGraph:
+    """
+    合并多个图谱（例如同一文档的多个分块）：同 ID 节点合并属性，
+    (源, 关系, 目标, 限定词) 相同的关系只保留一条，证据句号取并集，置信度取最大值。
+    """
+    merged_nodes: Dict[str, Node] = {}
+    merged_relationships: Dict[Tuple[str, str, str, str], Relationship] = {}
+    for graph in graphs:
+        for node in graph.nodes:
+            existing_node = merged_nodes.get(node.id)
+            if existing_node is None:
+                merged_nodes[node.id] = node
+                continue
+            if node.properties:
+                existing_node.properties = {**(existing_node.properties or {}), **node.properties}
+            if existing_node.type == "Unknown" and node.type != "Unknown":
+                existing_node.type = node.type
+        for relationship in graph.relationships:
+            key = relationship_merge_key(relationship)
+            existing_relationship = merged_relationships.get(key)
+            if existing_relationship is None:
+                merged_relationships[key] = relationship
+                continue
+            existing_relationship.evidence = merge_evidence(existing_relationship.evidence, relationship.evidence)
+            confidences = [c for c in (existing_relationship.confidence, relationship.confidence) if c is not None]
+            existing_relationship.confidence = max(confidences) if confidences else None
+            if relationship.properties:
+                existing_relationship.properties = {**(existing_relationship.properties or {}), **relationship.properties}
+    # Point relationship endpoints at the merged node objects
+    for relationship in merged_relationships.values():
+        relationship.source = merged_nodes.setdefault(relationship.source.id, relationship.source)
+        relationship.target = merged_nodes.setdefault(relationship.target.id, relationship.target)
+    return KnowledgeGraph(nodes=list(merged_nodes.values()), relationships=list(merged_relationships.values()), metadata=metadata)
+
+
+def fact_to_relationship(fact: Dict[str, Any]) -> Relationship:
+    """将模型输出的一行 JSONL 事实（head/relation/tail/qualifiers/evidence/confidence）转换为 Relationship。"""
+    def to_node(entity: Any) -> Node:
+        if isinstance(entity, dict):
+            return Node(id=str(entity.get("text") or entity.get("id")), type=entity.get("type") or "Unknown")
+        return Node(id=str(entity))
+
+    evidence = fact.get("evidence")
+    if isinstance(evidence, dict):
+        evidence = [evidence]
+    if not isinstance(evidence, list):
+        evidence = None
+    qualifiers = fact.get("qualifiers")
+    return Relationship(
+        source=to_node(fact["head"]),
+        target=to_node(fact["tail"]),
+        type=str(fact["relation"]),
+        qualifiers=qualifiers if isinstance(qualifiers, dict) and qualifiers else None,
+        evidence=[item for item in evidence if isinstance(item, dict)] if evidence else None,
+        confidence=fact.get("confidence"),
+    )
+
+
+def stream_relationships(text: str, source: str, model_name: str, rel_set_name: str, doc_id: Optional[str] = None, doc_date: Optional[str] = None, parser: Optional[JSONObjectStreamParser] = None, relation_names: Optional[Tuple[str, ...]] = None, callbacks: Optional[list] = None) -> Iterator[Relationship]:
+    """
+    以流式方式调用模型，每解析出一行完整的 JSONL 事实就立即产出对应的 Relationship。
+    无法转换的对象记录在 parser.errors 中，不会中断整个流。
+    """
+    compiled_chain = get_compiled_chain(model_name, rel_set_name, relation_names)
+    parser = parser if parser is not None else JSONObjectStreamParser()
+    for text_chunk in compiled_chain.stream(text, doc_id, doc_date, source, callbacks=callbacks):
+        for record in parser.feed(text_chunk):
+            if not is_fact(record):
+                parser.errors.append((json.dumps(record, ensure_ascii=False), "Missing head, relation or tail"))
+                continue
+            try:
+                yield fact_to_relationship(record)
+            except (ValueError, TypeError) as e:
+                parser.errors.append((json.dumps(record, ensure_ascii=False), str(e)))
+    parser.close()
+
+
+def generate_graph_streaming(
+    text: str,
+    source: str,
+    model_name: str,
+    node_color: str,
+    edge_color: str,
+    rel_set_name: str,
+    doc_id: Optional[str] = None,
+    doc_date: Optional[str] = None,
+    cache: Optional[ExtractionCache] = None,
+    scheduler: Optional[LLMScheduler] = None,
+    on_relationship: Optional[Callable[[Relationship], None]] = None,
+    relation_names: Optional[Tuple[str, ...]] = None,
+    metrics: Optional[RunMetrics] = None,
+) -> KnowledgeGraph:
+    """
+    流式版本的 generate_graph：关系一旦解析完成就通过 on_relationship 回调交给下游，
+    调用结束后返回与 generate_graph 相同结构的 KnowledgeGraph。
+    重试时已回调过的关系不会重复回调。
+    """
+    compiled_chain = get_compiled_chain(model_name, rel_set_name, relation_names)
+    emitted_keys = set()
+
+    def emit(relationship: Relationship):
+        relationship.color = edge_color
+        relationship.source.color = node_color
+        relationship.target.color = node_color
+        key = relationship_merge_key(relationship)
+        if on_relationship and key not in emitted_keys:
+            emitted_keys.add(key)
+            on_relationship(relationship)
+
+    cache_key = None
+    if cache is not None:
+        cache_key = build_extraction_cache_key(compiled_chain, text, doc_id, doc_date, source)
+        cached_payload = cache.get(cache_key)
+        if cached_payload is not None:
+            graph = KnowledgeGraph.model_validate(cached_payload)
+            if metrics is not None:
+                metrics.record(CallMetrics(doc_id=doc_id, model=model_name, nodes=len(graph.nodes), edges=len(graph.relationships), cache_hit=True))
+            for relationship in graph.relationships:
+                emit(relationship)
+            return finalize_graph(graph, source, doc_id, doc_date, node_color, edge_color)
+
+    def run_stream(callbacks: Optional[list]) -> List[Relationship]:
+        relationships = []
+        for relationship in stream_relationships(text, source, model_name, rel_set_name, doc_id, doc_date, relation_names=relation_names, callbacks=callbacks):
+            relationships.append(relationship)
+            emit(relationship)
+        return relationships
+
+    def summarize_relationships(relationships: List[Relationship]) -> Tuple[int, int, str]:
+        node_ids = {node.id for relationship in relationships for node in (relationship.source, relationship.target)}
+        return len(node_ids), len(relationships), "\n".join(relationship.model_dump_json() for relationship in relationships)
+
+    relationships = run_instrumented_call(compiled_chain, text, doc_id, run_stream, summarize=summarize_relationships, scheduler=scheduler, metrics=metrics)
+
+    nodes = [node for relationship in relationships for node in (relationship.source, relationship.target)]
+    graph = merge_graphs([KnowledgeGraph(nodes=nodes, relationships=relationships)])
+    if cache is not None:
+        cache.set(cache_key, graph.model_dump(exclude={"metadata"}))
+    return finalize_graph(graph, source, doc_id, doc_date, node_color, edge_color)
+
+
+def generate_graph_chunked(
+    text: str,
+    source: str,
+    model_name: str,
+    node_color: str,
+    edge_color: str,
+    rel_set_name: str,
+    doc_id: Optional[str] = None,
+    doc_date: Optional[str] = None,
+    cache: Optional[ExtractionCache] = None,
+    max_chunk_tokens: int = DEFAULT_CHUNK_TOKEN_BUDGET,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP_SENTENCES,
+    max_concurrency: int = 1,
+    scheduler: Optional[LLMScheduler] = None,
+    relation_names: Optional[Tuple[str, ...]] = None,
+    cascade: Optional[ModelCascade] = None,
+    metrics: Optional[RunMetrics] = None,
+) -> KnowledgeGraph:
+    """
+    按句子边界把长文档切成带重叠的窗口并并发抽取，
+    再把证据句号映射回文档级编号，合并重叠区域内重复抽取的关系。
+    """
+    chunks = chunk_text(text, max_chunk_tokens, chunk_overlap)
+    if len(chunks) <= 1:
+        return generate_graph(text, source, model_name, node_color, edge_color, rel_set_name, doc_id=doc_id, doc_date=doc_date, cache=cache, scheduler=scheduler, relation_names=relation_names, cascade=cascade, metrics=metrics)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(chunks)))) as executor:
+        futures = [
+            executor.submit(generate_graph, chunk.text, source, model_name, node_color, edge_color, rel_set_name, doc_id=doc_id, doc_date=doc_date, cache=cache, scheduler=scheduler, relation_names=relation_names, cascade=cascade, metrics=metrics)
+            for chunk in chunks
+        ]
+        # Any failed chunk fails the document, so that partial graphs are never reported as complete
+        chunk_graphs = [remap_chunk_evidence(future.result(), chunk, doc_id) for future, chunk in zip(futures, chunks)]
+
+    metadata = Metadata(source=source, timestamp=time.strftime("%Y-%m-%d %H:%M:%S"), doc_id=doc_id, doc_date=doc_date)
+    return merge_graphs(chunk_graphs, metadata=metadata)
+
+
+def prune_relations_for_text(rel_set_pruner: Optional[RelSetPruner], text: str, model_name: str, rel_set_name: str) -> Optional[Tuple[str, ...]]:
+    """根据本地类型预判裁剪 REL_SET，并记录裁剪前后的提示词 token 估算；未启用裁剪时返回 None。"""
+    if rel_set_pruner is None:
+        return None
+    pruning = rel_set_pruner.prune(text)
+    text_tokens = estimate_tokens(text)
+    full_chain = get_compiled_chain(model_name, rel_set_name)
+    pruned_chain = get_compiled_chain(model_name, rel_set_name, pruning.relation_names)
+    rel_set_pruner.record(pruning, full_chain.system_prompt_tokens + text_tokens, pruned_chain.system_prompt_tokens + text_tokens)
+    return pruning.relation_names
+
+
+def extract_document(
+    doc_data: Dict[str, Any],
+    model_name: str,
+    node_color: str,
+    edge_color: str,
+    rel_set_name: str,
+    cache: Optional[ExtractionCache] = None,
+    max_chunk_tokens: Optional[int] = None,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP_SENTENCES,
+    max_concurrency: int = 1,
+    scheduler: Optional[LLMScheduler] = None,
+    streaming: bool = False,
+    on_relationship: Optional[Callable[[str, Relationship], None]] = None,
+    rel_set_pruner: Optional[RelSetPruner] = None,
+    cascade: Optional[ModelCascade] = None,
+    metrics: Optional[RunMetrics] = None,
+) -> KnowledgeGraph:
+    """
+    抽取单篇文档；文档超过分块阈值时改用句子窗口分块抽取。证据中的 doc 统一改写为本文档 ID。
+    streaming 为真时（仅对未分块的文档生效）按 JSONL 流式抽取，每条关系解析完成即回调 on_relationship(文档 ID, 关系)。
+    rel_set_pruner 不为空时，提示词只保留该文档中可能出现的实体类型所适用的关系。
+    cascade 不为空时按模型级联逐级抽取（流式抽取已把关系交给下游，无法回退，因此不参与级联）。
+    """
+    text = doc_data["text_with_sentence_ids"]
+    doc_id = doc_data["doc_id"]
+    relation_names = prune_relations_for_text(rel_set_pruner, text, model_name, rel_set_name)
+    if max_chunk_tokens and estimate_tokens(text) > max_chunk_tokens:
+        return generate_graph_chunked(
+            text, doc_data["source"], model_name, node_color, edge_color, rel_set_name,
+            doc_id=doc_data["doc_id"], doc_date=doc_data["date"], cache=cache,
+            max_chunk_tokens=max_chunk_tokens, chunk_overlap=chunk_overlap, max_concurrency=max_concurrency,
+            scheduler=scheduler, relation_names=relation_names, cascade=cascade, metrics=metrics,
+        )
+    if streaming:
+        def emit_relationship(relationship: Relationship):
+            assign_evidence_doc([relationship], doc_id)
+            on_relationship(doc_id, relationship)
+
+        graph = generate_graph_streaming(
+            text=text,
+            source=doc_data["source"],
+            model_name=model_name,
+            node_color=node_color,
+            edge_color=edge_color,
+            rel_set_name=rel_set_name,
+            doc_id=doc_data["doc_id"],
+            doc_date=doc_data["date"],
+            cache=cache,
+            scheduler=scheduler,
+            on_relationship=emit_relationship if on_relationship else None,
+            relation_names=relation_names,
+            metrics=metrics,
+        )
+    else:
+        graph = generate_graph(
+            text=text,
+            source=doc_data["source"],
+            model_name=model_name,
+            node_color=node_color,
+            edge_color=edge_color,
+            rel_set_name=rel_set_name,
+            doc_id=doc_data["doc_id"],
+            doc_date=doc_data["date"],
+            cache=cache,
+            scheduler=scheduler,
+            relation_names=relation_names,
+            cascade=cascade,
+            metrics=metrics,
+        )
+    # Evidence of a single-document call always refers to this document, whatever name the model used
+    assign_evidence_doc(graph.relationships, doc_id)
+    return graph
+
+
+def extraction_fingerprint(model_name: str, rel_set_name: str, cascade: Optional[ModelCascade] = None) -> str:
+    """标识影响抽取结果的配置（模型或级联层级、REL_SET 与提示词），配置变化后旧快照不再复用。"""
+    compiled_chain = get_compiled_chain(model_name, rel_set_name)
+    model_names = ",".join(cascade.tiers) if cascade is not None else model_name
+    return make_cache_key("", compiled_chain.system_prompt_template, rel_set_name, compiled_chain.rel_set.get("version"), model_names)
+
+
+def extract_document_incremental(
+    doc_data: Dict[str, Any],
+    model_name: str,
+    node_color: str,
+    edge_color: str,
+    rel_set_name: str,
+    snapshot_store: DocumentSnapshotStore,
+    reextraction_window: int = DEFAULT_REEXTRACTION_WINDOW,
+    max_changed_ratio: float = DEFAULT_MAX_CHANGED_RATIO,
+    cache: Optional[ExtractionCache] = None,
+    scheduler: Optional[LLMScheduler] = None,
+    rel_set_pruner: Optional[RelSetPruner] = None,
+    cascade: Optional[ModelCascade] = None,
+    metrics: Optional[RunMetrics] = None,
+    **extract_kwargs,
+) -> KnowledgeGraph:
+    """
+    基于上次抽取的快照做句子级增量抽取：比对句子哈希，只重抽改动句前后 reextraction_window 句的窗口；
+    证据全部落在未改动句子上的关系保留（句号重新编号），证据句被修改或删除的关系撤回；
+    未引用本文档任何句子的关系原样保留，文档完全未变时直接返回快照图谱。
+    首次抽取、元数据头变化或改动比例超过 max_changed_ratio 时整篇重抽，结束后更新快照。
+    """
+    doc_id = doc_data["doc_id"]
+    text = doc_data["text_with_sentence_ids"]
+    split = split_sentences(text)
+    new_hashes = hash_sentences(split.sentences)
+    header_hash = hash_sentence(split.header)
+    fingerprint = extraction_fingerprint(model_name, rel_set_name, cascade)
+    snapshot = snapshot_store.get(doc_id, fingerprint)
+
+    diff = None
+    if snapshot is not None and snapshot.header_hash == header_hash:
+        diff = diff_sentences(snapshot.sentence_hashes, new_hashes)
+        if len(diff.touched_positions) > max_changed_ratio * max(1, len(new_hashes)):
+            diff = None
+
+    if diff is None:
+        graph = extract_document(doc_data, model_name, node_color, edge_color, rel_set_name, cache=cache, scheduler=scheduler, rel_set_pruner=rel_set_pruner, cascade=cascade, metrics=metrics, **extract_kwargs)
+        snapshot_store.record("full", sentences_reextracted=len(new_hashes))
+    elif diff.is_unchanged:
+        graph = KnowledgeGraph.model_validate(snapshot.graph)
+        snapshot_store.record("unchanged", relationships_kept=len(graph.relationships))
+    else:
+        previous_graph = KnowledgeGraph.model_validate(snapshot.graph)
+        old_to_new = diff.old_to_new
+        kept_relationships = []
+        for relationship in previous_graph.relationships:
+            evidence = remap_retained_evidence(relationship.evidence, old_to_new, doc_id)
+            if evidence is not None:
+                # Keep None as None for relationships that never had evidence
+                relationship.evidence = evidence or relationship.evidence
+                kept_relationships.append(relationship)
+        # Only nodes of kept relationships survive; the re-extracted windows bring back any other entity still mentioned
+        kept_nodes = [node for relationship in kept_relationships for node in (relationship.source, relationship.target)]
+
+        window_graphs = []
+        windows = reextraction_windows(diff, len(split.sentences), reextraction_window)
+        relation_names = prune_relations_for_text(rel_set_pruner, text, model_name, rel_set_name) if windows else None
+        for window in windows:
+            window_sentences = [split.sentences[position] for position in window]
+            # One chunk per window unless a window alone exceeds the chunk budget
+            max_tokens = extract_kwargs.get("max_chunk_tokens") or sum(estimate_tokens(sentence_text) + 2 for _, sentence_text in window_sentences) + estimate_tokens(split.header) + 1
+            for chunk in chunk_sentences(window_sentences, max_tokens, overlap_sentences=0, header=split.header):
+                window_graph = generate_graph(
+                    chunk.text, doc_data["source"], model_name, node_color, edge_color, rel_set_name,
+                    doc_id=doc_id, doc_date=doc_data["date"], cache=cache, scheduler=scheduler, relation_names=relation_names, cascade=cascade, metrics=metrics,
+                )
+                window_graphs.append(remap_chunk_evidence(window_graph, chunk, doc_id))
+
+        metadata = Metadata(source=doc_data["source"], timestamp=time.strftime("%Y-%m-%d %H:%M:%S"), doc_id=doc_id, doc_date=doc_data["date"])
+        graph = merge_graphs([KnowledgeGraph(nodes=kept_nodes, relationships=kept_relationships)] + window_graphs, metadata=metadata)
+        snapshot_store.record(
+            "incremental",
+            sentences_reextracted=sum(len(window) for window in windows),
+            relationships_kept=len(kept_relationships),
+            relationships_retracted=len(previous_graph.relationships) - len(kept_relationships),
+        )
+
+    snapshot_store.put(DocumentSnapshot(
+        doc_id=doc_id,
+        fingerprint=fingerprint,
+        header_hash=header_hash,
+        sentence_hashes=new_hashes,
+        graph=graph.model_dump(exclude={"metadata"}),
+    ))
+    return finalize_graph(graph, doc_data["source"], doc_id, doc_data["date"], node_color, edge_color)
+
+
+def split_packed_graph(graph: KnowledgeGraph, documents: List[Dict[str, Any]]) -> Tuple[List[KnowledgeGraph], List[Relationship]]:
+    """
+    按 evidence[].doc 把打包调用的结果拆回每篇文档的 KnowledgeGraph，保留的证据一律改写为完整的文档 ID。
+    证据无法对应到任何文档的关系不归入任何文档，作为第二个返回值交给调用方处理。
+    节点随引用它的关系分配；未被关系引用的节点只归入文本中出现该实体的文档。
+    """
+    doc_ids = [doc["doc_id"] for doc in documents]
+    nodes_by_doc: Dict[str, Dict[str, Node]] = {doc_id: {} for doc_id in doc_ids}
+    relationships_by_doc: Dict[str, List[Relationship]] = {doc_id: [] for doc_id in doc_ids}
+    unresolved: List[Relationship] = []
+
+    for relationship in graph.relationships:
+        evidence_by_doc: Dict[str, List[Dict[str, Any]]] = {}
+        for evidence in relationship.evidence or []:
+            resolved_doc_id = resolve_packed_doc_id(evidence.get("doc"), doc_ids)
+            if resolved_doc_id:
+                evidence_by_doc.setdefault(resolved_doc_id, []).append({**evidence, "doc": resolved_doc_id})
+        if not evidence_by_doc:
+            unresolved.append(relationship)
+            continue
+        for doc_id, evidence in evidence_by_doc.items():
+            relationships_by_doc[doc_id].append(relationship.model_copy(update={"evidence": evidence}))
+            nodes_by_doc[doc_id].setdefault(relationship.source.id, relationship.source)
+            nodes_by_doc[doc_id].setdefault(relationship.target.id, relationship.target)
+
+    nodes_by_id = {node.id: node for node in graph.nodes}
+    referenced_node_ids = {relationship_node.id for relationship in graph.relationships for relationship_node in (relationship.source, relationship.target)}
+    for node in graph.nodes:
+        if node.id not in referenced_node_ids:
+            for doc in documents:
+                if node.id in doc["text_with_sentence_ids"]:
+                    nodes_by_doc[doc["doc_id"]][node.id] = node
+
+    graphs = []
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    for doc in documents:
+        doc_id = doc["doc_id"]
+        # Prefer the node objects the model listed in `nodes`, they carry type and properties
+        doc_nodes = [nodes_by_id.get(node_id, node).model_copy() for node_id, node in nodes_by_doc[doc_id].items()]
+        graphs.append(KnowledgeGraph(
+            nodes=doc_nodes,
+            relationships=relationships_by_doc[doc_id],
+            metadata=Metadata(source=doc["source"], timestamp=timestamp, doc_id=doc_id, doc_date=doc.get("date")),
+        ))
+    return graphs, unresolved
+
+
+def extract_packed_documents(
+    documents: List[Dict[str, Any]],
+    model_name: str,
+    node_color: str,
+    edge_color: str,
+    rel_set_name: str,
+    cache: Optional[ExtractionCache] = None,
+    scheduler: Optional[LLMScheduler] = None,
+    rel_set_pruner: Optional[RelSetPruner] = None,
+    cascade: Optional[ModelCascade] = None,
+    metrics: Optional[RunMetrics] = None,
+) -> List[KnowledgeGraph]:
+    """
+    把多篇短文档打包为一次带 DOC_ID 分段的 LLM 调用，再按证据拆回每篇文档的图谱。
+    证据无法对应到文档的关系不会被猜测归属：同时提及其头尾实体的文档改为单独重抽，其余直接丢弃。
+    """
+    packed_text = render_packed_documents(documents)
+    relation_names = prune_relations_for_text(rel_set_pruner, packed_text, model_name, rel_set_name)
+    doc_dates = {doc.get("date") for doc in documents}
+    graph = generate_graph(
+        text=packed_text,
+        source="多文档打包: " + ", ".join(doc["doc_id"] for doc in documents),
+        model_name=model_name,
+        node_color=node_color,
+        edge_color=edge_color,
+        rel_set_name=rel_set_name,
+        # The header must not name a document of its own, evidence cites the section DOC_IDs
+        doc_id=PACKED_DOC_ID,
+        doc_date=doc_dates.pop() if len(doc_dates) == 1 else None,
+        cache=cache,
+        scheduler=scheduler,
+        relation_names=relation_names,
+        cascade=cascade,
+        metrics=metrics,
+    )
+    graphs, unresolved = split_packed_graph(graph, documents)
+    reextract_positions = sorted({
+        position
+        for relationship in unresolved
+        for position, doc in enumerate(documents)
+        if relationship.source.id in doc["text_with_sentence_ids"] and relationship.target.id in doc["text_with_sentence_ids"]
+    })
+    for position in reextract_positions:
+        graphs[position] = extract_document(
+            documents[position], model_name, node_color, edge_color, rel_set_name,
+            cache=cache, scheduler=scheduler, rel_set_pruner=rel_set_pruner, cascade=cascade, metrics=metrics,
+        )
+    return graphs
+
+
+def annotate_evidence_pages(graph: KnowledgeGraph, doc_id: str, page_starts: Optional[List[Any]]) -> KnowledgeGraph:
+    """为指向本文档的证据补充页码 (pages)，页码由证据句号按每页首句编号换算得到。"""
+    if not page_starts:
+        return graph
+    for relationship in graph.relationships:
+        for evidence in relationship.evidence or []:
+            if evidence.get("doc") not in (None, doc_id):
+                continue
+            pages = {page_for_sentence(page_starts, sentence_id) for sentence_id in evidence.get("sents") or [] if isinstance(sentence_id, int)}
+            pages.discard(None)
+            if pages:
+                evidence["pages"] = sorted(pages)
+    return graph
+
+
+class DocumentExtractionResult(BaseModel):
+    doc_id: str = Field(..., description="The ID of the processed document.")
+    source: Optional[str] = Field(None, description="The source of the processed document.")
+    graph: Optional[KnowledgeGraph] = Field(None, description="The extracted graph, if extraction succeeded.")
+    error: Optional[str] = Field(None, description="The error message, if extraction failed.")
+    skipped: bool = Field(False, description="Whether the document was skipped because it has no content.")
+    duplicate_of: Optional[str] = Field(None, description="The ID of the document this one duplicates; its facts are attached to that document's graph as extra evidence.")
+
+
+def attach_duplicate_evidence(graph: KnowledgeGraph, representative: Dict[str, Any], duplicate: Dict[str, Any]) -> KnowledgeGraph:
+    """把代表文档的证据按相同句子映射到重复文档，作为额外的证据来源附加到关系上。"""
+    sentence_map = map_duplicate_sentences(representative["text_with_sentence_ids"], duplicate["text_with_sentence_ids"])
+    for relationship in graph.relationships:
+        extra = duplicate_evidence(relationship.evidence, representative["doc_id"], duplicate["doc_id"], sentence_map)
+        if extra:
+            relationship.evidence = (relationship.evidence or []) + extra
+    return graph
+
+
+def extract_documents(
+    documents: List[Dict[str, Any]],
+    model_name: str,
+    node_color: str,
+    edge_color: str,
+    rel_set_name: str,
+    max_concurrency: int = 1,
+    on_result: Optional[Callable[[int, DocumentExtractionResult, int], None]] = None,
+    cache: Optional[ExtractionCache] = None,
+    max_chunk_tokens: Optional[int] = None,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP_SENTENCES,
+    pack_token_budget: Optional[int] = None,
+    scheduler: Optional[LLMScheduler] = None,
+    streaming: bool = False,
+    on_relationship: Optional[Callable[[str, Relationship], None]] = None,
+    rel_set_pruner: Optional[RelSetPruner] = None,
+    cascade: Optional[ModelCascade] = None,
+    snapshot_store: Optional[DocumentSnapshotStore] = None,
+    metrics: Optional[RunMetrics] = None,
+    duplicate_detector: Optional[NearDuplicateDetector] = None,
+) -> List[DocumentExtractionResult]:
+    """
+    使用有界线程池并发抽取多篇文档的知识图谱。
+    结果按输入文档顺序返回，单篇文档失败只记录在其结果中，不影响其它文档。
+    on_result 在主线程中按完成顺序回调 (文档序号, 结果, 已完成数量)，便于更新进度。
+    max_chunk_tokens 不为空时，超长文档按句子窗口分块后并发抽取；文档与分块共用 max_concurrency，同时进行的调用不会超过该值。
+    pack_token_budget 不为空时，相邻的短文档会被打包进同一次调用。
+    scheduler 负责限流、自适应并发与重试，文档只有在重试耗尽后才会被标记为失败。
+    streaming 为真时单次调用的文档按 JSONL 流式抽取，on_relationship 会在工作线程中逐条收到 (文档 ID, 关系)。
+    rel_set_pruner 不为空时按文档（或打包后的整体）裁剪 REL_SET，裁剪前后的 token 估算记录在其 stats() 中。
+    cascade 不为空时忽略 model_name，先用低成本模型抽取，只有未通过质量检查的调用才升级到更强的模型。
+    snapshot_store 不为空时按句子快照增量抽取（每篇文档需单独保存快照，因此不再打包短文档）。
+    metrics 不为空时记录每次调用的耗时、token 用量、重试次数与费用；达到其预算上限后不再发起新调用，
+    剩余文档以 BudgetExceededError 记为失败。
+    duplicate_detector 不为空时先按 MinHash/LSH 找出完全重复与近似重复的文档，每组只抽取第一篇，
+    其余文档不调用模型，结果标记 duplicate_of，其句子对应的证据附加到代表文档的图谱中。
+    """
+    results: List[Optional[DocumentExtractionResult]] = [None] * len(documents)
+    completed = 0
+
+    def report(index: int, result: DocumentExtractionResult):
+        nonlocal completed
+        results[index] = result
+        completed += 1
+        if on_result:
+            on_result(index, result, completed)
+
+    pending_indexes = []
+    for index, doc_data in enumerate(documents):
+        if not doc_data.get("text_with_sentence_ids"):
+            report(index, DocumentExtractionResult(doc_id=doc_data["doc_id"], source=doc_data.get("source"), skipped=True))
+        else:
+            pending_indexes.append(index)
+
+    # representative index -> indexes of the documents that duplicate it
+    duplicates: Dict[int, List[int]] = {}
+    if duplicate_detector is not None and pending_indexes:
+        deduplication = duplicate_detector.find_duplicates([documents[index] for index in pending_indexes])
+        for match in deduplication.matches.values():
+            duplicates.setdefault(pending_indexes[match.representative], []).append(pending_indexes[match.index])
+        pending_indexes = [pending_indexes[position] for position in deduplication.representatives]
+
+    if pack_token_budget and snapshot_store is None:
+        packs = [[pending_indexes[position] for position in pack] for pack in pack_documents([documents[index] for index in pending_indexes], pack_token_budget)]
+    else:
+        packs = [[index] for index in pending_indexes]
+
+    # Chunks of a long document run inside a document worker, so the workers split the
+    # concurrency between them: never more than max_concurrency LLM calls in flight
+    document_workers = max(1, min(max_concurrency, len(packs)))
+    chunk_concurrency = max(1, max_concurrency // document_workers)
+
+    with ThreadPoolExecutor(max_workers=document_workers) as executor:
+        futures = {}
+        for pack in packs:
+            if len(pack) > 1:
+                future = executor.submit(
+                    extract_packed_documents,
+                    [documents[index] for index in pack],
+                    model_name=model_name,
+                    node_color=node_color,
+                    edge_color=edge_color,
+                    rel_set_name=rel_set_name,
+                    cache=cache,
+                    scheduler=scheduler,
+                    rel_set_pruner=rel_set_pruner,
+                    cascade=cascade,
+                    metrics=metrics,
+                )
+            else:
+                # Incremental mode diffs against the document's last snapshot before calling the LLM
+                incremental_kwargs = {"snapshot_store": snapshot_store} if snapshot_store is not None else {}
+                future = executor.submit(
+                    extract_document_incremental if snapshot_store is not None else extract_document,
+                    documents[pack[0]],
+                    model_name=model_name,
+                    node_color=node_color,
+                    edge_color=edge_color,
+                    rel_set_name=rel_set_name,
+                    cache=cache,
+                    max_chunk_tokens=max_chunk_tokens,
+                    chunk_overlap=chunk_overlap,
+                    max_concurrency=chunk_concurrency,
+                    scheduler=scheduler,
+                    streaming=streaming,
+                    on_relationship=on_relationship,
+                    rel_set_pruner=rel_set_pruner,
+                    cascade=cascade,
+                    metrics=metrics,
+                    **incremental_kwargs,
+                )
+            futures[future] = pack
+
+        for future in as_completed(futures):
+            pack = futures[future]
+            try:
+                graphs = future.result()
+                error = None
+            except Exception as e:
+                graphs, error = None, str(e)
+            if graphs is not None and len(pack) == 1:
+                graphs = [graphs]
+            for position, index in enumerate(pack):
+                doc_data = documents[index]
+                if error is not None:
+                    result = DocumentExtractionResult(doc_id=doc_data["doc_id"], source=doc_data.get("source"), error=error)
+                else:
+                    graph = annotate_evidence_pages(graphs[position], doc_data["doc_id"], doc_data.get("page_starts"))
+                    for duplicate_index in duplicates.get(index, []):
+                        graph = attach_duplicate_evidence(graph, doc_data, documents[duplicate_index])
+                    result = DocumentExtractionResult(doc_id=doc_data["doc_id"], source=doc_data.get("source"), graph=graph)
+                report(index, result)
+                for duplicate_index in duplicates.get(index, []):
+                    duplicate_doc = documents[duplicate_index]
+                    report(duplicate_index, DocumentExtractionResult(
+                        doc_id=duplicate_doc["doc_id"],
+                        source=duplicate_doc.get("source"),
+                        duplicate_of=doc_data["doc_id"],
+                        error=f"与 {doc_data['doc_id']} 重复，而该文档抽取失败: {error}" if error is not None else None,
+                    ))
+
+    return results
+
+
+def extract_documents_checkpointed(
+    documents: List[Dict[str, Any]],
+    run_manifest: RunManifest,
+    on_result: Optional[Callable[[int, DocumentExtractionResult, int], None]] = None,
+    **extract_kwargs,
+) -> List[DocumentExtractionResult]:
+    """
+    带断点的批量抽取：运行清单中已完成（且内容未变）的文档直接读取保存的图谱，
+    其余文档交给 extract_documents，每篇完成后立即写入清单，会话中断后可从清单继续而不重复调用模型。
+    清单按文档在本次运行中的位置记录进度（同一 doc_id 可出现多次）；近似重复文档记为 duplicate 并保存其代表文档ID。
+    """
+    results: List[Optional[DocumentExtractionResult]] = [None] * len(documents)
+    pending_indexes = []
+    resumed = 0
+    for index, doc_data in enumerate(documents):
+        entry = run_manifest.entry_of(doc_data, index)
+        status = entry["status"] if entry is not None else None
+        if status == STATUS_DONE:
+            payload = run_manifest.load_graph(doc_data, index)
+            if payload is None:
+                pending_indexes.append(index)
+                continue
+            result = DocumentExtractionResult(doc_id=doc_data["doc_id"], source=doc_data.get("source"), graph=KnowledgeGraph.model_validate(payload))
+        elif status == STATUS_DUPLICATE:
+            result = DocumentExtractionResult(doc_id=doc_data["doc_id"], source=doc_data.get("source"), duplicate_of=entry.get("duplicate_of"))
+        elif status == STATUS_SKIPPED:
+            result = DocumentExtractionResult(doc_id=doc_data["doc_id"], source=doc_data.get("source"), skipped=True)
+        else:
+            pending_indexes.append(index)
+            continue
+        results[index] = result
+        resumed += 1
+        if on_result:
+            on_result(index, result, resumed)
+
+    def record_result(position: int, result: DocumentExtractionResult, completed: int):
+        index = pending_indexes[position]
+        doc_data = documents[index]
+        if result.duplicate_of is not None and result.error is None:
+            # A duplicate's facts are stored in its representative's graph
+            run_manifest.record(doc_data, STATUS_DUPLICATE, position=index, duplicate_of=result.duplicate_of)
+        elif result.skipped:
+            run_manifest.record(doc_data, STATUS_SKIPPED, position=index)
+        elif result.error is not None:
+            run_manifest.record(doc_data, STATUS_ERROR, error=result.error, position=index)
+        else:
+            run_manifest.record(doc_data, STATUS_DONE, graph_payload=result.graph.model_dump(), position=index)
+        results[index] = result
+        if on_result:
+            on_result(index, result, resumed + completed)
+
+    if pending_indexes:
+        extract_documents([documents[index] for index in pending_indexes], on_result=record_result, **extract_kwargs)
+    return results
+
+
+def sync_watched_folder(
+    manifest: FolderManifest,
+    changes: FolderChanges,
+    parse_workers: Optional[int] = None,
+    html_mode: Optional[str] = None,
+    **extract_kwargs,
+) -> Dict[str, Any]:
+    """
+    把一次目录扫描的变化同步到监视目录的状态中：删除的文件撤回其图谱，新增或修改的文件重新解析、抽取并替换旧图谱，
+    最后用所有文件的图谱重建合并图谱 graph.json。抽取失败的文件不保存图谱，下次扫描时重试。
+    extract_kwargs 原样传给 extract_documents（模型、REL_SET、缓存、调度器、增量快照等）。
+    """
+    for name in changes.deleted:
+        manifest.retract(name)
+
+    to_extract = changes.to_extract
+    parse_result = parse_files(manifest.directory, [manifest.directory / name for name in to_extract], max_workers=parse_workers, html_mode=html_mode, deferred_extensions=MARKDOWN_EXTENSIONS)
+    documents, document_files = [], []
+    for name, parsed_file in zip(to_extract, parse_result.files):
+        if parsed_file.error is not None:
+            manifest.record(name, to_extract[name], [], error=parsed_file.error)
+            continue
+        for doc in documents_from_parsed_file(parsed_file):
+            documents.append(ensure_sentence_ids(doc))
+            document_files.append(name)
+
+    results_by_file: Dict[str, List[DocumentExtractionResult]] = {}
+    for name, result in zip(document_files, extract_documents(documents, **extract_kwargs) if documents else []):
+        results_by_file.setdefault(name, []).append(result)
+
+    failed = [name for name, parsed_file in zip(to_extract, parse_result.files) if parsed_file.error is not None]
+    for name, results in results_by_file.items():
+        doc_ids = [result.doc_id for result in results]
+        errors = [f"{result.doc_id}: {result.error}" for result in results if result.error is not None]
+        if errors:
+            manifest.record(name, to_extract[name], doc_ids, error="; ".join(errors))
+            failed.append(name)
+            continue
+        graphs = [result.graph for result in results if result.graph is not None]
+        metadata = graphs[0].metadata if len(graphs) == 1 else None
+        manifest.record(name, to_extract[name], doc_ids, graph_payload=merge_graphs(graphs, metadata=metadata).model_dump())
+    # Files that parsed into no documents at all (e.g. a Markdown file without valid blocks)
+    for name in set(to_extract) - set(results_by_file) - set(failed):
+        manifest.record(name, to_extract[name], [], graph_payload=KnowledgeGraph(nodes=[], relationships=[]).model_dump())
+    manifest.save()
+
+    corpus_graph = merge_graphs([KnowledgeGraph.model_validate(payload) for payload in manifest.iter_graphs()])
+    (manifest.state_dir / "graph.json").write_text(corpus_graph.model_dump_json(indent=2), encoding="utf-8")
+    return {
+        "added": len(changes.added),
+        "modified": len(changes.modified),
+        "deleted": len(changes.deleted),
+        "unchanged": changes.unchanged,
+        "documents_extracted": len(documents),
+        "failed": failed,
+        "nodes": len(corpus_graph.nodes),
+        "relationships": len(corpus_graph.relationships),
+    }
+
+
 # --- UI & VISUALIZATION ---
 
 st.title("文本知识图谱提取器")
@@ -423,12 +1554,12 @@ st.caption("从文本中提取知识图谱并进行可视化。")
 text_input = st.text_area("粘贴文本（或输入YouTube链接）:", key="text_input")
 uploaded_file = st.file_uploader(
     "或者上传一个文件", 
-    type=['txt', 'pdf', 'docx', 'md', 'html', 'htm', 'odt'],
+    type=['txt', 'pdf', 'docx', 'md', 'html', 'htm', 'odt', 'zip', 'tar', 'gz', 'tgz'],
     key="uploaded_file"
 )
 
 directory_path_input = st.text_input(
-    "输入本地目录路径以批量处理（可选）",
+    "输入本地目录或压缩包 (.zip/.tar.gz) 路径以批量处理（可选）",
     value="",
     placeholder="例如：GraphRAG-Extract-Best-Example-CoralWind-zh/corpus"
 )
@@ -447,9 +1578,11 @@ selected_mentions_option = st.selectbox(
 )
 selected_mentions_path = AVAILABLE_MENTIONS_FILES.get(selected_mentions_option)
 
+MODEL_OPTIONS = ("gemini-2.5-pro", "gemini-1.5-pro", "gemini-1.5-flash")
+
 model_selection = st.selectbox(
     "选择一个模型:",
-    ("gemini-2.5-pro", "gemini-1.5-pro", "gemini-1.5-flash")
+    MODEL_OPTIONS
 )
 
 rel_set_selection = st.selectbox(
@@ -457,6 +1590,70 @@ rel_set_selection = st.selectbox(
     list(REL_SETS.keys())
 )
 
+EXTRACTION_CACHE_OPTIONS = {"不使用缓存": None, "内存": "memory", "磁盘 (zstd 压缩)": "disk", "SQLite": "sqlite"}
+
+
+@st.cache_resource
+def get_extraction_cache(backend_name: str, max_megabytes: int) -> ExtractionCache:
+    # Cached as a Streamlit resource so the cache and its counters survive reruns
+    return create_extraction_cache(backend_name, EXTRACTION_CACHE_DIR, max_bytes=max_megabytes * 1024 * 1024)
+
+
+@st.cache_resource
+def get_llm_scheduler(requests_per_minute: int, tokens_per_minute: int, max_concurrency: int, max_retries: int) -> LLMScheduler:
+    # Shared across reruns and sessions, since the rate limits belong to the API key
+    return LLMScheduler(
+        requests_per_minute=requests_per_minute or None,
+        tokens_per_minute=tokens_per_minute or None,
+        initial_concurrency=max_concurrency,
+        max_concurrency=max_concurrency,
+        retry_policy=RetryPolicy(max_retries=max_retries),
+    )
+
+
+@st.cache_resource
+def get_snapshot_store() -> DocumentSnapshotStore:
+    return DocumentSnapshotStore(EXTRACTION_CACHE_DIR / "snapshots")
+
+
+with st.expander("高级抽取设置"):
+    max_concurrency = st.slider("并发调用数（同时处理的文档数）", 1, 32, DEFAULT_MAX_CONCURRENCY)
+    parse_workers = st.slider("目录解析进程数（PDF/DOCX/ODT 并行解析）", 1, max(64, DEFAULT_PARSE_WORKERS), DEFAULT_PARSE_WORKERS)
+    html_mode_option = st.selectbox("网页 (HTML) 文本抽取", list(HTML_MODE_OPTIONS.keys()), index=list(HTML_MODE_OPTIONS.values()).index(DEFAULT_HTML_MODE))
+    html_mode = HTML_MODE_OPTIONS[html_mode_option]
+    extraction_cache_option = st.selectbox("抽取结果缓存", list(EXTRACTION_CACHE_OPTIONS.keys()))
+    extraction_cache_max_mb = st.slider("缓存容量上限 (MB)", 16, 4096, 512)
+    max_chunk_tokens = st.number_input("长文档分块阈值（估算 token，0 表示不分块）", min_value=0, max_value=200000, value=DEFAULT_CHUNK_TOKEN_BUDGET, step=500)
+    chunk_overlap = st.slider("分块重叠句数", 0, 5, DEFAULT_CHUNK_OVERLAP_SENTENCES)
+    pack_token_budget = st.number_input("短文档打包上限（估算 token，0 表示不打包）", min_value=0, max_value=200000, value=DEFAULT_PACK_TOKEN_BUDGET, step=500)
+    requests_per_minute = st.number_input("每分钟请求数上限 (RPM，0 表示不限)", min_value=0, max_value=100000, value=DEFAULT_REQUESTS_PER_MINUTE, step=10)
+    tokens_per_minute = st.number_input("每分钟 token 上限 (TPM，0 表示不限)", min_value=0, max_value=100000000, value=DEFAULT_TOKENS_PER_MINUTE, step=10000)
+    max_retries = st.slider("限流/瞬时错误最大重试次数", 0, 10, DEFAULT_MAX_RETRIES)
+    rel_set_pruning_enabled = st.checkbox("按文档裁剪关系集（本地预判实体类型，只保留可能适用的关系以缩短提示词）", value=False)
+    cascade_enabled = st.checkbox("模型级联（先用低成本模型，未通过质量检查的文档再交给上方所选模型）", value=False)
+    cascade_fast_model = st.selectbox("级联首选低成本模型", MODEL_OPTIONS, index=MODEL_OPTIONS.index("gemini-1.5-flash"))
+    cascade_min_confidence = st.slider("级联升级阈值（平均置信度低于此值则升级）", 0.0, 1.0, DEFAULT_MIN_MEAN_CONFIDENCE, 0.05)
+    deduplication_enabled = st.checkbox("近似重复文档去重（MinHash/LSH，每组重复文档只抽取一篇，其余作为额外证据来源）", value=False)
+    deduplication_threshold = st.slider("近似重复判定阈值（估算 Jaccard 相似度）", 0.5, 1.0, DEFAULT_SIMILARITY_THRESHOLD, 0.05)
+    entity_resolution_enabled = st.checkbox("跨文档实体消解（按别名索引命中与 alias_of 关系合并实体，not_same_as 关系禁止合并）", value=False)
+    incremental_enabled = st.checkbox("增量抽取（与上次结果逐句比对，只重抽改动句附近的窗口；启用后不打包短文档）", value=False)
+    run_checkpoint_options = {"不记录断点": None, "新建运行（逐篇记录断点，可续跑）": "new"}
+    for unfinished_run in list_runs(RUNS_DIR):
+        run_summary = unfinished_run.summary()
+        if run_summary["finished"] < run_summary["total"]:
+            run_checkpoint_options[f"继续运行 {run_summary['run_id']}（已完成 {run_summary['finished']}/{run_summary['total']}）"] = unfinished_run
+    run_checkpoint_option = st.selectbox("断点续跑", list(run_checkpoint_options.keys()))
+    streaming_enabled = st.checkbox("流式抽取（按 JSONL 逐条接收关系，不适用于分块/打包的文档）", value=False)
+    budget_usd = st.number_input("单次运行费用上限（美元，按公开价格估算，0 表示不限）", min_value=0.0, max_value=10000.0, value=0.0, step=0.5)
+    budget_tokens = st.number_input("单次运行 token 上限（0 表示不限）", min_value=0, max_value=1000000000, value=0, step=100000)
+
+
+extraction_cache = None
+if EXTRACTION_CACHE_OPTIONS[extraction_cache_option]:
+    extraction_cache = get_extraction_cache(EXTRACTION_CACHE_OPTIONS[extraction_cache_option], extraction_cache_max_mb)
+
+llm_scheduler = get_llm_scheduler(int(requests_per_minute), int(tokens_per_minute), max_concurrency, max_retries)
+
 with st.expander("自定义颜色"):
     node_color = st.color_picker("选择节点颜色", "#FFADAD")
     edge_color = st.color_picker("选择边颜色", "#9BF6FF")
@@ -541,31 +1738,59 @@ if clear_button:
     st.session_state.uploaded_file = None
     st.rerun()
 
-def normalize_entities(graph: KnowledgeGraph, mentions_data: List[Dict[str, Any]]) -> KnowledgeGraph:
+def graph_node_types(graph: KnowledgeGraph) -> Dict[str, str]:
+    """节点ID到其类型的映射（取第一个已知类型，Unknown 不计），供别名包含匹配核对实体类型。"""
+    node_types: Dict[str, str] = {}
+    for node in [*graph.nodes, *(endpoint for rel in graph.relationships for endpoint in (rel.source, rel.target))]:
+        if node.type and node.type != "Unknown":
+            node_types.setdefault(node.id, node.type)
+    return node_types
+
+def normalize_entities(graph: KnowledgeGraph, mentions_data: Union[AliasIndex, List[Dict[str, Any]]], match_report: Optional[AliasMatchReport] = None) -> KnowledgeGraph:
     """
     规范化知识图谱中的实体ID，根据提供的mentions数据进行别名映射。
+    mentions_data 为已编译的别名索引（AliasIndex）时，图中出现的每个ID依次尝试精确别名、规范化键（NFKC、全半角、
+    去标点括号）和 Aho-Corasick 最长包含别名匹配（别名须位于ID开头，其后只能是公司组织形式或括号限定语，且节点类型须与 mentions 中的 type 一致）；
+    对应多个规范ID的歧义匹配不做映射，记入 match_report。
+    mentions_data 为 mentions 记录列表时只做精确映射。
     合并具有相同规范化ID的节点属性，并确保关系源和目标引用实际的规范化Node对象。
     """
     id_mapping = {}
-    for idx, mention_entry in enumerate(mentions_data, start=1):
-        canonical_id = mention_entry.get("canonical_id")
-        name = mention_entry.get("name")
-        aliases = mention_entry.get("aliases", [])
+    if isinstance(mentions_data, AliasIndex):
+        graph_ids = [node.id for node in graph.nodes]
+        graph_ids.extend(endpoint.id for rel in graph.relationships for endpoint in (rel.source, rel.target))
+        for node_id, match in mentions_data.match_many(graph_ids, graph_node_types(graph)).items():
+            if match.canonical_id is not None:
+                id_mapping[node_id] = match.canonical_id
+            if match_report is not None:
+                match_report.add(match)
+    else:
+        for idx, mention_entry in enumerate(mentions_data, start=1):
+            canonical_id = mention_entry.get("canonical_id")
+            name = mention_entry.get("name")
+            aliases = mention_entry.get("aliases", [])
 
-        if not canonical_id or not name:
-            st.warning(f"mentions.jsonl 第 {idx} 行缺少 canonical_id 或 name，已跳过该条记录。")
-            continue
+            if not canonical_id or not name:
+                st.warning(f"mentions.jsonl 第 {idx} 行缺少 canonical_id 或 name，已跳过该条记录。")
+                continue
 
-        if not isinstance(aliases, list):
-            aliases = [aliases]
+            if not isinstance(aliases, list):
+                aliases = [aliases]
 
-        # Map the canonical name itself
-        id_mapping[name] = canonical_id
-        # Map all aliases
-        for alias in aliases:
-            if alias:
-                id_mapping[alias] = canonical_id
-    
+            # Map the canonical name itself
+            id_mapping[name] = canonical_id
+            # Map all aliases
+            for alias in aliases:
+                if alias:
+                    id_mapping[alias] = canonical_id
+
+    return collapse_entities(graph, id_mapping)
+
+def collapse_entities(graph: KnowledgeGraph, id_mapping: Dict[str, str]) -> KnowledgeGraph:
+    """
+    按 id_mapping 将节点ID改写为规范化ID，合并映射到同一ID的节点属性，
+    并确保关系源和目标引用实际的规范化Node对象。
+    """
     # Use a dictionary to store unique normalized nodes, keyed by their normalized ID
     unique_normalized_nodes: Dict[str, Node] = {}
     
@@ -617,9 +1842,53 @@ def normalize_entities(graph: KnowledgeGraph, mentions_data: List[Dict[str, Any]
 
     return KnowledgeGraph(nodes=normalized_nodes_list, relationships=normalized_relationships, metadata=graph.metadata)
 
+def resolve_entities(graph: KnowledgeGraph, alias_index: Optional[AliasIndex] = None, match_report: Optional[AliasMatchReport] = None, resolver: Optional[EntityResolver] = None) -> KnowledgeGraph:
+    """
+    跨文档实体消解：以并查集合并别名索引命中（节点ID与其规范ID）和 alias_of 关系两端的节点，
+    not_same_as 关系作为禁止合并约束，违反约束的合并会被拒绝并计入统计。
+    按提示词约定，alias_of 可以是首尾相同的自环边，别名写在 qualifiers.alias 中（不新建别名节点），此时合并头实体与该别名。
+    每个簇优先以规范ID为代表，其次为出现次数最多、最先出现的ID；关系端点只改写一次，因合并而首尾相同的 alias_of 关系被移除，原本就是自环的保留。
+    """
+    if resolver is None:
+        resolver = EntityResolver()
+    resolver.add_mentions(node.id for node in graph.nodes)
+    # Constraints first, so that no merge below can join a not_same_as pair
+    for rel in graph.relationships:
+        if rel.type == DISTINCT_RELATION:
+            resolver.forbid(rel.source.id, rel.target.id)
+    if alias_index is not None and len(alias_index):
+        graph_ids = [node.id for node in graph.nodes]
+        graph_ids.extend(endpoint.id for rel in graph.relationships for endpoint in (rel.source, rel.target))
+        for node_id, match in alias_index.match_many(graph_ids, graph_node_types(graph)).items():
+            if match.canonical_id is not None:
+                resolver.prefer(match.canonical_id)
+                resolver.union(node_id, match.canonical_id, reason="alias_index")
+            if match_report is not None:
+                match_report.add(match)
+    alias_self_loops = set()
+    for rel in graph.relationships:
+        if rel.type != ALIAS_RELATION:
+            continue
+        alias = (rel.qualifiers or {}).get("alias")
+        if isinstance(alias, str) and alias.strip():
+            resolver.union(rel.source.id, alias.strip(), reason=ALIAS_RELATION)
+        if rel.source.id == rel.target.id:
+            alias_self_loops.add(id(rel))
+        else:
+            resolver.union(rel.source.id, rel.target.id, reason=ALIAS_RELATION)
+
+    resolved = collapse_entities(graph, resolver.assignments())
+    # collapse_entities rewrites the relationship objects in place, so their identity still tells the original self-loops apart
+    resolved.relationships = [
+        rel for rel in resolved.relationships
+        if not (rel.type == ALIAS_RELATION and rel.source.id == rel.target.id and id(rel) not in alias_self_loops)
+    ]
+    return resolved
+
 
 if generate_button:
-    if not GOOGLE_API_KEY:
+    # The replay backend serves recorded responses and never contacts the API
+    if not GOOGLE_API_KEY and LLM_BACKEND != "replay":
         st.error("未找到 GOOGLE_API_KEY。请确保您的 .env 文件已正确设置。")
         st.stop()
     
@@ -632,79 +1901,185 @@ if generate_button:
                 documents_to_process.append({
                     "doc_id": "youtube_video",
                     "source": input_text,
-                    "date": time.strftime("%Y-%m-%d"),
+                    "date": None,
                     "text_with_sentence_ids": get_text_from_youtube(input_text)
                 })
             else:
                 documents_to_process.append({
                     "doc_id": "text_input",
                     "source": "用户输入",
-                    "date": time.strftime("%Y-%m-%d"),
+                    "date": None,
                     "text_with_sentence_ids": input_text
                 })
     
     if uploaded_file:
         file_extension = os.path.splitext(uploaded_file.name)[1].lower()
-        if file_extension == ".md":
-            markdown_content = uploaded_file.read().decode("utf-8")
-            documents_to_process.extend(process_markdown_content(markdown_content, uploaded_file.name, uploaded_file.name))
+        if archive_kind(uploaded_file.name):
+            documents_to_process.extend(load_documents_from_archive(uploaded_file, uploaded_file.name, html_mode=html_mode))
+        elif file_extension == ".md":
+            documents_to_process.extend(process_markdown_content(uploaded_file, uploaded_file.name, uploaded_file.name))
+        elif file_extension == ".pdf":
+            pdf_text = get_pdf_document_text(uploaded_file)
+            documents_to_process.append({
+                "doc_id": uploaded_file.name,
+                "source": uploaded_file.name,
+                "date": None,
+                "text_with_sentence_ids": pdf_text.text,
+                "page_starts": pdf_text.page_starts,
+            })
         else:
             uploaded_file.seek(0)
             documents_to_process.append({
                 "doc_id": uploaded_file.name,
                 "source": uploaded_file.name,
-                "date": time.strftime("%Y-%m-%d"),
-                "text_with_sentence_ids": get_text_from_file(uploaded_file)
+                "date": None,
+                "text_with_sentence_ids": get_text_from_file(uploaded_file, html_mode=html_mode)
             })
     
     if directory_path_input.strip():
         directory_path = Path(directory_path_input.strip()).expanduser()
-        directory_documents = load_documents_from_directory(directory_path)
-        documents_to_process.extend(directory_documents)
+        if directory_path.is_file() and archive_kind(directory_path.name):
+            documents_to_process.extend(load_documents_from_archive(directory_path, directory_path.name, html_mode=html_mode))
+        else:
+            documents_to_process.extend(load_documents_from_directory(directory_path, max_workers=parse_workers, html_mode=html_mode))
     
     if example_directory_selection:
         for example_label in example_directory_selection:
             example_path = EXAMPLE_DIRECTORIES.get(example_label)
             if example_path:
-                documents_to_process.extend(load_documents_from_directory(example_path))
+                documents_to_process.extend(load_documents_from_directory(example_path, max_workers=parse_workers, html_mode=html_mode))
+
+    # Evidence sentence IDs can only be checked, chunked and resolved on S-annotated text
+    documents_to_process = [ensure_sentence_ids(doc) for doc in documents_to_process]
+
+    resume_run = run_checkpoint_options[run_checkpoint_option]
+    if isinstance(resume_run, RunManifest):
+        # Resuming works from the documents stored with the run, not from the current inputs
+        documents_to_process = resume_run.load_documents()
+        if resume_run.config.get("model") != model_selection or resume_run.config.get("rel_set") != rel_set_selection:
+            st.warning(f"运行 {resume_run.run_id} 创建时使用的是 {resume_run.config.get('model')} / {resume_run.config.get('rel_set')}，剩余文档将使用当前选择的模型与关系集。")
 
     if not documents_to_process or not any(doc["text_with_sentence_ids"] for doc in documents_to_process):
         st.warning("请输入文本、YouTube链接、上传文件，或提供有效的目录路径。")
         st.stop()
     else:
         progress_bar = st.progress(0, text="正在初始化...")
-        all_graphs = []
         total_docs = len(documents_to_process)
         doc_source_summary = [doc.get("source") for doc in documents_to_process if doc.get("source")]
 
-        for i, doc_data in enumerate(documents_to_process):
-            doc_id = doc_data["doc_id"]
-            source = doc_data["source"]
-            date = doc_data["date"]
-            text_to_process = doc_data["text_with_sentence_ids"]
-
-            if not text_to_process:
-                st.info(f"文档 '{doc_id}' 内容为空，跳过处理。")
-                continue
+        rel_set_pruner = None
+        if rel_set_pruning_enabled:
+            # Names and aliases from the selected mentions file double as a gazetteer for type detection
+            rel_set_pruner = RelSetPruner(REL_SETS[rel_set_selection], gazetteer=load_gazetteer(selected_mentions_path) if selected_mentions_path else None)
+
+        model_cascade = None
+        if cascade_enabled and cascade_fast_model != model_selection:
+            model_cascade = ModelCascade([cascade_fast_model, model_selection], min_mean_confidence=cascade_min_confidence)
+
+        snapshot_store = get_snapshot_store() if incremental_enabled else None
+        duplicate_detector = NearDuplicateDetector(threshold=deduplication_threshold) if deduplication_enabled else None
+        run_metrics = RunMetrics(budget_usd=float(budget_usd) or None, budget_tokens=int(budget_tokens) or None)
+
+        extraction_started_at = time.perf_counter()
+        streamed_facts = {"count": 0, "first_at": None}
+        streamed_facts_lock = threading.Lock()
+
+        def count_streamed_relationship(doc_id: str, relationship: Relationship):
+            # Runs on worker threads, so only record counters here; the UI is updated from report_extraction_progress
+            with streamed_facts_lock:
+                streamed_facts["count"] += 1
+                if streamed_facts["first_at"] is None:
+                    streamed_facts["first_at"] = time.perf_counter() - extraction_started_at
+
+        def report_extraction_progress(index: int, result: DocumentExtractionResult, completed: int):
+            progress_text = f"已完成 {completed}/{total_docs} 篇文档 (最新: {result.doc_id})... 并发调用大语言模型 (这可能需要一些时间)"
+            if streaming_enabled:
+                progress_text += f" 已流式接收 {streamed_facts['count']} 条关系"
+            progress_bar.progress(min(completed * 60 // total_docs + 10, 70), text=progress_text)
+
+        progress_bar.progress(10, text=f"正在并发处理 {total_docs} 篇文档（并发数 {max_concurrency}）...")
+        run_manifest = None
+        if isinstance(resume_run, RunManifest):
+            run_manifest = resume_run
+        elif resume_run == "new":
+            run_manifest = RunManifest.create(RUNS_DIR, documents_to_process, config={"model": model_selection, "rel_set": rel_set_selection})
+        if run_manifest is not None:
+            st.caption(f"运行 ID：{run_manifest.run_id}（断点保存在 {run_manifest.run_dir}）")
+
+        extract_kwargs = {"run_manifest": run_manifest} if run_manifest is not None else {}
+        extraction_results = (extract_documents_checkpointed if run_manifest is not None else extract_documents)(
+            documents_to_process,
+            model_name=model_selection,
+            node_color=node_color,
+            edge_color=edge_color,
+            rel_set_name=rel_set_selection,
+            max_concurrency=max_concurrency,
+            on_result=report_extraction_progress,
+            cache=extraction_cache,
+            max_chunk_tokens=int(max_chunk_tokens) or None,
+            chunk_overlap=chunk_overlap,
+            pack_token_budget=int(pack_token_budget) or None,
+            scheduler=llm_scheduler,
+            streaming=streaming_enabled,
+            on_relationship=count_streamed_relationship if streaming_enabled else None,
+            rel_set_pruner=rel_set_pruner,
+            cascade=model_cascade,
+            snapshot_store=snapshot_store,
+            metrics=run_metrics,
+            duplicate_detector=duplicate_detector,
+            **extract_kwargs,
+        )
+        metrics_summary = run_metrics.summary()
+        if run_manifest is not None:
+            (run_manifest.run_dir / "metrics.json").write_text(run_metrics.to_json(), encoding="utf-8")
+        st.caption(
+            f"调用统计：模型调用 {metrics_summary['llm_calls']} 次（缓存命中 {metrics_summary['cache_hits']} 次，重试 {metrics_summary['retries']} 次），"
+            f"输入 {metrics_summary['prompt_tokens']} / 输出 {metrics_summary['completion_tokens']} tokens，"
+            f"估算费用 ${metrics_summary['cost_usd']:.4f}，耗时 p50 {metrics_summary['latency_seconds']['p50']:.1f} 秒 / p95 {metrics_summary['latency_seconds']['p95']:.1f} 秒"
+        )
+        if metrics_summary["calls_refused_by_budget"]:
+            st.warning(f"已达到运行预算上限，{metrics_summary['calls_refused_by_budget']} 次调用未发起。")
+        if snapshot_store is not None:
+            snapshot_stats = snapshot_store.stats()
+            st.caption(
+                f"增量抽取（累计）：未改动 {snapshot_stats['unchanged']} 篇，增量 {snapshot_stats['incremental']} 篇，整篇 {snapshot_stats['full']} 篇；"
+                f"重抽 {snapshot_stats['sentences_reextracted']} 句，保留 {snapshot_stats['relationships_kept']} 条关系，撤回 {snapshot_stats['relationships_retracted']} 条"
+            )
+        if duplicate_detector is not None:
+            duplicate_stats = duplicate_detector.stats()
+            st.caption(
+                f"重复文档检测：{duplicate_stats['documents']} 篇中完全重复 {duplicate_stats['exact_duplicates']} 篇、近似重复 {duplicate_stats['near_duplicates']} 篇"
+                f"（重复率 {duplicate_stats['duplicate_rate']:.1%}），节省 {duplicate_stats['calls_saved']} 次调用、约 {duplicate_stats['tokens_saved']} 输入 tokens"
+            )
+        if model_cascade is not None:
+            cascade_tier_stats = model_cascade.stats()["tiers"]
+            st.caption("模型级联：" + "；".join(
+                f"{tier_model} 调用 {tier_stats['calls']} 次（采纳 {tier_stats['accepted']}，升级 {tier_stats['escalated']}，平均耗时 {tier_stats['mean_latency_seconds']:.1f} 秒）"
+                for tier_model, tier_stats in cascade_tier_stats.items()
+            ))
+        if rel_set_pruner is not None and rel_set_pruner.documents:
+            pruning_stats = rel_set_pruner.stats()
+            st.caption(
+                f"关系集裁剪：保留 {pruning_stats['relations_kept']}/{pruning_stats['relations_total']} 个关系，"
+                f"提示词估算 {pruning_stats['prompt_tokens_before']} → {pruning_stats['prompt_tokens_after']} tokens"
+                f"（节省 {pruning_stats['prompt_tokens_saved_ratio']:.1%}）"
+            )
+        if streaming_enabled and streamed_facts["first_at"] is not None:
+            st.caption(f"流式抽取：共接收 {streamed_facts['count']} 条关系，首条关系用时 {streamed_facts['first_at']:.1f} 秒")
+        if extraction_cache is not None:
+            cache_stats = extraction_cache.stats()
+            st.caption(f"抽取缓存：命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次（累计命中率 {cache_stats['hit_rate']:.0%}）")
 
-            progress_text = f"正在处理文档 {i+1}/{total_docs} ({doc_id})... 调用大语言模型 (这可能需要一些时间)"
-            progress_bar.progress((i * 100 // total_docs) + 10, text=progress_text)
-            
-            try:
-                graph = generate_graph(
-                    text=text_to_process,
-                    source=source,
-                    model_name=model_selection,
-                    node_color=node_color,
-                    edge_color=edge_color,
-                    rel_set_name=rel_set_selection,
-                    doc_id=doc_id,
-                    doc_date=date
-                )
-                all_graphs.append(graph)
-            except Exception as e:
-                st.error(f"处理文档 '{doc_id}' 时发生错误: {e}")
+        all_graphs = []
+        for result in extraction_results:
+            if result.skipped:
+                st.info(f"文档 '{result.doc_id}' 内容为空，跳过处理。")
+            elif result.duplicate_of is not None and result.error is None:
                 continue
+            elif result.error:
+                st.error(f"处理文档 '{result.doc_id}' 时发生错误: {result.error}")
+            else:
+                all_graphs.append(result.graph)
         
         if not all_graphs:
             progress_bar.empty()
@@ -727,42 +2102,48 @@ if generate_button:
         )
 
         # --- Entity Normalization/Alias Handling ---
+        alias_index = None
+        alias_match_report = AliasMatchReport()
         if selected_mentions_path:
             progress_bar.progress(70, text="正在进行实体规范化...")
             try:
-                mentions_data = []
-                with open(selected_mentions_path, "r", encoding="utf-8") as mentions_file:
-                    for line_number, raw_line in enumerate(mentions_file, start=1):
-                        line = raw_line.strip()
-                        if not line:
-                            continue
-                        try:
-                            record = json.loads(line)
-                        except json.JSONDecodeError as json_err:
-                            st.warning(f"{selected_mentions_option} 第 {line_number} 行解析失败: {json_err}")
-                            continue
-
-                        missing_fields = [field for field in ("canonical_id", "name") if field not in record]
-                        if missing_fields:
-                            st.warning(f"{selected_mentions_option} 第 {line_number} 行缺少字段: {', '.join(missing_fields)}，已跳过该条记录。")
-                            continue
-
-                        if "aliases" not in record or record["aliases"] is None:
-                            record["aliases"] = []
-                        elif not isinstance(record["aliases"], list):
-                            record["aliases"] = [record["aliases"]]
-
-                        mentions_data.append(record)
-
-                if mentions_data:
-                    aggregated_graph = normalize_entities(aggregated_graph, mentions_data)
-                    st.success("实体规范化完成。")
-                else:
+                # The compiled index is only rebuilt when the mentions file changed since the last build
+                alias_index = load_alias_index(selected_mentions_path, ALIAS_INDEX_DIR)
+                for mention_warning in alias_index.warnings:
+                    if mention_warning.kind == "invalid_json":
+                        st.warning(f"{selected_mentions_option} 第 {mention_warning.line_number} 行解析失败: {mention_warning.detail}")
+                    else:
+                        st.warning(f"{selected_mentions_option} 第 {mention_warning.line_number} 行缺少字段: {mention_warning.detail}，已跳过该条记录。")
+                if alias_index.header["warning_count"] > len(alias_index.warnings):
+                    st.warning(f"{selected_mentions_option} 另有 {alias_index.header['warning_count'] - len(alias_index.warnings)} 行无效记录已跳过。")
+
+                if not len(alias_index):
                     st.warning("未找到有效的实体规范化数据，已跳过该步骤。")
+                elif not entity_resolution_enabled:
+                    aggregated_graph = normalize_entities(aggregated_graph, alias_index, match_report=alias_match_report)
+                    st.success("实体规范化完成。")
             except Exception as e:
                 st.error(f"实体规范化失败: {e}")
                 st.stop()
 
+        # --- Cross-document Entity Resolution ---
+        entity_resolver = None
+        if entity_resolution_enabled:
+            progress_bar.progress(75, text="正在进行跨文档实体消解...")
+            # Alias-index hits are merged here together with alias_of edges, under the not_same_as constraints
+            entity_resolver = EntityResolver()
+            aggregated_graph = resolve_entities(aggregated_graph, alias_index, match_report=alias_match_report, resolver=entity_resolver)
+            resolution_stats = entity_resolver.stats()
+            blocked_merges = sum(resolution_stats["blocked_merges"].values())
+            st.success(f"跨文档实体消解完成：{resolution_stats['nodes_in']} 个节点合并为 {resolution_stats['nodes_out']} 个，共 {resolution_stats['merged_clusters']} 个合并簇（最大 {resolution_stats['largest_cluster']} 个ID）。")
+            if blocked_merges:
+                st.warning(f"{blocked_merges} 次合并因 not_same_as 约束被拒绝，相关实体保持分开。")
+
+        if alias_match_report.ambiguous:
+            st.warning(f"{len(alias_match_report.ambiguous)} 个实体对应多个规范ID，未做合并，请人工确认：\n" + "\n".join(
+                f"- {node_id}: {' / '.join(candidates)}" for node_id, candidates in list(alias_match_report.ambiguous.items())[:20]
+            ))
+
         progress_bar.progress(80, text="已获取数据，正在渲染聚合图谱...")
         time.sleep(0.2)
 
@@ -854,8 +2235,12 @@ if generate_button:
             for node in aggregated_graph.nodes:
                 title = node.model_dump_json(indent=2)
                 net.add_node(node.id, label=node.id, title=title, color=node_color, shape=node_shape, size=node_size)
+            sentence_indexes = build_sentence_indexes(documents_to_process)
             for edge in aggregated_graph.relationships:
                 title = edge.model_dump_json(indent=2)
+                evidence_sentences = resolve_evidence_sentences(edge.evidence, sentence_indexes)
+                if evidence_sentences:
+                    title += "\n\n证据原文:\n" + "\n".join(evidence_sentences)
                 net.add_edge(edge.source.id, edge.target.id, label=edge.type, color=edge_color, title=title, width=edge_width, arrows=edge_arrow_style)
             
             graph_html_path = "temp_graph.html"
@@ -896,12 +2281,25 @@ if generate_button:
                     "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
                     "document_sources": doc_source_summary,
                     "selected_mentions": selected_mentions_option if selected_mentions_path else "未使用",
+                    "alias_index": alias_index.stats() if alias_index is not None else "未使用",
+                    "alias_matching": alias_match_report.summary() if alias_index is not None else "未使用",
+                    "entity_resolution": entity_resolver.stats() if entity_resolver is not None else "未使用",
                     "example_directories": example_directory_selection,
                     "custom_directory": directory_path_input.strip() or "未提供",
                     "model": model_selection,
-                    "rel_set": rel_set_selection
+                    "rel_set": rel_set_selection,
+                    "html_mode": html_mode,
+                    "extraction_cache": extraction_cache.stats() if extraction_cache is not None else "未使用",
+                    "llm_scheduler": llm_scheduler.stats(),
+                    "rel_set_pruning": rel_set_pruner.stats() if rel_set_pruner is not None else "未使用",
+                    "model_cascade": model_cascade.stats() if model_cascade is not None else "未使用",
+                    "incremental_extraction": snapshot_store.stats() if snapshot_store is not None else "未使用",
+                    "deduplication": duplicate_detector.stats() if duplicate_detector is not None else "未使用",
+                    "run": run_manifest.summary() if run_manifest is not None else "未记录断点",
+                    "metrics": run_metrics.summary(),
                 }
                 zip_file.writestr("run_metadata.json", json.dumps(run_metadata, ensure_ascii=False, indent=2))
+                zip_file.writestr("metrics.json", run_metrics.to_json())
             submission_zip.seek(0)
             st.download_button(
                 label="下载提交包 (ZIP，含HTML+JSON+Metadata)",
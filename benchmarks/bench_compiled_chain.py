@@ -0,0 +1,85 @@
+"""
+Microbenchmark: per-document overhead of preparing an extraction call.
+
+Compares the previous behaviour of generate_graph (new client, with_structured_output,
+REL_SET serialization and chained str.replace on every call) with the compiled chain
+registry. The LLM is never called: both paths stop at the formatted prompt value.
+
+    python benchmarks/bench_compiled_chain.py --docs 500
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder-key")
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+import app  # noqa: E402
+from app import ChatPromptTemplate, KnowledgeGraph, REL_SETS, PROMPT_TEMPLATE, HUMAN_PROMPT_TEMPLATE, get_compiled_chain, get_llm  # noqa: E402
+
+
+def legacy_prepare(text, source, model_name, rel_set_name, doc_id, doc_date):
+    # Mirrors generate_graph before the compiled chain registry was introduced
+    llm = get_llm(model_name)
+    structured_llm = llm.with_structured_output(KnowledgeGraph)
+    selected_rel_set = REL_SETS[rel_set_name]
+    relations_list = [json.dumps(rel["name"]) for rel in selected_rel_set["relations"]]
+    formatted_relations = ",\n  ".join(relations_list)
+    formatted_qualifiers = json.dumps(selected_rel_set["qualifiers"], indent=2, ensure_ascii=False)
+    formatted_policies = json.dumps(selected_rel_set["policies"], indent=2, ensure_ascii=False)
+    formatted_policies = formatted_policies.replace("{", "{{").replace("}", "}}")
+    formatted_authority_order = json.dumps(selected_rel_set["authority_order_for_disputes"], indent=2, ensure_ascii=False)
+    formatted_authority_order = formatted_authority_order.replace("{", "{{").replace("}", "}}")
+    system_prompt_content = PROMPT_TEMPLATE.replace("{REL_SET}", formatted_relations).replace("{QUALIFIERS}", formatted_qualifiers)
+    system_prompt_content = system_prompt_content.replace("{{POLICIES}}", formatted_policies).replace("{{AUTHORITY_ORDER}}", formatted_authority_order)
+    system_prompt_content = system_prompt_content.replace("{{doc_id}}", doc_id)
+    system_prompt_content = system_prompt_content.replace("{{doc_date}}", doc_date)
+    system_prompt_content = system_prompt_content.replace("{{source_name}}", source)
+    prompt = ChatPromptTemplate.from_messages([("system", system_prompt_content), ("human", HUMAN_PROMPT_TEMPLATE)])
+    prompt | structured_llm
+    return prompt.invoke({"text": text})
+
+
+def compiled_prepare(text, source, model_name, rel_set_name, doc_id, doc_date):
+    compiled_chain = get_compiled_chain(model_name, rel_set_name)
+    compiled_chain.chain  # built once, reused afterwards
+    prompt = compiled_chain.chain.first
+    return prompt.invoke(compiled_chain.build_input(text, doc_id, doc_date, source))
+
+
+def run(label, prepare, documents, model_name, rel_set_name):
+    timings = []
+    for doc in documents:
+        start = time.perf_counter()
+        prepare(doc["text"], doc["source"], model_name, rel_set_name, doc["doc_id"], doc["date"])
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<10} total {sum(timings):9.1f} ms | mean {statistics.mean(timings):7.3f} ms/doc | "
+          f"p50 {statistics.median(timings):7.3f} | max {max(timings):7.3f}")
+    return statistics.mean(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=300)
+    parser.add_argument("--model", default="gemini-2.5-pro")
+    parser.add_argument("--rel-set", default="GraphRAG-RELSET-GenericWeb-zh")
+    args = parser.parse_args()
+
+    documents = [
+        {"doc_id": f"d{i}", "source": f"d{i}.txt", "date": "2025-03-12",
+         "text": f"S1 珊瑚湾市政府与南海电力集团签署第{i}号备忘录。\nS2 NPG出资2.4亿元。"}
+        for i in range(args.docs)
+    ]
+    app.clear_compiled_chains()
+    legacy = run("legacy", legacy_prepare, documents, args.model, args.rel_set)
+    compiled = run("compiled", compiled_prepare, documents, args.model, args.rel_set)
+    print(f"per-document overhead reduced {legacy / compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
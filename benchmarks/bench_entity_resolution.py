@@ -0,0 +1,80 @@
+"""
+Benchmark: union-find entity resolution over synthetic cross-document mentions.
+
+Generates --mentions node mentions spread over --entities entities, each entity seen
+under a few surface IDs. Surface IDs of one entity are linked by alias_of edges (a
+chain, as documents would emit them), and a share of entity pairs is marked
+not_same_as; a few alias_of edges deliberately cross such pairs and must be refused.
+Reports the time of each phase and the resident memory the resolver adds (VmRSS,
+Linux; tracemalloc would slow every allocation and skew the timings).
+
+    python benchmarks/bench_entity_resolution.py --mentions 2000000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.extraction.entity_resolution import EntityResolver  # noqa: E402
+
+
+def rss_mib():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mentions", type=int, default=2000000, help="node mentions across all documents")
+    parser.add_argument("--entities", type=int, default=400000, help="distinct real-world entities")
+    parser.add_argument("--surface-forms", type=int, default=3, help="surface IDs per entity")
+    parser.add_argument("--conflicts", type=float, default=0.05, help="share of entities with a not_same_as partner")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mentions = [f"E{rng.randrange(args.entities)}/{rng.randrange(args.surface_forms)}" for _ in range(args.mentions)]
+    alias_edges = [(f"E{entity}/{form}", f"E{entity}/{form - 1}") for entity in range(args.entities) for form in range(1, args.surface_forms)]
+    conflicting = rng.sample(range(args.entities), int(args.entities * args.conflicts) // 2 * 2)
+    distinct_edges = [(f"E{first}/0", f"E{second}/0") for first, second in zip(conflicting[::2], conflicting[1::2])]
+    # Wrong alias_of edges across every tenth not_same_as pair, through another surface form
+    wrong_edges = [(f"E{first}/1", f"E{second}/1") for first, second in zip(conflicting[::20], conflicting[1::20])]
+
+    baseline = rss_mib()
+    resolver = EntityResolver()
+    phases = []
+    start = time.perf_counter()
+    resolver.add_mentions(mentions)
+    phases.append(("mentions", time.perf_counter() - start))
+    start = time.perf_counter()
+    for first, second in distinct_edges:
+        resolver.forbid(first, second)
+    phases.append(("not_same_as", time.perf_counter() - start))
+    start = time.perf_counter()
+    for first, second in alias_edges + wrong_edges:
+        resolver.union(first, second, "alias_of")
+    phases.append(("alias_of unions", time.perf_counter() - start))
+    start = time.perf_counter()
+    assignments = resolver.assignments()
+    phases.append(("representatives", time.perf_counter() - start))
+    resolver_mib = rss_mib() - baseline
+
+    stats = resolver.stats()
+    for name, seconds in phases:
+        print(f"{name:<16} {seconds:8.2f}s")
+    print(f"{'total':<16} {sum(seconds for _, seconds in phases):8.2f}s")
+    print(f"mentions {stats['mentions']:,}, ids {stats['ids']:,}, nodes {stats['nodes_in']:,} -> {stats['nodes_out']:,}, "
+          f"remapped {len(assignments):,}, largest cluster {stats['largest_cluster']}")
+    print(f"unions {stats['unions']}, blocked {stats['blocked_merges']} of {len(wrong_edges):,} wrong edges, cannot-link {stats['cannot_link']:,}")
+    print(f"resolver memory {resolver_mib:.1f} MiB ({resolver_mib * 2 ** 20 / max(stats['ids'], 1):.0f} bytes per ID, assignment dict included)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark: bytes in vs. estimated tokens out for saved web pages.
+
+Extracts every page under benchmarks/fixtures/html (or --pages) twice, once as the
+whole page text (the previous BeautifulSoup get_text behaviour) and once as main
+content, and reports the token estimate the extraction prompt would carry for each,
+the reduction, and the extraction time per page.
+
+    python benchmarks/bench_html_extraction.py --repeat 20
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.parsers.html_content import extract_html_text  # noqa: E402
+from src.parsers.sentence_chunker import estimate_tokens  # noqa: E402
+
+FIXTURE_DIR = ROOT / "benchmarks" / "fixtures" / "html"
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=Path, default=FIXTURE_DIR, help="directory of .html/.htm pages")
+    parser.add_argument("--repeat", type=int, default=5, help="extractions per page and mode for timing")
+    parser.add_argument("--show", action="store_true", help="print the extracted main content")
+    args = parser.parse_args()
+
+    pages = sorted(path for path in args.pages.iterdir() if path.suffix.lower() in (".html", ".htm"))
+    print(f"{'page':<34} {'bytes':>8} {'full tok':>9} {'main tok':>9} {'saved':>7} {'full ms':>8} {'main ms':>8}")
+    totals = [0, 0, 0]
+    for path in pages:
+        html = path.read_text(encoding="utf-8", errors="replace")
+        full_text, full_seconds = timed(lambda: extract_html_text(html, "full"), args.repeat)
+        main_text, main_seconds = timed(lambda: extract_html_text(html, "main"), args.repeat)
+        size, full_tokens, main_tokens = path.stat().st_size, estimate_tokens(full_text), estimate_tokens(main_text)
+        totals = [totals[0] + size, totals[1] + full_tokens, totals[2] + main_tokens]
+        print(f"{path.name:<34} {size:8d} {full_tokens:9d} {main_tokens:9d} {1 - main_tokens / max(full_tokens, 1):7.1%} {full_seconds * 1000:8.2f} {main_seconds * 1000:8.2f}")
+        if args.show:
+            print(main_text, end="\n\n")
+    print(f"{'total':<34} {totals[0]:8d} {totals[1]:9d} {totals[2]:9d} {1 - totals[2] / max(totals[1], 1):7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: multi-document markdown parsing on a large concatenated corpus.
+
+Writes a corpus file of --size-mb by repeating the CoralWind documents under unique
+IDs (with one malformed block every --malformed-every blocks), then compares the
+previous tempered-regex parser, which needs the whole file as one string, with the
+streaming line parser reading the file object. The legacy parser only runs on the
+first --legacy-mb of the file.
+
+    python benchmarks/bench_markdown_parser.py --size-mb 300 --legacy-mb 50 --memory
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.parsers.markdown_parser import MarkdownMultiDocumentParser  # noqa: E402
+
+CORPUS_DIR = ROOT / "GraphRAG-Extract-Best-Example-CoralWind-zh" / "corpus"
+
+LEGACY_DOC_BLOCK_REGEX = re.compile(
+    r"^\s*#\s*/corpus/(?P<doc_id>[^\s]+)\.txt\s*\n"
+    r"^\s*#\s*元数据:\s*source=(?P<source>[^,]+),\s*date=(?P<date>[^,]+),\s*id=(?P<meta_id>[^\s]+)\s*\n"
+    r"(?P<content>(?:(?!^\s*#\s*/corpus/).)*)",
+    re.DOTALL | re.MULTILINE,
+)
+LEGACY_SENTENCE_REGEX = re.compile(r"^(S\d+\s+.*)", re.MULTILINE)
+
+
+def legacy_parse(markdown_content):
+    # Mirrors MarkdownMultiDocumentParser.parse before the line-oriented rewrite
+    documents = []
+    for match in LEGACY_DOC_BLOCK_REGEX.finditer(markdown_content):
+        content_block = match.group("content").strip()
+        documents.append({
+            "doc_id": match.group("doc_id"),
+            "source": match.group("source"),
+            "date": match.group("date"),
+            "text_with_sentence_ids": "\n".join(m.group(1) for m in LEGACY_SENTENCE_REGEX.finditer(content_block)),
+        })
+    return documents
+
+
+def write_corpus(path, size_bytes, malformed_every):
+    templates = [(p.stem, p.read_text(encoding="utf-8").strip()) for p in sorted(CORPUS_DIR.glob("*.txt"))]
+    written, block = 0, 0
+    with open(path, "w", encoding="utf-8") as corpus_file:
+        while written < size_bytes:
+            stem, body = templates[block % len(templates)]
+            if malformed_every and block % malformed_every == malformed_every - 1:
+                body = body.replace("# 元数据:", "# 元数据", 1)
+            chunk = f"# /corpus/{stem}-{block}.txt\n{body}\n\n"
+            corpus_file.write(chunk)
+            written += len(chunk.encode("utf-8"))
+            block += 1
+    return block
+
+
+def measure(label, fn, size_mb, memory):
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    documents = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if memory else None
+    if memory:
+        tracemalloc.stop()
+    line = f"{label:<10} {size_mb:7.1f} MB | {documents:8d} docs | {elapsed:7.2f} s | {size_mb / elapsed:7.1f} MB/s"
+    if peak is not None:
+        line += f" | peak {peak / 2**20:8.1f} MiB"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=300)
+    parser.add_argument("--legacy-mb", type=float, default=50)
+    parser.add_argument("--malformed-every", type=int, default=1000)
+    parser.add_argument("--memory", action="store_true", help="report peak Python allocations (slower)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus_path = Path(tmp_dir) / "corpus.md"
+        blocks = write_corpus(corpus_path, int(args.size_mb * 2**20), args.malformed_every)
+        size_mb = os.path.getsize(corpus_path) / 2**20
+        print(f"corpus: {blocks} blocks, {size_mb:.1f} MB")
+
+        legacy_bytes = int(args.legacy_mb * 2**20)
+        if legacy_bytes:
+            with open(corpus_path, "rb") as corpus_file:
+                legacy_content = corpus_file.read(legacy_bytes).decode("utf-8", errors="ignore")
+            legacy_mb = len(legacy_content.encode("utf-8")) / 2**20
+            measure("legacy", lambda: len(legacy_parse(legacy_content)), legacy_mb, args.memory)
+            del legacy_content
+
+        streaming_parser = MarkdownMultiDocumentParser()
+
+        def stream():
+            with open(corpus_path, "r", encoding="utf-8") as corpus_file:
+                return sum(1 for _ in streaming_parser.parse_iter(corpus_file))
+
+        measure("streaming", stream, size_mb, args.memory)
+        print(f"malformed blocks reported: {len(streaming_parser.errors)}")
+
+
+if __name__ == "__main__":
+    main()
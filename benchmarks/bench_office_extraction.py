@@ -0,0 +1,144 @@
+"""
+Benchmark: DOCX/ODT text extraction, object model vs. streaming XML.
+
+Builds a .docx and an .odt of --paragraphs paragraphs (the CoralWind corpus sentences
+repeated, with a four-column table every --table-every paragraphs), then extracts the
+text with the previous implementation (python-docx Document.paragraphs / odfpy
+getElementsByType) and with the iterparse-based office_xml extractor. Each extraction
+runs in a fresh process and reports wall time and the growth of the process's peak
+RSS (VmHWM, Linux), which also covers lxml's allocations (python-docx) that
+tracemalloc cannot see.
+
+    python benchmarks/bench_office_extraction.py --paragraphs 20000
+"""
+import argparse
+import io
+import multiprocessing
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import docx
+from odf import table as odf_table, teletype as odf_teletype, text as odf_text
+from odf.opendocument import OpenDocumentText, load as load_odt
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.parsers.office_xml import iter_docx_paragraphs, iter_odt_paragraphs  # noqa: E402
+
+CORPUS_DIR = ROOT / "GraphRAG-Extract-Best-Example-CoralWind-zh" / "corpus"
+TABLE_ROWS = [("用途", "金额（亿元）", "实施单位", "年份"), ("珊瑚幼体培育与移植", "0.45", "蓝珊研究所", "2026"), ("基线监测与年度评估", "0.20", "蓝珊研究所", "2026")]
+
+
+def corpus_sentences():
+    sentences = []
+    for path in sorted(CORPUS_DIR.glob("*.txt")):
+        sentences.extend(line.split(" ", 1)[1] for line in path.read_text(encoding="utf-8").splitlines() if line.startswith("S") and " " in line)
+    return sentences
+
+
+def build_docx(paragraphs, table_every):
+    sentences = corpus_sentences()
+    document = docx.Document()
+    for index in range(paragraphs):
+        document.add_paragraph(sentences[index % len(sentences)])
+        if table_every and index % table_every == table_every - 1:
+            table = document.add_table(rows=len(TABLE_ROWS), cols=len(TABLE_ROWS[0]))
+            for row_index, row in enumerate(TABLE_ROWS):
+                for column_index, value in enumerate(row):
+                    table.cell(row_index, column_index).text = value
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def build_odt(paragraphs, table_every):
+    sentences = corpus_sentences()
+    document = OpenDocumentText()
+    for index in range(paragraphs):
+        document.text.addElement(odf_text.P(text=sentences[index % len(sentences)]))
+        if table_every and index % table_every == table_every - 1:
+            table = odf_table.Table()
+            for row in TABLE_ROWS:
+                table_row = odf_table.TableRow()
+                table.addElement(table_row)
+                for value in row:
+                    cell = odf_table.TableCell()
+                    cell.addElement(odf_text.P(text=value))
+                    table_row.addElement(cell)
+            document.text.addElement(table)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def legacy_docx(data):
+    return "\n".join(para.text for para in docx.Document(io.BytesIO(data)).paragraphs)
+
+
+def legacy_odt(data):
+    document = load_odt(io.BytesIO(data))
+    return "\n".join(odf_teletype.extractText(para) for para in document.getElementsByType(odf_text.P))
+
+
+def streaming_docx(data):
+    return "\n".join(iter_docx_paragraphs(io.BytesIO(data)))
+
+
+def streaming_odt(data):
+    return "\n".join(iter_odt_paragraphs(io.BytesIO(data)))
+
+
+EXTRACTORS = {"python-docx": legacy_docx, "streaming docx": streaming_docx, "odfpy": legacy_odt, "streaming odt": streaming_odt}
+
+
+def peak_rss_mib():
+    # ru_maxrss survives fork and exec, so a spawned worker would report the parent's peak
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_extractor(label, data):
+    baseline = peak_rss_mib()
+    start = time.perf_counter()
+    text = EXTRACTORS[label](data)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(text), peak_rss_mib() - baseline
+
+
+def xml_size_mib(data, part):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        return archive.getinfo(part).file_size / 2**20
+
+
+def measure(label, data):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        elapsed, chars, peak_growth = executor.submit(run_extractor, label, data).result()
+    print(f"{label:<16} {elapsed:8.2f} s | {chars:10d} chars | peak RSS +{peak_growth:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--table-every", type=int, default=50, help="insert a table after every N paragraphs (0: no tables)")
+    args = parser.parse_args()
+
+    docx_data = build_docx(args.paragraphs, args.table_every)
+    print(f"docx: {args.paragraphs} paragraphs, {xml_size_mib(docx_data, 'word/document.xml'):.1f} MiB of XML")
+    measure("python-docx", docx_data)
+    measure("streaming docx", docx_data)
+
+    odt_data = build_odt(args.paragraphs, args.table_every)
+    print(f"odt: {args.paragraphs} paragraphs, {xml_size_mib(odt_data, 'content.xml'):.1f} MiB of XML")
+    measure("odfpy", odt_data)
+    measure("streaming odt", odt_data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+End-to-end pipeline benchmark against the replay LLM backend (no network access).
+
+Stages: directory ingestion, extraction through the scheduler with recorded responses
+served at a simulated latency/failure rate, merging, entity normalization, pyvis
+rendering and, when NEO4J_URI/NEO4J_USER/NEO4J_PASSWORD are set and --neo4j is given,
+the Neo4j write.
+
+Recordings come from a live run with KGRAPH_LLM_BACKEND=record, or --seed-gold
+writes one structured response per corpus document built from the gold graph.
+
+    python benchmarks/bench_replay_pipeline.py --seed-gold --latency 1.5 --jitter 0.5 --failure-rate 0.05 --concurrency 8
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+DEFAULT_EXAMPLE_DIR = ROOT / "GraphRAG-Extract-Best-Example-CoralWind-zh"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_EXAMPLE_DIR / "corpus")
+    parser.add_argument("--mentions", type=Path, default=DEFAULT_EXAMPLE_DIR / "gold" / "mentions.jsonl")
+    parser.add_argument("--recordings", type=Path, default=None, help="recordings directory (default: a temporary directory)")
+    parser.add_argument("--seed-gold", action="store_true", help="write recordings built from gold/graph.jsonl before running")
+    parser.add_argument("--model", default="gemini-2.5-pro")
+    parser.add_argument("--rel-set", default="GraphRAG-RELSET-GenericWeb-zh")
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=1, help="process the corpus this many times (documents get distinct IDs)")
+    parser.add_argument("--neo4j", action="store_true")
+    return parser.parse_args()
+
+
+args = parse_args()
+recordings_dir = args.recordings or Path(tempfile.mkdtemp(prefix="kgraph_recordings_"))
+# The backend is chosen from the environment when app is imported
+os.environ["KGRAPH_LLM_BACKEND"] = "replay"
+os.environ["KGRAPH_LLM_RECORDINGS_DIR"] = str(recordings_dir)
+os.environ["KGRAPH_REPLAY_LATENCY"] = str(args.latency)
+os.environ["KGRAPH_REPLAY_JITTER"] = str(args.jitter)
+os.environ["KGRAPH_REPLAY_FAILURE_RATE"] = str(args.failure_rate)
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+import app  # noqa: E402
+from pyvis.network import Network  # noqa: E402
+from src.extraction.llm_backend import KIND_STRUCTURED, RecordingStore, prompt_text, recording_key  # noqa: E402
+from src.extraction.llm_scheduler import LLMScheduler, RetryPolicy  # noqa: E402
+from src.extraction.metrics import RunMetrics  # noqa: E402
+
+
+def seed_gold_recordings(documents, store, model_name, rel_set_name, mentions):
+    """Stores, for every document, the gold relationships whose evidence cites it, under the exact prompt the pipeline will send."""
+    names = {mention["canonical_id"]: mention["name"] for mention in mentions}
+    types = {mention["canonical_id"]: mention.get("type", "Unknown") for mention in mentions}
+    gold_facts = [json.loads(line) for line in (args.mentions.parent / "graph.jsonl").read_text(encoding="utf-8").splitlines() if line.strip()]
+    compiled_chain = app.get_compiled_chain(model_name, rel_set_name)
+    prompt = compiled_chain.build_prompt()
+    for doc in documents:
+        gold_doc_id = doc["doc_id"].split("_", 1)[0]
+        nodes, relationships = {}, []
+        for fact in gold_facts:
+            evidence = [item for item in fact["evidence"] if item["doc"] == gold_doc_id]
+            if not evidence:
+                continue
+            endpoints = []
+            for entity_id in (fact["head"], fact["tail"]):
+                node = nodes.setdefault(entity_id, {"id": names.get(entity_id, entity_id), "type": types.get(entity_id, "Unknown")})
+                endpoints.append(node)
+            relationships.append({
+                "source": endpoints[0], "target": endpoints[1], "type": fact["relation"],
+                "qualifiers": fact.get("qualifiers") or {}, "evidence": [{**item, "doc": doc["doc_id"]} for item in evidence], "confidence": 0.9,
+            })
+        prompt_value = prompt.invoke(compiled_chain.build_input(doc["text_with_sentence_ids"], doc["doc_id"], doc["date"], doc["source"]))
+        store.put(recording_key(model_name, KIND_STRUCTURED, prompt_text(prompt_value)), {
+            "model": model_name, "kind": KIND_STRUCTURED, "response": {"nodes": list(nodes.values()), "relationships": relationships},
+        })
+
+
+def render(graph):
+    net = Network(height="600px", width="100%", notebook=True, directed=True, cdn_resources="in_line")
+    for node in graph.nodes:
+        net.add_node(node.id, label=node.id, title=node.type)
+    for edge in graph.relationships:
+        net.add_edge(edge.source.id, edge.target.id, label=edge.type)
+    return net.generate_html()
+
+
+def main():
+    timings = {}
+
+    def timed(stage, fn, *fn_args, **fn_kwargs):
+        started_at = time.perf_counter()
+        result = fn(*fn_args, **fn_kwargs)
+        timings[stage] = time.perf_counter() - started_at
+        return result
+
+    corpus = timed("ingest", app.load_documents_from_directory, args.corpus)
+    documents = []
+    for copy in range(args.repeat):
+        suffix = f"#{copy}" if copy else ""
+        documents.extend({**doc, "doc_id": doc["doc_id"] + suffix} for doc in corpus)
+    mentions = [json.loads(line) for line in args.mentions.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    store = RecordingStore(recordings_dir)
+    if args.seed_gold:
+        timed("seed", seed_gold_recordings, documents, store, args.model, args.rel_set, mentions)
+
+    scheduler = LLMScheduler(initial_concurrency=args.concurrency, max_concurrency=args.concurrency, retry_policy=RetryPolicy(max_retries=5, base_delay=0.2, max_delay=2.0))
+    metrics = RunMetrics()
+    results = timed(
+        "extract", app.extract_documents, documents, model_name=args.model, node_color="#FFADAD", edge_color="#9BF6FF",
+        rel_set_name=args.rel_set, max_concurrency=args.concurrency, scheduler=scheduler, metrics=metrics, max_chunk_tokens=None,
+    )
+    graphs = [result.graph for result in results if result.graph is not None]
+    failures = [result for result in results if result.error]
+    merged = timed("merge", app.merge_graphs, graphs)
+    normalized = timed("normalize", app.normalize_entities, merged, mentions)
+    html = timed("render", render, normalized)
+    if args.neo4j and app.NEO4J_URI and app.NEO4J_USER and app.NEO4J_PASSWORD:
+        db = app.Neo4jDatabase(app.NEO4J_URI, app.NEO4J_USER, app.NEO4J_PASSWORD)
+        try:
+            timed("neo4j", db.save_graph, normalized)
+        finally:
+            db.close()
+
+    summary = metrics.summary()
+    print(f"recordings: {recordings_dir} ({len(store)} responses)")
+    print(f"documents: {len(documents)} | failed: {len(failures)} | retries: {summary['retries']} | scheduler: {scheduler.stats()}")
+    for failure in failures[:5]:
+        print(f"  {failure.doc_id}: {failure.error}")
+    print(f"graph: {len(normalized.nodes)} nodes, {len(normalized.relationships)} relationships, {len(html) // 1024} KiB HTML")
+    latencies = [call["latency_seconds"] for call in json.loads(metrics.to_json())["calls"] if not call["cache_hit"]]
+    if latencies:
+        print(f"call latency: p50 {statistics.median(latencies):.2f} s | p95 {summary['latency_seconds']['p95']:.2f} s | max {max(latencies):.2f} s")
+    for stage, seconds in timings.items():
+        print(f"{stage:<10} {seconds * 1000:10.1f} ms")
+    print(f"throughput: {len(documents) / timings['extract']:.2f} documents/s at concurrency {args.concurrency}")
+
+
+if __name__ == "__main__":
+    main()
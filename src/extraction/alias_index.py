@@ -0,0 +1,387 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import xxhash
+
+from src.extraction.alias_matching import MIN_CONTAINED_KEY_CHARS, AliasAutomaton, AliasMatch, alias_key, build_automaton, is_legal_form_suffix, strip_qualifiers, types_agree
+from src.extraction.folder_manifest import file_content_hash
+
+# Compiled alias index for entity normalization. A mentions.jsonl gazetteer is parsed
+# and validated once into a single binary file of sorted arrays:
+#   hashes            uint64  xxh3 hash of every (alias, canonical ID) entry, sorted by (hash, file order)
+#   canonical         uint32  index into the canonical ID table, per entry
+#   alias_offsets     uint64  + alias_blob (UTF-8), the alias of every entry, to rule out hash collisions
+#   canonical_offsets uint64  + canonical_blob (UTF-8), the canonical ID table
+#   type_offsets      uint64  + type_blob (UTF-8), the gazetteer type of every canonical ID ("" if none)
+#   key_canonical_offsets uint64 + key_canonicals uint32, the canonical IDs of every normalized alias key
+#   edge_*, fail, output_*, key_lengths  the Aho-Corasick automaton over the normalized keys (alias_matching)
+# The file is memory-mapped, so opening an index of millions of aliases costs a header
+# read and lookups touch only the pages they binary-search. Index files are named by
+# the gazetteer's content hash; a small JSON sidecar per source path remembers the
+# mtime/size it was built from, so an unchanged file is never re-read and a touched but
+# identical file is only re-hashed. lookup() keeps the former dict semantics (the
+# latest line wins when an alias is listed for several canonical IDs); match() reports
+# such aliases as ambiguous instead of guessing.
+
+INDEX_FORMAT_VERSION = 3
+INDEX_MAGIC = b"KGALIAS1"
+INDEX_SUFFIX = ".kgalias"
+# Warnings kept in the index header; the total is always counted
+MAX_RECORDED_WARNINGS = 200
+_ALIGNMENT = 8
+_AUTOMATON_ARRAYS = ("edge_offsets", "edge_chars", "edge_targets", "fail", "output_key", "output_link", "key_lengths")
+
+
+@dataclass
+class MentionWarning:
+    line_number: int
+    kind: str  # "invalid_json" or "missing_fields"
+    detail: str
+
+
+def iter_mention_records(path: Path) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[MentionWarning]]]:
+    """(line number, record, warning) per non-empty line; records lacking canonical_id or name come back as warnings."""
+    with open(path, "r", encoding="utf-8") as mentions_file:
+        for line_number, raw_line in enumerate(mentions_file, start=1):
+            line = raw_line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as json_err:
+                yield line_number, None, MentionWarning(line_number, "invalid_json", str(json_err))
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, MentionWarning(line_number, "invalid_json", "not a JSON object")
+                continue
+            missing_fields = [field for field in ("canonical_id", "name") if not record.get(field)]
+            if missing_fields:
+                yield line_number, None, MentionWarning(line_number, "missing_fields", ", ".join(missing_fields))
+                continue
+            aliases = record.get("aliases")
+            record["aliases"] = [] if aliases is None else aliases if isinstance(aliases, list) else [aliases]
+            yield line_number, record, None
+
+
+def _pack_strings(values: List[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(values) + 1, dtype=np.uint64)
+    if values:
+        np.cumsum([len(value) for value in values], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(values), dtype=np.uint8)
+
+
+def build_alias_index(source: Path, index_path: Path) -> Dict[str, Any]:
+    """Parses the mentions file at source and writes its index to index_path; returns the index header."""
+    canonical_positions: Dict[str, int] = {}
+    # canonical position -> the first type given for it
+    canonical_types: Dict[int, str] = {}
+    # (alias, canonical position) -> latest position in file order
+    entry_order: Dict[Tuple[str, int], int] = {}
+    warnings: List[MentionWarning] = []
+    warning_count, record_count, order = 0, 0, 0
+    for _, record, warning in iter_mention_records(source):
+        if warning is not None:
+            warning_count += 1
+            if len(warnings) < MAX_RECORDED_WARNINGS:
+                warnings.append(warning)
+            continue
+        record_count += 1
+        canonical_position = canonical_positions.setdefault(str(record["canonical_id"]), len(canonical_positions))
+        if record.get("type") and not canonical_types.get(canonical_position):
+            canonical_types[canonical_position] = str(record["type"])
+        for alias in [record["name"], *record["aliases"]]:
+            if alias:
+                key = (str(alias), canonical_position)
+                entry_order.pop(key, None)
+                entry_order[key] = order
+                order += 1
+
+    entries = list(entry_order)
+    alias_bytes = [alias.encode("utf-8") for alias, _ in entries]
+    hashes = np.fromiter((xxhash.xxh3_64_intdigest(value) for value in alias_bytes), dtype=np.uint64, count=len(entries))
+    # entry_order is already in file order, so a stable sort keeps the latest entry last within a hash run
+    permutation = np.argsort(hashes, kind="stable")
+    alias_offsets, alias_blob = _pack_strings([alias_bytes[position] for position in permutation])
+    canonical_offsets, canonical_blob = _pack_strings([canonical_id.encode("utf-8") for canonical_id in canonical_positions])
+    type_offsets, type_blob = _pack_strings([canonical_types.get(position, "").encode("utf-8") for position in range(len(canonical_positions))])
+
+    # Normalized key -> canonical positions (ordered, distinct)
+    key_canonicals: Dict[str, Dict[int, None]] = {}
+    for alias, canonical_position in entries:
+        key = alias_key(alias)
+        if key:
+            key_canonicals.setdefault(key, {})[canonical_position] = None
+    keys = sorted(key_canonicals)
+    key_canonical_lists = [list(key_canonicals[key]) for key in keys]
+    key_canonical_offsets = np.zeros(len(keys) + 1, dtype=np.uint64)
+    np.cumsum([len(positions) for positions in key_canonical_lists], out=key_canonical_offsets[1:])
+    arrays = {
+        "hashes": hashes[permutation],
+        "canonical": np.fromiter((entries[position][1] for position in permutation), dtype=np.uint32, count=len(entries)),
+        "alias_offsets": alias_offsets,
+        "alias_blob": alias_blob,
+        "canonical_offsets": canonical_offsets,
+        "canonical_blob": canonical_blob,
+        "type_offsets": type_offsets,
+        "type_blob": type_blob,
+        "key_canonical_offsets": key_canonical_offsets,
+        "key_canonicals": np.array([position for positions in key_canonical_lists for position in positions], dtype=np.uint32),
+        **build_automaton(keys),
+    }
+    distinct_aliases = len({alias for alias, _ in entries})
+    header = {
+        "format_version": INDEX_FORMAT_VERSION,
+        "source": str(source),
+        "records": record_count,
+        "aliases": distinct_aliases,
+        "entries": len(entries),
+        "canonical_ids": len(canonical_positions),
+        "ambiguous_aliases": len(entries) - distinct_aliases,
+        "keys": len(keys),
+        "ambiguous_keys": sum(1 for positions in key_canonical_lists if len(positions) > 1),
+        "warning_count": warning_count,
+        "warnings": [asdict(warning) for warning in warnings],
+        "arrays": {},
+    }
+    _write_index(index_path, header, arrays)
+    return header
+
+
+def _write_index(index_path: Path, header: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    # Array offsets depend on the header length, which depends on the offsets: lay the
+    # arrays out relative to a padded header size and grow the padding until it fits
+    header_budget = 4096
+    while True:
+        offset = len(INDEX_MAGIC) + 4 + header_budget
+        layout = {}
+        for name, array in arrays.items():
+            offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+            layout[name] = {"offset": offset, "dtype": array.dtype.str, "length": int(array.shape[0])}
+            offset += array.nbytes
+        header_bytes = json.dumps({**header, "arrays": layout}, ensure_ascii=False).encode("utf-8")
+        if len(header_bytes) <= header_budget:
+            break
+        header_budget = len(header_bytes) * 2
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as index_file:
+        index_file.write(INDEX_MAGIC)
+        index_file.write(header_budget.to_bytes(4, "little"))
+        index_file.write(header_bytes.ljust(header_budget, b" "))
+        for name, array in arrays.items():
+            index_file.write(b"\0" * (layout[name]["offset"] - index_file.tell()))
+            index_file.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, index_path)
+
+
+class AliasIndex:
+    """Read-only view of a compiled alias index file (memory-mapped)."""
+
+    def __init__(self, index_path: Path):
+        self.path = Path(index_path)
+        with open(self.path, "rb") as index_file:
+            if index_file.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError(f"{self.path} is not an alias index")
+            header_size = int.from_bytes(index_file.read(4), "little")
+            self.header = json.loads(index_file.read(header_size).decode("utf-8"))
+        if self.header.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"{self.path} has index format {self.header.get('format_version')}, expected {INDEX_FORMAT_VERSION}")
+        for name, spec in self.header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            if spec["length"]:
+                # A plain ndarray view of the mapping: slicing a np.memmap builds a memmap object per slice
+                array = np.memmap(self.path, dtype=dtype, mode="r", offset=spec["offset"], shape=(spec["length"],)).view(np.ndarray)
+            else:
+                array = np.zeros(0, dtype=dtype)
+            setattr(self, f"_{name}", array)
+        self._automaton = AliasAutomaton(**{name: getattr(self, f"_{name}") for name in _AUTOMATON_ARRAYS})
+        # Set by load_alias_index
+        self.rebuilt = False
+        self.build_seconds = 0.0
+
+    def __len__(self) -> int:
+        return self.header["aliases"]
+
+    @property
+    def warnings(self) -> List[MentionWarning]:
+        return [MentionWarning(**warning) for warning in self.header["warnings"]]
+
+    def canonical_id(self, position: int) -> str:
+        start, end = int(self._canonical_offsets[position]), int(self._canonical_offsets[position + 1])
+        return self._canonical_blob[start:end].tobytes().decode("utf-8")
+
+    def canonical_type(self, position: int) -> str:
+        start, end = int(self._type_offsets[position]), int(self._type_offsets[position + 1])
+        return self._type_blob[start:end].tobytes().decode("utf-8")
+
+    def _alias_at(self, position: int) -> bytes:
+        start, end = int(self._alias_offsets[position]), int(self._alias_offsets[position + 1])
+        return self._alias_blob[start:end].tobytes()
+
+    def _entry_range(self, hash_value: int) -> Tuple[int, int]:
+        key = np.uint64(hash_value)
+        return int(np.searchsorted(self._hashes, key, side="left")), int(np.searchsorted(self._hashes, key, side="right"))
+
+    def candidates(self, alias: str) -> List[str]:
+        """Every canonical ID listed for alias, in file order (the last one is what lookup returns)."""
+        encoded = alias.encode("utf-8")
+        start, end = self._entry_range(xxhash.xxh3_64_intdigest(encoded))
+        return [self.canonical_id(int(self._canonical[position])) for position in range(start, end) if self._alias_at(position) == encoded]
+
+    def lookup(self, alias: str) -> Optional[str]:
+        encoded = alias.encode("utf-8")
+        start, end = self._entry_range(xxhash.xxh3_64_intdigest(encoded))
+        for position in range(end - 1, start - 1, -1):
+            if self._alias_at(position) == encoded:
+                return self.canonical_id(int(self._canonical[position]))
+        return None
+
+    def lookup_many(self, aliases: Iterable[str]) -> Dict[str, str]:
+        """alias -> canonical ID for the aliases found in the index, with one vectorized binary search for all of them."""
+        aliases = list(dict.fromkeys(aliases))
+        if not aliases or not len(self._hashes):
+            return {}
+        encoded = [alias.encode("utf-8") for alias in aliases]
+        hashes = np.fromiter((xxhash.xxh3_64_intdigest(value) for value in encoded), dtype=np.uint64, count=len(encoded))
+        last_positions = np.searchsorted(self._hashes, hashes, side="right") - 1
+        found = (last_positions >= 0) & (self._hashes[np.maximum(last_positions, 0)] == hashes)
+        found_indexes = np.flatnonzero(found)
+        positions = last_positions[found_indexes]
+        alias_starts, alias_ends = self._alias_offsets[positions].tolist(), self._alias_offsets[positions + 1].tolist()
+        canonical_positions = self._canonical[positions]
+        canonical_starts, canonical_ends = self._canonical_offsets[canonical_positions].tolist(), self._canonical_offsets[canonical_positions + 1].tolist()
+        alias_blob, canonical_blob = self._alias_blob, self._canonical_blob
+        mapping = {}
+        for slot, index in enumerate(found_indexes.tolist()):
+            if alias_blob[alias_starts[slot]:alias_ends[slot]].tobytes() == encoded[index]:
+                mapping[aliases[index]] = canonical_blob[canonical_starts[slot]:canonical_ends[slot]].tobytes().decode("utf-8")
+            else:
+                # Another alias with the same 64-bit hash sorts last: fall back to the exact scan
+                canonical_id = self.lookup(aliases[index])
+                if canonical_id is not None:
+                    mapping[aliases[index]] = canonical_id
+        return mapping
+
+    def _key_canonical_positions(self, key_index: int) -> List[int]:
+        start, end = int(self._key_canonical_offsets[key_index]), int(self._key_canonical_offsets[key_index + 1])
+        return [int(position) for position in self._key_canonicals[start:end]]
+
+    def _key_candidates(self, key_index: int) -> List[str]:
+        return [self.canonical_id(position) for position in self._key_canonical_positions(key_index)]
+
+    def match(self, node_id: str, node_type: Optional[str] = None) -> AliasMatch:
+        """
+        Resolves a node ID in three stages: the exact alias, then its normalized key
+        (alias_key), then the longest alias key that starts the ID with only a legal
+        form or bracketed qualifiers after it, for a node whose type agrees with the
+        gazetteer (Aho-Corasick). A stage that yields several canonical IDs ends the
+        search with an ambiguous match.
+        """
+        candidates = self.candidates(node_id)
+        method = "exact"
+        if not candidates:
+            key = alias_key(node_id)
+            key_index = self._automaton.find(key) if key else -1
+            if key_index >= 0:
+                candidates, method = self._key_candidates(key_index), "normalized"
+            elif key:
+                candidates, method = self._contained_candidates(node_id, node_type), "contained"
+        if not candidates:
+            return AliasMatch(node_id)
+        return AliasMatch(node_id, candidates[0] if len(candidates) == 1 else None, method, candidates)
+
+    def _contained_candidates(self, node_id: str, node_type: Optional[str]) -> List[str]:
+        key = alias_key(strip_qualifiers(node_id))
+        longest, best_key_index = 0, -1
+        for start, end, key_index in self._automaton.matches(key):
+            if start > 0 or end < MIN_CONTAINED_KEY_CHARS or end <= longest or not is_legal_form_suffix(key[end:]):
+                continue
+            # An ASCII alias must not end inside an ASCII word ("npg" in "npgco")
+            if end < len(key) and key[end].isascii() and key[end].isalnum() and key[end - 1].isascii() and key[end - 1].isalnum():
+                continue
+            longest, best_key_index = end, key_index
+        if best_key_index < 0:
+            return []
+        return [
+            self.canonical_id(position) for position in self._key_canonical_positions(best_key_index)
+            if types_agree(node_type, self.canonical_type(position))
+        ]
+
+    def match_many(self, node_ids: Iterable[str], node_types: Optional[Dict[str, str]] = None) -> Dict[str, AliasMatch]:
+        """Matches every distinct ID; node_types (ID -> node type) enables the contained stage for typed nodes."""
+        node_types = node_types or {}
+        return {node_id: self.match(node_id, node_types.get(node_id)) for node_id in dict.fromkeys(node_ids)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.header["source"],
+            "records": self.header["records"],
+            "aliases": self.header["aliases"],
+            "canonical_ids": self.header["canonical_ids"],
+            "ambiguous_aliases": self.header["ambiguous_aliases"],
+            "normalized_keys": self.header["keys"],
+            "skipped_lines": self.header["warning_count"],
+            "index_bytes": self.path.stat().st_size,
+            "rebuilt": self.rebuilt,
+            "build_seconds": round(self.build_seconds, 4),
+        }
+
+
+def _sidecar_path(source: Path, index_dir: Path) -> Path:
+    return index_dir / f"{hashlib.sha256(str(source).encode('utf-8')).hexdigest()[:16]}.json"
+
+
+def load_alias_index(source: Path, index_dir: Path) -> AliasIndex:
+    """
+    Opens the compiled index of the mentions file at source, (re)building it under
+    index_dir only when the file's content changed since the index was built.
+    """
+    source = Path(source).resolve()
+    index_dir = Path(index_dir)
+    stat = source.stat()
+    sidecar_path = _sidecar_path(source, index_dir)
+    sidecar = json.loads(sidecar_path.read_text(encoding="utf-8")) if sidecar_path.exists() else {}
+
+    if sidecar.get("mtime_ns") == stat.st_mtime_ns and sidecar.get("size") == stat.st_size:
+        try:
+            return AliasIndex(index_dir / sidecar["index_file"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    content_hash = file_content_hash(source)
+    index_path = index_dir / f"{content_hash[:24]}{INDEX_SUFFIX}"
+    index, build_seconds = None, 0.0
+    if index_path.exists():
+        try:
+            index = AliasIndex(index_path)
+        except (OSError, ValueError):
+            index = None
+    if index is None:
+        start = time.perf_counter()
+        build_alias_index(source, index_path)
+        build_seconds = time.perf_counter() - start
+        index = AliasIndex(index_path)
+        index.rebuilt = True
+        index.build_seconds = build_seconds
+
+    previous_index_file = sidecar.get("index_file")
+    index_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = sidecar_path.with_name(f"{sidecar_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(json.dumps({
+        "source": str(source),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "content_hash": content_hash,
+        "index_file": index_path.name,
+    }), encoding="utf-8")
+    os.replace(tmp_path, sidecar_path)
+    if previous_index_file and previous_index_file != index_path.name:
+        (index_dir / previous_index_file).unlink(missing_ok=True)
+    return index
@@ -0,0 +1,223 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Fuzzy alias matching for entity normalization. LLM node IDs often decorate a
+# gazetteer name ("周启明（NPG）", full-width letters, extra spaces, "南海电力集团有限公司"),
+# so exact lookup misses them. Every alias is reduced to a canonical key (NFKC, which
+# also folds full-width forms, then casefold, with punctuation, symbols and whitespace
+# removed except for a single space between two ASCII words), and an Aho-Corasick
+# automaton over all keys finds every alias key inside a node's key in one pass,
+# linear in the length of the ID. The automaton is stored as flat arrays (CSR
+# transitions, failure links, output links) so it can live in the memory-mapped alias
+# index next to the exact-match tables. A contained alias is only accepted as a prefix
+# followed by a legal form, and only for a node whose type agrees with the gazetteer.
+
+# A contained alias must start the node ID, and what follows it may only be a legal
+# form once bracketed qualifiers are dropped: "南海电力集团有限公司" and "周启明（项目经理）"
+# resolve, while "NPG董事长", "海曦一号二期", "南海电力集团子公司" or "珊瑚湾市海洋与渔业局"
+# name other entities and are left alone.
+LEGAL_FORM_SUFFIXES = (
+    "有限公司", "有限责任公司", "股份有限公司", "股份公司", "集团有限公司", "集团股份有限公司", "公司",
+    "Co., Ltd.", "Co.", "Ltd.", "Limited", "Inc.", "Corp.", "Corporation", "LLC", "PLC", "GmbH",
+)
+# Single-character keys are never matched inside a longer ID
+MIN_CONTAINED_KEY_CHARS = 2
+MATCH_METHODS = ("exact", "normalized", "contained")
+# Types that say nothing about the entity never agree with a gazetteer type
+UNKNOWN_TYPES = ("", "unknown")
+_QUALIFIER_REGEX = re.compile(r"\([^()]*\)|\[[^\[\]]*\]|【[^【】]*】|〔[^〔〕]*〕")
+
+
+def _is_ascii_alnum(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+
+def alias_key(text: str) -> str:
+    """Canonical matching key of a name: "周启明 （NPG）" and "周启明(npg)" both become "周启明npg"."""
+    characters: List[str] = []
+    separated = False
+    for char in unicodedata.normalize("NFKC", text).casefold():
+        if unicodedata.category(char)[0] in "PZSC":
+            separated = True
+            continue
+        if separated and characters and _is_ascii_alnum(characters[-1]) and _is_ascii_alnum(char):
+            characters.append(" ")
+        separated = False
+        characters.append(char)
+    return "".join(characters)
+
+
+_LEGAL_FORM_KEYS = frozenset(alias_key(suffix) for suffix in LEGAL_FORM_SUFFIXES)
+
+
+def strip_qualifiers(text: str) -> str:
+    """Drops bracketed qualifiers: "周启明（项目经理）" -> "周启明 "."""
+    return _QUALIFIER_REGEX.sub(" ", unicodedata.normalize("NFKC", text))
+
+
+def is_legal_form_suffix(rest_key: str) -> bool:
+    """Whether the key text left after a contained alias is empty or a legal form such as "有限公司"."""
+    rest_key = rest_key.strip()
+    return not rest_key or rest_key in _LEGAL_FORM_KEYS
+
+
+def types_agree(node_type: Optional[str], gazetteer_type: Optional[str]) -> bool:
+    """A node type agrees with a gazetteer type when both are known and equal (case-insensitive); untyped gazetteer records accept any node."""
+    if not gazetteer_type:
+        return True
+    return bool(node_type) and node_type.casefold() not in UNKNOWN_TYPES and node_type.casefold() == gazetteer_type.casefold()
+
+
+def build_automaton(keys: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Aho-Corasick automaton over keys (sorted, distinct), as arrays: key i ends in the
+    state whose output_key is i. The trie is built from the sorted keys with a prefix
+    stack, so construction needs flat integer arrays only, no per-state dicts.
+    """
+    parents, chars, depths, output_key = [0], [0], [0], [-1]
+    path = [0]  # states along the previous key, path[d] at depth d
+    previous = ""
+    for key_index, key in enumerate(keys):
+        common = 0
+        while common < min(len(previous), len(key)) and previous[common] == key[common]:
+            common += 1
+        del path[common + 1:]
+        for char in key[common:]:
+            state = len(parents)
+            parents.append(path[-1])
+            chars.append(ord(char))
+            depths.append(len(path))
+            output_key.append(-1)
+            path.append(state)
+        output_key[path[len(key)]] = key_index
+        previous = key
+
+    state_count = len(parents)
+    parent_array = np.array(parents, dtype=np.uint32)
+    char_array = np.array(chars, dtype=np.uint32)
+    # Edges (every non-root state is the target of exactly one) grouped by parent, sorted by character
+    edge_order = np.lexsort((char_array[1:], parent_array[1:])) + 1
+    edge_offsets = np.zeros(state_count + 1, dtype=np.uint64)
+    np.cumsum(np.bincount(parent_array[1:], minlength=state_count), out=edge_offsets[1:])
+    edge_chars = char_array[edge_order]
+    edge_targets = edge_order.astype(np.uint32)
+
+    offsets_list, chars_list, targets_list = edge_offsets.tolist(), edge_chars.tolist(), edge_targets.tolist()
+
+    def goto(state: int, code: int) -> int:
+        lo, hi = offsets_list[state], offsets_list[state + 1]
+        position = bisect_left(chars_list, code, lo, hi)
+        return targets_list[position] if position < hi and chars_list[position] == code else -1
+
+    fail = [0] * state_count
+    output_link = [-1] * state_count
+    # Breadth-first, so a state's failure target is always resolved before the state itself
+    for state in np.argsort(np.array(depths, dtype=np.uint32), kind="stable").tolist():
+        if depths[state] <= 1:
+            continue
+        code, fallback = chars[state], fail[parents[state]]
+        target = goto(fallback, code)
+        while target < 0 and fallback:
+            fallback = fail[fallback]
+            target = goto(fallback, code)
+        fail[state] = max(target, 0)
+        suffix = fail[state]
+        output_link[state] = suffix if output_key[suffix] >= 0 else output_link[suffix]
+
+    return {
+        "edge_offsets": edge_offsets,
+        "edge_chars": edge_chars,
+        "edge_targets": edge_targets,
+        "fail": np.array(fail, dtype=np.uint32),
+        "output_key": np.array(output_key, dtype=np.int32),
+        "output_link": np.array(output_link, dtype=np.int32),
+        "key_lengths": np.array([len(key) for key in keys], dtype=np.uint32),
+    }
+
+
+class AliasAutomaton:
+    """Read-only matcher over the arrays from build_automaton (plain or memory-mapped)."""
+
+    def __init__(self, edge_offsets, edge_chars, edge_targets, fail, output_key, output_link, key_lengths):
+        # memoryviews index to Python ints without numpy scalar overhead, and bisect works on them directly
+        self._edge_offsets = memoryview(np.ascontiguousarray(edge_offsets))
+        self._edge_chars = memoryview(np.ascontiguousarray(edge_chars))
+        self._edge_targets = memoryview(np.ascontiguousarray(edge_targets))
+        self._fail = memoryview(np.ascontiguousarray(fail))
+        self._output_key = memoryview(np.ascontiguousarray(output_key))
+        self._output_link = memoryview(np.ascontiguousarray(output_link))
+        self._key_lengths = memoryview(np.ascontiguousarray(key_lengths))
+
+    def _goto(self, state: int, code: int) -> int:
+        lo, hi = self._edge_offsets[state], self._edge_offsets[state + 1]
+        if lo == hi:
+            return -1
+        position = bisect_left(self._edge_chars, code, lo, hi)
+        return self._edge_targets[position] if position < hi and self._edge_chars[position] == code else -1
+
+    def find(self, key: str) -> int:
+        """Index of key among the automaton's keys, or -1."""
+        if not len(self._fail):
+            return -1
+        state = 0
+        for char in key:
+            state = self._goto(state, ord(char))
+            if state < 0:
+                return -1
+        return self._output_key[state]
+
+    def matches(self, text: str) -> List[Tuple[int, int, int]]:
+        """(start, end, key index) of every key occurring in text."""
+        found: List[Tuple[int, int, int]] = []
+        if not len(self._fail):
+            return found
+        state = 0
+        for end, char in enumerate(text, start=1):
+            code = ord(char)
+            target = self._goto(state, code)
+            while target < 0 and state:
+                state = self._fail[state]
+                target = self._goto(state, code)
+            state = max(target, 0)
+            output = state if self._output_key[state] >= 0 else self._output_link[state]
+            while output >= 0:
+                key_index = self._output_key[output]
+                found.append((end - self._key_lengths[key_index], end, key_index))
+                output = self._output_link[output]
+        return found
+
+
+@dataclass
+class AliasMatch:
+    node_id: str
+    canonical_id: Optional[str] = None
+    method: Optional[str] = None  # one of MATCH_METHODS, None when nothing matched
+    candidates: List[str] = field(default_factory=list)
+
+    @property
+    def ambiguous(self) -> bool:
+        return len(self.candidates) > 1
+
+
+@dataclass
+class AliasMatchReport:
+    """Per-run tally of how node IDs were resolved, with the ambiguous ones listed for review."""
+    matched: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(MATCH_METHODS, 0))
+    unmatched: int = 0
+    ambiguous: Dict[str, List[str]] = field(default_factory=dict)
+
+    def add(self, match: AliasMatch):
+        if match.ambiguous:
+            self.ambiguous[match.node_id] = match.candidates
+        elif match.canonical_id is not None:
+            self.matched[match.method] += 1
+        else:
+            self.unmatched += 1
+
+    def summary(self) -> Dict[str, object]:
+        return {"matched": dict(self.matched), "unmatched": self.unmatched, "ambiguous": dict(self.ambiguous)}
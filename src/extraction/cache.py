@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import zstandard
+
+# Content-addressed cache for validated extraction results.
+# Keys are derived from everything that influences the LLM output, values are the
+# KnowledgeGraph payload (model_dump of the validated object) serialized as JSON.
+
+CACHE_BACKENDS = ("memory", "disk", "sqlite")
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+def make_cache_key(text: str, system_prompt: str, rel_set_name: str, rel_set_version: Optional[str], model_name: str) -> str:
+    digest = hashlib.sha256()
+    for part in (text, system_prompt, rel_set_name, rel_set_version or "", model_name):
+        encoded = part.encode("utf-8")
+        # Length-prefix every field so that ("ab", "c") and ("a", "bc") hash differently
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class MemoryCacheBackend:
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += len(value)
+            # Evict least recently used entries, but always keep the newest one
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def size_bytes(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheBackend:
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_CACHE_MAX_BYTES, compression_level: int = 3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._compressor = zstandard.ZstdCompressor(level=compression_level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._lock = threading.Lock()
+        self._size = sum(path.stat().st_size for path in self._entry_paths())
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json.zst"
+
+    def _entry_paths(self):
+        return self.cache_dir.glob("*/*.json.zst")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path_for(key)
+        try:
+            compressed = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        # Touch the entry so that eviction drops the least recently used files first
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return self._decompressor.decompress(compressed)
+
+    def set(self, key: str, value: bytes):
+        compressed = self._compressor.compress(value)
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(compressed)
+        with self._lock:
+            previous_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+            self._size += len(compressed) - previous_size
+            if self._size > self.max_bytes:
+                self._evict(keep=path)
+
+    def _evict(self, keep: Path):
+        entries = []
+        for path in self._entry_paths():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+    def size_bytes(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._entry_paths())
+
+
+class SQLiteCacheBackend:
+    def __init__(self, db_path: Path, max_bytes: int = DEFAULT_CACHE_MAX_BYTES, compression_level: int = 3):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._compressor = zstandard.ZstdCompressor(level=compression_level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extraction_cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_extraction_cache_accessed ON extraction_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM extraction_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE extraction_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return self._decompressor.decompress(row[0])
+
+    def set(self, key: str, value: bytes):
+        compressed = self._compressor.compress(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, compressed, len(compressed), time.time()),
+            )
+            overflow = self.size_bytes_locked() - self.max_bytes
+            if overflow > 0:
+                evicted = 0
+                rows = self._conn.execute(
+                    "SELECT key, size FROM extraction_cache WHERE key != ? ORDER BY accessed_at", (key,)
+                ).fetchall()
+                for old_key, size in rows:
+                    if evicted >= overflow:
+                        break
+                    self._conn.execute("DELETE FROM extraction_cache WHERE key = ?", (old_key,))
+                    evicted += size
+            self._conn.commit()
+
+    def size_bytes_locked(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self.size_bytes_locked()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ExtractionCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.backend.get(key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw.decode("utf-8"))
+
+    def set(self, key: str, payload: Dict[str, Any]):
+        self.backend.set(key, json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self.backend),
+            "size_bytes": self.backend.size_bytes(),
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+def create_extraction_cache(backend_name: str, cache_dir: Path, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> ExtractionCache:
+    if backend_name == "memory":
+        backend = MemoryCacheBackend(max_bytes=max_bytes)
+    elif backend_name == "disk":
+        backend = DiskCacheBackend(Path(cache_dir) / "graphs", max_bytes=max_bytes)
+    elif backend_name == "sqlite":
+        backend = SQLiteCacheBackend(Path(cache_dir) / "extraction_cache.sqlite3", max_bytes=max_bytes)
+    else:
+        raise ValueError(f"Unknown cache backend '{backend_name}'. Expected one of: {', '.join(CACHE_BACKENDS)}")
+    return ExtractionCache(backend)
@@ -0,0 +1,118 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+from src.parsers.sentence_chunker import split_sentences
+
+# Model cascade: every document goes to the first (cheapest) tier; a result that
+# fails the quality checks is escalated to the next tier. The last tier's result is
+# always accepted. Checks work on any graph object exposing `relationships` with
+# `type`, `confidence` and `evidence`, so this module does not depend on app.py.
+
+DEFAULT_MIN_MEAN_CONFIDENCE = 0.7
+DEFAULT_NEGATION_PREFIX = "negated:"
+
+CHECK_EMPTY = "empty"
+CHECK_LOW_CONFIDENCE = "low_confidence"
+CHECK_INVALID_EVIDENCE = "invalid_evidence"
+CHECK_UNKNOWN_RELATION = "unknown_relation"
+CHECK_ERROR = "error"
+
+
+def allowed_relation_types(rel_set: Dict[str, Any]) -> set:
+    negation_prefix = rel_set.get("negation_prefix", DEFAULT_NEGATION_PREFIX)
+    names = {relation["name"] for relation in rel_set["relations"]}
+    return names | {negation_prefix + name for name in names}
+
+
+def check_extraction_quality(graph, text: str, rel_set: Dict[str, Any], min_mean_confidence: float = DEFAULT_MIN_MEAN_CONFIDENCE, allow_empty: bool = False) -> List[str]:
+    """
+    Returns the names of the failed checks (an empty list means the result is acceptable).
+    Relationships without a confidence are left out of the mean; evidence sentence IDs
+    must exist in `text`, and relation types must belong to the REL_SET (optionally negated).
+    """
+    failures = []
+    relationships = list(graph.relationships)
+    if not relationships:
+        return [] if allow_empty else [CHECK_EMPTY]
+
+    confidences = [relationship.confidence for relationship in relationships if relationship.confidence is not None]
+    if confidences and sum(confidences) / len(confidences) < min_mean_confidence:
+        failures.append(CHECK_LOW_CONFIDENCE)
+
+    valid_sentence_ids = {sentence_id for sentence_id, _ in split_sentences(text).sentences}
+    for relationship in relationships:
+        for item in relationship.evidence or []:
+            sentence_ids = item.get("sents") or []
+            if any(not isinstance(sentence_id, int) or sentence_id not in valid_sentence_ids for sentence_id in sentence_ids):
+                failures.append(CHECK_INVALID_EVIDENCE)
+                break
+        if CHECK_INVALID_EVIDENCE in failures:
+            break
+
+    allowed = allowed_relation_types(rel_set)
+    if any(relationship.type not in allowed for relationship in relationships):
+        failures.append(CHECK_UNKNOWN_RELATION)
+    return failures
+
+
+class ModelCascade:
+    def __init__(self, tiers: Sequence[str], min_mean_confidence: float = DEFAULT_MIN_MEAN_CONFIDENCE, allow_empty: bool = False, clock: Callable[[], float] = time.perf_counter):
+        if not tiers:
+            raise ValueError("A model cascade needs at least one tier")
+        self.tiers = list(tiers)
+        self.min_mean_confidence = min_mean_confidence
+        self.allow_empty = allow_empty
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.tier_stats: Dict[str, Dict[str, Any]] = {
+            model_name: {"calls": 0, "accepted": 0, "escalated": 0, "errors": 0, "latency_seconds": 0.0} for model_name in self.tiers
+        }
+        self.failed_checks: Dict[str, int] = {}
+
+    def _record(self, model_name: str, latency: float, outcome: str, failures: Sequence[str] = ()):
+        with self._lock:
+            stats = self.tier_stats[model_name]
+            stats["calls"] += 1
+            stats["latency_seconds"] += latency
+            stats[outcome] += 1
+            for failure in failures:
+                self.failed_checks[failure] = self.failed_checks.get(failure, 0) + 1
+
+    def run(self, extract: Callable[[str], Any], text: str, rel_set: Dict[str, Any]):
+        """
+        Calls extract(model_name) tier by tier until a result passes the checks.
+        An error on a lower tier escalates as well; an error on the last tier is raised.
+        """
+        for tier_index, model_name in enumerate(self.tiers):
+            is_last_tier = tier_index == len(self.tiers) - 1
+            started_at = self._clock()
+            try:
+                graph = extract(model_name)
+            except Exception:
+                self._record(model_name, self._clock() - started_at, "errors", [CHECK_ERROR])
+                if is_last_tier:
+                    raise
+                continue
+            latency = self._clock() - started_at
+            failures = [] if is_last_tier else check_extraction_quality(graph, text, rel_set, self.min_mean_confidence, self.allow_empty)
+            if failures:
+                self._record(model_name, latency, "escalated", failures)
+                continue
+            self._record(model_name, latency, "accepted")
+            return graph
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tiers = {}
+            for model_name, stats in self.tier_stats.items():
+                tiers[model_name] = {
+                    **stats,
+                    "latency_seconds": round(stats["latency_seconds"], 3),
+                    "mean_latency_seconds": round(stats["latency_seconds"] / stats["calls"], 3) if stats["calls"] else 0.0,
+                }
+            return {
+                "tiers": tiers,
+                "failed_checks": dict(self.failed_checks),
+                "min_mean_confidence": self.min_mean_confidence,
+            }
@@ -0,0 +1,70 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.parsers.sentence_chunker import estimate_tokens
+
+# Packs several short documents into one LLM request. Every document becomes a
+# DOC_ID-tagged section so that evidence[].doc can be used to split the result.
+# The prompt header of a packed call carries no document ID of its own; it only
+# points at the sections, so the model has no header ID to cite.
+
+PACKED_DOC_ID = "见各分段的 DOC_ID"
+PACKED_SECTION_HEADER = "=== DOC_ID: {doc_id} ==="
+PACKED_INSTRUCTION = (
+    "以下输入包含 {count} 篇独立文档，每篇以“=== DOC_ID: <ID> ===”开头。"
+    "每条关系只能使用同一篇文档内的句子作为证据，evidence.doc 必须填写该文档的 DOC_ID，sents 为该文档内的句子编号。"
+)
+DEFAULT_MAX_DOCUMENTS_PER_PACK = 8
+
+
+def pack_documents(documents: Sequence[Dict[str, Any]], max_tokens: int, max_documents: int = DEFAULT_MAX_DOCUMENTS_PER_PACK) -> List[List[int]]:
+    """
+    Groups document indexes into packs whose combined estimated size stays under max_tokens.
+    Document order is preserved; documents that are too large on their own get a pack of one.
+    """
+    packs: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for index, doc in enumerate(documents):
+        doc_tokens = estimate_tokens(doc.get("text_with_sentence_ids") or "") + 16
+        if doc_tokens >= max_tokens:
+            if current:
+                packs.append(current)
+                current, current_tokens = [], 0
+            packs.append([index])
+            continue
+        if current and (current_tokens + doc_tokens > max_tokens or len(current) >= max_documents):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += doc_tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def render_packed_documents(documents: Sequence[Dict[str, Any]]) -> str:
+    sections = [PACKED_INSTRUCTION.format(count=len(documents))]
+    for doc in documents:
+        sections.append("\n".join([
+            PACKED_SECTION_HEADER.format(doc_id=doc["doc_id"]),
+            f"DATE: {doc.get('date') or '未知'}",
+            f"SOURCE: {doc.get('source') or '未知'}",
+            doc["text_with_sentence_ids"].strip(),
+        ]))
+    return "\n\n".join(sections)
+
+
+def resolve_packed_doc_id(evidence_doc: Optional[str], doc_ids: Sequence[str]) -> Optional[str]:
+    """
+    Maps the doc value the model wrote into evidence back to one of the packed doc IDs.
+    Accepts the exact ID, or a unique prefix such as "d1" for "d1_news_2025-03-12.txt".
+    """
+    if not evidence_doc:
+        return None
+    evidence_doc = str(evidence_doc).strip()
+    if evidence_doc in doc_ids:
+        return evidence_doc
+    prefix_regex = re.compile(re.escape(evidence_doc) + r"(?:[^0-9A-Za-z]|$)")
+    candidates = [doc_id for doc_id in doc_ids if prefix_regex.match(doc_id)]
+    return candidates[0] if len(candidates) == 1 else None
@@ -0,0 +1,169 @@
+from array import array
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+# Cross-document entity resolution. Aggregating per-document graphs only merges nodes
+# whose IDs collide exactly; the resolver instead keeps a disjoint-set (union-find)
+# over every node ID of the run and merges the IDs that an alias-index hit or an
+# `alias_of` edge says are the same entity, while `not_same_as` edges act as
+# cannot-link constraints: a union that would put two forbidden IDs into one cluster
+# is refused and counted. Each ID is an int in flat C arrays (parent, size, mention
+# count), so a few million mentions cost a dict entry plus a dozen bytes per distinct
+# ID; find uses path halving and union goes by size, so all unions together run in
+# near-linear time. Cannot-link sets are kept per root and merged smaller-into-larger.
+# The representative of every cluster is picked once at the end with one vectorized
+# pass, so relationship endpoints are rewritten a single time.
+
+ALIAS_RELATION = "alias_of"
+DISTINCT_RELATION = "not_same_as"
+
+
+class EntityResolver:
+    """Disjoint-set over entity IDs with cannot-link constraints."""
+
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._parent = array("i")
+        self._size = array("i")
+        self._mentions = array("i")
+        self._preferred = bytearray()
+        # root -> members of other clusters it must not be merged with
+        self._conflicts: Dict[int, Set[int]] = {}
+        self.unions: Dict[str, int] = {}
+        self.blocked: Dict[str, int] = {}
+        self.cannot_link = 0
+        # not_same_as pairs whose IDs were already in one cluster when the constraint arrived
+        self.violated_constraints = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _intern(self, entity_id: str) -> int:
+        index = self._index.get(entity_id)
+        if index is None:
+            index = len(self._ids)
+            self._index[entity_id] = index
+            self._ids.append(entity_id)
+            self._parent.append(index)
+            self._size.append(1)
+            self._mentions.append(0)
+            self._preferred.append(0)
+        return index
+
+    def _find(self, index: int) -> int:
+        parent = self._parent
+        while parent[index] != index:
+            # Path halving: every other node on the path skips to its grandparent
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def add_mention(self, entity_id: str):
+        """Count one node occurrence of entity_id; the most mentioned ID represents its cluster."""
+        self._mentions[self._intern(entity_id)] += 1
+
+    def add_mentions(self, entity_ids: Iterable[str]):
+        for entity_id in entity_ids:
+            self.add_mention(entity_id)
+
+    def prefer(self, entity_id: str):
+        """Mark entity_id (a canonical gazetteer ID) as the representative of whatever cluster it ends up in."""
+        self._preferred[self._intern(entity_id)] = 1
+
+    def find(self, entity_id: str) -> Optional[str]:
+        """Current root ID of entity_id's cluster (not necessarily its final representative), or None."""
+        index = self._index.get(entity_id)
+        return None if index is None else self._ids[self._find(index)]
+
+    def same(self, first_id: str, second_id: str) -> bool:
+        first, second = self._index.get(first_id), self._index.get(second_id)
+        return first is not None and second is not None and self._find(first) == self._find(second)
+
+    def forbid(self, first_id: str, second_id: str) -> bool:
+        """Record a cannot-link constraint. Returns False if both IDs are already in one cluster."""
+        first, second = self._intern(first_id), self._intern(second_id)
+        first_root, second_root = self._find(first), self._find(second)
+        if first_root == second_root:
+            self.violated_constraints += 1
+            return False
+        self._conflicts.setdefault(first_root, set()).add(second)
+        self._conflicts.setdefault(second_root, set()).add(first)
+        self.cannot_link += 1
+        return True
+
+    def union(self, first_id: str, second_id: str, reason: str = "manual") -> bool:
+        """Merge the clusters of both IDs unless a cannot-link constraint forbids it; True if they end up together."""
+        first_root, second_root = self._find(self._intern(first_id)), self._find(self._intern(second_id))
+        if first_root == second_root:
+            return True
+        first_conflicts, second_conflicts = self._conflicts.get(first_root, ()), self._conflicts.get(second_root, ())
+        # Constraints are stored on both sides, so scanning the smaller set is enough
+        if len(first_conflicts) > len(second_conflicts):
+            first_root, second_root = second_root, first_root
+            first_conflicts, second_conflicts = second_conflicts, first_conflicts
+        if any(self._find(member) == second_root for member in first_conflicts):
+            self.blocked[reason] = self.blocked.get(reason, 0) + 1
+            return False
+
+        if self._size[first_root] > self._size[second_root]:
+            first_root, second_root = second_root, first_root
+        self._parent[first_root] = second_root
+        self._size[second_root] += self._size[first_root]
+        merged_conflicts = self._conflicts.pop(first_root, None)
+        if merged_conflicts:
+            target = self._conflicts.setdefault(second_root, set())
+            if len(target) < len(merged_conflicts):
+                target, merged_conflicts = merged_conflicts, target
+                self._conflicts[second_root] = target
+            target.update(merged_conflicts)
+        self.unions[reason] = self.unions.get(reason, 0) + 1
+        return True
+
+    def _representatives(self) -> np.ndarray:
+        """Index of the representative of every ID's cluster: preferred, then most mentioned, then first seen."""
+        count = len(self._ids)
+        if not count:
+            return np.zeros(0, dtype=np.intc)
+        roots = np.frombuffer(self._parent, dtype=np.intc).copy()
+        # Pointer jumping until every entry points straight at its root
+        while True:
+            grandparents = roots[roots]
+            if np.array_equal(grandparents, roots):
+                break
+            roots = grandparents
+        positions = np.arange(count, dtype=np.intc)
+        mentions = np.frombuffer(self._mentions, dtype=np.intc).astype(np.int64)
+        preferred = np.frombuffer(bytes(self._preferred), dtype=np.uint8).astype(np.int64)
+        order = np.lexsort((positions, -mentions, -preferred, roots))
+        sorted_roots = roots[order]
+        group_start = np.ones(count, dtype=bool)
+        group_start[1:] = sorted_roots[1:] != sorted_roots[:-1]
+        representative_of_root = np.empty(count, dtype=np.intc)
+        representative_of_root[sorted_roots[group_start]] = order[group_start]
+        return representative_of_root[roots]
+
+    def assignments(self) -> Dict[str, str]:
+        """Mapping of every ID that is merged into another one to its cluster representative."""
+        representatives = self._representatives()
+        changed = np.flatnonzero(representatives != np.arange(len(self._ids)))
+        ids = self._ids
+        return {ids[index]: ids[representative] for index, representative in zip(changed.tolist(), representatives[changed].tolist())}
+
+    def stats(self) -> Dict[str, object]:
+        representatives = self._representatives()
+        mentioned = np.frombuffer(self._mentions, dtype=np.intc) > 0 if len(self._ids) else np.zeros(0, dtype=bool)
+        cluster_sizes = np.bincount(representatives, minlength=len(self._ids)) if len(self._ids) else np.zeros(0, dtype=np.int64)
+        return {
+            "ids": len(self._ids),
+            "mentions": int(np.frombuffer(self._mentions, dtype=np.intc).sum()) if len(self._ids) else 0,
+            "nodes_in": int(mentioned.sum()),
+            "nodes_out": int(np.unique(representatives[mentioned]).size),
+            "merged_clusters": int((cluster_sizes > 1).sum()),
+            "largest_cluster": int(cluster_sizes.max()) if len(self._ids) else 0,
+            "unions": dict(self.unions),
+            "blocked_merges": dict(self.blocked),
+            "cannot_link": self.cannot_link,
+            "violated_constraints": self.violated_constraints,
+        }
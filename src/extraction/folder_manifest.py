@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# State for watch-folder ingestion. The state directory holds:
+#   manifest.json  relative path -> (mtime, size, content hash, doc IDs, graph file, error) of every ingested file
+#   graphs/        one graph per file, covering every document parsed from it
+# A scan stats every file and only hashes those whose mtime or size moved, so an idle
+# poll over a large corpus costs one stat per file. Deleting a file retracts its graph.
+
+MANIFEST_FILE_NAME = "manifest.json"
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_content_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as content_file:
+        for block in iter(lambda: content_file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, content: str):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class FileState:
+    mtime_ns: int
+    size: int
+    content_hash: str
+
+
+@dataclass
+class FileRecord:
+    state: FileState
+    doc_ids: List[str] = field(default_factory=list)
+    graph_file: Optional[str] = None
+    error: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "FileRecord":
+        return cls(**{**payload, "state": FileState(**payload["state"])})
+
+
+@dataclass
+class FolderChanges:
+    # relative name -> state observed by the scan, for files that need extracting
+    added: Dict[str, FileState] = field(default_factory=dict)
+    modified: Dict[str, FileState] = field(default_factory=dict)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.modified or self.deleted)
+
+    @property
+    def to_extract(self) -> Dict[str, FileState]:
+        return {**self.added, **self.modified}
+
+
+class FolderManifest:
+    def __init__(self, directory: Path, state_dir: Path):
+        self.directory = Path(directory)
+        self.state_dir = Path(state_dir)
+        (self.state_dir / "graphs").mkdir(parents=True, exist_ok=True)
+        self.records: Dict[str, FileRecord] = {}
+        manifest_path = self.state_dir / MANIFEST_FILE_NAME
+        if manifest_path.exists():
+            payload = json.loads(manifest_path.read_text(encoding="utf-8"))
+            self.records = {name: FileRecord.from_dict(record) for name, record in payload.get("files", {}).items()}
+
+    def scan(self, paths: Iterable[Path]) -> FolderChanges:
+        """
+        Compares the given files (absolute, under the watched directory) against the
+        manifest. A file whose mtime moved but whose content hash did not is counted as
+        unchanged and its new mtime is saved. Files that failed last time are retried.
+        """
+        changes = FolderChanges()
+        seen = set()
+        touched = False
+        for path in paths:
+            name = Path(path).relative_to(self.directory).as_posix()
+            seen.add(name)
+            try:
+                stat = Path(path).stat()
+            except FileNotFoundError:
+                continue  # Deleted between listing and stat; the next scan retracts it
+            record = self.records.get(name)
+            if record is not None and record.error is None and (record.state.mtime_ns, record.state.size) == (stat.st_mtime_ns, stat.st_size):
+                changes.unchanged += 1
+                continue
+            state = FileState(mtime_ns=stat.st_mtime_ns, size=stat.st_size, content_hash=file_content_hash(path))
+            if record is None:
+                changes.added[name] = state
+            elif record.error is None and record.state.content_hash == state.content_hash:
+                record.state = state
+                touched = True
+                changes.unchanged += 1
+            else:
+                changes.modified[name] = state
+        changes.deleted = sorted(name for name in self.records if name not in seen)
+        if touched:
+            self.save()
+        return changes
+
+    def _graph_path(self, name: str) -> Path:
+        return self.state_dir / "graphs" / (hashlib.sha256(name.encode("utf-8")).hexdigest()[:24] + ".json")
+
+    def record(self, name: str, state: FileState, doc_ids: List[str], graph_payload: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """Stores the file's graph (replacing the previous one) before updating the manifest."""
+        graph_path = self._graph_path(name)
+        if graph_payload is not None:
+            _write_atomic(graph_path, json.dumps(graph_payload, ensure_ascii=False))
+        elif graph_path.exists():
+            graph_path.unlink()
+        self.records[name] = FileRecord(state=state, doc_ids=list(doc_ids), graph_file=graph_path.name if graph_payload is not None else None, error=error)
+
+    def retract(self, name: str) -> Optional[FileRecord]:
+        record = self.records.pop(name, None)
+        graph_path = self._graph_path(name)
+        if graph_path.exists():
+            graph_path.unlink()
+        return record
+
+    def save(self):
+        payload = {"directory": str(self.directory), "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"), "files": {name: asdict(record) for name, record in sorted(self.records.items())}}
+        _write_atomic(self.state_dir / MANIFEST_FILE_NAME, json.dumps(payload, ensure_ascii=False, indent=2))
+
+    def load_graph(self, name: str) -> Optional[Dict[str, Any]]:
+        record = self.records.get(name)
+        if record is None or record.graph_file is None:
+            return None
+        return json.loads((self.state_dir / "graphs" / record.graph_file).read_text(encoding="utf-8"))
+
+    def iter_graphs(self) -> Iterator[Dict[str, Any]]:
+        for name in sorted(self.records):
+            payload = self.load_graph(name)
+            if payload is not None:
+                yield payload
+
+
+def poll_folder(
+    list_files: Callable[[], List[Path]],
+    manifest: FolderManifest,
+    on_changes: Callable[[FolderChanges], None],
+    interval_seconds: float = 5.0,
+    max_cycles: Optional[int] = None,
+    stop_event: Optional[threading.Event] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> int:
+    """
+    Scans the folder every interval_seconds and calls on_changes when anything was
+    added, modified or deleted. Runs until stop_event is set or max_cycles scans have
+    been made; returns the number of scans.
+    """
+    cycles = 0
+    while not (stop_event is not None and stop_event.is_set()):
+        changes = manifest.scan(list_files())
+        if changes.has_changes:
+            on_changes(changes)
+        cycles += 1
+        if max_cycles is not None and cycles >= max_cycles:
+            break
+        if stop_event is not None:
+            stop_event.wait(interval_seconds)
+        else:
+            sleep(interval_seconds)
+    return cycles
@@ -0,0 +1,175 @@
+import difflib
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Per-document snapshots for incremental re-extraction. A snapshot keeps the hash of
+# every sentence and the final graph whose evidence points at those sentences. On
+# re-ingest the sentence hashes are diffed, only windows around the edits are sent
+# to the LLM again, and relationships supported solely by unchanged sentences are
+# carried over with their sentence IDs remapped.
+
+DEFAULT_REEXTRACTION_WINDOW = 1
+# Above this share of touched sentences a full re-extraction is cheaper and safer
+DEFAULT_MAX_CHANGED_RATIO = 0.5
+
+
+def hash_sentence(text: str) -> str:
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def hash_sentences(sentences: Sequence[Tuple[int, str]]) -> List[Tuple[int, str]]:
+    return [(sentence_id, hash_sentence(sentence_text)) for sentence_id, sentence_text in sentences]
+
+
+@dataclass
+class SentenceDiff:
+    # new sentence ID -> old sentence ID for sentences whose text did not change
+    unchanged: Dict[int, int] = field(default_factory=dict)
+    # positions (0-based, in the new document) that were edited, inserted or border a deletion
+    touched_positions: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+
+    @property
+    def old_to_new(self) -> Dict[int, int]:
+        return {old_id: new_id for new_id, old_id in self.unchanged.items()}
+
+    @property
+    def is_unchanged(self) -> bool:
+        return not self.touched_positions and not self.removed
+
+
+def diff_sentences(old_hashes: Sequence[Tuple[int, str]], new_hashes: Sequence[Tuple[int, str]]) -> SentenceDiff:
+    matcher = difflib.SequenceMatcher(a=[h for _, h in old_hashes], b=[h for _, h in new_hashes], autojunk=False)
+    diff = SentenceDiff()
+    touched = set()
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(i2 - i1):
+                diff.unchanged[new_hashes[j1 + offset][0]] = old_hashes[i1 + offset][0]
+            continue
+        if tag in ("replace", "delete"):
+            diff.removed.extend(sentence_id for sentence_id, _ in old_hashes[i1:i2])
+        if tag in ("replace", "insert"):
+            touched.update(range(j1, j2))
+        else:
+            # A deletion can break a fact spanning the sentences on either side of it
+            touched.update(position for position in (j1 - 1, j1) if 0 <= position < len(new_hashes))
+    diff.touched_positions = sorted(touched)
+    return diff
+
+
+def reextraction_windows(diff: SentenceDiff, sentence_count: int, window: int = DEFAULT_REEXTRACTION_WINDOW) -> List[List[int]]:
+    """Groups the touched positions, widened by `window` sentences on each side, into contiguous runs of positions."""
+    positions = set()
+    for position in diff.touched_positions:
+        positions.update(range(max(0, position - window), min(sentence_count, position + window + 1)))
+    runs: List[List[int]] = []
+    for position in sorted(positions):
+        if runs and runs[-1][-1] == position - 1:
+            runs[-1].append(position)
+        else:
+            runs.append([position])
+    return runs
+
+
+def remap_retained_evidence(evidence: Optional[List[Dict[str, Any]]], old_to_new: Dict[int, int], doc_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Returns the evidence with this document's sentence IDs moved to their new numbers,
+    or None when any cited sentence of this document changed or disappeared (the
+    relationship lost its support). Items of other documents (a `doc` other than
+    doc_id, when given) and items citing no sentences are passed through, so a relationship that
+    cites no sentence of this document is always kept.
+    """
+    remapped = []
+    for item in evidence or []:
+        sentence_ids = item.get("sents") or []
+        if not sentence_ids or (doc_id is not None and item.get("doc") not in (None, doc_id)):
+            remapped.append(item)
+            continue
+        if any(sentence_id not in old_to_new for sentence_id in sentence_ids):
+            return None
+        remapped.append({**item, "sents": [old_to_new[sentence_id] for sentence_id in sentence_ids]})
+    return remapped
+
+
+@dataclass
+class DocumentSnapshot:
+    doc_id: str
+    fingerprint: str
+    header_hash: str
+    sentence_hashes: List[Tuple[int, str]]
+    graph: Dict[str, Any]
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "DocumentSnapshot":
+        payload = dict(payload)
+        payload["sentence_hashes"] = [tuple(pair) for pair in payload["sentence_hashes"]]
+        return cls(**payload)
+
+
+class DocumentSnapshotStore:
+    """Keeps one snapshot per (doc_id, extraction fingerprint); in memory, or as JSON files when a directory is given."""
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(directory) if directory is not None else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._snapshots: Dict[str, DocumentSnapshot] = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            "unchanged": 0,
+            "incremental": 0,
+            "full": 0,
+            "sentences_reextracted": 0,
+            "relationships_kept": 0,
+            "relationships_retracted": 0,
+        }
+
+    @staticmethod
+    def _key(doc_id: str, fingerprint: str) -> str:
+        return hashlib.sha256(f"{doc_id}\0{fingerprint}".encode("utf-8")).hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, doc_id: str, fingerprint: str) -> Optional[DocumentSnapshot]:
+        key = self._key(doc_id, fingerprint)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        if snapshot is not None or self.directory is None:
+            return snapshot
+        try:
+            payload = json.loads(self._path_for(key).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        snapshot = DocumentSnapshot.from_dict(payload)
+        with self._lock:
+            self._snapshots[key] = snapshot
+        return snapshot
+
+    def put(self, snapshot: DocumentSnapshot):
+        key = self._key(snapshot.doc_id, snapshot.fingerprint)
+        with self._lock:
+            self._snapshots[key] = snapshot
+        if self.directory is not None:
+            path = self._path_for(key)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(json.dumps(asdict(snapshot), ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, path)
+
+    def record(self, outcome: str, sentences_reextracted: int = 0, relationships_kept: int = 0, relationships_retracted: int = 0):
+        with self._lock:
+            self.counters[outcome] += 1
+            self.counters["sentences_reextracted"] += sentences_reextracted
+            self.counters["relationships_kept"] += relationships_kept
+            self.counters["relationships_retracted"] += relationships_retracted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters)
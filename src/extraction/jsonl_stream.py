@@ -0,0 +1,97 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Incremental parser for the JSONL fact stream requested by GraphRAG_prompt.md.
+# Text arrives in arbitrary pieces; every top-level JSON object is emitted as soon
+# as its closing brace is seen. Objects are delimited by brace depth rather than by
+# newlines, so pretty-printed objects, a JSON array of facts, or output wrapped in
+# ``` fences are handled the same way as strict one-object-per-line JSONL.
+
+FACT_REQUIRED_FIELDS = ("head", "relation", "tail")
+
+
+class JSONObjectStreamParser:
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.objects_parsed = 0
+        # (object text, error message) for objects that were balanced but not valid JSON
+        self.errors: List[Tuple[str, str]] = []
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        completed = []
+        for char in text:
+            if self._depth == 0:
+                # Outside an object: skip fences, array brackets, commas and whitespace
+                if char == "{":
+                    self._buffer = [char]
+                    self._depth = 1
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    parsed = self._parse("".join(self._buffer))
+                    if parsed is not None:
+                        completed.append(parsed)
+                    self._buffer = []
+        return completed
+
+    def _parse(self, object_text: str):
+        try:
+            parsed = json.loads(object_text)
+        except json.JSONDecodeError as e:
+            self.errors.append((object_text, str(e)))
+            return None
+        self.objects_parsed += 1
+        return parsed
+
+    def close(self):
+        """Ends the stream; an unterminated trailing object is reported as an error."""
+        if self._depth > 0 and self._buffer:
+            self.errors.append(("".join(self._buffer), "Unterminated JSON object at end of stream"))
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+
+def iter_json_objects(text_chunks: Iterable[str], parser: Optional[JSONObjectStreamParser] = None) -> Iterator[Dict[str, Any]]:
+    parser = parser if parser is not None else JSONObjectStreamParser()
+    for text_chunk in text_chunks:
+        yield from parser.feed(text_chunk)
+    parser.close()
+
+
+def is_fact(record: Dict[str, Any]) -> bool:
+    return isinstance(record, dict) and all(record.get(field) for field in FACT_REQUIRED_FIELDS)
+
+
+def message_chunk_text(chunk: Any) -> str:
+    """Returns the text of a streamed chat message chunk (string or list of content parts)."""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for part in content:
+            if isinstance(part, str):
+                parts.append(part)
+            elif isinstance(part, dict) and part.get("type", "text") == "text":
+                parts.append(part.get("text", ""))
+        return "".join(parts)
+    return ""
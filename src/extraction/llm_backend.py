@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from src.extraction.jsonl_stream import message_chunk_text
+
+# Record/replay chat model backends for offline runs of the full pipeline.
+# The recorder wraps a live chat model and stores every response under the hash of
+# (model, output kind, rendered prompt); the replay backend serves those responses
+# back with simulated latency and failures, so everything downstream of the LLM can
+# be exercised and timed without network access. Both expose the two entry points
+# the extraction chains use: `prompt | llm` (raw text, streamed) and
+# `prompt | llm.with_structured_output(schema)`.
+
+LLM_BACKENDS = ("live", "record", "replay")
+KIND_STRUCTURED = "structured"
+KIND_TEXT = "text"
+# Characters per simulated stream chunk
+REPLAY_STREAM_CHUNK_CHARS = 64
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+class SimulatedLLMError(RuntimeError):
+    pass
+
+
+def prompt_text(prompt_value: Any) -> str:
+    to_string = getattr(prompt_value, "to_string", None)
+    return to_string() if callable(to_string) else str(prompt_value)
+
+
+def recording_key(model_name: str, kind: str, prompt: str) -> str:
+    digest = hashlib.sha256()
+    for part in (model_name, kind, prompt):
+        encoded = part.encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class RecordingStore:
+    """One JSON file per recorded response, named after its recording key."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path_for(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._path_for(key).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        path = self._path_for(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.directory.glob("*.json"))
+
+
+class RecordingChatModel(Runnable):
+    """Passes every call through to `llm` and stores the response for later replay."""
+
+    def __init__(self, llm: Any, store: RecordingStore, model_name: str):
+        self.llm = llm
+        self.store = store
+        self.model_name = model_name
+
+    def _save(self, kind: str, prompt_value: Any, response: Any):
+        prompt = prompt_text(prompt_value)
+        self.store.put(recording_key(self.model_name, kind, prompt), {
+            "model": self.model_name,
+            "kind": kind,
+            "prompt_sha256": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+            "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "response": response,
+        })
+
+    def invoke(self, input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        message = self.llm.invoke(input, config, **kwargs)
+        self._save(KIND_TEXT, input, message_chunk_text(message))
+        return message
+
+    def stream(self, input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Iterator[Any]:
+        parts = []
+        for chunk in self.llm.stream(input, config, **kwargs):
+            parts.append(message_chunk_text(chunk))
+            yield chunk
+        # Only complete responses are recorded; an interrupted stream leaves nothing behind
+        self._save(KIND_TEXT, input, "".join(parts))
+
+    def with_structured_output(self, schema: Any, **kwargs) -> Runnable:
+        structured_llm = self.llm.with_structured_output(schema, **kwargs)
+
+        def invoke_and_record(prompt_value: Any, config: Dict[str, Any]) -> Any:
+            result = structured_llm.invoke(prompt_value, config)
+            self._save(KIND_STRUCTURED, prompt_value, result.model_dump() if hasattr(result, "model_dump") else result)
+            return result
+
+        return RunnableLambda(invoke_and_record)
+
+
+class ReplayChatModel(Runnable):
+    """
+    Serves recorded responses. Each call sleeps latency_seconds ± latency_jitter and
+    fails with a throttling-style SimulatedLLMError with probability failure_rate, so
+    the scheduler's retries and backoff are exercised as they would be against the API.
+    A prompt that was never recorded raises ReplayMissError.
+    """
+
+    def __init__(
+        self,
+        store: RecordingStore,
+        model_name: str,
+        latency_seconds: float = 0.0,
+        latency_jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.store = store
+        self.model_name = model_name
+        self.latency_seconds = latency_seconds
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._sleep = sleep
+
+    def _simulate_call(self) -> float:
+        with self._random_lock:
+            latency = max(0.0, self.latency_seconds + self._random.uniform(-self.latency_jitter, self.latency_jitter))
+            fails = self._random.random() < self.failure_rate
+        if fails:
+            # Failing calls still take time, as a throttled request would
+            self._sleep(latency)
+            raise SimulatedLLMError(f"429 Resource exhausted (simulated failure for {self.model_name})")
+        return latency
+
+    def _lookup(self, kind: str, prompt_value: Any) -> Any:
+        key = recording_key(self.model_name, kind, prompt_text(prompt_value))
+        entry = self.store.get(key)
+        if entry is None:
+            raise ReplayMissError(f"No recorded {kind} response for {self.model_name} (key {key[:12]}) in {self.store.directory}")
+        return entry["response"]
+
+    def invoke(self, input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> AIMessage:
+        response = self._lookup(KIND_TEXT, input)
+        self._sleep(self._simulate_call())
+        return AIMessage(content=response)
+
+    def stream(self, input: Any, config: Optional[Dict[str, Any]] = None, **kwargs) -> Iterator[AIMessageChunk]:
+        response = self._lookup(KIND_TEXT, input)
+        latency = self._simulate_call()
+        pieces = [response[start:start + REPLAY_STREAM_CHUNK_CHARS] for start in range(0, len(response), REPLAY_STREAM_CHUNK_CHARS)] or [""]
+        # Spread the simulated latency over the chunks so time-to-first-fact stays realistic
+        for piece in pieces:
+            self._sleep(latency / len(pieces))
+            yield AIMessageChunk(content=piece)
+
+    def with_structured_output(self, schema: Any, **kwargs) -> Runnable:
+        def replay_structured(prompt_value: Any) -> Any:
+            response = self._lookup(KIND_STRUCTURED, prompt_value)
+            self._sleep(self._simulate_call())
+            return schema.model_validate(response) if hasattr(schema, "model_validate") else response
+
+        return RunnableLambda(replay_structured)
+
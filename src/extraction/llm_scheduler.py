@@ -0,0 +1,217 @@
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Client-side flow control for LLM calls: requests-per-minute and tokens-per-minute
+# token buckets, an AIMD concurrency limit that backs off on throttling, and
+# jittered exponential retries for transient errors.
+
+THROTTLING_STATUS_CODES = {429}
+TRANSIENT_STATUS_CODES = {408, 500, 502, 503, 504}
+THROTTLING_MESSAGE_REGEX = re.compile(r"\b429\b|resource[ _]?exhausted|rate[ _-]?limit|quota", re.IGNORECASE)
+TRANSIENT_MESSAGE_REGEX = re.compile(r"\b50[0234]\b|unavailable|deadline[ _]?exceeded|timed? ?out|connection (?:reset|aborted|error)", re.IGNORECASE)
+
+
+def _status_codes(exc: BaseException):
+    seen = set()
+    current: Optional[BaseException] = exc
+    # Walk the cause chain: langchain wraps google.api_core errors, which carry the HTTP/gRPC code
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        for attribute in ("status_code", "code", "http_status"):
+            value = getattr(current, attribute, None)
+            if callable(value):
+                try:
+                    value = value()
+                except Exception:
+                    value = None
+            value = getattr(value, "value", value)
+            if isinstance(value, int):
+                yield value
+        current = current.__cause__ or current.__context__
+
+
+def _messages(exc: BaseException):
+    seen = set()
+    current: Optional[BaseException] = exc
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        yield f"{type(current).__name__}: {current}"
+        current = current.__cause__ or current.__context__
+
+
+def is_throttling_error(exc: BaseException) -> bool:
+    if any(code in THROTTLING_STATUS_CODES for code in _status_codes(exc)):
+        return True
+    return any(THROTTLING_MESSAGE_REGEX.search(message) for message in _messages(exc))
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    if is_throttling_error(exc) or isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if any(code in TRANSIENT_STATUS_CODES for code in _status_codes(exc)):
+        return True
+    return any(TRANSIENT_MESSAGE_REGEX.search(message) for message in _messages(exc))
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Blocks until `amount` tokens are available and returns the time spent waiting."""
+        # A request larger than the bucket waits for a full bucket and then goes into debt
+        required = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= required:
+                    self._tokens -= amount
+                    return waited
+                wait_seconds = (required - self._tokens) / self.rate_per_second
+            self._sleep(wait_seconds)
+            waited += wait_seconds
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class AdaptiveConcurrencyLimiter:
+    """Additive-increase / multiplicative-decrease limit on in-flight calls."""
+
+    def __init__(self, initial_limit: int, max_limit: int, min_limit: int = 1, decrease_factor: float = 0.5):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.decrease_factor = decrease_factor
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            # Roughly +1 per "window" of successful calls at the current limit
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self):
+        with self._condition:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int, rng: random.Random) -> float:
+        # "Full jitter": uniform in [0, min(max_delay, base * 2^attempt)]
+        return rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        initial_concurrency: int = 4,
+        max_concurrency: int = 16,
+        retry_policy: Optional[RetryPolicy] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute, clock=clock, sleep=sleep) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute, clock=clock, sleep=sleep) if tokens_per_minute else None
+        self.limiter = AdaptiveConcurrencyLimiter(initial_concurrency, max_concurrency)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.rate_limit_wait_seconds = 0.0
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def call(self, fn: Callable[[], Any], estimated_tokens: int = 0, on_retry: Optional[Callable[[int, BaseException, float], None]] = None) -> Any:
+        """
+        Runs fn under the rate limits and concurrency limit, retrying retryable errors.
+        The last error is re-raised once retries run out or for non-retryable errors.
+        """
+        attempt = 0
+        while True:
+            waited = 0.0
+            if self.request_bucket:
+                waited += self.request_bucket.acquire(1)
+            if self.token_bucket and estimated_tokens:
+                waited += self.token_bucket.acquire(estimated_tokens)
+            self._count(calls=1, rate_limit_wait_seconds=waited)
+
+            self.limiter.acquire()
+            try:
+                result = fn()
+            except Exception as e:
+                throttled = is_throttling_error(e)
+                if throttled:
+                    self.limiter.on_throttle()
+                    self._count(throttled=1)
+                if attempt >= self.retry_policy.max_retries or not (throttled or is_retryable_error(e)):
+                    self._count(failures=1)
+                    raise
+                delay = self.retry_policy.backoff(attempt, self._rng)
+                attempt += 1
+                self._count(retries=1)
+                if on_retry:
+                    on_retry(attempt, e, delay)
+            else:
+                self.limiter.on_success()
+                return result
+            finally:
+                self.limiter.release()
+            self._sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "rate_limit_wait_seconds": round(self.rate_limit_wait_seconds, 3),
+        }
@@ -0,0 +1,144 @@
+import json
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# Per-call instrumentation of the extraction chain and its per-run rollup.
+# Token counts come from the model's usage metadata when available and fall back
+# to the local estimate otherwise (flagged with tokens_estimated).
+
+# USD per million (input, output) tokens, list prices for prompts under the long-context tier
+MODEL_PRICING_PER_MILLION: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-1.5-pro": (1.25, 5.0),
+    "gemini-1.5-flash": (0.075, 0.30),
+}
+SLOWEST_CALLS_REPORTED = 5
+
+
+class BudgetExceededError(RuntimeError):
+    pass
+
+
+@dataclass
+class CallMetrics:
+    doc_id: Optional[str]
+    model: str
+    latency_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tokens_estimated: bool = False
+    retries: int = 0
+    nodes: int = 0
+    edges: int = 0
+    cache_hit: bool = False
+    error: Optional[str] = None
+    cost_usd: float = 0.0
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, pricing: Optional[Dict[str, Tuple[float, float]]] = None) -> float:
+    input_price, output_price = (pricing or MODEL_PRICING_PER_MILLION).get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class RunMetrics:
+    def __init__(self, budget_usd: Optional[float] = None, budget_tokens: Optional[int] = None, pricing: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.budget_usd = budget_usd
+        self.budget_tokens = budget_tokens
+        self.pricing = pricing or MODEL_PRICING_PER_MILLION
+        self.calls: List[CallMetrics] = []
+        self.calls_refused = 0
+        self._lock = threading.Lock()
+
+    def record(self, call: CallMetrics):
+        call.cost_usd = estimate_cost(call.model, call.prompt_tokens, call.completion_tokens, self.pricing)
+        with self._lock:
+            self.calls.append(call)
+
+    @property
+    def total_tokens(self) -> int:
+        with self._lock:
+            return sum(call.prompt_tokens + call.completion_tokens for call in self.calls)
+
+    @property
+    def total_cost_usd(self) -> float:
+        with self._lock:
+            return sum(call.cost_usd for call in self.calls)
+
+    def check_budget(self):
+        """Raises BudgetExceededError once the run has spent its budget, so no new call is started."""
+        exceeded = None
+        if self.budget_usd is not None and self.total_cost_usd >= self.budget_usd:
+            exceeded = f"Run budget of ${self.budget_usd:.2f} exhausted"
+        elif self.budget_tokens is not None and self.total_tokens >= self.budget_tokens:
+            exceeded = f"Run budget of {self.budget_tokens} tokens exhausted"
+        if exceeded:
+            with self._lock:
+                self.calls_refused += 1
+            raise BudgetExceededError(exceeded)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = list(self.calls)
+            calls_refused = self.calls_refused
+        llm_calls = [call for call in calls if not call.cache_hit]
+        latencies = sorted(call.latency_seconds for call in llm_calls)
+
+        per_model: Dict[str, Dict[str, Any]] = {}
+        per_document: Dict[str, Dict[str, Any]] = {}
+        for call in calls:
+            model_stats = per_model.setdefault(call.model, {"calls": 0, "cache_hits": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "latency_seconds": 0.0})
+            document_stats = per_document.setdefault(str(call.doc_id), {"calls": 0, "latency_seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "retries": 0, "nodes": 0, "edges": 0, "cost_usd": 0.0, "models": []})
+            for stats in (model_stats, document_stats):
+                stats["calls"] += 1
+                stats["prompt_tokens"] += call.prompt_tokens
+                stats["completion_tokens"] += call.completion_tokens
+                stats["cost_usd"] += call.cost_usd
+                stats["latency_seconds"] += call.latency_seconds
+            model_stats["cache_hits"] += int(call.cache_hit)
+            model_stats["errors"] += int(call.error is not None)
+            document_stats["retries"] += call.retries
+            document_stats["nodes"] += call.nodes
+            document_stats["edges"] += call.edges
+            if call.model not in document_stats["models"]:
+                document_stats["models"].append(call.model)
+        for stats in list(per_model.values()) + list(per_document.values()):
+            stats["cost_usd"] = round(stats["cost_usd"], 6)
+            stats["latency_seconds"] = round(stats["latency_seconds"], 3)
+
+        slowest = sorted(llm_calls, key=lambda call: call.latency_seconds, reverse=True)[:SLOWEST_CALLS_REPORTED]
+        return {
+            "calls": len(calls),
+            "llm_calls": len(llm_calls),
+            "cache_hits": len(calls) - len(llm_calls),
+            "errors": sum(1 for call in calls if call.error is not None),
+            "calls_refused_by_budget": calls_refused,
+            "retries": sum(call.retries for call in calls),
+            "prompt_tokens": sum(call.prompt_tokens for call in calls),
+            "completion_tokens": sum(call.completion_tokens for call in calls),
+            "calls_with_estimated_tokens": sum(1 for call in llm_calls if call.tokens_estimated),
+            "cost_usd": round(sum(call.cost_usd for call in calls), 6),
+            "budget_usd": self.budget_usd,
+            "budget_tokens": self.budget_tokens,
+            "latency_seconds": {
+                "total": round(sum(latencies), 3),
+                "p50": round(_percentile(latencies, 0.5), 3),
+                "p95": round(_percentile(latencies, 0.95), 3),
+                "max": round(latencies[-1], 3) if latencies else 0.0,
+            },
+            "slowest_calls": [{"doc_id": call.doc_id, "model": call.model, "latency_seconds": round(call.latency_seconds, 3)} for call in slowest],
+            "per_model": per_model,
+            "per_document": per_document,
+        }
+
+    def to_json(self) -> str:
+        with self._lock:
+            calls = [asdict(call) for call in self.calls]
+        return json.dumps({"summary": self.summary(), "calls": calls}, ensure_ascii=False, indent=2)
@@ -0,0 +1,192 @@
+import hashlib
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.parsers.sentence_chunker import estimate_tokens, split_sentences
+
+# MinHash/LSH near-duplicate detection over the documents of a run. A document is
+# reduced to character shingles of its normalized sentence text (lower-cased,
+# whitespace and punctuation removed, so reposts with different spacing, quotes or
+# S-numbering still match); its MinHash signature is split into bands, and only
+# documents that share a band bucket are compared. Each document is matched against
+# earlier representatives only, so near-duplicate chains do not drift.
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.8
+DEFAULT_NUM_PERMUTATIONS = 128
+# 16 bands of 8 rows: pairs at Jaccard 0.8 become candidates with probability > 0.99
+DEFAULT_BANDS = 16
+DEFAULT_SHINGLE_SIZE = 5
+
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SHIFT = np.uint64(32)
+# Odd multiplier for the polynomial shingle hash (arithmetic wraps modulo 2**64)
+_SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+# Shingles are hashed against all permutations in blocks to bound memory on long documents
+_SIGNATURE_BLOCK_SIZE = 4096
+_NON_WORD_REGEX = re.compile(r"[\W_]+")
+
+
+def normalize_sentence_key(sentence: str) -> str:
+    return _NON_WORD_REGEX.sub("", sentence.lower())
+
+
+def normalized_sentences(text: str) -> List[Tuple[int, str]]:
+    """(sentence ID, normalized sentence) pairs; empty sentences are dropped."""
+    pairs = []
+    for sentence_id, sentence_text in split_sentences(text).sentences:
+        key = normalize_sentence_key(sentence_text)
+        if key:
+            pairs.append((sentence_id, key))
+    return pairs
+
+
+def shingle_hashes(normalized_text: str, shingle_size: int = DEFAULT_SHINGLE_SIZE) -> np.ndarray:
+    """Distinct 32-bit hashes of the character shingles, computed over code points without building substrings."""
+    code_points = np.frombuffer(normalized_text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(code_points) == 0:
+        return code_points
+    width = min(shingle_size, len(code_points))
+    count = len(code_points) - width + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(width):
+            hashes = hashes * _SHINGLE_MULTIPLIER + code_points[offset:offset + count]
+    return np.unique(hashes >> _SHIFT)
+
+
+@dataclass
+class DuplicateMatch:
+    # Positions in the list passed to find_duplicates
+    index: int
+    representative: int
+    similarity: float
+    exact: bool
+
+
+@dataclass
+class DeduplicationResult:
+    # Positions of the documents that still have to be extracted, in input order
+    representatives: List[int] = field(default_factory=list)
+    matches: Dict[int, DuplicateMatch] = field(default_factory=dict)
+
+
+class NearDuplicateDetector:
+    def __init__(
+        self,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        num_permutations: int = DEFAULT_NUM_PERMUTATIONS,
+        bands: int = DEFAULT_BANDS,
+        shingle_size: int = DEFAULT_SHINGLE_SIZE,
+        seed: int = 1,
+    ):
+        if num_permutations % bands:
+            raise ValueError(f"num_permutations ({num_permutations}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_permutations // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # Multiply-shift permutations: the high 32 bits of (a * h + b) mod 2**64, with a odd
+        self._a = rng.integers(0, 1 << 63, size=num_permutations, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=num_permutations, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self.counters = {"documents": 0, "exact_duplicates": 0, "near_duplicates": 0, "tokens_saved": 0}
+
+    def signature(self, normalized_text: str) -> np.ndarray:
+        hashes = shingle_hashes(normalized_text, self.shingle_size)
+        signature = np.full(len(self._a), _MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(hashes), _SIGNATURE_BLOCK_SIZE):
+            block = hashes[start:start + _SIGNATURE_BLOCK_SIZE, None]
+            with np.errstate(over="ignore"):
+                permuted = (block * self._a + self._b) >> _SHIFT
+            np.minimum(signature, permuted.min(axis=0), out=signature)
+        return signature
+
+    def find_duplicates(self, documents: Sequence[Dict[str, Any]]) -> DeduplicationResult:
+        """
+        Returns which documents to extract and which ones duplicate an earlier one.
+        The first document of every group is its representative; documents without
+        any sentence text are always kept.
+        """
+        result = DeduplicationResult()
+        exact_owners: Dict[str, int] = {}
+        signatures: Dict[int, np.ndarray] = {}
+        buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+
+        for index, doc in enumerate(documents):
+            normalized_text = "".join(key for _, key in normalized_sentences(doc.get("text_with_sentence_ids") or ""))
+            if not normalized_text:
+                result.representatives.append(index)
+                continue
+            digest = hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+            if digest in exact_owners:
+                result.matches[index] = DuplicateMatch(index=index, representative=exact_owners[digest], similarity=1.0, exact=True)
+                continue
+
+            signature = self.signature(normalized_text)
+            band_keys = [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+            candidates = {candidate for band, key in enumerate(band_keys) for candidate in buckets[band].get(key, ())}
+            best, best_similarity = None, 0.0
+            for candidate in sorted(candidates):
+                similarity = float(np.mean(signatures[candidate] == signature))
+                if similarity > best_similarity:
+                    best, best_similarity = candidate, similarity
+            if best is not None and best_similarity >= self.threshold:
+                result.matches[index] = DuplicateMatch(index=index, representative=best, similarity=best_similarity, exact=False)
+                continue
+
+            result.representatives.append(index)
+            exact_owners[digest] = index
+            signatures[index] = signature
+            for band, key in enumerate(band_keys):
+                buckets[band].setdefault(key, []).append(index)
+
+        with self._lock:
+            self.counters["documents"] += len(documents)
+            for match in result.matches.values():
+                self.counters["exact_duplicates" if match.exact else "near_duplicates"] += 1
+                self.counters["tokens_saved"] += estimate_tokens(documents[match.index].get("text_with_sentence_ids") or "")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        duplicates = counters["exact_duplicates"] + counters["near_duplicates"]
+        counters["duplicate_rate"] = duplicates / counters["documents"] if counters["documents"] else 0.0
+        # Every duplicate would have needed at least one extraction call of its own
+        counters["calls_saved"] = duplicates
+        return counters
+
+
+def map_duplicate_sentences(representative_text: str, duplicate_text: str) -> Dict[int, int]:
+    """Maps representative sentence IDs to the IDs of the same (normalized) sentences in the duplicate."""
+    duplicate_ids: Dict[str, int] = {}
+    for sentence_id, key in normalized_sentences(duplicate_text):
+        duplicate_ids.setdefault(key, sentence_id)
+    return {sentence_id: duplicate_ids[key] for sentence_id, key in normalized_sentences(representative_text) if key in duplicate_ids}
+
+
+def duplicate_evidence(
+    evidence: Optional[List[Dict[str, Any]]],
+    representative_doc_id: str,
+    duplicate_doc_id: str,
+    sentence_map: Dict[int, int],
+) -> List[Dict[str, Any]]:
+    """
+    Evidence items citing the duplicate for the representative's evidence. An item is
+    only carried over when every sentence it cites also occurs in the duplicate.
+    """
+    extra = []
+    for item in evidence or []:
+        if item.get("doc") not in (None, representative_doc_id):
+            continue
+        sentence_ids = item.get("sents") or []
+        if not sentence_ids or any(sentence_id not in sentence_map for sentence_id in sentence_ids):
+            continue
+        copied = {key: value for key, value in item.items() if key != "pages"}
+        extra.append({**copied, "doc": duplicate_doc_id, "sents": [sentence_map[sentence_id] for sentence_id in sentence_ids], "duplicate_of": representative_doc_id})
+    return extra
@@ -0,0 +1,192 @@
+import json
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Cheap local pre-pass that guesses which entity types a document mentions and keeps
+# only the REL_SET relations whose domain and range can apply. Detection is
+# deliberately generous: a type without a detector is always treated as present,
+# and wildcard ("*") relations such as alias_of / not_same_as are never dropped.
+# People and organizations are mostly named bare ("林瑶", "BCRI", "Alice Smith"), so
+# keywords cannot rule them out; they have no detector and are only reported as
+# "gazetteer:<name>" when the gazetteer positively identifies one.
+
+WILDCARD_TYPE = "*"
+SENTENCE_ID_PREFIX_REGEX = re.compile(r"^\s*S\d+\s+", re.MULTILINE)
+
+# Finer-grained types used in mentions.jsonl, mapped onto the REL_SET types they specialize
+GAZETTEER_TYPE_ALIASES = {
+    "Company": "Organization",
+    "Government": "Organization",
+    "GovernmentAgency": "Organization",
+    "City": "Location",
+    "Province": "Location",
+    "Country": "Location",
+    "MarineArea": "Location",
+    "ProtectedArea": "Location",
+}
+
+TYPE_KEYWORD_PATTERNS: Dict[str, Sequence[str]] = {
+    # GraphRAG-RELSET-GenericWeb-zh (Person and Organization are left undetectable on purpose)
+    "Project": [r"项目|工程|计划|一号|二号|风电场|电站|示范区|专项|\bproject\b"],
+    "Product": [r"产品|型号|芯片|手机|设备|机型|系统|软件|平台|发布了|上市|\bproduct\b"],
+    "Work": [r"《[^》]+》|论文|报告|专著|白皮书|电影|纪录片|专辑|著作|\b(?:paper|report|book)\b"],
+    "Event": [r"会议|论坛|峰会|发布会|仪式|典礼|比赛|大赛|展会|博览会|事故|事件|台风|地震|活动|签署|开幕|闭幕|\b(?:conference|summit|event)\b"],
+    "Location": [r"[省市县区镇村州]|海域|海岸|湾|岛|港|路|街|国|园|基地|位于|距离|\b(?:city|province|county)\b"],
+    "Regulation": [r"法规|条例|规定|办法|政策|标准|法案|法律|《[^》]*(?:法|条例|办法|规定)》|\bregulation\b"],
+    "Value": [r"\d|[一二三四五六七八九十百千万亿]+(?:元|台|个|人|座|项|兆瓦|吉瓦|公里)"],
+    "Claim": [r"传闻|据称|声称|网传|否认|辟谣|谣言|\b(?:rumou?r|claim)"],
+    # GraphRAG-RELSET-AI-RAG-zh
+    "Model": [r"模型|大模型|\b(?:model|LLM|GPT|BERT|LLaMA|Llama|Gemini|Qwen|T5)\b"],
+    "EmbeddingModel": [r"嵌入|向量化|\bembedding"],
+    "Retriever": [r"检索器|召回|检索|\b(?:retriever|BM25|DPR)\b"],
+    "Reranker": [r"重排|精排|\b(?:re-?rank)"],
+    "Generator": [r"生成器|生成模型|\bgenerator\b"],
+    "Pipeline": [r"流水线|管线|管道|框架|\b(?:pipeline|RAG|GraphRAG)\b"],
+    "Component": [r"组件|模块|\bcomponent\b"],
+    "Dataset": [r"数据集|\bdataset"],
+    "Corpus": [r"语料|\bcorpus|\bcorpora"],
+    "Document": [r"文档|文章|网页|\bdocument"],
+    "Chunk": [r"分块|切块|文本块|\bchunk"],
+    "Graph": [r"图谱|知识图|\bgraph"],
+    "GraphDB": [r"图数据库|\b(?:Neo4j|NebulaGraph|TigerGraph|graph ?db)"],
+    "VectorIndex": [r"索引|\b(?:HNSW|IVF|index)"],
+    "VectorStore": [r"向量库|向量数据库|\b(?:FAISS|Milvus|Chroma|Qdrant|Weaviate|Pinecone|vector ?store)"],
+    "Task": [r"任务|问答|摘要|分类|\b(?:task|QA)\b"],
+    "Benchmark": [r"基准|评测集|榜单|\bbenchmark"],
+    "Metric": [r"指标|准确率|召回率|F1|\b(?:accuracy|recall|precision|BLEU|ROUGE|EM|MRR|nDCG)\b"],
+    "Paper": [r"论文|\b(?:paper|arXiv)"],
+    "Library": [r"库|\b(?:library|LangChain|LlamaIndex|Haystack|PyTorch|transformers)\b"],
+    "Prompt": [r"提示词|提示模板|\bprompt"],
+    "Tool": [r"工具|插件|\b(?:tool|plugin)"],
+    "Query": [r"查询|提问|\bquery"],
+}
+
+
+@dataclass
+class RelSetPruningResult:
+    rel_set: Dict[str, Any]
+    kept_relations: List[str]
+    dropped_relations: List[str]
+    # type -> why it is considered present ("keyword", "gazetteer:<name>" or "undetectable")
+    detected_types: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def relation_names(self) -> Tuple[str, ...]:
+        return tuple(self.kept_relations)
+
+
+def load_gazetteer(mentions_path: Path) -> List[Tuple[str, str]]:
+    """Reads (surface form, type) pairs from a mentions.jsonl file; malformed lines are skipped."""
+    entries = []
+    with open(mentions_path, "r", encoding="utf-8") as mentions_file:
+        for line in mentions_file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entity_type = record.get("type")
+            if not entity_type:
+                continue
+            aliases = record.get("aliases") or []
+            if not isinstance(aliases, list):
+                aliases = [aliases]
+            for surface in [record.get("name"), *aliases]:
+                if surface:
+                    entries.append((str(surface), entity_type))
+    return entries
+
+
+def restrict_rel_set(rel_set: Dict[str, Any], relation_names: Iterable[str]) -> Dict[str, Any]:
+    """Returns a shallow copy of rel_set that only lists the given relations (in REL_SET order)."""
+    keep = set(relation_names)
+    return {**rel_set, "relations": [relation for relation in rel_set["relations"] if relation["name"] in keep]}
+
+
+class RelSetPruner:
+    def __init__(self, rel_set: Dict[str, Any], gazetteer: Optional[Iterable[Tuple[str, str]]] = None, type_patterns: Optional[Dict[str, Sequence[str]]] = None):
+        self.rel_set = rel_set
+        type_patterns = type_patterns if type_patterns is not None else TYPE_KEYWORD_PATTERNS
+        relation_types: Set[str] = set(rel_set.get("types", []))
+        for relation in rel_set["relations"]:
+            relation_types.update(relation.get("domain", []))
+            relation_types.update(relation.get("range", []))
+        relation_types.discard(WILDCARD_TYPE)
+        self.type_regexes: Dict[str, re.Pattern] = {}
+        for type_name in relation_types:
+            patterns = list(type_patterns.get(type_name, []))
+            if patterns:
+                # The type name itself is a useful cue in technical text (e.g. "Dataset", "Benchmark")
+                patterns.append(r"\b" + re.escape(type_name) + r"\b")
+                self.type_regexes[type_name] = re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+        self.undetectable_types = sorted(relation_types - set(self.type_regexes))
+        # Longest surface forms first so that one regex pass finds the most specific names
+        self.gazetteer_types: Dict[str, str] = {}
+        for surface, entity_type in gazetteer or []:
+            self.gazetteer_types.setdefault(surface, GAZETTEER_TYPE_ALIASES.get(entity_type, entity_type))
+        surfaces = sorted(self.gazetteer_types, key=len, reverse=True)
+        self.gazetteer_regex = re.compile("|".join(re.escape(surface) for surface in surfaces)) if surfaces else None
+
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.relations_total = 0
+        self.relations_kept = 0
+        self.prompt_tokens_before = 0
+        self.prompt_tokens_after = 0
+
+    def detect_types(self, text: str) -> Dict[str, str]:
+        # Sentence numbers would otherwise make every document look like it mentions a Value
+        text = SENTENCE_ID_PREFIX_REGEX.sub("", text)
+        detected: Dict[str, str] = {}
+        if self.gazetteer_regex is not None:
+            for match in self.gazetteer_regex.finditer(text):
+                detected.setdefault(self.gazetteer_types[match.group(0)], f"gazetteer:{match.group(0)}")
+        for type_name in self.undetectable_types:
+            detected.setdefault(type_name, "undetectable")
+        for type_name, regex in self.type_regexes.items():
+            if type_name not in detected and regex.search(text):
+                detected[type_name] = "keyword"
+        return detected
+
+    def prune(self, text: str) -> RelSetPruningResult:
+        detected_types = self.detect_types(text)
+
+        def applies(types: Sequence[str]) -> bool:
+            return not types or WILDCARD_TYPE in types or any(type_name in detected_types for type_name in types)
+
+        kept, dropped = [], []
+        for relation in self.rel_set["relations"]:
+            if applies(relation.get("domain", [])) and applies(relation.get("range", [])):
+                kept.append(relation["name"])
+            else:
+                dropped.append(relation["name"])
+        return RelSetPruningResult(
+            rel_set=restrict_rel_set(self.rel_set, kept),
+            kept_relations=kept,
+            dropped_relations=dropped,
+            detected_types=detected_types,
+        )
+
+    def record(self, result: RelSetPruningResult, prompt_tokens_before: int, prompt_tokens_after: int):
+        with self._lock:
+            self.documents += 1
+            self.relations_total += len(result.kept_relations) + len(result.dropped_relations)
+            self.relations_kept += len(result.kept_relations)
+            self.prompt_tokens_before += prompt_tokens_before
+            self.prompt_tokens_after += prompt_tokens_after
+
+    def stats(self) -> Dict[str, Any]:
+        saved = self.prompt_tokens_before - self.prompt_tokens_after
+        return {
+            "documents": self.documents,
+            "relations_total": self.relations_total,
+            "relations_kept": self.relations_kept,
+            "prompt_tokens_before": self.prompt_tokens_before,
+            "prompt_tokens_after": self.prompt_tokens_after,
+            "prompt_tokens_saved_ratio": round(saved / self.prompt_tokens_before, 4) if self.prompt_tokens_before else 0.0,
+        }
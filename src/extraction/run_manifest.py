@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+# Checkpoint files for long batch runs. A run directory holds:
+#   manifest.json    run ID, creation time, extraction config and the document list with content hashes
+#   documents.jsonl  the documents themselves, so a run can be resumed without re-reading its inputs
+#   progress.jsonl   one appended line per finished document (status, graph file, error)
+#   graphs/          the per-document output graphs
+# progress.jsonl is append-only, so a crash can at most truncate its last line.
+# Progress is keyed by the document's position in the run, not its doc_id: the same
+# doc_id can arrive twice (a file uploaded and also found in a directory).
+
+STATUS_DONE = "done"
+STATUS_SKIPPED = "skipped"
+# A near-duplicate whose facts were attached to its representative's graph
+STATUS_DUPLICATE = "duplicate"
+STATUS_ERROR = "error"
+STATUS_PENDING = "pending"
+FINISHED_STATUSES = {STATUS_DONE, STATUS_SKIPPED, STATUS_DUPLICATE}
+
+
+def document_hash(doc: Dict[str, Any]) -> str:
+    digest = hashlib.sha256()
+    for part in (doc.get("doc_id"), doc.get("source"), doc.get("date"), doc.get("text_with_sentence_ids")):
+        encoded = str(part or "").encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, content: str):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class RunManifest:
+    def __init__(self, run_dir: Path, manifest: Dict[str, Any]):
+        self.run_dir = Path(run_dir)
+        self.manifest = manifest
+        # position in the run's document list -> latest progress entry
+        self.statuses: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def run_id(self) -> str:
+        return self.manifest["run_id"]
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.manifest.get("config", {})
+
+    @classmethod
+    def create(cls, runs_dir: Path, documents: Sequence[Dict[str, Any]], config: Optional[Dict[str, Any]] = None) -> "RunManifest":
+        document_hashes = [document_hash(doc) for doc in documents]
+        run_id = time.strftime("%Y%m%d-%H%M%S") + "-" + hashlib.sha256("".join(document_hashes).encode("utf-8")).hexdigest()[:8]
+        run_dir = Path(runs_dir) / run_id
+        (run_dir / "graphs").mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "run_id": run_id,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "config": config or {},
+            "documents": [
+                {"doc_id": doc["doc_id"], "source": doc.get("source"), "content_hash": content_hash}
+                for doc, content_hash in zip(documents, document_hashes)
+            ],
+        }
+        _write_atomic(run_dir / "documents.jsonl", "".join(json.dumps(doc, ensure_ascii=False) + "\n" for doc in documents))
+        _write_atomic(run_dir / "manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+        return cls(run_dir, manifest)
+
+    @classmethod
+    def load(cls, run_dir: Path) -> "RunManifest":
+        run_dir = Path(run_dir)
+        manifest = json.loads((run_dir / "manifest.json").read_text(encoding="utf-8"))
+        run = cls(run_dir, manifest)
+        progress_path = run_dir / "progress.jsonl"
+        if progress_path.exists():
+            for line in progress_path.read_text(encoding="utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Last line cut short by a crash
+                    continue
+                run.statuses[entry["position"]] = entry
+        return run
+
+    def load_documents(self) -> List[Dict[str, Any]]:
+        with open(self.run_dir / "documents.jsonl", "r", encoding="utf-8") as documents_file:
+            return [json.loads(line) for line in documents_file if line.strip()]
+
+    def _position_of(self, doc_id: str, content_hash: Optional[str] = None) -> Optional[int]:
+        """First position of doc_id in the run, preferring an entry with the same content."""
+        candidates = [position for position, entry in enumerate(self.manifest["documents"]) if entry["doc_id"] == doc_id]
+        for position in candidates:
+            if self.manifest["documents"][position].get("content_hash") == content_hash:
+                return position
+        return candidates[0] if candidates else None
+
+    def _resolve_position(self, doc: Dict[str, Any], position: Optional[int]) -> int:
+        if position is None:
+            position = self._position_of(doc["doc_id"], document_hash(doc))
+        if position is None:
+            raise KeyError(f"document {doc['doc_id']} is not part of run {self.run_id}")
+        return position
+
+    def _graph_path(self, position: int, doc_id: str) -> Path:
+        return self.run_dir / "graphs" / (hashlib.sha256(f"{position}\0{doc_id}".encode("utf-8")).hexdigest()[:24] + ".json")
+
+    def record(
+        self,
+        doc: Dict[str, Any],
+        status: str,
+        graph_payload: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        position: Optional[int] = None,
+        duplicate_of: Optional[str] = None,
+    ):
+        """
+        Stores the document's graph (if any) first, then appends its status, so a
+        recorded "done" always has its graph on disk. position is the document's index
+        in the run (by default the first document with this doc_id and content).
+        """
+        position = self._resolve_position(doc, position)
+        entry = {
+            "doc_id": doc["doc_id"],
+            "position": position,
+            "content_hash": document_hash(doc),
+            "status": status,
+            "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        if graph_payload is not None:
+            graph_path = self._graph_path(position, doc["doc_id"])
+            _write_atomic(graph_path, json.dumps(graph_payload, ensure_ascii=False))
+            entry["graph_file"] = graph_path.name
+        if error is not None:
+            entry["error"] = error
+        if duplicate_of is not None:
+            entry["duplicate_of"] = duplicate_of
+        with self._lock:
+            with open(self.run_dir / "progress.jsonl", "a", encoding="utf-8") as progress_file:
+                progress_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                progress_file.flush()
+                os.fsync(progress_file.fileno())
+            self.statuses[position] = entry
+
+    def entry_of(self, doc: Dict[str, Any], position: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """The recorded progress entry of the document, or None when it is pending or its content changed since."""
+        entry = self.statuses.get(self._resolve_position(doc, position))
+        # A document whose content changed since it was recorded has to be extracted again
+        if entry is None or entry.get("content_hash") != document_hash(doc):
+            return None
+        return entry
+
+    def status_of(self, doc: Dict[str, Any], position: Optional[int] = None) -> str:
+        entry = self.entry_of(doc, position)
+        return STATUS_PENDING if entry is None else entry["status"]
+
+    def is_finished(self, doc: Dict[str, Any], position: Optional[int] = None) -> bool:
+        return self.status_of(doc, position) in FINISHED_STATUSES
+
+    def load_graph(self, doc: Dict[str, Any], position: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        entry = self.entry_of(doc, position)
+        if not entry or not entry.get("graph_file"):
+            return None
+        return json.loads((self.run_dir / "graphs" / entry["graph_file"]).read_text(encoding="utf-8"))
+
+    def summary(self) -> Dict[str, Any]:
+        counts = {STATUS_DONE: 0, STATUS_SKIPPED: 0, STATUS_DUPLICATE: 0, STATUS_ERROR: 0}
+        for entry in self.statuses.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        total = len(self.manifest["documents"])
+        return {
+            "run_id": self.run_id,
+            "created_at": self.manifest.get("created_at"),
+            "total": total,
+            "finished": counts[STATUS_DONE] + counts[STATUS_SKIPPED] + counts[STATUS_DUPLICATE],
+            "errors": counts[STATUS_ERROR],
+            "config": self.config,
+        }
+
+
+def list_runs(runs_dir: Path) -> List[RunManifest]:
+    """Returns the runs under runs_dir, newest first; unreadable run directories are ignored."""
+    runs_dir = Path(runs_dir)
+    if not runs_dir.exists():
+        return []
+    runs = []
+    for run_dir in sorted(runs_dir.iterdir(), reverse=True):
+        if (run_dir / "manifest.json").exists():
+            try:
+                runs.append(RunManifest.load(run_dir))
+            except (OSError, json.JSONDecodeError, KeyError):
+                continue
+    return runs
@@ -0,0 +1,84 @@
+import gzip
+import tarfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterable, Iterator, Optional, Tuple, Union
+
+from src.parsers.document_loader import PARSEABLE_EXTENSIONS, ParsedFile, extract_text_from_stream
+
+# Corpus ingestion straight from .zip / .tar(.gz) archives, from a path or an uploaded
+# file object. Members are read one at a time from the archive stream and parsed in
+# memory; nothing is extracted to disk, so memory use is bounded by the largest member
+# rather than the archive. Tarballs are read in stream mode ("r|*"), which never seeks,
+# so even a non-seekable source works. A plain .gz holds a single compressed document
+# ("memo.docx.gz"), named after the file without its .gz suffix.
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar.gz", ".tgz", ".tar", ".gz")
+
+
+def archive_kind(name: str) -> Optional[str]:
+    """Returns "zip", "tar" or "gzip" (one compressed file) for a supported archive name, otherwise None."""
+    lowered = name.lower()
+    if lowered.endswith(".zip"):
+        return "zip"
+    if lowered.endswith((".tar.gz", ".tgz", ".tar")):
+        return "tar"
+    if lowered.endswith(".gz"):
+        return "gzip"
+    return None
+
+
+def _is_wanted_member(member_name: str, extensions: Iterable[str]) -> bool:
+    path = PurePosixPath(member_name)
+    # Resource forks and metadata added by macOS archivers
+    if (path.parts and path.parts[0] == "__MACOSX") or path.name.startswith("._"):
+        return False
+    return path.suffix.lower() in extensions
+
+
+def iter_archive_members(source: Union[str, Path, BinaryIO], name: Optional[str] = None, extensions: Iterable[str] = PARSEABLE_EXTENSIONS) -> Iterator[Tuple[str, BinaryIO]]:
+    """
+    Yields (archive-relative POSIX path, open binary stream) for every regular member
+    with a parseable extension, in archive order. A stream is only valid until the
+    next member is requested.
+    """
+    name = name or str(source)
+    kind = archive_kind(name)
+    extensions = {extension.lower() for extension in extensions}
+    if kind == "zip":
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_wanted_member(info.filename, extensions):
+                    with archive.open(info) as member_stream:
+                        yield info.filename, member_stream
+    elif kind == "tar":
+        opened = isinstance(source, (str, Path))
+        archive = tarfile.open(source, mode="r|*") if opened else tarfile.open(fileobj=source, mode="r|*")
+        with archive:
+            for member in archive:
+                if member.isfile() and _is_wanted_member(member.name, extensions):
+                    member_stream = archive.extractfile(member)
+                    if member_stream is not None:
+                        yield member.name, member_stream
+    elif kind == "gzip":
+        member_name = PurePosixPath(name.replace("\\", "/")).name[:-len(".gz")]
+        if _is_wanted_member(member_name, extensions):
+            opened = isinstance(source, (str, Path))
+            with (gzip.open(source, "rb") if opened else gzip.GzipFile(fileobj=source, mode="rb")) as member_stream:
+                yield member_name, member_stream
+    else:
+        raise ValueError(f"Unsupported archive type: {name}")
+
+
+def iter_archive_files(source: Union[str, Path, BinaryIO], name: Optional[str] = None, extensions: Iterable[str] = PARSEABLE_EXTENSIONS, html_mode: Optional[str] = None) -> Iterator[ParsedFile]:
+    """
+    Parses the archive's members one by one. A member that fails to parse is yielded
+    with its error instead of stopping the archive; a corrupt archive raises.
+    """
+    for member_name, member_stream in iter_archive_members(source, name, extensions):
+        relative_name = member_name.lstrip("/")
+        try:
+            text, page_starts = extract_text_from_stream(member_stream, member_name, html_mode=html_mode)
+            yield ParsedFile(path=Path(relative_name), relative_name=relative_name, text=text, page_starts=page_starts)
+        except Exception as e:
+            yield ParsedFile(path=Path(relative_name), relative_name=relative_name, error=f"{type(e).__name__}: {e}")
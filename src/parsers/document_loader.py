@@ -0,0 +1,157 @@
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+
+from src.parsers.html_content import extract_html_text
+from src.parsers.office_xml import iter_docx_paragraphs, iter_odt_paragraphs
+from src.parsers.pdf_pages import build_pdf_document_text, iter_pdf_pages
+
+# Text extraction for files found in an input directory. PDF, DOCX and ODT parsing
+# is CPU-bound, so a directory is parsed across a process pool; the functions here
+# must stay importable without Streamlit because they run in worker processes.
+# Files with a deferred extension are not read by the workers at all: they come back
+# with `deferred=True` and no text, for the caller to stream from `path` itself.
+
+PARSEABLE_EXTENSIONS = {".txt", ".pdf", ".docx", ".md", ".html", ".htm", ".odt"}
+# Below this many files the cost of starting worker processes outweighs the parallel speed-up
+MIN_FILES_FOR_PROCESS_POOL = 4
+
+
+def extract_text_with_pages(file_path: Path, html_mode: Optional[str] = None) -> Tuple[str, Optional[List[Tuple[int, int]]]]:
+    """
+    Returns the file's text and, for PDFs, the (first sentence ID, page number) of
+    every page. PDF text comes back S-annotated, one page-bounded sentence per line.
+    HTML is reduced to its main content unless html_mode is "full" (default
+    KGRAPH_HTML_MODE, see html_content).
+    """
+    file_path = Path(file_path)
+    if file_path.suffix.lower() not in PARSEABLE_EXTENSIONS:
+        raise ValueError(f"Unsupported file type: {file_path.suffix.lower() or file_path.name}")
+    with file_path.open("rb") as f:
+        return extract_text_from_stream(f, file_path.name, html_mode=html_mode)
+
+
+def extract_text(file_path: Path, html_mode: Optional[str] = None) -> str:
+    """Returns the plain text of a file; raises on unreadable files and unsupported extensions."""
+    return extract_text_with_pages(file_path, html_mode=html_mode)[0]
+
+
+def _random_access(stream: BinaryIO) -> BinaryIO:
+    # PDF, DOCX and ODT readers seek around the file; archive member streams either
+    # cannot seek or re-decompress from the start on every backward seek
+    if isinstance(stream, io.BytesIO) or (isinstance(stream, io.BufferedReader) and isinstance(stream.raw, io.FileIO)):
+        return stream
+    return io.BytesIO(stream.read())
+
+
+def _decode_text(data: bytes) -> str:
+    # Universal newlines, as when reading the file in text mode
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def extract_text_from_stream(stream: BinaryIO, name: str, html_mode: Optional[str] = None) -> Tuple[str, Optional[List[Tuple[int, int]]]]:
+    """Same as extract_text_with_pages for an open binary stream, dispatched on the extension of name."""
+    file_extension = PurePosixPath(name).suffix.lower()
+    if file_extension == ".pdf":
+        pdf_text = build_pdf_document_text(iter_pdf_pages(_random_access(stream)))
+        return pdf_text.text, pdf_text.page_starts
+    if file_extension == ".docx":
+        return "\n".join(iter_docx_paragraphs(_random_access(stream))), None
+    if file_extension == ".odt":
+        return "\n".join(iter_odt_paragraphs(_random_access(stream))), None
+    if file_extension in (".html", ".htm"):
+        return extract_html_text(_decode_text(stream.read()), html_mode), None
+    if file_extension in (".txt", ".md"):
+        return _decode_text(stream.read()), None
+    raise ValueError(f"Unsupported file type: {file_extension or name}")
+
+
+@dataclass
+class ParsedFile:
+    path: Path
+    relative_name: str
+    text: str = ""
+    page_starts: Optional[List[Tuple[int, int]]] = None
+    error: Optional[str] = None
+    deferred: bool = False
+    # Modification time of the file on disk (seconds since the epoch), when known
+    modified_at: Optional[float] = None
+
+
+@dataclass
+class DirectoryParseResult:
+    files: List[ParsedFile] = field(default_factory=list)
+
+    @property
+    def failures(self) -> List[ParsedFile]:
+        return [parsed for parsed in self.files if parsed.error is not None]
+
+
+def _parse_one(file_path: str, html_mode: Optional[str] = None) -> Tuple[str, Optional[List[Tuple[int, int]]], Optional[str]]:
+    try:
+        return (*extract_text_with_pages(Path(file_path), html_mode=html_mode), None)
+    except Exception as e:
+        return "", None, f"{type(e).__name__}: {e}"
+
+
+def _modified_at(path: Path) -> Optional[float]:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+def find_parseable_files(directory_path: Path, extensions: Iterable[str] = PARSEABLE_EXTENSIONS) -> List[Path]:
+    extensions = {extension.lower() for extension in extensions}
+    return sorted(path for path in Path(directory_path).rglob("*") if path.suffix.lower() in extensions and path.is_file())
+
+
+def default_parse_workers() -> int:
+    return int(os.getenv("KGRAPH_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def parse_directory(directory_path: Path, max_workers: Optional[int] = None, extensions: Iterable[str] = PARSEABLE_EXTENSIONS, html_mode: Optional[str] = None, deferred_extensions: Iterable[str] = ()) -> DirectoryParseResult:
+    """
+    Parses every matching file under directory_path, across max_workers processes
+    (default KGRAPH_PARSE_WORKERS or the CPU count). Files come back in sorted path
+    order regardless of which worker finished first; a file that fails to parse is
+    returned with its error instead of stopping the run.
+    """
+    directory_path = Path(directory_path)
+    return parse_files(directory_path, find_parseable_files(directory_path, extensions), max_workers=max_workers, html_mode=html_mode, deferred_extensions=deferred_extensions)
+
+
+def parse_files(directory_path: Path, paths: List[Path], max_workers: Optional[int] = None, html_mode: Optional[str] = None, deferred_extensions: Iterable[str] = ()) -> DirectoryParseResult:
+    """
+    Parses the given files under directory_path (e.g. only the changed ones), in the order given.
+    Files with one of deferred_extensions are returned unread, marked deferred.
+    """
+    directory_path = Path(directory_path)
+    deferred_extensions = {extension.lower() for extension in deferred_extensions}
+    deferred_paths = [path for path in paths if path.suffix.lower() in deferred_extensions]
+    if deferred_paths:
+        parsed = parse_files(directory_path, [path for path in paths if path.suffix.lower() not in deferred_extensions], max_workers=max_workers, html_mode=html_mode)
+        parsed_by_path = {parsed_file.path: parsed_file for parsed_file in parsed.files}
+        return DirectoryParseResult(files=[
+            parsed_by_path.get(path) or ParsedFile(path=path, relative_name=str(path.relative_to(directory_path)), deferred=True, modified_at=_modified_at(path))
+            for path in paths
+        ])
+    max_workers = max(1, min(max_workers or default_parse_workers(), len(paths) or 1))
+
+    if max_workers == 1 or len(paths) < MIN_FILES_FOR_PROCESS_POOL:
+        outcomes = [_parse_one(str(path), html_mode) for path in paths]
+    else:
+        # Batches of files per task keep inter-process overhead low on directories of small files
+        chunksize = max(1, len(paths) // (max_workers * 4))
+        # Spawned rather than forked workers: the Streamlit server process is multi-threaded
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            outcomes = list(executor.map(_parse_one, [str(path) for path in paths], [html_mode] * len(paths), chunksize=chunksize))
+
+    return DirectoryParseResult(files=[
+        ParsedFile(path=path, relative_name=str(path.relative_to(directory_path)), text=text, page_starts=page_starts, error=error, modified_at=_modified_at(path))
+        for path, (text, page_starts, error) in zip(paths, outcomes)
+    ])
@@ -0,0 +1,209 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+# Main-content extraction for saved web pages. Navigation, headers and footers,
+# sidebars, cookie banners and share widgets are dropped, then the remaining block
+# containers are scored readability-style: every paragraph credits its parent (and
+# half as much its grandparent) by length and comma count, scores are damped by link
+# density, and the best container is kept together with its high-scoring siblings.
+# Block elements become paragraphs separated by blank lines, so the sentence
+# segmenter never joins a heading or list item into the next paragraph.
+
+HTML_EXTRACTION_MODES = ("main", "full")
+DEFAULT_HTML_EXTRACTION_MODE = "main"
+# Below this many characters the main-content guess is not trusted and the whole page is used
+MIN_MAIN_CONTENT_CHARS = 140
+MIN_PARAGRAPH_CHARS = 25
+
+_DROPPED_TAGS = ["script", "style", "noscript", "template", "svg", "canvas", "iframe", "form", "button", "select", "input", "nav", "aside", "footer", "header", "menu", "dialog"]
+_NEGATIVE_REGEX = re.compile(
+    r"nav|menu|footer|sidebar|side-bar|banner|cookie|consent|gdpr|breadcrumb|share|social|subscribe|newsletter|"
+    r"comment|related|recommend|promo|advert|\bads?\b|\bad-|sponsor|popup|modal|toolbar|pagination|pager|masthead|widget|login|signup",
+    re.IGNORECASE,
+)
+_POSITIVE_REGEX = re.compile(r"article|content|main|post|story|entry|body|text|news|detail|正文", re.IGNORECASE)
+_BLOCK_TAGS = {"p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "blockquote", "pre", "tr", "dt", "dd", "figcaption", "caption", "address", "table", "ul", "ol", "dl", "div", "section", "article", "main", "td", "th"}
+_SCORED_TAGS = {"p", "pre", "td", "blockquote"}
+_COMMA_REGEX = re.compile(r"[,，、;；]")
+_WHITESPACE_REGEX = re.compile(r"\s+")
+
+
+def default_html_mode() -> str:
+    mode = os.getenv("KGRAPH_HTML_MODE", DEFAULT_HTML_EXTRACTION_MODE)
+    return mode if mode in HTML_EXTRACTION_MODES else DEFAULT_HTML_EXTRACTION_MODE
+
+
+def _attribute_text(tag: Tag) -> str:
+    classes = tag.get("class") or []
+    return " ".join([*(classes if isinstance(classes, list) else [classes]), tag.get("id") or "", tag.get("role") or ""])
+
+
+def _class_weight(tag: Tag) -> int:
+    attributes = _attribute_text(tag)
+    weight = 0
+    if _NEGATIVE_REGEX.search(attributes):
+        weight -= 25
+    if _POSITIVE_REGEX.search(attributes):
+        weight += 25
+    return weight
+
+
+def _inner_text(tag: Tag) -> str:
+    return _WHITESPACE_REGEX.sub(" ", tag.get_text(" ")).strip()
+
+
+def _link_density(tag: Tag) -> float:
+    text_length = len(_inner_text(tag))
+    if not text_length:
+        return 0.0
+    link_length = sum(len(_inner_text(link)) for link in tag.find_all("a"))
+    return min(1.0, link_length / text_length)
+
+
+def _strip_boilerplate(soup: BeautifulSoup):
+    for comment in soup.find_all(string=lambda value: isinstance(value, Comment)):
+        comment.extract()
+    for tag in soup.find_all(_DROPPED_TAGS):
+        if tag.decomposed:
+            continue
+        # A page that wraps its whole article in <header> or <form> keeps it, and an
+        # article's own header holds its headline and byline
+        if tag.name in ("header", "form") and (tag.find(["article", "main"]) or (tag.name == "header" and tag.find_parent("article"))):
+            tag.unwrap()
+        else:
+            tag.decompose()
+    for tag in soup.find_all(True):
+        if tag.decomposed or tag.name in ("html", "body", "article", "main"):
+            continue
+        attributes = _attribute_text(tag)
+        if tag.get("aria-hidden") == "true" or "display:none" in (tag.get("style") or "").replace(" ", ""):
+            tag.decompose()
+        elif _NEGATIVE_REGEX.search(attributes) and not _POSITIVE_REGEX.search(attributes):
+            tag.decompose()
+
+
+def _best_candidate(body: Tag) -> Optional[Tag]:
+    scores: Dict[int, float] = {}
+    tags: Dict[int, Tag] = {}
+
+    def credit(tag: Optional[Tag], amount: float):
+        if tag is None or not isinstance(tag, Tag):
+            return
+        key = id(tag)
+        if key not in scores:
+            initial = {"div": 5, "article": 10, "main": 10, "section": 3, "pre": 3, "td": 3, "blockquote": 3}.get(tag.name, 0)
+            scores[key] = initial + _class_weight(tag)
+            tags[key] = tag
+        scores[key] += amount
+
+    for paragraph in body.find_all(True):
+        if paragraph.name in _SCORED_TAGS:
+            text = _inner_text(paragraph)
+        elif paragraph.name == "div":
+            # Text placed straight into a div counts as a paragraph too (e.g. forum posts built with <br>)
+            text = _WHITESPACE_REGEX.sub(" ", "".join(paragraph.find_all(string=True, recursive=False))).strip()
+        else:
+            continue
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        amount = 1 + len(_COMMA_REGEX.findall(text)) + min(len(text) // 100, 3)
+        credit(paragraph.parent, amount)
+        if paragraph.parent is not None:
+            credit(paragraph.parent.parent, amount / 2)
+
+    if not scores:
+        return None
+    best_key = max(scores, key=lambda key: scores[key] * (1 - _link_density(tags[key])))
+    best = tags[best_key]
+    best_score = scores[best_key] * (1 - _link_density(best))
+
+    # Articles split into several sibling containers (e.g. around an inline figure)
+    parent = best.parent
+    if parent is None or best.name in ("body", "html"):
+        return best
+    threshold = max(10.0, best_score * 0.2)
+    kept: List[Tag] = []
+    for sibling in parent.find_all(True, recursive=False):
+        if sibling is best:
+            kept.append(sibling)
+            continue
+        sibling_score = scores.get(id(sibling), 0) * (1 - _link_density(sibling))
+        text = _inner_text(sibling)
+        if sibling_score >= threshold or (sibling.name == "p" and len(text) > 80 and _link_density(sibling) < 0.25):
+            kept.append(sibling)
+    if len(kept) == 1:
+        return best
+    wrapper = BeautifulSoup("<div></div>", "html.parser").div
+    for tag in kept:
+        wrapper.append(tag.extract())
+    return wrapper
+
+
+def _block_paragraphs(root: Tag) -> List[str]:
+    """Text of the block elements under root, one entry per paragraph, inline markup flattened."""
+    paragraphs: List[str] = []
+    current: List[str] = []
+
+    def flush():
+        text = _WHITESPACE_REGEX.sub(" ", "".join(current)).strip()
+        if text:
+            paragraphs.append(text)
+        current.clear()
+
+    def walk(node):
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                current.append(str(child))
+            elif isinstance(child, Tag):
+                if child.name == "br":
+                    flush()
+                elif child.name == "tr":
+                    # One paragraph per table row, cells separated by spaces
+                    flush()
+                    current.append(" ".join(_inner_text(cell) for cell in child.find_all(["td", "th"], recursive=False)))
+                    flush()
+                elif child.name in _BLOCK_TAGS:
+                    flush()
+                    walk(child)
+                    flush()
+                else:
+                    walk(child)
+
+    walk(root)
+    flush()
+    return paragraphs
+
+
+def extract_main_content(html: str) -> str:
+    """
+    Returns the article text of a web page as paragraphs separated by blank lines,
+    preceded by the page title when the article does not repeat it. Falls back to
+    the whole (boilerplate-stripped) body when no main content can be found.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    title = _inner_text(soup.title) if soup.title else ""
+    _strip_boilerplate(soup)
+    body = soup.body or soup
+    candidate = _best_candidate(body)
+    paragraphs = _block_paragraphs(candidate) if candidate is not None else []
+    if sum(len(paragraph) for paragraph in paragraphs) < MIN_MAIN_CONTENT_CHARS:
+        paragraphs = _block_paragraphs(body)
+    headline = soup.find("h1")
+    heading = _inner_text(headline) if headline is not None else title
+    if heading and not any(heading in paragraph for paragraph in paragraphs[:3]):
+        paragraphs.insert(0, heading)
+    return "\n\n".join(paragraphs)
+
+
+def extract_full_text(html: str) -> str:
+    return BeautifulSoup(html, "html.parser").get_text()
+
+
+def extract_html_text(html: str, mode: Optional[str] = None) -> str:
+    mode = mode or default_html_mode()
+    if mode not in HTML_EXTRACTION_MODES:
+        raise ValueError(f"Unknown HTML extraction mode '{mode}'. Expected one of: {', '.join(HTML_EXTRACTION_MODES)}")
+    return extract_main_content(html) if mode == "main" else extract_full_text(html)
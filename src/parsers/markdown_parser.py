@@ -1,42 +1,98 @@
+import io
 import re
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import Any, Dict, IO, Iterator, List, Optional
+
+# Line-oriented parser for concatenated corpus files. A document block is
+#   # /corpus/<doc_id>.txt
+#   # 元数据: source=<source>, date=<date>, id=<id>
+#   S1 ...
+# and ends at the next `# /corpus/` line or at end of file. Each line is looked at
+# once, so parsing is linear in the input and a file can be streamed.
+
+_OUTSIDE = "outside"
+_EXPECT_METADATA = "expect_metadata"
+_IN_CONTENT = "in_content"
+_SKIPPING = "skipping"
+
+
+@dataclass
+class MalformedBlock:
+    line_number: int
+    doc_id: Optional[str]
+    reason: str
+
 
 class MarkdownMultiDocumentParser:
     def __init__(self):
-        # Regex to find document blocks: starts with /corpus/ and ends before next /corpus/ or end of file
-        # It captures the document ID, source, date, and the content with sentence IDs
-        self.doc_block_regex = re.compile(
-            r"^\s*#\s*/corpus/(?P<doc_id>[^\s]+)\.txt\s*\n"  # Matches /corpus/d1_news_2025-03-12.txt
-            r"^\s*#\s*元数据:\s*source=(?P<source>[^,]+),\s*date=(?P<date>[^,]+),\s*id=(?P<meta_id>[^\s]+)\s*\n" # Matches metadata
-            r"(?P<content>(?:(?!^\s*#\s*/corpus/).)*)", # Captures content until next doc block or EOF
-            re.DOTALL | re.MULTILINE
-        )
-        self.sentence_regex = re.compile(r"^(S\d+\s+.*)", re.MULTILINE) # Matches S1, S2, ...
+        # Any line of this form starts a new block, well-formed or not
+        self.block_start_regex = re.compile(r"^\s*#\s*/corpus/")
+        self.header_regex = re.compile(r"^\s*#\s*/corpus/(?P<doc_id>\S+)\.txt\s*$")  # Matches /corpus/d1_news_2025-03-12.txt
+        self.metadata_regex = re.compile(r"^\s*#\s*元数据:\s*source=(?P<source>[^,]+),\s*date=(?P<date>[^,]+),\s*id=(?P<meta_id>\S+)\s*$")
+        self.sentence_regex = re.compile(r"^(S\d+\s+.*)")  # Matches S1, S2, ...
+        self.errors: List[MalformedBlock] = []
 
     def parse(self, markdown_content: str) -> List[Dict[str, Any]]:
-        documents = []
-        for match in self.doc_block_regex.finditer(markdown_content):
-            doc_id = match.group("doc_id")
-            source = match.group("source")
-            date = match.group("date")
-            meta_id = match.group("meta_id") # This should match doc_id, but we'll use doc_id for consistency
-            content_block = match.group("content").strip()
-
-            # Extract sentences with their IDs
-            sentences_with_ids = []
-            for sent_match in self.sentence_regex.finditer(content_block):
-                sentences_with_ids.append(sent_match.group(1))
-            
-            # Reconstruct content with sentence IDs for the LLM prompt
-            text_with_sentence_ids = "\n".join(sentences_with_ids)
-
-            documents.append({
-                "doc_id": doc_id,
-                "source": source,
-                "date": date,
-                "text_with_sentence_ids": text_with_sentence_ids
-            })
-        return documents
+        return list(self.parse_iter(io.StringIO(markdown_content)))
+
+    def parse_iter(self, file_obj: IO) -> Iterator[Dict[str, Any]]:
+        """
+        Yields each document as soon as its block is closed by the next block or EOF.
+        Blocks without a valid header or metadata line are skipped and recorded in
+        self.errors (reset on every call) instead of being dropped silently.
+        """
+        self.errors = []
+        state = _OUTSIDE
+        document: Dict[str, Any] = {}
+        sentences: List[str] = []
+        header_line_number = 0
+
+        def close_block():
+            return {**document, "text_with_sentence_ids": "\n".join(sentences)}
+
+        for line_number, line in enumerate(file_obj, start=1):
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            line = line.rstrip("\r\n")
+
+            if "/corpus/" in line and self.block_start_regex.match(line):
+                if state == _IN_CONTENT:
+                    yield close_block()
+                elif state == _EXPECT_METADATA:
+                    self.errors.append(MalformedBlock(header_line_number, document.get("doc_id"), "missing metadata line"))
+                header_match = self.header_regex.match(line)
+                header_line_number = line_number
+                sentences = []
+                if header_match:
+                    document = {"doc_id": header_match.group("doc_id")}
+                    state = _EXPECT_METADATA
+                else:
+                    self.errors.append(MalformedBlock(line_number, None, f"invalid block header: {line.strip()[:80]}"))
+                    document = {}
+                    state = _SKIPPING
+                continue
+
+            if state == _EXPECT_METADATA:
+                if not line.strip():
+                    continue
+                metadata_match = self.metadata_regex.match(line)
+                if metadata_match:
+                    # id= should match the header's doc_id; the header is kept for consistency
+                    document.update(source=metadata_match.group("source").strip(), date=metadata_match.group("date").strip())
+                    state = _IN_CONTENT
+                else:
+                    self.errors.append(MalformedBlock(line_number, document.get("doc_id"), f"invalid metadata line: {line.strip()[:80]}"))
+                    state = _SKIPPING
+            elif state == _IN_CONTENT:
+                sentence_match = self.sentence_regex.match(line.strip())
+                if sentence_match:
+                    sentences.append(sentence_match.group(1))
+
+        if state == _IN_CONTENT:
+            yield close_block()
+        elif state == _EXPECT_METADATA:
+            self.errors.append(MalformedBlock(header_line_number, document.get("doc_id"), "missing metadata line"))
+
 
 if __name__ == '__main__':
     # Example usage (for testing the parser directly)
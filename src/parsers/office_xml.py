@@ -0,0 +1,168 @@
+import posixpath
+import xml.etree.ElementTree as ElementTree
+import zipfile
+from typing import BinaryIO, Iterator, List, Optional
+
+# Streaming paragraph extraction for DOCX and ODT. Both formats are zip packages whose
+# body is a single XML part (word/document.xml, content.xml); instead of building the
+# python-docx / odfpy object model for the whole document, the part is read straight
+# from the zip with iterparse and each paragraph is turned into text at its end tag,
+# then cleared, so memory stays bounded by the largest paragraph or table row rather
+# than by the document. Table rows come out as one paragraph with their cells joined
+# by spaces (as in html_content); paragraphs in text boxes, footnotes and other
+# nested containers come out as paragraphs of their own.
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_NS = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+OFFICE_NS = "{urn:oasis:names:tc:opendocument:xmlns:office:1.0}"
+TEXT_NS = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+TABLE_NS = "{urn:oasis:names:tc:opendocument:xmlns:table:1.0}"
+PACKAGE_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+OFFICE_DOCUMENT_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+DEFAULT_DOCX_DOCUMENT_PART = "word/document.xml"
+
+
+class _Schema:
+    def __init__(self, body, paragraphs, row, cell, skipped):
+        self.body = body
+        self.paragraphs = paragraphs
+        self.row = row
+        self.cell = cell
+        # Subtrees whose text is not part of the document (fallback copies, deletions, comments)
+        self.skipped = skipped
+
+
+DOCX_SCHEMA = _Schema(
+    body=W_NS + "body",
+    paragraphs={W_NS + "p"},
+    row=W_NS + "tr",
+    cell=W_NS + "tc",
+    skipped={MC_NS + "Fallback", W_NS + "del", W_NS + "moveFrom"},
+)
+ODT_SCHEMA = _Schema(
+    body=OFFICE_NS + "text",
+    paragraphs={TEXT_NS + "p", TEXT_NS + "h"},
+    row=TABLE_NS + "table-row",
+    cell=TABLE_NS + "table-cell",
+    skipped={OFFICE_NS + "annotation", TEXT_NS + "tracked-changes", TEXT_NS + "note-citation"},
+)
+
+
+def _docx_run_text(run: ElementTree.Element) -> str:
+    # Same mapping as python-docx Run.text
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == W_NS + "t":
+            parts.append(child.text or "")
+        elif tag in (W_NS + "tab", W_NS + "ptab"):
+            parts.append("\t")
+        elif tag == W_NS + "cr" or (tag == W_NS + "br" and child.get(W_NS + "type", "textWrapping") == "textWrapping"):
+            parts.append("\n")
+        elif tag == W_NS + "noBreakHyphen":
+            parts.append("-")
+    return "".join(parts)
+
+
+def _docx_paragraph_text(paragraph: ElementTree.Element) -> str:
+    parts = []
+    # Runs sit directly in the paragraph or inside hyperlinks, insertions, smart tags and fields
+    stack = list(reversed(paragraph))
+    while stack:
+        element = stack.pop()
+        if element.tag == W_NS + "r":
+            parts.append(_docx_run_text(element))
+        elif element.tag not in DOCX_SCHEMA.skipped and element.tag not in DOCX_SCHEMA.paragraphs and element.tag != W_NS + "pPr":
+            stack.extend(reversed(element))
+    return "".join(parts)
+
+
+def _odt_paragraph_text(paragraph: ElementTree.Element) -> str:
+    # Same mapping as odfpy teletype.extractText: <text:s text:c="n"/> is n spaces
+    parts = [paragraph.text or ""]
+    for child in paragraph:
+        tag = child.tag
+        if tag == TEXT_NS + "s":
+            parts.append(" " * int(child.get(TEXT_NS + "c", "1")))
+        elif tag == TEXT_NS + "tab":
+            parts.append("\t")
+        elif tag == TEXT_NS + "line-break":
+            parts.append("\n")
+        elif tag not in ODT_SCHEMA.skipped and tag not in ODT_SCHEMA.paragraphs:
+            parts.append(_odt_paragraph_text(child))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def _iter_paragraphs(xml_stream: BinaryIO, schema: _Schema, paragraph_text) -> Iterator[str]:
+    body: Optional[ElementTree.Element] = None
+    depth, body_depth, skipped_depth = 0, None, 0
+    # One entry per open table row (nested tables nest rows): cells, each a list of paragraph texts
+    rows: List[List[List[str]]] = []
+
+    for event, element in ElementTree.iterparse(xml_stream, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            depth += 1
+            if body is None:
+                if tag == schema.body:
+                    body, body_depth = element, depth
+            elif tag in schema.skipped:
+                skipped_depth += 1
+            elif tag == schema.row and not skipped_depth:
+                rows.append([])
+            elif tag == schema.cell and rows and not skipped_depth:
+                rows[-1].append([])
+            continue
+
+        depth -= 1
+        if body is None or depth < body_depth:
+            continue
+        if tag in schema.skipped:
+            skipped_depth -= 1
+        elif skipped_depth:
+            pass
+        elif tag in schema.paragraphs:
+            text = paragraph_text(element)
+            if rows and rows[-1]:
+                rows[-1][-1].append(text)
+            else:
+                yield text
+            tail = element.tail
+            element.clear()
+            element.tail = tail
+        elif tag == schema.row and rows:
+            row = rows.pop()
+            line = " ".join(cell_text for cell_text in (" ".join(text for text in cell if text.strip()) for cell in row) if cell_text)
+            if rows and rows[-1]:
+                rows[-1][-1].append(line)
+            elif line:
+                yield line
+            element.clear()
+        if depth == body_depth:
+            # A top-level block of the body is finished: drop it from the tree
+            del body[:]
+
+
+def docx_document_part(archive: zipfile.ZipFile) -> str:
+    """Name of the main document part, as declared in the package relationships."""
+    try:
+        with archive.open("_rels/.rels") as rels_stream:
+            for relationship in ElementTree.parse(rels_stream).getroot().iter(PACKAGE_RELS_NS + "Relationship"):
+                if relationship.get("Type") == OFFICE_DOCUMENT_REL_TYPE:
+                    return posixpath.normpath(relationship.get("Target", DEFAULT_DOCX_DOCUMENT_PART).lstrip("/"))
+    except KeyError:
+        pass
+    return DEFAULT_DOCX_DOCUMENT_PART
+
+
+def iter_docx_paragraphs(stream: BinaryIO) -> Iterator[str]:
+    """Paragraph texts of a .docx file (seekable binary stream) in document order, tables included."""
+    with zipfile.ZipFile(stream) as archive, archive.open(docx_document_part(archive)) as xml_stream:
+        yield from _iter_paragraphs(xml_stream, DOCX_SCHEMA, _docx_paragraph_text)
+
+
+def iter_odt_paragraphs(stream: BinaryIO) -> Iterator[str]:
+    """Paragraph and heading texts of an .odt file (seekable binary stream) in document order, tables included."""
+    with zipfile.ZipFile(stream) as archive, archive.open("content.xml") as xml_stream:
+        yield from _iter_paragraphs(xml_stream, ODT_SCHEMA, _odt_paragraph_text)
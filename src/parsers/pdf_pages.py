@@ -0,0 +1,69 @@
+import bisect
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
+
+from PyPDF2 import PdfReader
+
+from src.parsers.sentence_chunker import split_sentences
+
+# Page-at-a-time PDF text extraction. Pages are yielded as they are extracted, so a
+# caller can segment, chunk or extract them without first concatenating the whole
+# report; sentences never cross a page boundary and every sentence ID can be mapped
+# back to its page, which lets evidence carry page numbers.
+
+
+@dataclass
+class PdfPage:
+    page_number: int
+    text: str
+
+
+@dataclass
+class PdfDocumentText:
+    # S-annotated text, one sentence per line, numbered across pages
+    text: str = ""
+    # (first sentence ID, page number) for every page that has text, in order
+    page_starts: List[Tuple[int, int]] = field(default_factory=list)
+
+
+def iter_pdf_pages(source: Union[str, Path, BinaryIO]) -> Iterator[PdfPage]:
+    """Yields the text of each page with its 1-based page number; pages without a text layer yield empty text."""
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as pdf_file:
+            yield from iter_pdf_pages(pdf_file)
+        return
+    reader = PdfReader(source)
+    for page_index in range(len(reader.pages)):
+        yield PdfPage(page_number=page_index + 1, text=reader.pages[page_index].extract_text() or "")
+
+
+def iter_page_sentences(pages: Iterable[PdfPage], first_sentence_id: int = 1) -> Iterator[Tuple[int, int, str]]:
+    """
+    Segments each page on its own and yields (sentence ID, page number, sentence text)
+    with IDs running across pages. `(sentence_id, text)` pairs taken from this stream
+    can be fed straight into chunk_sentences.
+    """
+    sentence_id = first_sentence_id
+    for page in pages:
+        for _, sentence_text in split_sentences(page.text).sentences:
+            yield sentence_id, page.page_number, sentence_text
+            sentence_id += 1
+
+
+def build_pdf_document_text(pages: Iterable[PdfPage]) -> PdfDocumentText:
+    lines = []
+    page_starts: List[Tuple[int, int]] = []
+    for sentence_id, page_number, sentence_text in iter_page_sentences(pages):
+        if not page_starts or page_starts[-1][1] != page_number:
+            page_starts.append((sentence_id, page_number))
+        lines.append(f"S{sentence_id} {sentence_text}")
+    return PdfDocumentText(text="\n".join(lines), page_starts=page_starts)
+
+
+def page_for_sentence(page_starts: Iterable[Any], sentence_id: int) -> Optional[int]:
+    """Returns the page of a sentence from a page_starts list (pairs, possibly decoded from JSON as lists)."""
+    page_starts = list(page_starts)
+    first_ids = [start[0] for start in page_starts]
+    position = bisect.bisect_right(first_ids, sentence_id) - 1
+    return page_starts[position][1] if position >= 0 else None
@@ -0,0 +1,105 @@
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Tuple
+
+from src.parsers.sentence_segmenter import segment_sentences
+
+# Splits documents into overlapping sentence windows that fit a token budget.
+# Each window is renumbered S1..Sk for the LLM; `sentence_ids` maps the local
+# numbering back to the document-level sentence IDs.
+
+SENTENCE_ID_LINE_REGEX = re.compile(r"^\s*S(\d+)\s+(.*)$")
+CJK_CHAR_REGEX = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    # Gemini tokenizes CJK text at roughly one token per character and Latin text at ~4 characters per token
+    cjk_chars = len(CJK_CHAR_REGEX.findall(text))
+    other_chars = len(text) - cjk_chars
+    return cjk_chars + (other_chars + 3) // 4
+
+
+@dataclass
+class TextChunk:
+    index: int
+    sentence_ids: List[int]
+    text: str
+    token_estimate: int = 0
+
+    def to_document_sentence_id(self, local_sentence_id: int) -> int:
+        if 1 <= local_sentence_id <= len(self.sentence_ids):
+            return self.sentence_ids[local_sentence_id - 1]
+        raise IndexError(f"Sentence S{local_sentence_id} does not exist in chunk {self.index}")
+
+
+@dataclass
+class SentenceSplit:
+    header: str = ""
+    sentences: List[Tuple[int, str]] = field(default_factory=list)
+
+
+def split_sentences(text: str) -> SentenceSplit:
+    """
+    Returns the document's sentences as (sentence_id, text) pairs.
+    Text already annotated with `S<n>` lines keeps its IDs; other text is segmented
+    with sentence_segmenter and numbered from S1. Lines before the first annotated
+    sentence (e.g. metadata headers) are returned separately as the header.
+    """
+    lines = text.splitlines()
+    if any(SENTENCE_ID_LINE_REGEX.match(line) for line in lines):
+        result = SentenceSplit()
+        header_lines = []
+        for line in lines:
+            match = SENTENCE_ID_LINE_REGEX.match(line)
+            if match:
+                result.sentences.append((int(match.group(1)), match.group(2).strip()))
+            elif not line.strip():
+                continue
+            elif result.sentences:
+                # Continuation line of a wrapped sentence
+                sentence_id, sentence_text = result.sentences[-1]
+                result.sentences[-1] = (sentence_id, f"{sentence_text} {line.strip()}")
+            else:
+                header_lines.append(line.strip())
+        result.header = "\n".join(header_lines)
+        return result
+
+    return SentenceSplit(sentences=list(enumerate(segment_sentences(text), start=1)))
+
+
+def chunk_sentences(sentences: Iterable[Tuple[int, str]], max_tokens: int, overlap_sentences: int = 1, header: str = "") -> List[TextChunk]:
+    sentences = list(sentences)
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be positive")
+    overlap_sentences = max(0, overlap_sentences)
+    header_tokens = estimate_tokens(header) if header else 0
+    sentence_tokens = [estimate_tokens(sentence_text) + 2 for _, sentence_text in sentences]
+
+    chunks = []
+    start = 0
+    while start < len(sentences):
+        end = start
+        budget = header_tokens
+        # Always take at least one sentence, even if it alone exceeds the budget
+        while end < len(sentences) and (end == start or budget + sentence_tokens[end] <= max_tokens):
+            budget += sentence_tokens[end]
+            end += 1
+
+        window = sentences[start:end]
+        lines = [header] if header else []
+        lines.extend(f"S{local_id} {sentence_text}" for local_id, (_, sentence_text) in enumerate(window, start=1))
+        chunks.append(TextChunk(
+            index=len(chunks),
+            sentence_ids=[sentence_id for sentence_id, _ in window],
+            text="\n".join(lines),
+            token_estimate=budget,
+        ))
+        if end >= len(sentences):
+            break
+        start = max(end - overlap_sentences, start + 1)
+    return chunks
+
+
+def chunk_text(text: str, max_tokens: int, overlap_sentences: int = 1) -> List[TextChunk]:
+    split = split_sentences(text)
+    return chunk_sentences(split.sentences, max_tokens, overlap_sentences, header=split.header)
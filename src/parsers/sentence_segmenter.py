@@ -0,0 +1,193 @@
+import re
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# Sentence segmentation for text that arrives without `S<n>` sentence IDs (plain
+# text, PDF/DOCX/HTML, transcripts, pasted input), and a compact offset index that
+# maps sentence IDs to (start, end) character offsets in the annotated text.
+#
+# Boundaries: CJK terminal punctuation (。！？；) always ends a sentence; ASCII
+# . ! ? end one when followed by whitespace, unless the period belongs to a known
+# abbreviation, an initial or a list/section number ("1. 项目概况", "IV. Results",
+# "Section 2. The grid"); blank lines always end one; a single line break ends
+# one unless it looks like a hard wrap inside a sentence. Closing quotes and
+# brackets stay with the sentence they close. Overlong pieces (e.g. unpunctuated
+# transcripts) are cut at the last soft break before MAX_SENTENCE_CHARS.
+
+MAX_SENTENCE_CHARS = 300
+# A line shorter than this (titles, list items) is never treated as hard-wrapped
+MIN_WRAPPED_LINE_CHARS = 20
+
+_CLOSERS = "”’\"'」』）)】\\]》"
+_CANDIDATE_REGEX = re.compile(
+    rf"[。！？；]+[{_CLOSERS}]*"
+    rf"|[.!?]+[{_CLOSERS}]*(?=\s|$)"
+    r"|\n[ \t\r\f\v]*(?:\n\s*)*"
+)
+_TERMINAL_CHARS = set("。！？；.!?:：" + _CLOSERS)
+_SOFT_BREAK_REGEX = re.compile(r"[，,、：:]\s*|\s+")
+_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "inc", "ltd", "co", "corp",
+    "no", "fig", "e.g", "i.e", "u.s", "u.k", "a.m", "p.m", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+}
+_WORD_BEFORE_PERIOD_REGEX = re.compile(r"([A-Za-z][A-Za-z.]*)$")
+_CONTINUATION_START_REGEX = re.compile(r"[a-z0-9㐀-䶿一-鿿豈-﫿（(“\"]")
+# Arabic (optionally dotted, "2.1"), roman (up to xxxix) or single-letter list numbers
+_ENUMERATOR = r"(?:\d{1,3}(?:\.\d{1,3})*|x{0,3}(?:ix|iv|vi{0,3}|i{1,3})|x{1,3}|[a-z])"
+_LINE_ENUMERATOR_REGEX = re.compile(rf"[ \t]*[(（]?{_ENUMERATOR}", re.IGNORECASE)
+_HEADING_NUMBER_REGEX = re.compile(
+    rf"\b(?:section|chapter|article|part|step|item|appendix|table|figure|fig\.|clause|phase|stage|no\.)[ \t]*{_ENUMERATOR}$",
+    re.IGNORECASE,
+)
+
+
+def _is_abbreviation(text: str, period_position: int) -> bool:
+    match = _WORD_BEFORE_PERIOD_REGEX.search(text, max(0, period_position - 12), period_position)
+    if not match:
+        return False
+    word = match.group(1)
+    # Single initials ("J. Smith") and listed abbreviations ("Dr.", "e.g.")
+    return (len(word) == 1 and word.isupper()) or word.lower().rstrip(".") in _ABBREVIATIONS
+
+
+def _is_enumerator(text: str, period_position: int) -> bool:
+    """A period after a number or roman numeral that starts its line, or after a heading word such as "Section"."""
+    line_start = text.rfind("\n", 0, period_position) + 1
+    if _LINE_ENUMERATOR_REGEX.fullmatch(text, line_start, period_position):
+        return True
+    return bool(_HEADING_NUMBER_REGEX.search(text, max(line_start, period_position - 24), period_position))
+
+
+def _is_hard_wrap(text: str, newline_start: int, newline_end: int) -> bool:
+    """A single line break inside a sentence: the line is long, unterminated, and the next line continues it."""
+    if text.count("\n", newline_start, newline_end) != 1:
+        return False
+    line_start = text.rfind("\n", 0, newline_start) + 1
+    line = text[line_start:newline_start].rstrip()
+    if len(line) < MIN_WRAPPED_LINE_CHARS or line[-1] in _TERMINAL_CHARS:
+        return False
+    return bool(_CONTINUATION_START_REGEX.match(text, newline_end))
+
+
+def _split_overlong(text: str, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    while end - start > MAX_SENTENCE_CHARS:
+        cut = None
+        for match in _SOFT_BREAK_REGEX.finditer(text, start + MAX_SENTENCE_CHARS // 2, start + MAX_SENTENCE_CHARS):
+            cut = match.end()
+        cut = cut or start + MAX_SENTENCE_CHARS
+        yield start, cut
+        start = cut
+    yield start, end
+
+
+def segment_spans(text: str) -> List[Tuple[int, int]]:
+    """Returns (start, end) offsets of the sentences in text, with surrounding whitespace excluded."""
+    boundaries = []
+    for match in _CANDIDATE_REGEX.finditer(text):
+        token = match.group(0)
+        if token[0] == ".":
+            if _is_abbreviation(text, match.start()) or _is_enumerator(text, match.start()):
+                continue
+        elif token[0] == "\n" and _is_hard_wrap(text, match.start(), match.end()):
+            continue
+        boundaries.append(match.start() if token[0] == "\n" else match.end())
+    boundaries.append(len(text))
+
+    spans = []
+    start = 0
+    for boundary in boundaries:
+        piece_start, piece_end = start, boundary
+        while piece_start < piece_end and text[piece_start].isspace():
+            piece_start += 1
+        while piece_end > piece_start and text[piece_end - 1].isspace():
+            piece_end -= 1
+        if piece_start < piece_end:
+            spans.extend(_split_overlong(text, piece_start, piece_end))
+        start = boundary
+    return spans
+
+
+def normalize_sentence(text: str) -> str:
+    # Hard-wrapped lines are joined; CJK text is joined without a space
+    lines = [line.strip() for line in text.splitlines()]
+    joined = lines[0] if lines else ""
+    for line in lines[1:]:
+        if not line:
+            continue
+        separator = "" if joined and (ord(joined[-1]) > 0x2E7F and ord(line[0]) > 0x2E7F) else " "
+        joined += separator + line
+    return joined
+
+
+def segment_sentences(text: str) -> List[str]:
+    return [normalize_sentence(text[start:end]) for start, end in segment_spans(text)]
+
+
+class SentenceIndex:
+    """
+    Array-backed sentence ID -> (start, end) offsets into an S-annotated text. When
+    the IDs run 1..n (always true for text annotated here) a lookup is a direct array
+    access; otherwise it is a binary search over the sorted IDs.
+    """
+
+    def __init__(self, sentence_ids: Sequence[int] = (), starts: Sequence[int] = (), ends: Sequence[int] = ()):
+        self.sentence_ids = array("l", sentence_ids)
+        self.starts = array("l", starts)
+        self.ends = array("l", ends)
+        self._sequential = all(sentence_id == position for position, sentence_id in enumerate(self.sentence_ids, start=1))
+
+    def __len__(self) -> int:
+        return len(self.sentence_ids)
+
+    @classmethod
+    def from_annotated_text(cls, text: str) -> "SentenceIndex":
+        ids, starts, ends = [], [], []
+        for match in re.finditer(r"^[ \t]*S(\d+)[ \t]+(.*?)[ \t\r]*$", text, re.MULTILINE):
+            ids.append(int(match.group(1)))
+            starts.append(match.start(2))
+            ends.append(match.end(2))
+        if any(later <= earlier for earlier, later in zip(ids, ids[1:])):
+            order = sorted(range(len(ids)), key=lambda position: ids[position])
+            ids, starts, ends = [ids[p] for p in order], [starts[p] for p in order], [ends[p] for p in order]
+        return cls(ids, starts, ends)
+
+    def _position(self, sentence_id: int) -> Optional[int]:
+        if self._sequential:
+            return sentence_id - 1 if 1 <= sentence_id <= len(self.sentence_ids) else None
+        position = bisect_left(self.sentence_ids, sentence_id)
+        return position if position < len(self.sentence_ids) and self.sentence_ids[position] == sentence_id else None
+
+    def span(self, sentence_id: int) -> Optional[Tuple[int, int]]:
+        position = self._position(sentence_id)
+        return (self.starts[position], self.ends[position]) if position is not None else None
+
+    def __contains__(self, sentence_id: int) -> bool:
+        return self._position(sentence_id) is not None
+
+    def sentence_text(self, text: str, sentence_id: int) -> Optional[str]:
+        span = self.span(sentence_id)
+        return text[span[0]:span[1]] if span else None
+
+
+@dataclass
+class AnnotatedText:
+    text: str
+    index: SentenceIndex
+
+
+def annotate_sentences(text: str, first_sentence_id: int = 1) -> AnnotatedText:
+    """Segments text and renders it as `S<n> <sentence>` lines, building the offset index in the same pass."""
+    parts, ids, starts, ends = [], [], [], []
+    offset = 0
+    for sentence_id, sentence in enumerate(segment_sentences(text), start=first_sentence_id):
+        prefix = f"S{sentence_id} "
+        if parts:
+            offset += 1  # joining newline
+        ids.append(sentence_id)
+        starts.append(offset + len(prefix))
+        offset += len(prefix) + len(sentence)
+        ends.append(offset)
+        parts.append(prefix + sentence)
+    return AnnotatedText(text="\n".join(parts), index=SentenceIndex(ids, starts, ends))
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+@pytest.fixture(autouse=True)
+def clear_compiled_chain_registry():
+    # Compiled chains hold on to the LLM client, so tests that mock the client need a fresh registry
+    import app
+    app.clear_compiled_chains()
+    yield
+    app.clear_compiled_chains()
@@ -0,0 +1,60 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.alias_index import AliasIndex, load_alias_index
+
+RECORDS = [
+    {"canonical_id": "ORG.NPG", "name": "南海电力集团", "aliases": ["NPG", "南海电力"]},
+    {"canonical_id": "ORG.BCRI", "name": "蓝珊研究所", "aliases": "BCRI"},
+    {"canonical_id": "PER.ZQM_NPG", "name": "周启明", "aliases": ["周总"]},
+    {"canonical_id": "PER.ZQM_VCM", "name": "周启明", "aliases": None},
+]
+
+
+def write_mentions(path, records, extra_lines=()):
+    lines = [json.dumps(record, ensure_ascii=False) for record in records]
+    path.write_text("\n".join([*lines, *extra_lines]) + "\n", encoding="utf-8")
+
+
+def test_index_maps_names_and_aliases_with_latest_line_winning(tmp_path):
+    mentions_path = tmp_path / "mentions.jsonl"
+    write_mentions(mentions_path, RECORDS, ['{"canonical_id": "ORG.X"}', "{not json"])
+    index = load_alias_index(mentions_path, tmp_path / "index")
+
+    assert index.lookup("NPG") == "ORG.NPG" and index.lookup("BCRI") == "ORG.BCRI" and index.lookup("未知") is None
+    # Same alias under two canonical IDs: the later line wins, as with the former dict mapping
+    assert index.lookup("周启明") == "PER.ZQM_VCM"
+    assert index.candidates("周启明") == ["PER.ZQM_NPG", "PER.ZQM_VCM"]
+    assert index.lookup_many(["南海电力", "周总", "未知", "南海电力"]) == {"南海电力": "ORG.NPG", "周总": "PER.ZQM_NPG"}
+    assert [(warning.line_number, warning.kind) for warning in index.warnings] == [(5, "missing_fields"), (6, "invalid_json")]
+    assert index.stats()["aliases"] == 7 and index.stats()["ambiguous_aliases"] == 1 and index.stats()["rebuilt"]
+
+
+def test_index_is_reused_until_the_content_changes(tmp_path):
+    mentions_path = tmp_path / "mentions.jsonl"
+    index_dir = tmp_path / "index"
+    write_mentions(mentions_path, RECORDS)
+    first = load_alias_index(mentions_path, index_dir)
+
+    assert not load_alias_index(mentions_path, index_dir).rebuilt
+    # Touched but identical content: re-hashed, not rebuilt
+    os.utime(mentions_path, ns=(1, 1))
+    assert not load_alias_index(mentions_path, index_dir).rebuilt
+
+    write_mentions(mentions_path, RECORDS + [{"canonical_id": "ORG.QLU", "name": "青岚大学", "aliases": ["QLU"]}])
+    rebuilt = load_alias_index(mentions_path, index_dir)
+    assert rebuilt.rebuilt and rebuilt.lookup("QLU") == "ORG.QLU"
+    # The index built from the old content is dropped
+    assert not first.path.exists() and [path.suffix for path in index_dir.iterdir()].count(".kgalias") == 1
+
+
+def test_empty_gazetteer_opens_as_an_empty_index(tmp_path):
+    mentions_path = tmp_path / "mentions.jsonl"
+    mentions_path.write_text("\n", encoding="utf-8")
+    index = load_alias_index(mentions_path, tmp_path / "index")
+
+    assert len(index) == 0 and index.lookup_many(["NPG"]) == {} and index.lookup("NPG") is None
+    assert len(AliasIndex(index.path)) == 0
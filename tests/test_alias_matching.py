@@ -0,0 +1,78 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.alias_index import load_alias_index
+from src.extraction.alias_matching import AliasAutomaton, AliasMatchReport, alias_key, build_automaton, is_legal_form_suffix, strip_qualifiers, types_agree
+
+MENTIONS_PATH = os.path.join(os.path.dirname(__file__), '..', 'GraphRAG-Extract-Best-Example-CoralWind-zh', 'gold', 'mentions.jsonl')
+
+
+def test_alias_key_folds_width_case_brackets_and_spacing():
+    assert alias_key("周启明（NPG）") == alias_key("周启明 (npg)") == "周启明npg"
+    assert alias_key("ＣＲ－２０２６") == alias_key("CR 2026") == "cr 2026"
+    assert alias_key("  Blue   Horizon,  Energy ") == "blue horizon energy"
+    assert alias_key("“海曦一号”") == "海曦一号"
+
+
+def test_automaton_finds_every_key_occurrence_in_one_pass():
+    keys = sorted(["he", "she", "his", "hers"])
+    automaton = AliasAutomaton(**build_automaton(keys))
+
+    assert sorted((start, end, keys[index]) for start, end, index in automaton.matches("ushers")) == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+    assert automaton.find("his") == keys.index("his") and automaton.find("hi") == -1 and automaton.find("hersx") == -1
+    assert AliasAutomaton(**build_automaton([])).matches("anything") == []
+
+
+def test_decorated_ids_resolve_through_normalized_and_contained_stages(tmp_path):
+    index = load_alias_index(MENTIONS_PATH, tmp_path)
+
+    assert index.match("周启明（NPG）").canonical_id == "PER.ZQM_NPG"
+    normalized = index.match("周启明 ( npg )")
+    assert (normalized.canonical_id, normalized.method) == ("PER.ZQM_NPG", "normalized")
+    assert (index.match("ＮＰＧ").canonical_id, index.match("cr-2026").canonical_id) == ("ORG.NPG", "PROJ.CR2026")
+    contained = index.match("南海电力集团有限公司", "Organization")
+    assert (contained.canonical_id, contained.method) == ("ORG.NPG", "contained")
+    assert index.match("NPG Co., Ltd.", "organization").canonical_id == "ORG.NPG"
+    # The longest leading alias wins over its own prefix ("海曦一号"); bracketed qualifiers are dropped
+    assert index.match("海曦一号风电场（一期）", "Project").canonical_id == "PROJ.HX1"
+
+
+def test_contained_matches_reject_titles_phases_subsidiaries_and_other_types(tmp_path):
+    index = load_alias_index(MENTIONS_PATH, tmp_path)
+    rejected = [
+        ("NPG董事长", "Person"), ("NPG董事长", "Organization"), ("BCRI研究员", "Person"),
+        ("海曦一号二期", "Project"), ("南海电力集团子公司", "Organization"), ("珊瑚湾市海洋与渔业局", "GovernmentAgency"),
+        # Legal form, but the node type disagrees with the gazetteer or is unknown
+        ("南海电力集团有限公司", "Person"), ("南海电力集团有限公司", "Unknown"), ("南海电力集团有限公司", None),
+    ]
+    for node_id, node_type in rejected:
+        assert index.match(node_id, node_type).canonical_id is None, node_id
+
+
+def test_ambiguous_and_weak_matches_are_not_mapped(tmp_path):
+    index = load_alias_index(MENTIONS_PATH, tmp_path)
+    report = AliasMatchReport()
+    node_ids = ["周启明", "周启明（项目经理）", "周启明先生", "NPGX 公司", "NPG"]
+    matches = index.match_many(node_ids, dict.fromkeys(node_ids, "Person") | {"NPGX 公司": "Organization", "NPG": "Organization"})
+    for match in matches.values():
+        report.add(match)
+
+    assert matches["周启明"].candidates == ["PER.ZQM_NPG", "PER.ZQM_VCM"] and matches["周启明"].canonical_id is None
+    assert matches["周启明（项目经理）"].ambiguous and matches["周启明（项目经理）"].method == "contained"
+    # Honorifics are not legal forms; "npg" may not match inside the word "npgx"
+    assert matches["周启明先生"].canonical_id is None and matches["NPGX 公司"].canonical_id is None
+    assert report.summary() == {
+        "matched": {"exact": 1, "normalized": 0, "contained": 0},
+        "unmatched": 2,
+        "ambiguous": {"周启明": ["PER.ZQM_NPG", "PER.ZQM_VCM"], "周启明（项目经理）": ["PER.ZQM_NPG", "PER.ZQM_VCM"]},
+    }
+
+
+def test_legal_form_and_type_helpers():
+    assert is_legal_form_suffix("") and is_legal_form_suffix(alias_key("股份有限公司")) and is_legal_form_suffix(" co ltd")
+    assert not is_legal_form_suffix("董事长") and not is_legal_form_suffix("子公司")
+    assert strip_qualifiers("周启明（项目经理）").strip() == "周启明"
+    assert types_agree("organization", "Organization") and types_agree("Person", None)
+    assert not types_agree("Unknown", "Organization") and not types_agree(None, "Organization")
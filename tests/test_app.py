@@ -4,7 +4,12 @@ import os
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import generate_graph, KnowledgeGraph, Node, Relationship
+import io
+import time
+
+from app import generate_graph, generate_graph_chunked, generate_graph_streaming, extract_documents, extract_document_incremental, extract_documents_checkpointed, get_compiled_chain, HUMAN_PROMPT_TEMPLATE, ChatPromptTemplate, KnowledgeGraph, Node, Relationship
+from src.extraction.cache import create_extraction_cache
+from src.extraction.document_packing import PACKED_DOC_ID
 
 # --- Integration Test ---
 
@@ -121,4 +126,822 @@ def test_generate_graph_with_mock_llm(mocker):
         ("human", "请从以下文本中提取知识图谱：\n\n{text}")
     ])
     mock_prompt_instance.__or__.assert_called_once_with(mock_structured_llm)
-    mock_chain.invoke.assert_called_once_with({"text": "some dummy text"})
\ No newline at end of file
+    mock_chain.invoke.assert_called_once_with({"text": "some dummy text", "doc_id": "未知", "doc_date": "未知", "source_name": "test_source"})
+
+
+def test_extract_documents_keeps_order_and_reports_errors(mocker):
+    """Concurrent extraction returns results in document order and isolates per-document failures."""
+    delays = {"d1": 0.05, "d2": 0.0, "d4": 0.01}
+
+    def fake_generate_graph(text, source, model_name, node_color, edge_color, rel_set_name, doc_id=None, doc_date=None, **kwargs):
+        if doc_id == "d3":
+            raise RuntimeError("429 Resource exhausted")
+        time.sleep(delays[doc_id])
+        return KnowledgeGraph(nodes=[Node(id=f"{doc_id}-node")], relationships=[])
+
+    mocker.patch('app.generate_graph', side_effect=fake_generate_graph)
+    documents = [
+        {"doc_id": doc_id, "source": f"{doc_id}.txt", "date": "2025-01-01", "text_with_sentence_ids": f"S1 {doc_id}"}
+        for doc_id in ("d1", "d2", "d3", "d4")
+    ]
+    documents.append({"doc_id": "d5", "source": "d5.txt", "date": "2025-01-01", "text_with_sentence_ids": ""})
+    completed_order = []
+
+    results = extract_documents(
+        documents, model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF",
+        rel_set_name="GraphRAG-RELSET-GenericWeb-zh", max_concurrency=4,
+        on_result=lambda index, result, completed: completed_order.append(index),
+    )
+
+    assert [result.doc_id for result in results] == ["d1", "d2", "d3", "d4", "d5"]
+    assert results[0].graph.nodes[0].id == "d1-node"
+    assert results[2].graph is None and "429" in results[2].error
+    assert results[4].skipped
+    assert sorted(completed_order) == [0, 1, 2, 3, 4]
+
+
+def test_generate_graph_cache_hit_skips_llm(mocker):
+    """A second extraction of the same document is served from the cache without creating an LLM client."""
+    mock_chain = mocker.MagicMock()
+    mock_chain.invoke.return_value = KnowledgeGraph(nodes=[Node(id="Node A", type="Person")], relationships=[])
+    mock_llm = mocker.MagicMock()
+    get_llm_mock = mocker.patch('app.get_llm', return_value=mock_llm)
+    mock_prompt_instance = mocker.MagicMock()
+    mock_prompt_instance.__or__.return_value = mock_chain
+    mocker.patch('app.ChatPromptTemplate.from_messages', return_value=mock_prompt_instance)
+    cache = create_extraction_cache("memory", cache_dir=None)
+
+    kwargs = dict(source="d1.txt", model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF",
+                  rel_set_name="GraphRAG-RELSET-GenericWeb-zh", doc_id="d1", doc_date="2025-03-12", cache=cache)
+    first = generate_graph("S1 NPG 与 BCRI 合作。", **kwargs)
+    second = generate_graph("S1 NPG 与 BCRI 合作。", **kwargs)
+
+    assert get_llm_mock.call_count == 1
+    assert mock_chain.invoke.call_count == 1
+    assert [node.id for node in second.nodes] == [node.id for node in first.nodes]
+    assert second.nodes[0].color == "#FFADAD"
+    assert second.metadata.doc_id == "d1"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    generate_graph("S1 NPG 与 BCRI 终止合作。", **kwargs)
+    assert mock_chain.invoke.call_count == 2
+    assert get_llm_mock.call_count == 1
+
+
+def test_compiled_chain_is_built_once_per_model_and_rel_set(mocker):
+    """The prompt and structured chain are compiled once and only document fields change between calls."""
+    mock_chain = mocker.MagicMock()
+    mock_chain.invoke.side_effect = lambda inputs: KnowledgeGraph(nodes=[Node(id=inputs["doc_id"])], relationships=[])
+    mock_llm = mocker.MagicMock()
+    get_llm_mock = mocker.patch('app.get_llm', return_value=mock_llm)
+    mock_chat_prompt_template = mocker.patch('app.ChatPromptTemplate.from_messages')
+    mock_chat_prompt_template.return_value.__or__.return_value = mock_chain
+
+    for doc_id in ("d1", "d2", "d3"):
+        graph = generate_graph(f"S1 {doc_id}", source=f"{doc_id}.txt", model_name="gemini-2.5-pro", node_color="#FFADAD",
+                               edge_color="#9BF6FF", rel_set_name="GraphRAG-RELSET-GenericWeb-zh", doc_id=doc_id, doc_date="2025-03-12")
+        assert graph.nodes[0].id == doc_id
+
+    get_llm_mock.assert_called_once_with("gemini-2.5-pro")
+    mock_llm.with_structured_output.assert_called_once_with(KnowledgeGraph)
+    mock_chat_prompt_template.assert_called_once()
+    system_prompt = mock_chat_prompt_template.call_args.args[0][0][1]
+    assert "- DOC_ID: {doc_id}" in system_prompt
+    assert "- SOURCE: {source_name}" in system_prompt
+    assert '"partner_with"' in system_prompt
+    assert mock_chain.invoke.call_args.args[0] == {"text": "S1 d3", "doc_id": "d3", "doc_date": "2025-03-12", "source_name": "d3.txt"}
+
+
+def test_compiled_chain_renders_same_prompt_as_template():
+    """Rendering the compiled prompt with document fields matches the ChatPromptTemplate output."""
+    compiled_chain = get_compiled_chain("gemini-2.5-pro", "GraphRAG-RELSET-GenericWeb-zh")
+    rendered = compiled_chain.render_system_prompt("d1", "2025-03-12", "《珊瑚湾日报》{特刊}")
+    prompt_value = ChatPromptTemplate.from_messages([
+        ("system", compiled_chain.system_prompt_with_variables), ("human", HUMAN_PROMPT_TEMPLATE)
+    ]).invoke(compiled_chain.build_input("S1 文本", "d1", "2025-03-12", "《珊瑚湾日报》{特刊}"))
+    # The rendered prompt is still in template syntax, so unescape doubled braces before comparing
+    assert prompt_value.messages[0].content == rendered.replace("{{", "{").replace("}}", "}")
+    assert "- SOURCE: 《珊瑚湾日报》{特刊}" in prompt_value.messages[0].content
+
+
+def test_generate_graph_chunked_remaps_evidence_and_merges_overlap(mocker):
+    """Chunk-local sentence IDs are mapped back to document IDs and facts found in the overlap are merged."""
+    text = "\n".join(f"S{index} " + "句" * 20 + "。" for index in range(1, 6))
+
+    def fake_generate_graph(chunk_text, source, model_name, node_color, edge_color, rel_set_name, doc_id=None, doc_date=None, **kwargs):
+        lines = chunk_text.splitlines()
+        assert lines[0].startswith("S1 ")
+        npg = Node(id="NPG", type="Organization", color=node_color)
+        hx1 = Node(id="海曦一号", type="Project", color=node_color)
+        # Every chunk reports the same fact, citing its own last local sentence
+        relationship = Relationship(source=npg, target=hx1, type="funds", evidence=[{"doc": "chunk", "sents": [len(lines)]}, {"doc": "chunk", "sents": [99]}], confidence=0.5 + 0.1 * len(lines))
+        # Cites only a sentence outside the chunk: nothing verifiable is left, so the fact is dropped
+        unsupported = Relationship(source=hx1, target=npg, type="funds", evidence=[{"doc": "chunk", "sents": [len(lines) + 1]}])
+        return KnowledgeGraph(nodes=[npg, hx1], relationships=[relationship, unsupported])
+
+    mocker.patch('app.generate_graph', side_effect=fake_generate_graph)
+    graph = generate_graph_chunked(text, source="d1.txt", model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF",
+                                   rel_set_name="GraphRAG-RELSET-GenericWeb-zh", doc_id="d1", doc_date="2025-03-12",
+                                   max_chunk_tokens=50, chunk_overlap=1, max_concurrency=3)
+
+    assert [node.id for node in graph.nodes] == ["NPG", "海曦一号"]
+    assert len(graph.relationships) == 1
+    merged = graph.relationships[0]
+    assert merged.evidence == [{"doc": "d1", "sents": [2, 3, 4, 5]}]
+    assert merged.confidence == pytest.approx(0.7)
+    assert graph.metadata.doc_id == "d1"
+
+
+def test_extract_documents_bounds_calls_across_documents_and_chunks(mocker):
+    """Long documents are chunked inside the document workers without exceeding max_concurrency calls in total."""
+    import threading
+    text = "\n".join(f"S{index} " + "句" * 20 + "。" for index in range(1, 9))
+    documents = [{"doc_id": f"d{index}", "source": f"d{index}.txt", "date": "2025-03-12", "text_with_sentence_ids": text} for index in range(3)]
+    lock, in_flight, peak = threading.Lock(), [0], [0]
+
+    def fake_generate_graph(chunk_text, *args, **kwargs):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return KnowledgeGraph(nodes=[], relationships=[])
+
+    generate_graph_mock = mocker.patch('app.generate_graph', side_effect=fake_generate_graph)
+    kwargs = dict(model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF", rel_set_name="GraphRAG-RELSET-GenericWeb-zh", max_chunk_tokens=50, chunk_overlap=0)
+    results = extract_documents(documents, max_concurrency=3, **kwargs)
+    assert all(result.graph is not None for result in results) and generate_graph_mock.call_count > 3
+    assert peak[0] <= 3
+
+    # A single long document gets the whole concurrency for its chunks
+    peak[0] = 0
+    extract_documents(documents[:1], max_concurrency=3, **kwargs)
+    assert peak[0] == 3
+
+
+def test_extract_documents_packs_short_documents_and_splits_by_evidence(mocker):
+    """Short documents share one LLM call and the result is split back per document using evidence[].doc."""
+    documents = [
+        {"doc_id": f"d{index}_news.txt", "source": f"d{index}_news.txt", "date": "2025-06-21", "text_with_sentence_ids": f"S1 NPG 与 BCRI 第{index}次合作。\nS2 海曦一号启动。"}
+        for index in (1, 2, 3)
+    ]
+    documents[1]["text_with_sentence_ids"] += "\nS3 生态环境局批复海曦一号。"
+    npg, bcri, hx1, eeb, brc = (Node(id="NPG", type="Organization"), Node(id="BCRI", type="Organization"), Node(id="海曦一号", type="Project"),
+                                Node(id="生态环境局", type="Organization"), Node(id="蓝珊研究所", type="Organization"))
+
+    def fake_generate_graph(text, source, model_name, node_color, edge_color, rel_set_name, doc_id=None, doc_date=None, **kwargs):
+        if doc_id != PACKED_DOC_ID:
+            # Documents with unattributable facts are extracted again on their own
+            assert doc_id == "d2_news.txt" and "=== DOC_ID" not in text
+            return KnowledgeGraph(nodes=[eeb, hx1], relationships=[Relationship(source=eeb, target=hx1, type="approves", evidence=[{"doc": "d2_news.txt", "sents": [3]}])])
+        assert text.count("=== DOC_ID: d") == 3
+        return KnowledgeGraph(nodes=[npg, bcri, hx1, eeb, brc], relationships=[
+            Relationship(source=npg, target=bcri, type="partner_with", evidence=[{"doc": "d1", "sents": [1]}, {"doc": "d3_news.txt", "sents": [1]}]),
+            Relationship(source=npg, target=hx1, type="funds", evidence=[{"doc": "d2_news.txt", "sents": [2]}]),
+            # Cites the header instead of a section: only d2 mentions both entities
+            Relationship(source=eeb, target=hx1, type="approves", evidence=[{"doc": PACKED_DOC_ID, "sents": [3]}]),
+            # Cites no packed document and no document mentions 深圳: dropped
+            Relationship(source=npg, target=Node(id="深圳"), type="located_in", evidence=[{"doc": "d9", "sents": [1]}]),
+        ])
+
+    generate_graph_mock = mocker.patch('app.generate_graph', side_effect=fake_generate_graph)
+    results = extract_documents(documents, model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF",
+                                rel_set_name="GraphRAG-RELSET-GenericWeb-zh", max_concurrency=2, pack_token_budget=2000)
+
+    assert generate_graph_mock.call_count == 2
+    assert [result.doc_id for result in results] == ["d1_news.txt", "d2_news.txt", "d3_news.txt"]
+    d1, d2, d3 = (result.graph for result in results)
+    assert [(rel.type, rel.evidence) for rel in d1.relationships] == [("partner_with", [{"doc": "d1_news.txt", "sents": [1]}])]
+    assert [(rel.type, rel.evidence) for rel in d2.relationships] == [("approves", [{"doc": "d2_news.txt", "sents": [3]}])]
+    assert [rel.type for rel in d3.relationships] == ["partner_with"]
+    assert d3.metadata.doc_id == "d3_news.txt"
+    # Nodes no document mentions are not assigned to any document
+    assert all({"深圳", "蓝珊研究所", "生态环境局"}.isdisjoint(node.id for node in graph.nodes) for graph in (d1, d3))
+
+
+def test_generate_graph_streaming_yields_relationships_before_the_call_ends(mocker):
+    """Facts are handed downstream as soon as their JSONL line is complete, then assembled into a KnowledgeGraph."""
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+
+    jsonl_output = "\n".join([
+        '{"head":{"text":"南海电力集团","type":"Organization"},"relation":"funds","tail":{"text":"海曦一号","type":"Project"},"qualifiers":{"amount":"2.4亿元"},"evidence":[{"doc":"d1","sents":[2]}],"confidence":0.84}',
+        '{"head":{"text":"incomplete"}}',
+        '{"head":{"text":"周启明","type":"Person"},"relation":"manages","tail":{"text":"海曦一号","type":"Project"},"evidence":[{"doc":"d1","sents":[5]}],"confidence":0.83}',
+    ])
+    streamed_chunks = []
+
+    class RecordingFakeChatModel(GenericFakeChatModel):
+        def _stream(self, *args, **kwargs):
+            for chunk in super()._stream(*args, **kwargs):
+                streamed_chunks.append(chunk.message.content)
+                yield chunk
+
+    mocker.patch('app.get_llm', return_value=RecordingFakeChatModel(messages=iter([AIMessage(content=jsonl_output)])))
+    received = []
+
+    def on_relationship(relationship):
+        received.append((relationship.type, len(streamed_chunks)))
+
+    graph = generate_graph_streaming("S1 ...", source="d1.txt", model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF",
+                                     rel_set_name="GraphRAG-RELSET-GenericWeb-zh", doc_id="d1", on_relationship=on_relationship)
+
+    assert [relation for relation, _ in received] == ["funds", "manages"]
+    assert received[0][1] < len(streamed_chunks)
+    assert sorted(node.id for node in graph.nodes) == sorted(["南海电力集团", "海曦一号", "周启明"])
+    assert graph.relationships[0].qualifiers == {"amount": "2.4亿元"}
+    assert graph.relationships[1].target is graph.relationships[0].target
+    assert all(node.color == "#FFADAD" for node in graph.nodes)
+    assert graph.metadata.doc_id == "d1"
+
+
+def test_extract_documents_prunes_rel_set_per_document(mocker):
+    """The pruned relation list reaches the compiled prompt, and the prompt-token savings are recorded."""
+    from app import REL_SETS
+    from src.extraction.relset_pruning import RelSetPruner
+
+    rel_set_name = "GraphRAG-RELSET-GenericWeb-zh"
+    full_chain = get_compiled_chain("gemini-2.5-pro", rel_set_name)
+    captured = {}
+
+    def fake_generate_graph(text, source, model_name, node_color, edge_color, rel_set_name, doc_id=None, doc_date=None, relation_names=None, **kwargs):
+        captured[doc_id] = relation_names
+        return KnowledgeGraph(nodes=[], relationships=[])
+
+    mocker.patch('app.generate_graph', side_effect=fake_generate_graph)
+    pruner = RelSetPruner(REL_SETS[rel_set_name])
+    documents = [{"doc_id": "d4", "source": "d4.txt", "date": "2025-06-21", "text_with_sentence_ids": "S1 有网帖称“海曦一号施工导致三头鲸搁浅”。\nS2 市生态环境局发布通告否认。"}]
+    extract_documents(documents, model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF",
+                      rel_set_name=rel_set_name, rel_set_pruner=pruner)
+
+    assert "releases" not in captured["d4"] and "denies" in captured["d4"]
+    pruned_chain = get_compiled_chain("gemini-2.5-pro", rel_set_name, captured["d4"])
+    # The prompt lists relations only through the substituted REL_SET, so pruned ones are gone entirely
+    pruned_out = [rel["name"] for rel in REL_SETS[rel_set_name]["relations"] if rel["name"] not in captured["d4"]]
+    assert pruned_out and all(f'"{name}"' in full_chain.system_prompt_template for name in pruned_out)
+    assert not any(f'"{name}"' in pruned_chain.system_prompt_template for name in pruned_out)
+    assert pruned_chain.system_prompt_tokens < full_chain.system_prompt_tokens
+    stats = pruner.stats()
+    assert stats["prompt_tokens_after"] < stats["prompt_tokens_before"]
+
+
+def test_extract_documents_cascade_escalates_low_confidence_documents(mocker):
+    """Only the document whose fast-model result fails the checks is sent to the stronger model."""
+    from langchain_core.runnables import RunnableLambda
+    from src.extraction.cascade import ModelCascade
+
+    calls = []
+
+    class FakeLLM:
+        def __init__(self, model_name):
+            self.model_name = model_name
+
+        def with_structured_output(self, schema):
+            def invoke(prompt_value):
+                text = prompt_value.to_string()
+                calls.append((self.model_name, "hard" in text))
+                confidence = 0.3 if "hard" in text and self.model_name == "gemini-1.5-flash" else 0.9
+                npg, bcri = Node(id="NPG", type="Organization"), Node(id="BCRI", type="Organization")
+                return schema(nodes=[npg, bcri], relationships=[
+                    Relationship(source=npg, target=bcri, type="partner_with", evidence=[{"doc": "d", "sents": [1]}], confidence=confidence)
+                ])
+            return RunnableLambda(invoke)
+
+    mocker.patch('app.get_llm', side_effect=FakeLLM)
+    cascade = ModelCascade(["gemini-1.5-flash", "gemini-2.5-pro"], min_mean_confidence=0.7)
+    documents = [
+        {"doc_id": "easy", "source": "easy.txt", "date": "2025-01-01", "text_with_sentence_ids": "S1 NPG 与 BCRI 合作 easy。"},
+        {"doc_id": "hard", "source": "hard.txt", "date": "2025-01-01", "text_with_sentence_ids": "S1 NPG 与 BCRI 合作 hard。"},
+    ]
+    results = extract_documents(documents, model_name="ignored", node_color="#FFADAD", edge_color="#9BF6FF",
+                                rel_set_name="GraphRAG-RELSET-GenericWeb-zh", cascade=cascade)
+
+    assert sorted(calls) == [("gemini-1.5-flash", False), ("gemini-1.5-flash", True), ("gemini-2.5-pro", True)]
+    assert [result.graph.relationships[0].confidence for result in results] == [0.9, 0.9]
+    assert cascade.stats()["tiers"]["gemini-2.5-pro"]["calls"] == 1
+
+
+def test_extract_document_incremental_reextracts_only_edited_window(mocker):
+    """After one sentence changes, only its window goes to the LLM; facts on unchanged sentences are kept, stale ones retracted."""
+    from src.extraction.incremental import DocumentSnapshotStore
+
+    npg, bcri, hx1 = Node(id="NPG", type="Organization"), Node(id="BCRI", type="Organization"), Node(id="海曦一号", type="Project")
+    calls = []
+
+    def fake_generate_graph(text, source, model_name, node_color, edge_color, rel_set_name, doc_id=None, doc_date=None, **kwargs):
+        calls.append(text)
+        if len(calls) == 1:
+            return KnowledgeGraph(nodes=[npg, bcri, hx1], relationships=[
+                Relationship(source=npg, target=bcri, type="partner_with", evidence=[{"doc": "d1", "sents": [1]}]),
+                Relationship(source=npg, target=hx1, type="funds", qualifiers={"amount": "2.4亿元"}, evidence=[{"doc": "d1", "sents": [3]}]),
+                Relationship(source=bcri, target=hx1, type="manages", evidence=[{"doc": "d1", "sents": [5]}]),
+            ])
+        # Window re-extraction: local S2 is the edited document sentence S3
+        return KnowledgeGraph(nodes=[npg, hx1], relationships=[
+            Relationship(source=npg, target=hx1, type="funds", qualifiers={"amount": "3亿元"}, evidence=[{"doc": "d1", "sents": [2]}]),
+        ])
+
+    mocker.patch('app.generate_graph', side_effect=fake_generate_graph)
+    store = DocumentSnapshotStore()
+    sentences = ["NPG 与 BCRI 合作。", "双方签署备忘录。", "NPG 为海曦一号出资2.4亿元。", "海曦一号位于新城海域。", "BCRI 管理海曦一号。"]
+    doc = {"doc_id": "d1", "source": "d1.txt", "date": "2025-03-12",
+           "text_with_sentence_ids": "\n".join(f"S{i} {t}" for i, t in enumerate(sentences, start=1))}
+    kwargs = dict(model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF", rel_set_name="GraphRAG-RELSET-GenericWeb-zh", snapshot_store=store)
+
+    extract_document_incremental(doc, **kwargs)
+    # Re-ingesting the identical document does not call the LLM
+    unchanged_graph = extract_document_incremental(doc, **kwargs)
+    assert len(calls) == 1 and len(unchanged_graph.relationships) == 3
+
+    sentences[2] = "NPG 为海曦一号出资3亿元。"
+    del sentences[3]
+    doc["text_with_sentence_ids"] = "\n".join(f"S{i} {t}" for i, t in enumerate(sentences, start=1))
+    graph = extract_document_incremental(doc, reextraction_window=1, **kwargs)
+
+    assert len(calls) == 2
+    assert calls[1] == "S1 双方签署备忘录。\nS2 NPG 为海曦一号出资3亿元。\nS3 BCRI 管理海曦一号。"
+    relationships = {(rel.type, rel.qualifiers.get("amount") if rel.qualifiers else None): rel.evidence for rel in graph.relationships}
+    assert relationships == {
+        ("partner_with", None): [{"doc": "d1", "sents": [1]}],
+        ("funds", "3亿元"): [{"doc": "d1", "sents": [3]}],
+        ("manages", None): [{"doc": "d1", "sents": [4]}],
+    }
+    assert store.stats()["unchanged"] == 1 and store.stats()["incremental"] == 1
+    assert store.stats()["relationships_retracted"] == 1
+
+
+def test_checkpointed_run_resumes_only_unfinished_documents(mocker, tmp_path):
+    """A run interrupted after some documents resumes without re-extracting them and rebuilds all results."""
+    from src.extraction.run_manifest import RunManifest
+
+    documents = [
+        {"doc_id": f"d{index}", "source": f"d{index}.txt", "date": "2025-03-12", "text_with_sentence_ids": f"S1 文档{index}。"}
+        for index in range(1, 5)
+    ]
+    documents.append({"doc_id": "empty", "source": "empty.txt", "date": "2025-03-12", "text_with_sentence_ids": ""})
+    extracted = []
+
+    def fake_generate_graph(text, source, model_name, node_color, edge_color, rel_set_name, doc_id=None, doc_date=None, **kwargs):
+        extracted.append(doc_id)
+        if doc_id == "d3" and len(extracted) <= 4:
+            raise RuntimeError("session died")
+        return KnowledgeGraph(nodes=[Node(id=doc_id)], relationships=[])
+
+    mocker.patch('app.generate_graph', side_effect=fake_generate_graph)
+    kwargs = dict(model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF", rel_set_name="GraphRAG-RELSET-GenericWeb-zh")
+    run = RunManifest.create(tmp_path, documents)
+    first_results = extract_documents_checkpointed(documents, run, **kwargs)
+    assert first_results[2].error == "session died"
+    assert sorted(extracted) == ["d1", "d2", "d3", "d4"]
+
+    progress = []
+    resumed_run = RunManifest.load(run.run_dir)
+    results = extract_documents_checkpointed(resumed_run.load_documents(), resumed_run, on_result=lambda index, result, completed: progress.append(completed), **kwargs)
+
+    assert extracted[4:] == ["d3"]
+    assert [result.graph.nodes[0].id for result in results[:4]] == ["d1", "d2", "d3", "d4"]
+    assert results[4].skipped
+    assert sorted(progress) == [1, 2, 3, 4, 5]
+    assert RunManifest.load(run.run_dir).summary()["finished"] == 5
+
+
+
+def test_checkpointed_run_resumes_duplicates_and_repeated_doc_ids(mocker, tmp_path):
+    """Duplicates come back as duplicates on resume, and two inputs with the same doc_id keep their own graphs."""
+    from src.extraction.near_duplicates import NearDuplicateDetector
+    from src.extraction.run_manifest import RunManifest
+
+    def fake_extract_document(doc_data, **kwargs):
+        return KnowledgeGraph(nodes=[Node(id=doc_data["source"])], relationships=[])
+
+    mocker.patch('app.extract_document', side_effect=fake_extract_document)
+    text = "S1 珊瑚湾市政府今日签署联合备忘录，南海电力集团出资2.4亿元建设海上风电场。\nS2 南海电力集团与蓝珊研究所将共同开展珊瑚复育监测，合作期限为五年。"
+    documents = [
+        {"doc_id": "d1", "source": "dir/d1.txt", "date": "2025-03-12", "text_with_sentence_ids": text},
+        {"doc_id": "d1-repost", "source": "repost.txt", "date": "2025-03-13", "text_with_sentence_ids": text},
+        {"doc_id": "d1", "source": "upload/d1.txt", "date": "2025-03-12", "text_with_sentence_ids": "S1 海曦一号完成并网。"},
+    ]
+    kwargs = dict(model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF", rel_set_name="GraphRAG-RELSET-GenericWeb-zh")
+    run = RunManifest.create(tmp_path, documents)
+    extract_documents_checkpointed(documents, run, duplicate_detector=NearDuplicateDetector(threshold=0.6), **kwargs)
+
+    resumed_run = RunManifest.load(run.run_dir)
+    results = extract_documents_checkpointed(resumed_run.load_documents(), resumed_run, **kwargs)
+    assert results[1].duplicate_of == "d1" and not results[1].skipped
+    assert [results[index].graph.nodes[0].id for index in (0, 2)] == ["dir/d1.txt", "upload/d1.txt"]
+
+
+def test_extract_documents_records_call_metrics_and_stops_at_budget(mocker):
+    """Each LLM call is measured; once the token budget is spent the remaining documents are not sent."""
+    from langchain_core.runnables import RunnableLambda
+    from src.extraction.metrics import RunMetrics
+
+    calls = []
+
+    class FakeLLM:
+        def with_structured_output(self, schema):
+            def invoke(prompt_value):
+                calls.append(prompt_value.to_string())
+                npg, bcri = Node(id="NPG", type="Organization"), Node(id="BCRI", type="Organization")
+                return schema(nodes=[npg, bcri], relationships=[
+                    Relationship(source=npg, target=bcri, type="partner_with", evidence=[{"doc": "d", "sents": [1]}], confidence=0.9)
+                ])
+            return RunnableLambda(invoke)
+
+    mocker.patch('app.get_llm', return_value=FakeLLM())
+    documents = [
+        {"doc_id": f"d{i}", "source": f"d{i}.txt", "date": "2025-01-01", "text_with_sentence_ids": f"S1 NPG 与 BCRI 第 {i} 次合作。"}
+        for i in range(3)
+    ]
+    metrics = RunMetrics(budget_tokens=1)
+    results = extract_documents(documents, model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF",
+                                rel_set_name="GraphRAG-RELSET-GenericWeb-zh", metrics=metrics)
+
+    assert len(calls) == 1
+    assert results[0].graph is not None
+    assert all("budget" in result.error for result in results[1:])
+    summary = metrics.summary()
+    assert summary["llm_calls"] == 1 and summary["calls_refused_by_budget"] == 2
+    # The fake model reports no usage metadata, so token counts fall back to the local estimate
+    assert summary["calls_with_estimated_tokens"] == 1 and summary["prompt_tokens"] > 0
+    assert summary["per_document"]["d0"]["nodes"] == 2 and summary["per_document"]["d0"]["edges"] == 1
+
+
+def test_generate_graph_replays_recorded_responses_offline(mocker, tmp_path):
+    """A run recorded once can be replayed through the same pipeline without the live model."""
+    import app
+    from langchain_core.runnables import RunnableLambda
+
+    live_calls = []
+
+    class FakeGemini:
+        def __init__(self, **kwargs):
+            pass
+
+        def with_structured_output(self, schema):
+            def invoke(prompt_value):
+                live_calls.append(prompt_value)
+                npg, bcri = Node(id="NPG", type="Organization"), Node(id="BCRI", type="Organization")
+                return schema(nodes=[npg, bcri], relationships=[Relationship(source=npg, target=bcri, type="partner_with", evidence=[{"doc": "d1", "sents": [1]}])])
+            return RunnableLambda(invoke)
+
+    mocker.patch('app.ChatGoogleGenerativeAI', FakeGemini)
+    mocker.patch('app.LLM_RECORDINGS_DIR', tmp_path)
+    kwargs = dict(source="d1.txt", model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF",
+                  rel_set_name="GraphRAG-RELSET-GenericWeb-zh", doc_id="d1", doc_date="2025-03-12")
+
+    app.clear_compiled_chains()
+    mocker.patch('app.LLM_BACKEND', "record")
+    recorded = generate_graph("S1 NPG 与 BCRI 合作。", **kwargs)
+
+    app.clear_compiled_chains()
+    mocker.patch('app.LLM_BACKEND', "replay")
+    replayed = generate_graph("S1 NPG 与 BCRI 合作。", **kwargs)
+    app.clear_compiled_chains()
+
+    assert len(live_calls) == 1
+    assert [(r.source.id, r.type, r.target.id) for r in replayed.relationships] == [(r.source.id, r.type, r.target.id) for r in recorded.relationships]
+
+
+def test_extract_documents_adds_pdf_pages_to_evidence(mocker):
+    """Evidence of PDF documents carries the pages its sentences came from."""
+    def fake_generate_graph(text, source, model_name, node_color, edge_color, rel_set_name, doc_id=None, doc_date=None, **kwargs):
+        npg, bcri = Node(id="NPG"), Node(id="BCRI")
+        return KnowledgeGraph(nodes=[npg, bcri], relationships=[
+            Relationship(source=npg, target=bcri, type="partner_with", evidence=[{"doc": doc_id, "sents": [2, 5]}]),
+        ])
+
+    mocker.patch('app.generate_graph', side_effect=fake_generate_graph)
+    documents = [
+        {"doc_id": "report.pdf", "source": "report.pdf", "date": "2025-01-01", "text_with_sentence_ids": "S1 a。\nS2 b。\nS3 c。\nS4 d。\nS5 e。", "page_starts": [[1, 1], [3, 2], [5, 7]]},
+        {"doc_id": "memo.txt", "source": "memo.txt", "date": "2025-01-01", "text_with_sentence_ids": "S1 a。"},
+    ]
+    results = extract_documents(documents, model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF", rel_set_name="GraphRAG-RELSET-GenericWeb-zh")
+
+    assert results[0].graph.relationships[0].evidence == [{"doc": "report.pdf", "sents": [2, 5], "pages": [1, 7]}]
+    assert "pages" not in results[1].graph.relationships[0].evidence[0]
+
+
+def test_unannotated_documents_get_sentence_ids_and_evidence_resolves():
+    from app import build_sentence_indexes, ensure_sentence_ids, resolve_evidence_sentences
+
+    plain = ensure_sentence_ids({"doc_id": "paste", "text_with_sentence_ids": "NPG 与 BCRI 合作。BCRI 负责监测。"})
+    corpus = {"doc_id": "d1", "text_with_sentence_ids": "S1 已标注。\nS3 保留原编号。"}
+    assert plain["text_with_sentence_ids"] == "S1 NPG 与 BCRI 合作。\nS2 BCRI 负责监测。"
+    assert ensure_sentence_ids(corpus) is corpus
+
+    indexes = build_sentence_indexes([plain, corpus])
+    assert resolve_evidence_sentences([{"doc": "paste", "sents": [2]}, {"doc": "d1", "sents": [3, 2]}], indexes) == [
+        "[paste S2] BCRI 负责监测。",
+        "[d1 S3] 保留原编号。",
+        "[d1 S2] （未找到该句）",
+    ]
+
+
+def test_sync_watched_folder_extracts_changed_files_and_retracts_deleted_ones(mocker, tmp_path):
+    """Only new or edited files reach the LLM; a deleted file's relationships leave the merged graph."""
+    import json
+    from app import sync_watched_folder
+    from src.extraction.folder_manifest import FolderManifest
+
+    extracted_doc_ids = []
+
+    def fake_extract_document(doc_data, **kwargs):
+        extracted_doc_ids.append(doc_data["doc_id"])
+        head, tail = Node(id=doc_data["doc_id"], type="Document"), Node(id="NPG", type="Organization")
+        return KnowledgeGraph(nodes=[head, tail], relationships=[
+            Relationship(source=head, target=tail, type="mentions", evidence=[{"doc": doc_data["doc_id"], "sents": [1]}])
+        ])
+
+    mocker.patch('app.extract_document', side_effect=fake_extract_document)
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "a.txt").write_text("NPG 出资。", encoding="utf-8")
+    (corpus / "b.txt").write_text("NPG 中标。", encoding="utf-8")
+    manifest = FolderManifest(corpus, tmp_path / "state")
+    kwargs = dict(parse_workers=1, model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF", rel_set_name="GraphRAG-RELSET-GenericWeb-zh")
+
+    def sync():
+        return sync_watched_folder(manifest, manifest.scan(sorted(corpus.iterdir())), **kwargs)
+
+    assert sync()["relationships"] == 2 and extracted_doc_ids == ["a.txt", "b.txt"]
+    assert sync()["documents_extracted"] == 0
+
+    (corpus / "a.txt").write_text("NPG 追加出资。", encoding="utf-8")
+    (corpus / "b.txt").unlink()
+    summary = sync()
+    assert (summary["modified"], summary["deleted"], summary["relationships"]) == (1, 1, 1)
+    assert extracted_doc_ids == ["a.txt", "b.txt", "a.txt"]
+    corpus_graph = json.loads((tmp_path / "state" / "graph.json").read_text(encoding="utf-8"))
+    assert [relationship["source"]["id"] for relationship in corpus_graph["relationships"]] == ["a.txt"]
+
+
+def test_extract_documents_sends_one_document_per_duplicate_group(mocker):
+    """Copies are not sent to the LLM; their sentences become extra evidence on the representative's relationships."""
+    from src.extraction.near_duplicates import NearDuplicateDetector
+
+    extracted_doc_ids = []
+
+    def fake_extract_document(doc_data, **kwargs):
+        extracted_doc_ids.append(doc_data["doc_id"])
+        npg, bcri = Node(id="NPG", type="Organization"), Node(id="BCRI", type="Organization")
+        return KnowledgeGraph(nodes=[npg, bcri], relationships=[
+            Relationship(source=npg, target=bcri, type="partner_with", evidence=[{"doc": doc_data["doc_id"], "sents": [2]}])
+        ])
+
+    mocker.patch('app.extract_document', side_effect=fake_extract_document)
+    text = "S1 珊瑚湾市政府今日签署联合备忘录，南海电力集团出资2.4亿元建设海上风电场。\nS2 南海电力集团与蓝珊研究所将共同开展珊瑚复育监测，合作期限为五年。"
+    documents = [
+        {"doc_id": "d1", "source": "d1.txt", "date": "2025-03-12", "text_with_sentence_ids": text},
+        {"doc_id": "d1-repost", "source": "repost.txt", "date": "2025-03-13", "text_with_sentence_ids": "S1 来源：珊瑚湾日报。\n" + text.replace("S1 ", "S2 ", 1).replace("\nS2 ", "\nS3 ")},
+    ]
+    detector = NearDuplicateDetector(threshold=0.6)
+    results = extract_documents(documents, model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF",
+                                rel_set_name="GraphRAG-RELSET-GenericWeb-zh", duplicate_detector=detector)
+
+    assert extracted_doc_ids == ["d1"]
+    assert results[1].duplicate_of == "d1" and results[1].graph is None and results[1].error is None
+    assert results[0].graph.relationships[0].evidence == [{"doc": "d1", "sents": [2]}, {"doc": "d1-repost", "sents": [3], "duplicate_of": "d1"}]
+    assert detector.stats()["calls_saved"] == 1
+
+
+def test_load_documents_from_archive_uses_member_paths_as_doc_ids():
+    """The shipped CoralWind archive is read member by member; markdown and text members become documents."""
+    from app import load_documents_from_archive
+
+    documents = load_documents_from_archive("coralwind.zip", "coralwind.zip")
+    doc_ids = [doc["doc_id"] for doc in documents]
+    assert "GraphRAG-Extract-Best-Example-CoralWind-zh/corpus/d1_news_2025-03-12.txt" in doc_ids
+    assert len([doc_id for doc_id in doc_ids if "/corpus/" in doc_id]) == 8
+    d1 = next(doc for doc in documents if doc["doc_id"].endswith("d1_news_2025-03-12.txt"))
+    with open("GraphRAG-Extract-Best-Example-CoralWind-zh/corpus/d1_news_2025-03-12.txt", encoding="utf-8") as corpus_file:
+        assert d1["text_with_sentence_ids"] == corpus_file.read()
+
+
+def test_html_pages_are_reduced_to_main_content_before_sentence_ids(tmp_path):
+    """Directory import keeps only the article of a saved web page; the full mode keeps the navigation text."""
+    import shutil
+    from app import ensure_sentence_ids, load_documents_from_directory
+
+    shutil.copy("benchmarks/fixtures/html/news_zh_haixi.html", tmp_path / "news.html")
+    main_doc = ensure_sentence_ids(load_documents_from_directory(tmp_path, max_workers=1, html_mode="main")[0])
+    full_doc = load_documents_from_directory(tmp_path, max_workers=1, html_mode="full")[0]
+
+    assert main_doc["text_with_sentence_ids"].startswith("S1 海曦一号海上风电场获批 珊瑚复育同步启动\n")
+    assert "24小时热榜" not in main_doc["text_with_sentence_ids"] and "24小时热榜" in full_doc["text_with_sentence_ids"]
+
+
+def test_uploaded_docx_text_includes_table_rows():
+    """Uploaded DOCX files are read with the streaming extractor, so table rows reach the extraction prompt."""
+    import io
+    import docx
+    from app import get_text_from_file
+
+    document = docx.Document()
+    document.add_paragraph("S1 三方合计投入3.2亿元。")
+    table = document.add_table(rows=1, cols=3)
+    for column_index, value in enumerate(["珊瑚移植", "0.45", "蓝珊研究所"]):
+        table.cell(0, column_index).text = value
+    uploaded_file = io.BytesIO()
+    document.save(uploaded_file)
+    uploaded_file.seek(0)
+    uploaded_file.name = "memo.docx"
+
+    assert get_text_from_file(uploaded_file) == "S1 三方合计投入3.2亿元。\n珊瑚移植 0.45 蓝珊研究所"
+
+
+def test_normalize_entities_with_compiled_alias_index_matches_mentions_list(tmp_path):
+    """Normalizing with the compiled alias index gives the same graph as the parsed mentions records."""
+    import json
+    from app import normalize_entities
+    from src.extraction.alias_index import load_alias_index
+
+    mentions_path = "GraphRAG-Extract-Best-Example-CoralWind-zh/gold/mentions.jsonl"
+    with open(mentions_path, encoding="utf-8") as mentions_file:
+        mentions_data = [json.loads(line) for line in mentions_file if line.strip()]
+
+    def build_graph():
+        npg, npg_alias, bcri = Node(id="NPG", type="Organization"), Node(id="南海电力集团", type="Unknown"), Node(id="BCRI", type="Organization")
+        return KnowledgeGraph(nodes=[npg, npg_alias, bcri], relationships=[Relationship(source=npg, target=bcri, type="partner_with")])
+
+    from_index = normalize_entities(build_graph(), load_alias_index(mentions_path, tmp_path))
+    from_list = normalize_entities(build_graph(), mentions_data)
+
+    assert [node.id for node in from_index.nodes] == [node.id for node in from_list.nodes] == ["ORG.NPG", "ORG.BCRI"]
+    assert (from_index.relationships[0].source.id, from_index.relationships[0].target.id) == ("ORG.NPG", "ORG.BCRI")
+
+
+def test_normalize_entities_merges_decorated_ids_and_reports_ambiguous_ones(tmp_path):
+    """Decorated LLM node IDs reach their canonical entity; the bare, ambiguous 周启明 is left alone and reported."""
+    from app import normalize_entities
+    from src.extraction.alias_index import load_alias_index
+    from src.extraction.alias_matching import AliasMatchReport
+
+    npg, npg_full = Node(id="NPG", type="Organization"), Node(id="南海电力集团有限公司", type="Organization")
+    pm, zqm = Node(id="周启明 (NPG)", type="Person"), Node(id="周启明", type="Person")
+    graph = KnowledgeGraph(nodes=[npg, npg_full, pm, zqm], relationships=[
+        Relationship(source=pm, target=npg_full, type="works_for"),
+        Relationship(source=zqm, target=npg, type="works_for"),
+    ])
+    report = AliasMatchReport()
+    normalized = normalize_entities(graph, load_alias_index("GraphRAG-Extract-Best-Example-CoralWind-zh/gold/mentions.jsonl", tmp_path), match_report=report)
+
+    assert [node.id for node in normalized.nodes] == ["ORG.NPG", "PER.ZQM_NPG", "周启明"]
+    assert [(rel.source.id, rel.target.id) for rel in normalized.relationships] == [("PER.ZQM_NPG", "ORG.NPG"), ("周启明", "ORG.NPG")]
+    assert report.ambiguous == {"周启明": ["PER.ZQM_NPG", "PER.ZQM_VCM"]}
+
+
+def test_resolve_entities_merges_alias_edges_and_index_hits_under_not_same_as(tmp_path):
+    """alias_of edges and alias-index hits merge across documents; not_same_as keeps the two 周启明 apart."""
+    from app import resolve_entities
+    from src.extraction.alias_index import load_alias_index
+    from src.extraction.entity_resolution import EntityResolver
+
+    npg, npg_short, bcri = Node(id="南海电力集团有限公司", type="Organization"), Node(id="南电", type="Unknown"), Node(id="BCRI", type="Organization")
+    pm_npg, pm_vcm = Node(id="周启明 (NPG)", type="Person"), Node(id="周启明 (VCM)", type="Person")
+    pm_bare = Node(id="周总", type="Person", properties={"title": "总经理"})
+    graph = KnowledgeGraph(nodes=[npg, npg_short, bcri, pm_npg, pm_vcm, pm_bare], relationships=[
+        Relationship(source=npg_short, target=npg, type="alias_of"),
+        Relationship(source=pm_bare, target=pm_npg, type="alias_of"),
+        Relationship(source=pm_bare, target=pm_vcm, type="alias_of"),
+        Relationship(source=pm_npg, target=pm_vcm, type="not_same_as"),
+        Relationship(source=pm_bare, target=npg_short, type="works_for"),
+    ])
+    resolver = EntityResolver()
+    resolved = resolve_entities(graph, load_alias_index("GraphRAG-Extract-Best-Example-CoralWind-zh/gold/mentions.jsonl", tmp_path), resolver=resolver)
+
+    assert [node.id for node in resolved.nodes] == ["ORG.NPG", "ORG.BCRI", "PER.ZQM_NPG", "周启明 (VCM)"]
+    assert resolved.nodes[2].properties == {"title": "总经理"}
+    assert [(rel.type, rel.source.id, rel.target.id) for rel in resolved.relationships] == [
+        ("alias_of", "PER.ZQM_NPG", "周启明 (VCM)"),
+        ("not_same_as", "PER.ZQM_NPG", "周启明 (VCM)"),
+        ("works_for", "PER.ZQM_NPG", "ORG.NPG"),
+    ]
+    assert resolver.stats()["blocked_merges"] == {"alias_of": 1}
+
+
+def test_extract_document_incremental_keeps_relationships_without_evidence_of_this_document(mocker):
+    """Re-ingesting an unchanged document returns the snapshot graph; facts citing no sentence survive edits."""
+    from src.extraction.incremental import DocumentSnapshotStore
+
+    npg, bcri, hx1 = Node(id="NPG", type="Organization"), Node(id="BCRI", type="Organization"), Node(id="海曦一号", type="Project")
+    calls = []
+
+    def fake_generate_graph(text, source, model_name, node_color, edge_color, rel_set_name, doc_id=None, doc_date=None, **kwargs):
+        calls.append(text)
+        if len(calls) == 1:
+            return KnowledgeGraph(nodes=[npg, bcri, hx1], relationships=[
+                Relationship(source=npg, target=bcri, type="partner_with"),
+                Relationship(source=bcri, target=hx1, type="manages", evidence=[{"doc": "d1", "sents": [2]}]),
+            ])
+        return KnowledgeGraph(nodes=[], relationships=[])
+
+    mocker.patch('app.generate_graph', side_effect=fake_generate_graph)
+    store = DocumentSnapshotStore()
+    doc = {"doc_id": "d1", "source": "d1.txt", "date": "2025-03-12", "text_with_sentence_ids": "S1 NPG 与 BCRI 合作。\nS2 BCRI 管理海曦一号。\nS3 项目位于新城海域。"}
+    kwargs = dict(model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF", rel_set_name="GraphRAG-RELSET-GenericWeb-zh", snapshot_store=store)
+
+    extract_document_incremental(doc, **kwargs)
+    unchanged_graph = extract_document_incremental(doc, **kwargs)
+    assert len(calls) == 1 and len(unchanged_graph.relationships) == 2
+    assert store.stats()["unchanged"] == 1 and store.stats()["relationships_retracted"] == 0
+
+    doc["text_with_sentence_ids"] = "S1 NPG 与 BCRI 合作。\nS2 BCRI 管理海曦一号。\nS3 项目位于新城东侧海域。"
+    edited_graph = extract_document_incremental(doc, **kwargs)
+    assert len(calls) == 2
+    assert sorted(rel.type for rel in edited_graph.relationships) == ["manages", "partner_with"]
+    assert [rel.evidence for rel in edited_graph.relationships if rel.type == "manages"] == [[{"doc": "d1", "sents": [2]}]]
+    assert store.stats()["relationships_retracted"] == 0
+
+
+def test_extract_document_incremental_retracts_facts_cited_under_a_short_doc_alias(mocker):
+    """Evidence citing the document as "d1" is stored under its full ID, so editing the cited sentence still retracts the fact."""
+    from src.extraction.incremental import DocumentSnapshotStore
+
+    npg, bcri, hx1 = Node(id="NPG", type="Organization"), Node(id="BCRI", type="Organization"), Node(id="海曦一号", type="Project")
+    calls = []
+
+    def fake_generate_graph(text, source, model_name, node_color, edge_color, rel_set_name, doc_id=None, doc_date=None, **kwargs):
+        calls.append(text)
+        if len(calls) == 1:
+            return KnowledgeGraph(nodes=[npg, bcri, hx1], relationships=[
+                Relationship(source=npg, target=bcri, type="partner_with", evidence=[{"doc": "d1", "sents": [1]}]),
+                Relationship(source=bcri, target=hx1, type="manages", evidence=[{"doc": "d1", "sents": [2]}]),
+            ])
+        return KnowledgeGraph(nodes=[], relationships=[])
+
+    mocker.patch('app.generate_graph', side_effect=fake_generate_graph)
+    store = DocumentSnapshotStore()
+    doc = {"doc_id": "d1_news_2025-03-12", "source": "d1_news_2025-03-12.txt", "date": "2025-03-12",
+           "text_with_sentence_ids": "S1 NPG 与 BCRI 合作。\nS2 BCRI 管理海曦一号。\nS3 项目位于新城海域。"}
+    kwargs = dict(model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF", rel_set_name="GraphRAG-RELSET-GenericWeb-zh", snapshot_store=store)
+
+    extract_document_incremental(doc, **kwargs)
+    doc["text_with_sentence_ids"] = "S1 NPG 与 BCRI 合作。\nS2 NPG 管理海曦一号。\nS3 项目位于新城海域。"
+    edited_graph = extract_document_incremental(doc, reextraction_window=0, **kwargs)
+
+    assert len(calls) == 2
+    assert [(rel.type, rel.evidence) for rel in edited_graph.relationships] == [("partner_with", [{"doc": "d1_news_2025-03-12", "sents": [1]}])]
+    assert store.stats()["relationships_retracted"] == 1
+    # Nodes are kept only through kept relationships or the re-extracted window
+    assert {node.id for node in edited_graph.nodes} == {"NPG", "BCRI"}
+
+
+def test_resolve_entities_follows_the_prompt_alias_of_self_edge_shape():
+    """alias_of(PROJ.HX1→PROJ.HX1, alias=海曦一期) merges the alias node into the head and the self-edge itself is kept."""
+    from app import resolve_entities
+    from src.extraction.entity_resolution import EntityResolver
+
+    hx1, hx1_alias, npg = Node(id="PROJ.HX1", type="Project"), Node(id="海曦一期", type="Project"), Node(id="ORG.NPG", type="Organization")
+    graph = KnowledgeGraph(nodes=[hx1, npg, hx1_alias], relationships=[
+        Relationship(source=hx1, target=hx1, type="alias_of", qualifiers={"alias": "海曦一期"}, evidence=[{"doc": "d1", "sents": [5]}]),
+        Relationship(source=npg, target=hx1_alias, type="funds"),
+    ])
+    resolver = EntityResolver()
+    resolved = resolve_entities(graph, resolver=resolver)
+
+    assert [node.id for node in resolved.nodes] == ["PROJ.HX1", "ORG.NPG"]
+    assert [(rel.type, rel.source.id, rel.target.id) for rel in resolved.relationships] == [("alias_of", "PROJ.HX1", "PROJ.HX1"), ("funds", "ORG.NPG", "PROJ.HX1")]
+    assert resolver.stats()["unions"] == {"alias_of": 1}
+
+
+def test_markdown_files_are_streamed_through_the_corpus_parser(tmp_path):
+    """Directory and uploaded .md files are read line by line; the parse workers leave them unread."""
+    from app import load_documents_from_directory, process_markdown_content
+
+    corpus = ("前言\n# /corpus/d1_news_2025-03-12.txt\n# 元数据: source=《珊瑚湾日报》, date=2025-03-12, id=d1\nS1 NPG 与 BCRI 合作。\n"
+              "# /corpus/d2_brief_2025-05-01.txt\n# 元数据: source=BCRI科研简报, date=2025-05-01, id=d2\nS1 海曦一号启动。\n")
+    (tmp_path / "corpus.md").write_text(corpus, encoding="utf-8")
+    (tmp_path / "notes.md").write_text("# 标题\n**NPG** 出资。\n", encoding="utf-8")
+
+    documents = load_documents_from_directory(tmp_path, max_workers=1)
+    assert [(doc["doc_id"], doc["source"], doc["text_with_sentence_ids"]) for doc in documents] == [
+        ("d1_news_2025-03-12", "《珊瑚湾日报》", "S1 NPG 与 BCRI 合作。"),
+        ("d2_brief_2025-05-01", "BCRI科研简报", "S1 海曦一号启动。"),
+        ("notes.md", "notes.md", " 标题\nNPG 出资。\n"),
+    ]
+    uploaded = io.BytesIO(corpus.encode("utf-8"))
+    assert [doc["doc_id"] for doc in process_markdown_content(uploaded, "corpus.md", "corpus.md")] == ["d1_news_2025-03-12", "d2_brief_2025-05-01"]
+
+
+def test_undated_files_use_their_modification_date_so_cache_keys_survive_a_new_day(tmp_path, mocker):
+    from app import build_extraction_cache_key, load_documents_from_directory
+
+    (tmp_path / "a.txt").write_text("NPG 出资。", encoding="utf-8")
+    (tmp_path / "b.md").write_text("NPG 中标。", encoding="utf-8")
+    modified_at = time.mktime((2024, 1, 2, 12, 0, 0, 0, 0, -1))
+    for name in ("a.txt", "b.md"):
+        os.utime(tmp_path / name, (modified_at, modified_at))
+
+    documents = load_documents_from_directory(tmp_path, max_workers=1)
+    assert [(doc["doc_id"], doc["date"]) for doc in documents] == [("a.txt", "2024-01-02"), ("b.md", "2024-01-02")]
+
+    compiled_chain = get_compiled_chain("gemini-2.5-pro", "GraphRAG-RELSET-GenericWeb-zh")
+    doc = documents[0]
+    cache_key = build_extraction_cache_key(compiled_chain, doc["text_with_sentence_ids"], doc["doc_id"], doc["date"], doc["source"])
+    # Re-run on another day: only dates derived from the clock would change
+    real_strftime = time.strftime
+    mocker.patch('time.strftime', side_effect=lambda fmt, *args: real_strftime(fmt, *args) if args else real_strftime(fmt, time.localtime(time.time() + 86400)))
+    rerun = load_documents_from_directory(tmp_path, max_workers=1)[0]
+    assert build_extraction_cache_key(compiled_chain, rerun["text_with_sentence_ids"], rerun["doc_id"], rerun["date"], rerun["source"]) == cache_key
@@ -0,0 +1,93 @@
+import gzip
+import io
+import os
+import sys
+import tarfile
+import zipfile
+
+import docx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.parsers.archive_loader import archive_kind, iter_archive_files
+
+MEMBERS = {
+    "corpus/d1.txt": "S1 珊瑚湾市政府签署备忘录。\r\nS2 NPG 出资。".encode("utf-8"),
+    "corpus/notes.csv": b"ignored",
+    "__MACOSX/corpus/._d1.txt": b"\x00\x05resource fork",
+    "corpus/broken.pdf": b"not a pdf",
+}
+
+
+def docx_bytes():
+    document = docx.Document()
+    document.add_paragraph("S1 NPG 与 BCRI 合作。")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def make_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("corpus/", "")
+        for name, data in {**MEMBERS, "corpus/memo.docx": docx_bytes()}.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def make_tar_gz():
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in {**MEMBERS, "corpus/memo.docx": docx_bytes()}.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+class NonSeekable(io.RawIOBase):
+    """An upload stream that can only be read forward."""
+
+    def __init__(self, data):
+        self._buffer = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        chunk = self._buffer.read(len(target))
+        target[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def test_zip_and_tar_members_are_parsed_in_memory_with_archive_relative_names(tmp_path):
+    for source, name in ((make_zip(), "corpus.zip"), (make_tar_gz(), "corpus.tar.gz"), (NonSeekable(make_tar_gz().getvalue()), "corpus.tgz")):
+        parsed = {parsed_file.relative_name: parsed_file for parsed_file in iter_archive_files(source, name)}
+        assert sorted(parsed) == ["corpus/broken.pdf", "corpus/d1.txt", "corpus/memo.docx"], name
+        assert parsed["corpus/d1.txt"].text == "S1 珊瑚湾市政府签署备忘录。\nS2 NPG 出资。"
+        assert parsed["corpus/memo.docx"].text == "S1 NPG 与 BCRI 合作。"
+        assert parsed["corpus/broken.pdf"].error is not None and parsed["corpus/d1.txt"].error is None
+
+    archive_path = tmp_path / "corpus.zip"
+    archive_path.write_bytes(make_zip().getvalue())
+    assert len(list(iter_archive_files(archive_path))) == 3
+    assert os.listdir(tmp_path) == ["corpus.zip"]
+
+
+def test_archive_kind_recognizes_supported_names():
+    assert [archive_kind(name) for name in ("a.ZIP", "a.tar.gz", "a.tgz", "a.tar", "a.gz", "a.txt")] == ["zip", "tar", "tar", "tar", "gzip", None]
+
+
+def test_single_gzip_file_is_parsed_as_one_document(tmp_path):
+    data = gzip.compress("S1 珊瑚湾市政府签署备忘录。".encode("utf-8"))
+    parsed = list(iter_archive_files(io.BytesIO(data), "uploads/d1.txt.gz"))
+    assert [(parsed_file.relative_name, parsed_file.text) for parsed_file in parsed] == [("d1.txt", "S1 珊瑚湾市政府签署备忘录。")]
+
+    gzip_path = tmp_path / "d1.txt.gz"
+    gzip_path.write_bytes(data)
+    assert [parsed_file.relative_name for parsed_file in iter_archive_files(gzip_path, gzip_path.name)] == ["d1.txt"]
+    # The compressed file itself must have a supported extension
+    assert list(iter_archive_files(io.BytesIO(gzip.compress(b"ignored")), "notes.csv.gz")) == []
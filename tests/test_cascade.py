@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.cascade import ModelCascade, check_extraction_quality
+
+REL_SET = json.loads((Path(__file__).resolve().parent.parent / "GraphRAG-RELSET-GenericWeb-zh.json").read_text(encoding="utf-8"))
+TEXT = "S1 NPG 与 BCRI 签署备忘录。\nS2 NPG 出资 2.4 亿元。"
+
+
+def make_graph(*relationships):
+    return SimpleNamespace(relationships=[
+        SimpleNamespace(type=relation_type, confidence=confidence, evidence=[{"doc": "d1", "sents": sents}])
+        for relation_type, confidence, sents in relationships
+    ])
+
+
+def test_quality_checks():
+    assert check_extraction_quality(make_graph(("partner_with", 0.9, [1]), ("negated:funds", None, [2])), TEXT, REL_SET) == []
+    assert check_extraction_quality(make_graph(), TEXT, REL_SET) == ["empty"]
+    assert check_extraction_quality(make_graph(), TEXT, REL_SET, allow_empty=True) == []
+    assert check_extraction_quality(make_graph(("funds", 0.5, [2]), ("partner_with", 0.7, [1])), TEXT, REL_SET) == ["low_confidence"]
+    assert check_extraction_quality(make_graph(("funds", 0.9, [3])), TEXT, REL_SET) == ["invalid_evidence"]
+    assert check_extraction_quality(make_graph(("shares_data_with", 0.9, [1])), TEXT, REL_SET) == ["unknown_relation"]
+
+
+def test_cascade_escalates_only_failing_results():
+    results = {
+        "flash": make_graph(("funds", 0.4, [2])),
+        "pro": make_graph(("funds", 0.9, [2])),
+    }
+    calls = []
+
+    def extract(model_name):
+        calls.append(model_name)
+        return results[model_name]
+
+    cascade = ModelCascade(["flash", "pro"], min_mean_confidence=0.7)
+    assert cascade.run(extract, TEXT, REL_SET) is results["pro"]
+    results["flash"] = make_graph(("funds", 0.8, [2]))
+    assert cascade.run(extract, TEXT, REL_SET) is results["flash"]
+
+    assert calls == ["flash", "pro", "flash"]
+    stats = cascade.stats()
+    assert stats["tiers"]["flash"]["calls"] == 2 and stats["tiers"]["flash"]["escalated"] == 1
+    assert stats["tiers"]["pro"]["accepted"] == 1
+    assert stats["failed_checks"] == {"low_confidence": 1}
+
+
+def test_cascade_escalates_errors_and_raises_on_last_tier():
+    def extract(model_name):
+        raise RuntimeError(f"{model_name} failed")
+
+    cascade = ModelCascade(["flash", "pro"])
+    with pytest.raises(RuntimeError, match="pro failed"):
+        cascade.run(extract, TEXT, REL_SET)
+    assert cascade.stats()["tiers"]["flash"]["errors"] == 1
+    assert cascade.stats()["tiers"]["pro"]["errors"] == 1
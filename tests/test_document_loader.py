@@ -0,0 +1,44 @@
+import os
+import sys
+
+import docx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.parsers.document_loader import parse_directory
+
+
+def make_corpus(directory):
+    (directory / "nested").mkdir()
+    for index in range(6):
+        (directory / f"d{index}.txt").write_text(f"S1 文档 {index}。", encoding="utf-8")
+    document = docx.Document()
+    document.add_paragraph("S1 NPG 与 BCRI 合作。")
+    document.save(directory / "nested" / "memo.docx")
+    (directory / "nested" / "broken.pdf").write_bytes(b"not a pdf")
+    (directory / "notes.csv").write_text("ignored", encoding="utf-8")
+
+
+def test_parallel_parsing_keeps_sorted_order_and_collects_failures(tmp_path):
+    """多进程解析的结果与单进程一致，按路径排序；损坏文件只记录错误，不影响其它文件。"""
+    make_corpus(tmp_path)
+    sequential = parse_directory(tmp_path, max_workers=1)
+    parallel = parse_directory(tmp_path, max_workers=3)
+
+    names = [parsed.relative_name for parsed in parallel.files]
+    assert names == sorted(names) and "notes.csv" not in names
+    assert [(parsed.relative_name, parsed.text, parsed.error) for parsed in parallel.files] == [(parsed.relative_name, parsed.text, parsed.error) for parsed in sequential.files]
+    assert [parsed.relative_name for parsed in parallel.failures] == [os.path.join("nested", "broken.pdf")]
+    memo = next(parsed for parsed in parallel.files if parsed.relative_name.endswith("memo.docx"))
+    assert memo.text == "S1 NPG 与 BCRI 合作。" and memo.error is None
+
+
+def test_deferred_extensions_are_returned_unread(tmp_path):
+    make_corpus(tmp_path)
+    (tmp_path / "corpus.md").write_text("# /corpus/d1.txt", encoding="utf-8")
+    parsed = parse_directory(tmp_path, max_workers=3, deferred_extensions=[".MD"])
+
+    markdown = next(parsed_file for parsed_file in parsed.files if parsed_file.relative_name == "corpus.md")
+    assert markdown.deferred and markdown.text == "" and markdown.error is None
+    assert [parsed_file.relative_name for parsed_file in parsed.files] == sorted(parsed_file.relative_name for parsed_file in parsed.files)
+    assert not any(parsed_file.deferred for parsed_file in parsed.files if parsed_file is not markdown)
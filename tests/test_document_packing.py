@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.document_packing import pack_documents, render_packed_documents, resolve_packed_doc_id
+
+
+def make_doc(doc_id, sentence_count):
+    text = "\n".join(f"S{index} " + "字" * 30 + "。" for index in range(1, sentence_count + 1))
+    return {"doc_id": doc_id, "source": f"{doc_id}.txt", "date": "2025-06-21", "text_with_sentence_ids": text}
+
+
+def test_pack_documents_respects_budget_order_and_document_limit():
+    """打包保持文档顺序，不超过 token 上限与单包文档数上限，超大文档单独成包。"""
+    documents = [make_doc("d1", 3), make_doc("d2", 3), make_doc("d3", 20), make_doc("d4", 3), make_doc("d5", 3), make_doc("d6", 3)]
+    packs = pack_documents(documents, max_tokens=250, max_documents=2)
+    assert packs == [[0, 1], [2], [3, 4], [5]]
+
+
+def test_render_packed_documents_tags_every_section():
+    text = render_packed_documents([make_doc("d1_news_2025-03-12.txt", 1), make_doc("d2_brief_2025-05-01.txt", 1)])
+    assert "包含 2 篇独立文档" in text
+    assert "=== DOC_ID: d1_news_2025-03-12.txt ===\nDATE: 2025-06-21\nSOURCE: d1_news_2025-03-12.txt.txt\nS1 " in text
+    assert "=== DOC_ID: d2_brief_2025-05-01.txt ===" in text
+
+
+def test_resolve_packed_doc_id_accepts_exact_and_unique_prefix():
+    """证据中的 doc 可以是完整 DOC_ID，也可以是唯一的短前缀（如元数据中的 d1）。"""
+    doc_ids = ["d1_news_2025-03-12.txt", "d10_extra.txt", "d2_brief_2025-05-01.txt"]
+    assert resolve_packed_doc_id("d2_brief_2025-05-01.txt", doc_ids) == "d2_brief_2025-05-01.txt"
+    assert resolve_packed_doc_id("d1", doc_ids) == "d1_news_2025-03-12.txt"
+    assert resolve_packed_doc_id("d", doc_ids) is None
+    assert resolve_packed_doc_id(None, doc_ids) is None
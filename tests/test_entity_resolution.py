@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.entity_resolution import EntityResolver
+
+
+def test_unions_are_transitive_and_pick_preferred_then_most_mentioned_representative():
+    resolver = EntityResolver()
+    resolver.add_mentions(["NPG", "南海电力", "NPG", "南海电力集团", "BCRI", "蓝珊研究所", "蓝珊研究所"])
+    resolver.prefer("ORG.NPG")
+
+    assert resolver.union("NPG", "南海电力", "alias_of") and resolver.union("南海电力", "南海电力集团", "alias_of")
+    assert resolver.union("南海电力集团", "ORG.NPG", "alias_index")
+    assert resolver.union("BCRI", "蓝珊研究所", "alias_of")
+
+    # The canonical ID wins although it was never a node; otherwise the most mentioned ID, ties to the first seen
+    assert resolver.assignments() == {"NPG": "ORG.NPG", "南海电力": "ORG.NPG", "南海电力集团": "ORG.NPG", "BCRI": "蓝珊研究所"}
+    assert resolver.same("NPG", "ORG.NPG") and not resolver.same("NPG", "BCRI") and resolver.find("未知") is None
+
+
+def test_cannot_link_blocks_merges_through_any_chain():
+    resolver = EntityResolver()
+    resolver.add_mentions(["周启明 (NPG)", "周启明 (VCM)", "周总", "周启明"])
+    assert resolver.forbid("周启明 (NPG)", "周启明 (VCM)")
+
+    assert resolver.union("周启明 (NPG)", "周总", "alias_of")
+    assert resolver.union("周启明 (VCM)", "周启明", "alias_of")
+    # 周总 and 周启明 would join both sides of the constraint
+    assert not resolver.union("周总", "周启明", "alias_of")
+    assert not resolver.union("周启明", "周启明 (NPG)", "alias_index")
+    assert not resolver.forbid("周总", "周启明 (NPG)")
+
+    stats = resolver.stats()
+    assert (stats["nodes_in"], stats["nodes_out"], stats["merged_clusters"], stats["largest_cluster"]) == (4, 2, 2, 2)
+    assert stats["unions"] == {"alias_of": 2} and stats["blocked_merges"] == {"alias_of": 1, "alias_index": 1}
+    assert (stats["cannot_link"], stats["violated_constraints"]) == (1, 1)
+
+
+def test_large_chains_collapse_to_one_representative():
+    resolver = EntityResolver()
+    count = 50000
+    resolver.add_mentions(f"E{index}" for index in range(count))
+    resolver.add_mention("E0")
+    for index in range(1, count):
+        resolver.union(f"E{index}", f"E{index - 1}", "alias_of")
+
+    assignments = resolver.assignments()
+    assert len(assignments) == count - 1 and set(assignments.values()) == {"E0"}
+    assert resolver.stats()["largest_cluster"] == count and EntityResolver().stats()["ids"] == 0
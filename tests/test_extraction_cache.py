@@ -0,0 +1,102 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.cache import (
+    DiskCacheBackend,
+    ExtractionCache,
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+    create_extraction_cache,
+    make_cache_key,
+)
+
+PAYLOAD = {
+    "nodes": [{"id": "南海电力集团", "type": "Organization", "properties": None, "color": None}],
+    "relationships": [],
+}
+
+
+def test_cache_key_covers_every_input():
+    """缓存键随文本、提示词、REL_SET 名称/版本与模型变化，字段拼接不会产生碰撞。"""
+    base = make_cache_key("S1 文本", "system", "GraphRAG-RELSET-GenericWeb-zh", "2025-11-08", "gemini-2.5-pro")
+    assert base == make_cache_key("S1 文本", "system", "GraphRAG-RELSET-GenericWeb-zh", "2025-11-08", "gemini-2.5-pro")
+    variants = [
+        make_cache_key("S1 文本2", "system", "GraphRAG-RELSET-GenericWeb-zh", "2025-11-08", "gemini-2.5-pro"),
+        make_cache_key("S1 文本", "system2", "GraphRAG-RELSET-GenericWeb-zh", "2025-11-08", "gemini-2.5-pro"),
+        make_cache_key("S1 文本", "system", "GraphRAG-RELSET-AI-RAG-zh", "2025-11-08", "gemini-2.5-pro"),
+        make_cache_key("S1 文本", "system", "GraphRAG-RELSET-GenericWeb-zh", "2025-12-01", "gemini-2.5-pro"),
+        make_cache_key("S1 文本", "system", "GraphRAG-RELSET-GenericWeb-zh", "2025-11-08", "gemini-1.5-flash"),
+        make_cache_key("S1 文", "本system", "GraphRAG-RELSET-GenericWeb-zh", "2025-11-08", "gemini-2.5-pro"),
+    ]
+    assert base not in variants
+    assert len(set(variants)) == len(variants)
+
+
+@pytest.mark.parametrize("backend_name", ["memory", "disk", "sqlite"])
+def test_backends_round_trip_and_count_hits(tmp_path, backend_name):
+    """三种后端均可存取 KnowledgeGraph 载荷，并正确统计命中/未命中。"""
+    cache = create_extraction_cache(backend_name, tmp_path)
+    assert cache.get("missing") is None
+    cache.set("k1", PAYLOAD)
+    assert cache.get("k1") == PAYLOAD
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_disk_backend_persists_compressed_entries(tmp_path):
+    """磁盘后端以 zstd 压缩文件存储，新实例可以读取已有条目。"""
+    ExtractionCache(DiskCacheBackend(tmp_path)).set("abcdef", PAYLOAD)
+    stored = tmp_path / "ab" / "abcdef.json.zst"
+    assert stored.read_bytes()[:4] == b"\x28\xb5\x2f\xfd"
+    assert ExtractionCache(DiskCacheBackend(tmp_path)).get("abcdef") == PAYLOAD
+
+
+def test_memory_backend_evicts_least_recently_used():
+    """超过容量上限时优先淘汰最久未使用的条目。"""
+    backend = MemoryCacheBackend(max_bytes=250)
+    value = os.urandom(100)
+    backend.set("aa1", value)
+    backend.set("bb2", value)
+    assert backend.get("aa1") == value
+    backend.set("cc3", value)
+    assert backend.size_bytes() <= 250
+    assert backend.get("bb2") is None
+    assert backend.get("aa1") == value
+    assert backend.get("cc3") == value
+
+
+def test_disk_backend_evicts_oldest_files(tmp_path):
+    """磁盘后端按文件访问时间淘汰，直到总大小回到上限以内。"""
+    backend = DiskCacheBackend(tmp_path, max_bytes=250)
+    value = os.urandom(100)
+    backend.set("aa1", value)
+    backend.set("bb2", value)
+    os.utime(tmp_path / "aa" / "aa1.json.zst", (2, 2))
+    os.utime(tmp_path / "bb" / "bb2.json.zst", (1, 1))
+    backend.set("cc3", value)
+    assert backend.size_bytes() <= 250
+    assert backend.get("bb2") is None
+    assert backend.get("aa1") == value
+    assert backend.get("cc3") == value
+
+
+def test_sqlite_backend_evicts_least_recently_used(tmp_path, mocker):
+    """SQLite 后端按 accessed_at 淘汰最久未使用的条目。"""
+    clock = iter(range(100))
+    mocker.patch("src.extraction.cache.time.time", side_effect=lambda: next(clock))
+    backend = SQLiteCacheBackend(tmp_path / "cache.sqlite3", max_bytes=250)
+    value = os.urandom(100)
+    backend.set("aa1", value)
+    backend.set("bb2", value)
+    assert backend.get("aa1") == value
+    backend.set("cc3", value)
+    assert backend.size_bytes() <= 250
+    assert backend.get("bb2") is None
+    assert backend.get("aa1") == value
+    assert backend.get("cc3") == value
@@ -0,0 +1,77 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.folder_manifest import FolderManifest, poll_folder
+
+
+def list_files(directory):
+    return lambda: sorted(path for path in directory.rglob("*") if path.is_file())
+
+
+def test_scan_reports_added_modified_and_deleted_files(tmp_path):
+    corpus, state = tmp_path / "corpus", tmp_path / "state"
+    (corpus / "sub").mkdir(parents=True)
+    (corpus / "a.txt").write_text("NPG 与 BCRI 合作。", encoding="utf-8")
+    (corpus / "sub" / "b.txt").write_text("BCRI 负责监测。", encoding="utf-8")
+
+    manifest = FolderManifest(corpus, state)
+    changes = manifest.scan(list_files(corpus)())
+    assert sorted(changes.added) == ["a.txt", "sub/b.txt"] and not changes.modified and not changes.deleted
+    for name, file_state in changes.to_extract.items():
+        manifest.record(name, file_state, [name], graph_payload={"nodes": [], "relationships": [], "doc": name})
+    manifest.save()
+
+    # Same content with a new mtime is not a change; new content or a removed file is
+    os.utime(corpus / "a.txt", ns=(1, 1))
+    (corpus / "sub" / "b.txt").write_text("BCRI 负责长期监测。", encoding="utf-8")
+    (corpus / "c.txt").write_text("新文件。", encoding="utf-8")
+    reloaded = FolderManifest(corpus, state)
+    assert reloaded.load_graph("a.txt") == {"nodes": [], "relationships": [], "doc": "a.txt"}
+    (corpus / "a.txt").unlink()
+    changes = reloaded.scan(list_files(corpus)())
+    assert list(changes.added) == ["c.txt"] and list(changes.modified) == ["sub/b.txt"] and changes.deleted == ["a.txt"]
+
+    reloaded.retract("a.txt")
+    assert reloaded.load_graph("a.txt") is None and len(list(reloaded.iter_graphs())) == 1
+
+
+def test_unchanged_files_are_not_hashed_and_failed_files_are_retried(tmp_path, mocker):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "a.txt").write_text("内容。", encoding="utf-8")
+    (corpus / "b.txt").write_text("内容。", encoding="utf-8")
+    manifest = FolderManifest(corpus, tmp_path / "state")
+    changes = manifest.scan(list_files(corpus)())
+    manifest.record("a.txt", changes.added["a.txt"], ["a.txt"], graph_payload={"nodes": [], "relationships": []})
+    manifest.record("b.txt", changes.added["b.txt"], ["b.txt"], error="429 Resource exhausted")
+
+    hash_calls = mocker.spy(sys.modules["src.extraction.folder_manifest"], "file_content_hash")
+    changes = manifest.scan(list_files(corpus)())
+    assert changes.unchanged == 1 and list(changes.modified) == ["b.txt"]
+    assert hash_calls.call_count == 1
+
+
+def test_poll_folder_only_reports_scans_with_changes(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    manifest = FolderManifest(corpus, tmp_path / "state")
+    seen = []
+
+    def on_changes(changes):
+        seen.append(sorted(changes.to_extract))
+        for name, file_state in changes.to_extract.items():
+            manifest.record(name, file_state, [name], graph_payload={"nodes": [], "relationships": []})
+
+    def sleep(_):
+        if not (corpus / "a.txt").exists():
+            (corpus / "a.txt").write_text("第一篇。", encoding="utf-8")
+
+    assert poll_folder(list_files(corpus), manifest, on_changes, max_cycles=3, sleep=sleep) == 3
+    assert seen == [["a.txt"]]
+
+    stop_event = threading.Event()
+    stop_event.set()
+    assert poll_folder(list_files(corpus), manifest, on_changes, stop_event=stop_event) == 0
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.parsers.html_content import extract_html_text, extract_main_content
+from src.parsers.sentence_chunker import estimate_tokens
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'fixtures', 'html')
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as fixture:
+        return fixture.read()
+
+
+def test_news_page_keeps_article_paragraphs_and_drops_boilerplate():
+    """新闻页只保留标题与正文段落，导航、热榜、评论、Cookie 提示和脚本全部去除，段落之间以空行分隔。"""
+    text = extract_main_content(read_fixture("news_zh_haixi.html"))
+    paragraphs = text.split("\n\n")
+
+    assert paragraphs[0] == "海曦一号海上风电场获批 珊瑚复育同步启动"
+    assert any(paragraph.startswith("本报讯 珊瑚湾市政府今日与南海电力集团") for paragraph in paragraphs)
+    assert "渔民补偿方案下月公布" in paragraphs
+    assert "市长周启明在签约仪式上表示" in text and "目标是在三年内把活珊瑚覆盖度提高5个百分点" in text
+    for boilerplate in ("首页", "24小时热榜", "相关新闻", "网友评论", "Cookie", "gtag", "版权所有", "广告"):
+        assert boilerplate not in text
+
+
+def test_blog_page_keeps_headline_list_items_and_drops_sidebar_and_comments():
+    text = extract_main_content(read_fixture("blog_en_turbines.html"))
+    paragraphs = text.split("\n\n")
+
+    assert "What Offshore Wind Farms Mean for Coral Reefs" in paragraphs[:3]
+    assert "Construction is the riskiest phase" in paragraphs
+    assert "Scour protection rock can host juvenile reef fish." in paragraphs
+    for boilerplate in ("Skip to content", "Popular posts", "newsletter", "Diver Dan", "cookies", "All rights reserved"):
+        assert boilerplate not in text
+
+
+def test_table_rows_become_paragraphs():
+    text = extract_main_content(read_fixture("press_release_zh_funding.html"))
+    paragraphs = text.split("\n\n")
+
+    assert "珊瑚幼体培育与移植 0.45 蓝珊研究所" in paragraphs
+    assert any(paragraph.startswith("一、资金来源。项目总投入3.2亿元") for paragraph in paragraphs)
+    assert "政策文件" not in text and "网站地图" not in text
+
+
+def test_forum_posts_built_with_line_breaks_are_kept():
+    text = extract_main_content(read_fixture("forum_zh_monitoring.html"))
+
+    assert "南礁监测数据讨论：活珊瑚覆盖度真的只有27%吗？" in text
+    assert "一般是用固定样带的截线法" in text and "每季度一次" in text
+    assert "立即注册" not in text and "春季潜水装备大促" not in text and "推荐阅读" not in text
+
+
+def test_main_content_cuts_tokens_and_full_mode_keeps_the_whole_page():
+    html = read_fixture("news_zh_haixi.html")
+    main_text, full_text = extract_html_text(html, "main"), extract_html_text(html, "full")
+
+    assert "24小时热榜" in full_text
+    assert estimate_tokens(main_text) < 0.6 * estimate_tokens(full_text)
+
+
+def test_short_pages_fall_back_to_the_whole_body():
+    html = "<html><body><nav><a href='/'>Home</a></nav><div>S1 NPG 出资2.4亿元。</div><span>S2 BCRI 负责监测。</span></body></html>"
+    assert extract_main_content(html) == "S1 NPG 出资2.4亿元。\n\nS2 BCRI 负责监测。"
+
+
+def test_mode_defaults_to_environment_and_rejects_unknown_values(monkeypatch):
+    html = "<html><body><nav>Home</nav><p>S1 NPG 出资。</p></body></html>"
+    monkeypatch.setenv("KGRAPH_HTML_MODE", "full")
+    assert "Home" in extract_html_text(html)
+    monkeypatch.setenv("KGRAPH_HTML_MODE", "main")
+    assert "Home" not in extract_html_text(html)
+    with pytest.raises(ValueError):
+        extract_html_text(html, "reader")
@@ -0,0 +1,62 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.incremental import (
+    DocumentSnapshot,
+    DocumentSnapshotStore,
+    diff_sentences,
+    hash_sentences,
+    reextraction_windows,
+    remap_retained_evidence,
+)
+
+OLD = [(1, "A 与 B 合作。"), (2, "A 出资 1 亿元。"), (3, "C 位于海湾。"), (4, "D 管理项目。"), (5, "E 加入项目。")]
+
+
+def test_diff_maps_unchanged_sentences_and_touches_edits():
+    new = [(1, "A 与 B 合作。"), (2, "A 出资 2 亿元。"), (3, "C 位于海湾。"), (4, "E 加入项目。"), (5, "F 发布报告。")]
+    diff = diff_sentences(hash_sentences(OLD), hash_sentences(new))
+    assert diff.unchanged == {1: 1, 3: 3, 4: 5}
+    assert sorted(diff.removed) == [2, 4]
+    # Edited S2, the deletion of old S4 (bordering new S3/S4) and the inserted S5
+    assert diff.touched_positions == [1, 2, 3, 4]
+    assert not diff.is_unchanged
+
+
+def test_whitespace_only_edits_are_unchanged():
+    new = [(sentence_id, "  " + text.replace(" ", "  ")) for sentence_id, text in OLD]
+    assert diff_sentences(hash_sentences(OLD), hash_sentences(new)).is_unchanged
+
+
+def test_windows_widen_and_merge_touched_positions():
+    new = list(OLD)
+    new[3] = (4, "D 不再管理项目。")
+    diff = diff_sentences(hash_sentences(OLD), hash_sentences(new))
+    assert reextraction_windows(diff, len(new), window=1) == [[2, 3, 4]]
+    assert reextraction_windows(diff, len(new), window=0) == [[3]]
+
+
+def test_evidence_is_remapped_or_lost():
+    old_to_new = {1: 1, 3: 2}
+    assert remap_retained_evidence([{"doc": "d1", "sents": [1, 3]}], old_to_new) == [{"doc": "d1", "sents": [1, 2]}]
+    assert remap_retained_evidence([{"doc": "d1", "sents": [2]}], old_to_new) is None
+    assert remap_retained_evidence([{"doc": "d1", "sents": [1]}, {"doc": "d2", "sents": [7]}], old_to_new, "d1") == [{"doc": "d1", "sents": [1]}, {"doc": "d2", "sents": [7]}]
+
+
+def test_evidence_citing_no_sentence_of_the_document_is_kept():
+    old_to_new = {1: 1, 3: 2}
+    assert remap_retained_evidence(None, old_to_new) == []
+    assert remap_retained_evidence([{"doc": "d1", "sents": []}], old_to_new, "d1") == [{"doc": "d1", "sents": []}]
+    # A changed sentence of another document does not retract the relationship here
+    assert remap_retained_evidence([{"doc": "d2", "sents": [2]}], old_to_new, "d1") == [{"doc": "d2", "sents": [2]}]
+
+
+def test_snapshot_store_persists_to_disk(tmp_path):
+    store = DocumentSnapshotStore(tmp_path)
+    snapshot = DocumentSnapshot(doc_id="d1", fingerprint="f1", header_hash="h", sentence_hashes=hash_sentences(OLD), graph={"nodes": [], "relationships": []})
+    store.put(snapshot)
+    reloaded = DocumentSnapshotStore(tmp_path).get("d1", "f1")
+    assert reloaded == snapshot
+    assert store.get("d1", "another-config") is None
@@ -0,0 +1,50 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.jsonl_stream import JSONObjectStreamParser, is_fact, iter_json_objects, message_chunk_text
+
+FACT_LINES = [
+    '{"head":{"text":"南海电力集团","type":"Organization"},"relation":"funds","tail":{"text":"海曦一号","type":"Project"},"qualifiers":{"amount":"2.4亿元"},"evidence":[{"doc":"d1","sents":[2]}],"confidence":0.84}',
+    '{"head":{"text":"周启明","type":"Person"},"relation":"manages","tail":{"text":"海曦一号","type":"Project"},"qualifiers":{"role":"项目经理 {代}"},"evidence":[{"doc":"d1","sents":[5]}],"confidence":0.83}',
+]
+
+
+def split_every(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_objects_are_emitted_as_soon_as_they_close():
+    parser = JSONObjectStreamParser()
+    stream = "\n".join(FACT_LINES) + "\n"
+    emitted_at = []
+    for position, piece in enumerate(split_every(stream, 7)):
+        for record in parser.feed(piece):
+            emitted_at.append((position * 7, record["relation"]))
+    assert [relation for _, relation in emitted_at] == ["funds", "manages"]
+    # The first fact is available before the second one has been received
+    assert emitted_at[0][0] < len(FACT_LINES[0]) + 1
+    assert parser.errors == []
+
+
+def test_fenced_array_and_pretty_printed_output():
+    text = "```json\n[\n" + FACT_LINES[0] + ",\n{\n  \"head\": {\"text\": \"A\"},\n  \"relation\": \"r\",\n  \"tail\": \"B\\\"}\"\n}\n]\n```"
+    records = list(iter_json_objects(split_every(text, 5)))
+    assert [record["relation"] for record in records] == ["funds", "r"]
+    assert records[1]["tail"] == 'B"}'
+
+
+def test_malformed_and_truncated_objects_are_reported():
+    parser = JSONObjectStreamParser()
+    records = list(iter_json_objects(['{"head": oops}\n', FACT_LINES[0], '\n{"head": {"text": "cut'], parser))
+    assert len(records) == 1
+    assert len(parser.errors) == 2
+    assert parser.errors[-1][1].startswith("Unterminated")
+
+
+def test_fact_detection_and_chunk_text():
+    assert is_fact({"head": {"text": "A"}, "relation": "r", "tail": {"text": "B"}})
+    assert not is_fact({"head": {"text": "A"}, "relation": "r"})
+    assert message_chunk_text("abc") == "abc"
+    assert message_chunk_text(type("Chunk", (), {"content": [{"type": "text", "text": "a"}, "b"]})()) == "ab"
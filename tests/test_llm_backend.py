@@ -0,0 +1,85 @@
+import os
+import sys
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.llm_backend import RecordingChatModel, RecordingStore, ReplayChatModel, ReplayMissError, SimulatedLLMError
+from src.extraction.llm_scheduler import is_retryable_error
+
+PROMPT = ChatPromptTemplate.from_messages([("system", "Extract facts."), ("human", "{text}")])
+
+
+class Facts(BaseModel):
+    facts: list
+
+
+class FakeLiveLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, prompt_value, config=None):
+        self.calls += 1
+        return AIMessage(content='{"h": "NPG"}\n')
+
+    def stream(self, prompt_value, config=None):
+        self.calls += 1
+        yield AIMessageChunk(content='{"h": ')
+        yield AIMessageChunk(content='"NPG"}\n')
+
+    def with_structured_output(self, schema):
+        def invoke(prompt_value):
+            self.calls += 1
+            return schema(facts=[prompt_value.to_string().splitlines()[-1]])
+        return RunnableLambda(invoke)
+
+
+def test_recorded_responses_replay_for_the_same_prompt(tmp_path):
+    store = RecordingStore(tmp_path)
+    live = FakeLiveLLM()
+    recorder = RecordingChatModel(live, store, "gemini-2.5-pro")
+    recorded = (PROMPT | recorder.with_structured_output(Facts)).invoke({"text": "NPG 与 BCRI 合作"})
+    streamed = "".join(chunk.content for chunk in (PROMPT | recorder).stream({"text": "NPG 与 BCRI 合作"}))
+    assert live.calls == 2 and len(store) == 2
+
+    sleeps = []
+    replay = ReplayChatModel(store, "gemini-2.5-pro", latency_seconds=0.5, sleep=sleeps.append)
+    assert (PROMPT | replay.with_structured_output(Facts)).invoke({"text": "NPG 与 BCRI 合作"}) == recorded
+    chunks = list((PROMPT | replay).stream({"text": "NPG 与 BCRI 合作"}))
+    assert "".join(chunk.content for chunk in chunks) == streamed
+    assert sum(sleeps) == pytest.approx(1.0)
+
+    with pytest.raises(ReplayMissError):
+        (PROMPT | replay.with_structured_output(Facts)).invoke({"text": "另一篇文档"})
+    # Recordings are per model
+    with pytest.raises(ReplayMissError):
+        (PROMPT | ReplayChatModel(store, "gemini-1.5-flash").with_structured_output(Facts)).invoke({"text": "NPG 与 BCRI 合作"})
+
+
+def test_simulated_failures_are_retryable_and_seeded(tmp_path):
+    store = RecordingStore(tmp_path)
+    (PROMPT | RecordingChatModel(FakeLiveLLM(), store, "m")).invoke({"text": "x"})
+
+    always_failing = ReplayChatModel(store, "m", failure_rate=1.0, sleep=lambda seconds: None)
+    with pytest.raises(SimulatedLLMError) as error:
+        (PROMPT | always_failing).invoke({"text": "x"})
+    assert is_retryable_error(error.value)
+
+    def outcomes(seed):
+        replay = ReplayChatModel(store, "m", failure_rate=0.5, seed=seed, sleep=lambda seconds: None)
+        results = []
+        for _ in range(20):
+            try:
+                (PROMPT | replay).invoke({"text": "x"})
+                results.append(True)
+            except SimulatedLLMError:
+                results.append(False)
+        return results
+
+    assert outcomes(7) == outcomes(7)
+    assert 0 < sum(outcomes(7)) < 20
@@ -0,0 +1,177 @@
+import os
+import random
+import sys
+import threading
+import time
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import Node, extract_documents, generate_graph
+from src.extraction.llm_scheduler import (
+    AdaptiveConcurrencyLimiter,
+    LLMScheduler,
+    RetryPolicy,
+    TokenBucket,
+    is_retryable_error,
+    is_throttling_error,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ResourceExhausted(Exception):
+    code = 429
+
+
+class FakeThrottlingLLM:
+    """本地假 LLM：前 throttle_first 次调用返回 429，之后返回固定图谱。"""
+
+    def __init__(self, throttle_first=0, delay=0.0):
+        self.throttle_first = throttle_first
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def with_structured_output(self, schema):
+        def invoke(prompt_value):
+            with self._lock:
+                self.calls += 1
+                call_number = self.calls
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                time.sleep(self.delay)
+                if call_number <= self.throttle_first:
+                    raise ResourceExhausted("429 Resource has been exhausted (e.g. check quota).")
+                return schema(nodes=[Node(id="NPG", type="Organization")], relationships=[])
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+        return RunnableLambda(invoke)
+
+
+def test_error_classification():
+    assert is_throttling_error(ResourceExhausted("quota"))
+    assert is_throttling_error(RuntimeError("Error calling model: 429 Too Many Requests"))
+    wrapped = RuntimeError("Invalid argument provided to Gemini")
+    wrapped.__cause__ = ResourceExhausted("exhausted")
+    assert is_throttling_error(wrapped)
+    assert is_retryable_error(RuntimeError("503 Service Unavailable"))
+    assert is_retryable_error(TimeoutError())
+    assert not is_retryable_error(ValueError("REL_SET 'x' not found."))
+
+
+def test_token_bucket_waits_for_refill():
+    """令牌不足时按速率等待补充，超大请求等待满桶后透支。"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_minute=60, capacity=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire(2) == 0
+    assert bucket.acquire(1) == pytest.approx(1.0)
+    assert bucket.acquire(5) == pytest.approx(2.0)
+    assert bucket.available == pytest.approx(-3.0)
+
+
+def test_aimd_limiter_backs_off_and_recovers():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, max_limit=8)
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.limit == 2
+    for _ in range(20):
+        limiter.on_success()
+    assert 2 < limiter.limit <= 8
+
+
+def test_scheduler_retries_throttled_calls_with_backoff():
+    """被限流的调用按抖动指数退避重试，直到成功。"""
+    clock = FakeClock()
+    attempts = []
+
+    def flaky():
+        attempts.append(clock.now)
+        if len(attempts) < 3:
+            raise ResourceExhausted("429")
+        return "ok"
+
+    scheduler = LLMScheduler(initial_concurrency=4, max_concurrency=4, retry_policy=RetryPolicy(max_retries=5, base_delay=1.0),
+                             clock=clock, sleep=clock.sleep, rng=random.Random(7))
+    assert scheduler.call(flaky) == "ok"
+    assert len(attempts) == 3
+    assert clock.sleeps[0] <= 1.0 and clock.sleeps[1] <= 2.0
+    assert scheduler.stats()["retries"] == 2
+    assert scheduler.stats()["throttled"] == 2
+    assert scheduler.limiter.limit < 4
+
+
+def test_scheduler_gives_up_after_max_retries_and_on_fatal_errors():
+    clock = FakeClock()
+    scheduler = LLMScheduler(retry_policy=RetryPolicy(max_retries=2), clock=clock, sleep=clock.sleep)
+    calls = []
+
+    def always_throttled():
+        calls.append(1)
+        raise ResourceExhausted("429")
+
+    with pytest.raises(ResourceExhausted):
+        scheduler.call(always_throttled)
+    assert len(calls) == 3
+
+    def fatal():
+        calls.append(1)
+        raise ValueError("bad schema")
+
+    with pytest.raises(ValueError):
+        scheduler.call(fatal)
+    assert len(calls) == 4
+    assert scheduler.stats()["failures"] == 2
+
+
+def test_scheduler_enforces_requests_per_minute():
+    clock = FakeClock()
+    scheduler = LLMScheduler(requests_per_minute=2, clock=clock, sleep=clock.sleep)
+    for _ in range(4):
+        scheduler.call(lambda: None)
+    # Two calls fit in the initial bucket, the next two wait 30 seconds each
+    assert clock.now == pytest.approx(60.0)
+
+
+def test_extract_documents_survives_injected_throttling(mocker):
+    """通过本地假 LLM 注入限流：文档在重试后成功，且并发不超过调度器上限。"""
+    fake_llm = FakeThrottlingLLM(throttle_first=3, delay=0.01)
+    mocker.patch('app.get_llm', return_value=fake_llm)
+    scheduler = LLMScheduler(initial_concurrency=2, max_concurrency=2, retry_policy=RetryPolicy(max_retries=4, base_delay=0.001))
+    documents = [
+        {"doc_id": f"d{index}", "source": f"d{index}.txt", "date": "2025-01-01", "text_with_sentence_ids": f"S1 文档{index}。"}
+        for index in range(6)
+    ]
+
+    results = extract_documents(documents, model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF",
+                                rel_set_name="GraphRAG-RELSET-GenericWeb-zh", max_concurrency=4, scheduler=scheduler)
+
+    assert all(result.graph is not None and result.error is None for result in results)
+    assert fake_llm.calls == 9
+    assert fake_llm.max_in_flight <= 2
+    assert scheduler.stats()["throttled"] == 3
+
+
+def test_generate_graph_fails_once_retries_run_out(mocker):
+    mocker.patch('app.get_llm', return_value=FakeThrottlingLLM(throttle_first=10))
+    scheduler = LLMScheduler(retry_policy=RetryPolicy(max_retries=1, base_delay=0.001))
+    with pytest.raises(ResourceExhausted):
+        generate_graph("S1 文本。", source="d1.txt", model_name="gemini-2.5-pro", node_color="#FFADAD", edge_color="#9BF6FF",
+                       rel_set_name="GraphRAG-RELSET-GenericWeb-zh", scheduler=scheduler)
@@ -0,0 +1,53 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.parsers.markdown_parser import MarkdownMultiDocumentParser
+
+CORPUS = """说明文字，不属于任何文档。
+# /corpus/d1_news_2025-03-12.txt
+# 元数据: source=《珊瑚湾日报》, date=2025-03-12, id=d1
+S1 珊瑚湾市政府与南海电力集团签署备忘录。
+注释行会被忽略。
+S2 NPG出资2.4亿元。
+
+# /corpus/d2_brief_2025-05-01.txt
+# 元数据 source=BCRI科研简报 date=2025-05-01
+S1 这一块的元数据格式错误。
+# /corpus/notes.md
+S1 不是 .txt 文档。
+# /corpus/d3_permit_2025-06-10.txt
+
+# 元数据: source=省海洋局, date=2025-06-10, id=d3
+S1 省海洋局批复海曦一期用海。
+# /corpus/d4_rumor_2025-06-21.txt
+"""
+
+
+def test_parse_iter_yields_documents_and_reports_malformed_blocks():
+    parser = MarkdownMultiDocumentParser()
+    documents = list(parser.parse_iter(io.StringIO(CORPUS)))
+
+    assert documents == [
+        {"doc_id": "d1_news_2025-03-12", "source": "《珊瑚湾日报》", "date": "2025-03-12", "text_with_sentence_ids": "S1 珊瑚湾市政府与南海电力集团签署备忘录。\nS2 NPG出资2.4亿元。"},
+        {"doc_id": "d3_permit_2025-06-10", "source": "省海洋局", "date": "2025-06-10", "text_with_sentence_ids": "S1 省海洋局批复海曦一期用海。"},
+    ]
+    assert [(error.line_number, error.doc_id) for error in parser.errors] == [(9, "d2_brief_2025-05-01"), (11, None), (17, "d4_rumor_2025-06-21")]
+    assert parser.parse(CORPUS) == documents
+
+
+def test_parse_iter_streams_binary_files_lazily():
+    """Each document is yielded once the next block starts, before the rest of the file is read."""
+    lines_read = []
+
+    def lines():
+        for line in CORPUS.encode("utf-8").splitlines(keepends=True):
+            lines_read.append(line)
+            yield line
+
+    documents = MarkdownMultiDocumentParser().parse_iter(lines())
+    first = next(documents)
+    assert first["doc_id"] == "d1_news_2025-03-12"
+    assert len(lines_read) == 8
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.metrics import BudgetExceededError, CallMetrics, RunMetrics, estimate_cost
+
+
+def test_estimate_cost_uses_per_million_prices():
+    assert estimate_cost("gemini-1.5-pro", 1_000_000, 200_000) == pytest.approx(1.25 + 1.0)
+    assert estimate_cost("unknown-model", 1_000, 1_000) == 0.0
+
+
+def test_summary_rolls_up_per_model_and_per_document():
+    metrics = RunMetrics()
+    metrics.record(CallMetrics(doc_id="d1", model="gemini-1.5-flash", latency_seconds=1.0, prompt_tokens=1000, completion_tokens=100, nodes=3, edges=2))
+    metrics.record(CallMetrics(doc_id="d1", model="gemini-2.5-pro", latency_seconds=4.0, prompt_tokens=1000, completion_tokens=200, retries=2, nodes=4, edges=3))
+    metrics.record(CallMetrics(doc_id="d2", model="gemini-2.5-pro", latency_seconds=2.0, error="timeout"))
+    metrics.record(CallMetrics(doc_id="d3", model="gemini-2.5-pro", cache_hit=True, nodes=1))
+
+    summary = metrics.summary()
+    assert summary["calls"] == 4 and summary["llm_calls"] == 3 and summary["cache_hits"] == 1
+    assert summary["errors"] == 1 and summary["retries"] == 2
+    assert summary["prompt_tokens"] == 2000 and summary["completion_tokens"] == 300
+    assert summary["latency_seconds"] == {"total": 7.0, "p50": 2.0, "p95": 4.0, "max": 4.0}
+    assert summary["slowest_calls"][0] == {"doc_id": "d1", "model": "gemini-2.5-pro", "latency_seconds": 4.0}
+    assert summary["per_model"]["gemini-2.5-pro"]["calls"] == 3
+    assert summary["per_model"]["gemini-2.5-pro"]["cache_hits"] == 1
+    assert summary["per_document"]["d1"]["models"] == ["gemini-1.5-flash", "gemini-2.5-pro"]
+    assert summary["per_document"]["d1"]["edges"] == 5
+    assert summary["cost_usd"] == pytest.approx(estimate_cost("gemini-1.5-flash", 1000, 100) + estimate_cost("gemini-2.5-pro", 1000, 200), abs=1e-6)
+
+
+def test_budget_refuses_new_calls_once_spent():
+    metrics = RunMetrics(budget_tokens=1500)
+    metrics.check_budget()
+    metrics.record(CallMetrics(doc_id="d1", model="gemini-2.5-pro", prompt_tokens=1400, completion_tokens=100))
+    with pytest.raises(BudgetExceededError):
+        metrics.check_budget()
+    assert metrics.summary()["calls_refused_by_budget"] == 1
+
+    usd_metrics = RunMetrics(budget_usd=0.01)
+    usd_metrics.record(CallMetrics(doc_id="d1", model="gemini-2.5-pro", prompt_tokens=1000, completion_tokens=1000))
+    with pytest.raises(BudgetExceededError, match=r"\$0\.01"):
+        usd_metrics.check_budget()
@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.near_duplicates import NearDuplicateDetector, duplicate_evidence, map_duplicate_sentences
+
+ORIGINAL = "\n".join([
+    "S1 珊瑚湾市政府今日与南海电力集团（简称NPG）及蓝珊研究所（简称BCRI）签署“海曦一号海上风电场”与“珊瑚复育2026”联合备忘录。",
+    "S2 备忘录约定：NPG出资2.4亿元，市政府专项资金0.6亿元，BCRI筹集海洋基金0.2亿元，合计3.2亿元。",
+    "S3 项目预计于2026年第三季度完成首批风机吊装，同时在南礁开展珊瑚幼体移植试验。",
+    "S4 市长表示，该项目将为珊瑚湾带来约八百个就业岗位。",
+])
+
+
+def test_exact_and_near_duplicates_collapse_to_the_first_document():
+    # Repost with an added credit line, different S-numbering and different quotes
+    repost = "S1 转载自《珊瑚湾日报》。\n" + "\n".join(f"S{index} {line.split(' ', 1)[1].replace('“', '「').replace('”', '」')}" for index, line in enumerate(ORIGINAL.splitlines(), start=2))
+    edited = ORIGINAL.replace("八百个", "九百个")
+    unrelated = "S1 BCRI公布基线监测：南礁珊瑚保护区的平均活珊瑚覆盖度为27%（±3%）。\nS2 监测表明保护区北界外12公里处拟设风机组团。"
+    documents = [{"doc_id": doc_id, "text_with_sentence_ids": text} for doc_id, text in
+                 [("d1", ORIGINAL), ("d2", unrelated), ("d1-copy", ORIGINAL), ("d1-repost", repost), ("d1-edited", edited), ("empty", "")]]
+
+    detector = NearDuplicateDetector()
+    result = detector.find_duplicates(documents)
+    assert result.representatives == [0, 1, 5]
+    assert {index: (match.representative, match.exact) for index, match in result.matches.items()} == {2: (0, True), 3: (0, False), 4: (0, False)}
+    assert result.matches[4].similarity >= 0.8
+
+    stats = detector.stats()
+    assert (stats["documents"], stats["exact_duplicates"], stats["near_duplicates"], stats["calls_saved"]) == (6, 1, 2, 3)
+    assert stats["duplicate_rate"] == 0.5 and stats["tokens_saved"] > 0
+
+
+def test_threshold_keeps_partially_overlapping_documents_apart():
+    half = "\n".join(ORIGINAL.splitlines()[:2] + ["S3 会议还讨论了渔民补偿方案与航道调整。", "S4 具体条款将在下月公布。"])
+    result = NearDuplicateDetector(threshold=0.9).find_duplicates([{"doc_id": "a", "text_with_sentence_ids": ORIGINAL}, {"doc_id": "b", "text_with_sentence_ids": half}])
+    assert result.representatives == [0, 1] and not result.matches
+
+
+def test_evidence_is_carried_over_only_for_sentences_present_in_the_duplicate():
+    duplicate = "S1 转载说明。\nS2 " + ORIGINAL.splitlines()[0].split(" ", 1)[1] + "\nS3 " + ORIGINAL.splitlines()[1].split(" ", 1)[1]
+    sentence_map = map_duplicate_sentences(ORIGINAL, duplicate)
+    assert sentence_map == {1: 2, 2: 3}
+    evidence = [{"doc": "d1", "sents": [1, 2], "pages": [1]}, {"doc": "d1", "sents": [4]}, {"doc": "other", "sents": [1]}]
+    assert duplicate_evidence(evidence, "d1", "d9", sentence_map) == [{"doc": "d9", "sents": [2, 3], "duplicate_of": "d1"}]
@@ -0,0 +1,88 @@
+import io
+import os
+import sys
+import zipfile
+
+import docx
+from odf import office as odf_office, table as odf_table, teletype as odf_teletype, text as odf_text
+from odf.opendocument import OpenDocumentText
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.parsers.document_loader import extract_text_from_stream
+from src.parsers.office_xml import iter_docx_paragraphs, iter_odt_paragraphs
+
+
+def docx_bytes():
+    document = docx.Document()
+    document.add_heading("珊瑚复育2026 备忘录", 1)
+    paragraph = document.add_paragraph("S1 NPG 出资")
+    paragraph.add_run("2.4亿元。").bold = True
+    document.add_paragraph("")
+    table = document.add_table(rows=2, cols=2)
+    for row_index, row in enumerate([("用途", "金额"), ("珊瑚移植", "0.45")]):
+        for column_index, value in enumerate(row):
+            table.cell(row_index, column_index).text = value
+    document.add_paragraph("S2 BCRI\t负责监测。").add_run().add_break()
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def test_docx_paragraphs_match_python_docx_and_include_table_rows():
+    """正文段落与 python-docx 的 paragraph.text 一致；表格每行输出为一段，单元格以空格分隔。"""
+    data = docx_bytes()
+    legacy = [paragraph.text for paragraph in docx.Document(io.BytesIO(data)).paragraphs]
+    streamed = list(iter_docx_paragraphs(io.BytesIO(data)))
+
+    assert streamed == legacy[:3] + ["用途 金额", "珊瑚移植 0.45"] + legacy[3:]
+    assert streamed[-1] == "S2 BCRI\t负责监测。\n"
+
+
+def test_docx_skips_deleted_text_and_fallback_copies():
+    body = (
+        '<w:p><w:hyperlink><w:r><w:t>S1 蓝珊研究所</w:t></w:r></w:hyperlink>'
+        '<w:del><w:r><w:delText>未签署</w:delText></w:r></w:del><w:ins><w:r><w:t>已签署</w:t></w:r></w:ins>'
+        '<w:r><mc:AlternateContent><mc:Choice><w:drawing><w:txbxContent><w:p><w:r><w:t>文本框</w:t></w:r></w:p></w:txbxContent></w:drawing></mc:Choice>'
+        '<mc:Fallback><w:pict><w:txbxContent><w:p><w:r><w:t>文本框</w:t></w:r></w:p></w:txbxContent></w:pict></mc:Fallback></mc:AlternateContent></w:r>'
+        '<w:r><w:t>备忘录。</w:t></w:r></w:p>'
+    )
+    xml = (
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+        f'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"><w:body>{body}</w:body></w:document>'
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", xml)
+
+    assert list(iter_docx_paragraphs(buffer)) == ["文本框", "S1 蓝珊研究所已签署备忘录。"]
+
+
+def test_odt_paragraphs_include_headings_tables_and_spacing():
+    document = OpenDocumentText()
+    document.text.addElement(odf_text.H(outlinelevel=1, text="珊瑚复育2026"))
+    paragraph = odf_text.P()
+    odf_teletype.addTextToElement(paragraph, "S1 NPG  出资\t2.4亿元。")
+    annotation = odf_office.Annotation()
+    annotation.addElement(odf_text.P(text="批注：待核实"))
+    paragraph.addElement(annotation)
+    document.text.addElement(paragraph)
+    table = odf_table.Table()
+    for row in [("用途", "金额"), ("珊瑚移植", "0.45")]:
+        table_row = odf_table.TableRow()
+        table.addElement(table_row)
+        for value in row:
+            cell = odf_table.TableCell()
+            cell.addElement(odf_text.P(text=value))
+            table_row.addElement(cell)
+    document.text.addElement(table)
+    document.text.addElement(odf_text.P(text="S2 BCRI 负责监测。"))
+    buffer = io.BytesIO()
+    document.save(buffer)
+
+    assert list(iter_odt_paragraphs(io.BytesIO(buffer.getvalue()))) == ["珊瑚复育2026", "S1 NPG  出资\t2.4亿元。", "用途 金额", "珊瑚移植 0.45", "S2 BCRI 负责监测。"]
+
+
+def test_document_loader_reads_docx_streams():
+    text, page_starts = extract_text_from_stream(io.BytesIO(docx_bytes()), "memo.docx")
+    assert text.startswith("珊瑚复育2026 备忘录\nS1 NPG 出资2.4亿元。\n\n用途 金额\n") and page_starts is None
@@ -0,0 +1,52 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.parsers.pdf_pages import PdfPage, build_pdf_document_text, iter_pdf_pages, page_for_sentence
+from src.parsers.sentence_chunker import split_sentences
+
+
+def make_pdf(page_texts):
+    """Builds a minimal PDF with one Helvetica text line per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream.decode('latin-1')}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{page_id} 0 R' for page_id in page_ids)}] /Count {len(page_ids)} >>"
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    output += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("latin-1")
+    return bytes(output)
+
+
+def test_pages_are_yielded_with_page_numbers(tmp_path):
+    pdf_path = tmp_path / "report.pdf"
+    pdf_path.write_bytes(make_pdf(["Wind farm approved. Funding secured.", "", "Construction starts in May."]))
+
+    pages = list(iter_pdf_pages(pdf_path))
+    assert [page.page_number for page in pages] == [1, 2, 3]
+    assert "Funding secured." in pages[0].text and pages[1].text == ""
+
+    document = build_pdf_document_text(iter_pdf_pages(pdf_path))
+    assert split_sentences(document.text).sentences == [(1, "Wind farm approved."), (2, "Funding secured."), (3, "Construction starts in May.")]
+    assert document.page_starts == [(1, 1), (3, 3)]
+
+
+def test_sentences_do_not_cross_pages_and_map_back():
+    document = build_pdf_document_text([PdfPage(1, "第一句。第二句"), PdfPage(2, "接上页。第三句。"), PdfPage(4, "附录。")])
+    assert document.text.splitlines() == ["S1 第一句。", "S2 第二句", "S3 接上页。", "S4 第三句。", "S5 附录。"]
+    assert [page_for_sentence(document.page_starts, sentence_id) for sentence_id in range(1, 6)] == [1, 1, 2, 2, 4]
+    # Page starts decoded from JSON come back as lists
+    assert page_for_sentence([[1, 1], [3, 2]], 4) == 2
+    assert page_for_sentence([[3, 2]], 1) is None
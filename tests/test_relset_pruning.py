@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.relset_pruning import RelSetPruner, load_gazetteer, restrict_rel_set
+
+ROOT = Path(__file__).resolve().parent.parent
+GENERIC_REL_SET = json.loads((ROOT / "GraphRAG-RELSET-GenericWeb-zh.json").read_text(encoding="utf-8"))
+AI_RAG_REL_SET = json.loads((ROOT / "GraphRAG-RELSET-AI-RAG-zh.json").read_text(encoding="utf-8"))
+MENTIONS_PATH = ROOT / "GraphRAG-Extract-Best-Example-CoralWind-zh" / "gold" / "mentions.jsonl"
+
+
+def test_gazetteer_types_are_detected_and_mapped():
+    pruner = RelSetPruner(GENERIC_REL_SET, gazetteer=load_gazetteer(MENTIONS_PATH))
+    detected = pruner.detect_types("S1 林瑶在蓝珊研究所工作。")
+    assert detected["Person"] == "gazetteer:林瑶"
+    assert detected["Organization"].startswith("gazetteer:")
+    # Sentence numbers alone do not make the document mention a Value
+    assert "Value" not in pruner.detect_types("S1 林瑶在蓝珊研究所工作。")
+
+
+def test_prune_keeps_applicable_and_wildcard_relations():
+    pruner = RelSetPruner(GENERIC_REL_SET)
+    text = (ROOT / "GraphRAG-Extract-Best-Example-CoralWind-zh" / "corpus" / "d4_rumor_2025-06-21.txt").read_text(encoding="utf-8")
+    result = pruner.prune(text)
+    # The rumor document has no products or works
+    assert {"releases", "publishes"} <= set(result.dropped_relations)
+    assert {"denies", "rumor_about", "caused", "alias_of", "not_same_as"} <= set(result.kept_relations)
+    assert [relation["name"] for relation in result.rel_set["relations"]] == result.kept_relations
+    assert len(GENERIC_REL_SET["relations"]) == 28
+
+
+def test_bare_person_and_organization_names_keep_their_relations():
+    pruner = RelSetPruner(GENERIC_REL_SET)
+    for text in ["S1 林瑶（海洋生物学家）为该项目的首席科学家，隶属BCRI。", "S1 Alice Smith joined Google in 2020."]:
+        result = pruner.prune(text)
+        assert result.detected_types["Person"] == result.detected_types["Organization"] == "undetectable"
+        assert {"member_of", "affiliated_with", "partner_with", "joins", "holds_role"} <= set(result.kept_relations), text
+    # A gazetteer hit is still reported as such
+    assert RelSetPruner(GENERIC_REL_SET, gazetteer=[("BCRI", "Organization")]).detect_types("S1 隶属BCRI。")["Organization"] == "gazetteer:BCRI"
+
+
+def test_types_without_detectors_are_never_ruled_out():
+    pruner = RelSetPruner(AI_RAG_REL_SET)
+    assert "Algorithm" in pruner.undetectable_types
+    result = pruner.prune("S1 我们的 RAG 流水线使用 BM25 检索器和 FAISS 向量库。")
+    assert {"uses_component", "retrieves_with", "implements"} <= set(result.kept_relations)
+    assert {"trains_on", "chunked_into", "cites"} <= set(result.dropped_relations)
+
+
+def test_stats_report_token_savings():
+    pruner = RelSetPruner(GENERIC_REL_SET)
+    result = pruner.prune("S1 张三今天去了公园。")
+    pruner.record(result, prompt_tokens_before=1000, prompt_tokens_after=800)
+    stats = pruner.stats()
+    assert stats["documents"] == 1
+    assert stats["relations_total"] == 28
+    assert stats["prompt_tokens_saved_ratio"] == 0.2
+    assert restrict_rel_set(GENERIC_REL_SET, ["funds"])["relations"] == [GENERIC_REL_SET["relations"][8]]
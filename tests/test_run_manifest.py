@@ -0,0 +1,64 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction.run_manifest import RunManifest, list_runs
+
+DOCUMENTS = [
+    {"doc_id": f"d{index}", "source": f"d{index}.txt", "date": "2025-03-12", "text_with_sentence_ids": f"S1 文档{index}。"}
+    for index in range(1, 4)
+]
+
+
+def test_progress_survives_reload_and_truncated_lines(tmp_path):
+    run = RunManifest.create(tmp_path, DOCUMENTS, config={"model": "gemini-2.5-pro"})
+    run.record(DOCUMENTS[0], "done", graph_payload={"nodes": [], "relationships": []})
+    run.record(DOCUMENTS[1], "error", error="429")
+    # Simulate a crash in the middle of appending the next line
+    with open(run.run_dir / "progress.jsonl", "a", encoding="utf-8") as progress_file:
+        progress_file.write('{"doc_id": "d3", "sta')
+
+    reloaded = RunManifest.load(run.run_dir)
+    assert reloaded.load_documents() == DOCUMENTS
+    assert [reloaded.status_of(doc) for doc in DOCUMENTS] == ["done", "error", "pending"]
+    assert reloaded.load_graph(DOCUMENTS[0]) == {"nodes": [], "relationships": []}
+    assert reloaded.summary()["finished"] == 1 and reloaded.summary()["errors"] == 1
+    assert reloaded.config == {"model": "gemini-2.5-pro"}
+
+
+def test_changed_document_content_is_pending_again(tmp_path):
+    run = RunManifest.create(tmp_path, DOCUMENTS)
+    run.record(DOCUMENTS[0], "done", graph_payload={"nodes": [], "relationships": []})
+    edited = {**DOCUMENTS[0], "text_with_sentence_ids": "S1 改过的文档。"}
+    assert run.is_finished(DOCUMENTS[0])
+    assert not run.is_finished(edited)
+
+
+def test_same_doc_id_twice_is_tracked_per_position(tmp_path):
+    documents = [DOCUMENTS[0], {**DOCUMENTS[0], "source": "upload/d1.txt", "text_with_sentence_ids": "S1 上传的版本。"}]
+    run = RunManifest.create(tmp_path, documents)
+    run.record(documents[0], "done", graph_payload={"nodes": [{"id": "A"}], "relationships": []}, position=0)
+    run.record(documents[1], "done", graph_payload={"nodes": [{"id": "B"}], "relationships": []}, position=1)
+
+    reloaded = RunManifest.load(run.run_dir)
+    assert [reloaded.load_graph(doc, position)["nodes"] for position, doc in enumerate(documents)] == [[{"id": "A"}], [{"id": "B"}]]
+    assert reloaded.summary()["finished"] == 2
+
+
+def test_duplicates_keep_their_representative(tmp_path):
+    run = RunManifest.create(tmp_path, DOCUMENTS)
+    run.record(DOCUMENTS[1], "duplicate", duplicate_of="d1")
+    run.record(DOCUMENTS[2], "skipped")
+
+    reloaded = RunManifest.load(run.run_dir)
+    assert reloaded.entry_of(DOCUMENTS[1])["duplicate_of"] == "d1" and reloaded.is_finished(DOCUMENTS[1])
+    assert reloaded.status_of(DOCUMENTS[2]) == "skipped" and reloaded.summary()["finished"] == 2
+
+
+def test_list_runs_returns_runs_newest_first(tmp_path):
+    first = RunManifest.create(tmp_path, DOCUMENTS[:1])
+    (tmp_path / "not-a-run").mkdir()
+    runs = list_runs(tmp_path)
+    assert [run.run_id for run in runs] == [first.run_id]
+    assert list_runs(tmp_path / "missing") == []
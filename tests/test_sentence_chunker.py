@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.parsers.sentence_chunker import chunk_sentences, chunk_text, estimate_tokens, split_sentences
+
+
+def test_split_sentences_keeps_existing_sentence_ids_and_header():
+    """已带 S 编号的文本保留原编号，元数据行作为每个分块共享的头部。"""
+    text = "# 元数据: source=《珊瑚湾日报》, date=2025-03-12, id=d1\nS1 第一句。\nS2 第二句，\n续行。\n\nS7 第七句。"
+    split = split_sentences(text)
+    assert split.header == "# 元数据: source=《珊瑚湾日报》, date=2025-03-12, id=d1"
+    assert split.sentences == [(1, "第一句。"), (2, "第二句， 续行。"), (7, "第七句。")]
+
+
+def test_split_sentences_segments_unannotated_text():
+    """未标注文本按中英文句末标点切分并从 S1 开始编号。"""
+    split = split_sentences("珊瑚湾市政府签署备忘录。NPG出资2.4亿元！Funding was approved. Is it final?")
+    assert [sentence_id for sentence_id, _ in split.sentences] == [1, 2, 3, 4]
+    assert split.sentences[1][1] == "NPG出资2.4亿元！"
+    assert split.sentences[2][1] == "Funding was approved."
+
+
+def test_chunks_respect_budget_and_overlap():
+    """分块不超过 token 预算，相邻分块按句子重叠，局部编号可映射回文档编号。"""
+    sentences = [(index, "句" * 20 + "。") for index in range(1, 11)]
+    chunks = chunk_sentences(sentences, max_tokens=70, overlap_sentences=1)
+    assert all(chunk.token_estimate <= 70 for chunk in chunks)
+    assert chunks[0].sentence_ids == [1, 2, 3]
+    assert chunks[1].sentence_ids[0] == 3
+    assert chunks[-1].sentence_ids[-1] == 10
+    assert chunks[1].text.splitlines()[0].startswith("S1 ")
+    assert chunks[1].to_document_sentence_id(1) == 3
+    with pytest.raises(IndexError):
+        chunks[1].to_document_sentence_id(9)
+
+
+def test_oversized_sentence_still_forms_a_chunk():
+    """单句超过预算时仍单独成块，保证分块过程总能推进。"""
+    chunks = chunk_text("S1 " + "长" * 500 + "\nS2 短句。", max_tokens=50, overlap_sentences=1)
+    assert [chunk.sentence_ids for chunk in chunks] == [[1], [2]]
+
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens("南海电力集团") == 6
+    assert estimate_tokens("abcdefgh") == 2
@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.parsers.sentence_segmenter import MAX_SENTENCE_CHARS, SentenceIndex, annotate_sentences, segment_sentences
+
+
+def test_segments_chinese_and_english_text():
+    text = "Dr. J. Smith met Mr. Li at 3.5 p.m. on Monday. He said \"it works.\" Then left.\n\n第一章 概述\n她说：“项目获批！”NPG出资2.4亿元。"
+    assert segment_sentences(text) == [
+        "Dr. J. Smith met Mr. Li at 3.5 p.m. on Monday.",
+        "He said \"it works.\"",
+        "Then left.",
+        "第一章 概述",
+        "她说：“项目获批！”",
+        "NPG出资2.4亿元。",
+    ]
+
+
+def test_list_and_section_numbers_stay_with_their_heading():
+    assert segment_sentences("1. 项目概况\n2. 资金安排\n2.1. 出资方") == ["1. 项目概况", "2. 资金安排", "2.1. 出资方"]
+    assert segment_sentences("IV. Results\n  b. Second item\n(3. Third item") == ["IV. Results", "b. Second item", "(3. Third item"]
+    assert segment_sentences("Section 2. The grid connection was approved. Budget rose to 5. Then it fell.") == [
+        "Section 2. The grid connection was approved.",
+        "Budget rose to 5.",
+        "Then it fell.",
+    ]
+
+
+def test_hard_wrapped_lines_are_joined_and_long_runs_are_cut():
+    wrapped = "这是一个在PDF中被硬换行的很长的句子所以这里没有标点\n而是继续到了下一行。\nThis English sentence was also wrapped by the\nconverter in the middle."
+    assert segment_sentences(wrapped) == [
+        "这是一个在PDF中被硬换行的很长的句子所以这里没有标点而是继续到了下一行。",
+        "This English sentence was also wrapped by the converter in the middle.",
+    ]
+    transcript = " ".join(["so we went to the site and looked at the turbines"] * 30)
+    pieces = segment_sentences(transcript)
+    assert len(pieces) > 1 and all(len(piece) <= MAX_SENTENCE_CHARS for piece in pieces)
+
+
+def test_annotation_index_resolves_sentence_offsets():
+    annotated = annotate_sentences("珊瑚湾市政府签署备忘录。NPG出资2.4亿元！Funding was approved.")
+    assert annotated.text == "S1 珊瑚湾市政府签署备忘录。\nS2 NPG出资2.4亿元！\nS3 Funding was approved."
+    assert [annotated.index.sentence_text(annotated.text, sentence_id) for sentence_id in (1, 2, 3)] == ["珊瑚湾市政府签署备忘录。", "NPG出资2.4亿元！", "Funding was approved."]
+    assert annotated.index.span(4) is None and 0 not in annotated.index
+
+    rebuilt = SentenceIndex.from_annotated_text(annotated.text)
+    assert list(rebuilt.starts) == list(annotated.index.starts) and list(rebuilt.ends) == list(annotated.index.ends)
+
+    sparse_text = "# 元数据: id=d1\nS1 第一句。\nS7 第七句。"
+    sparse = SentenceIndex.from_annotated_text(sparse_text)
+    assert sparse.sentence_text(sparse_text, 7) == "第七句。" and 2 not in sparse
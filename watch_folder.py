@@ -0,0 +1,105 @@
+"""
+Watch a corpus directory and keep its knowledge graph up to date, without the UI.
+
+Every --interval seconds the directory is scanned against a manifest of
+path -> (mtime, size, content hash). New and changed files are parsed and extracted,
+deleted files have their graphs retracted, and the merged graph is rewritten to
+<state-dir>/graph.json. --once makes a single pass (e.g. from cron).
+
+    python watch_folder.py GraphRAG-Extract-Best-Example-CoralWind-zh/corpus --interval 30 --incremental
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+
+from src.extraction.cache import create_extraction_cache  # noqa: E402
+from src.extraction.folder_manifest import FolderManifest, poll_folder  # noqa: E402
+from src.extraction.incremental import DocumentSnapshotStore  # noqa: E402
+from src.extraction.llm_scheduler import LLMScheduler, RetryPolicy  # noqa: E402
+from src.parsers.document_loader import find_parseable_files  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--state-dir", type=Path, default=None, help="manifest and graphs (default: <cache dir>/watch/<directory hash>)")
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between scans")
+    parser.add_argument("--once", action="store_true", help="scan and sync once, then exit")
+    parser.add_argument("--model", default="gemini-2.5-pro")
+    parser.add_argument("--rel-set", default="GraphRAG-RELSET-GenericWeb-zh")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--parse-workers", type=int, default=None)
+    parser.add_argument("--html-mode", choices=["main", "full"], default=None, help="main content only or the whole page (default: KGRAPH_HTML_MODE or main)")
+    parser.add_argument("--cache", choices=["memory", "disk", "sqlite"], default=None, help="extraction cache backend")
+    parser.add_argument("--incremental", action="store_true", help="re-extract only the edited sentences of changed documents")
+    parser.add_argument("--rpm", type=int, default=None, help="requests per minute limit")
+    parser.add_argument("--tpm", type=int, default=None, help="tokens per minute limit")
+    return parser.parse_args()
+
+
+def main():
+    # Parsing runs in spawned worker processes that re-import this module, so argument
+    # parsing and the Streamlit app import stay out of module level
+    args = parse_args()
+    directory = args.directory.expanduser().resolve()
+    state_dir = args.state_dir.expanduser().resolve() if args.state_dir else None
+    if not directory.is_dir():
+        sys.exit(f"{directory} is not a directory")
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    # app loads the REL_SETs and the prompt template relative to the project root
+    os.chdir(ROOT)
+    import app
+
+    if args.rel_set not in app.REL_SETS:
+        sys.exit(f"unknown REL_SET {args.rel_set!r}; available: {', '.join(app.REL_SETS)}")
+    state_dir_path = state_dir or app.EXTRACTION_CACHE_DIR.resolve() / "watch" / hashlib.sha256(str(directory).encode("utf-8")).hexdigest()[:16]
+    manifest = FolderManifest(directory, state_dir_path)
+
+    concurrency = args.concurrency or app.DEFAULT_MAX_CONCURRENCY
+    extract_kwargs = {
+        "model_name": args.model,
+        "rel_set_name": args.rel_set,
+        "node_color": "#FFADAD",
+        "edge_color": "#9BF6FF",
+        "max_concurrency": concurrency,
+        "max_chunk_tokens": app.DEFAULT_CHUNK_TOKEN_BUDGET or None,
+        "cache": create_extraction_cache(args.cache, app.EXTRACTION_CACHE_DIR) if args.cache else None,
+        "scheduler": LLMScheduler(
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            initial_concurrency=concurrency,
+            max_concurrency=concurrency,
+            retry_policy=RetryPolicy(max_retries=app.DEFAULT_MAX_RETRIES),
+        ),
+        "snapshot_store": DocumentSnapshotStore(state_dir_path / "snapshots") if args.incremental else None,
+    }
+
+    def on_changes(changes):
+        summary = app.sync_watched_folder(manifest, changes, parse_workers=args.parse_workers, html_mode=args.html_mode, **extract_kwargs)
+        print(json.dumps(summary, ensure_ascii=False), flush=True)
+
+    print(f"watching {directory} (state: {state_dir_path})", flush=True)
+    stop_event = threading.Event()
+    try:
+        poll_folder(
+            lambda: find_parseable_files(directory, app.SUPPORTED_FILE_EXTENSIONS),
+            manifest,
+            on_changes,
+            interval_seconds=args.interval,
+            max_cycles=1 if args.once else None,
+            stop_event=stop_event,
+        )
+    except KeyboardInterrupt:
+        stop_event.set()
+
+
+if __name__ == "__main__":
+    main()